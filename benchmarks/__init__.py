@@ -0,0 +1,5 @@
+"""
+Micro benchmarks. Each module can be run as a script, e.g.
+
+    python -m benchmarks.bench_cookie
+"""
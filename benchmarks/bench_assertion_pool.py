@@ -0,0 +1,64 @@
+"""
+Compares the time it takes to construct a token request using private_key_jwt client
+authentication with an RSA key, with and without a pool of pre-signed assertions.
+"""
+import timeit
+
+from cryptojwt.key_jar import init_key_jar
+
+from idpyoidc.client.assertion_pool import AssertionPool
+from idpyoidc.client.client_auth import PrivateKeyJWT
+from idpyoidc.client.entity import Entity
+from idpyoidc.message.oauth2 import AccessTokenRequest
+
+CLIENT_CONF = {"client_id": "client_1", "client_secret": "a longer client secret"}
+
+KEY_CONF = {"key_defs": [{"type": "RSA", "key": "", "use": ["sig"]}], "read_only": False}
+
+
+def setup():
+    entity = Entity(
+        config=CLIENT_CONF,
+        services={"base": {"class": "idpyoidc.client.service.Service"}},
+        keyjar=init_key_jar(**KEY_CONF),
+        client_type="oidc",
+    )
+    _context = entity.get_service_context()
+    _context.map_supported_to_preferred()
+    _context.map_preferred_to_registered()
+    _context.provider_info = {
+        "issuer": "https://example.com/",
+        "token_endpoint": "https://example.com/token",
+    }
+    return entity.get_service("")
+
+
+def token_request(method, service):
+    request = AccessTokenRequest(grant_type="authorization_code", code="code")
+    method.construct(request, service=service, authn_endpoint="token_endpoint")
+    return request
+
+
+def main(number: int = 200):
+    service = setup()
+
+    _time = min(
+        timeit.repeat(lambda: token_request(PrivateKeyJWT(), service), number=number, repeat=3)
+    )
+    print(f"without pool {_time / number * 1e6:8.1f} us/request")
+
+    # The pool is refilled in the foreground here, between the timed requests, since a
+    # background thread would compete with the request path for the interpreter.
+    _pool = AssertionPool(size=number, background=False)
+    _method = PrivateKeyJWT(assertion_pool=_pool)
+    token_request(_method, service)
+    _times = []
+    for _ in range(3):
+        _pool.refill()
+        _times.append(timeit.timeit(lambda: token_request(_method, service), number=number))
+    print(f"with pool    {min(_times) / number * 1e6:8.1f} us/request")
+    print(f"pool stats   {_pool.metrics}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Compares the time it takes to make and parse a cookie in the old and the
+compact cookie format.
+"""
+import timeit
+
+from idpyoidc.server.cookie_handler import CookieHandler
+
+SIGN_KEY = "ghsNKDDLshZTPn974nOsIGhedULrsqnsGoBFBLwUKuJhE2ch"
+ENC_KEY = "NXi6HD473d_YS4exVRn7z9z23mGmvU641MuvKqH0o7Y"
+NAME = "idpyoidc.server"
+
+
+def round_trip(handler):
+    _cookie = handler.make_cookie_content(NAME, "a_session_identifier", "sso")
+    return handler.parse_cookie(NAME, [_cookie])
+
+
+def main(number: int = 10000):
+    for _compact in [False, True]:
+        for _keys in [{"sign_key": SIGN_KEY}, {"sign_key": SIGN_KEY, "enc_key": ENC_KEY}]:
+            handler = CookieHandler(compact=_compact, **_keys)
+            _size = len(handler.make_cookie_content(NAME, "a_session_identifier", "sso")["value"])
+            _time = timeit.timeit(lambda: round_trip(handler), number=number)
+            print(
+                f"compact={_compact!s:5} keys={'+'.join(_keys.keys()):17} "
+                f"size={_size:4} {_time / number * 1e6:8.1f} us/round trip"
+            )
+
+
+if __name__ == "__main__":
+    main()
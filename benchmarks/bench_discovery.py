@@ -0,0 +1,103 @@
+"""
+Serves the provider configuration and the JWKS the way it was done before, by
+serialising on every request, and from the pre-serialised response, with and
+without a matching If-None-Match header.
+"""
+import json
+import os
+import timeit
+
+from idpyoidc.server import Server
+from idpyoidc.server.configure import OPConfiguration
+from idpyoidc.server.endpoint import Endpoint
+from idpyoidc.server.oauth2.jwks import JWKS
+from idpyoidc.server.oidc.provider_config import ProviderConfiguration
+
+BASEDIR = os.path.abspath(os.path.dirname(__file__))
+
+CRYPT_CONFIG = {
+    "kwargs": {
+        "keys": {
+            "key_defs": [
+                {"type": "OCT", "use": ["enc"], "kid": "password"},
+                {"type": "OCT", "use": ["enc"], "kid": "salt"},
+            ]
+        },
+        "iterations": 1,
+    }
+}
+
+KEYDEFS = [
+    {"type": "RSA", "key": "", "use": ["sig"]},
+    {"type": "RSA", "key": "", "use": ["enc"]},
+    {"type": "EC", "crv": "P-256", "use": ["sig"]},
+    {"type": "EC", "crv": "P-256", "use": ["enc"]},
+]
+
+
+def setup():
+    conf = {
+        "issuer": "https://example.com/",
+        "httpc_params": {"verify": False},
+        "keys": {"uri_path": "static/jwks.json", "key_defs": KEYDEFS},
+        "token_handler_args": {
+            "code": {"kwargs": {"lifetime": 600, "crypt_conf": CRYPT_CONFIG}},
+            "token": {"kwargs": {"lifetime": 3600, "crypt_conf": CRYPT_CONFIG}},
+        },
+        "endpoint": {
+            "provider_config": {
+                "path": ".well-known/openid-configuration",
+                "class": ProviderConfiguration,
+                "kwargs": {},
+            },
+            "jwks": {"path": "static/jwks.json", "class": JWKS, "kwargs": {}},
+        },
+        "session_params": {"encrypter": CRYPT_CONFIG},
+    }
+    return Server(OPConfiguration(conf=conf, base_path=BASEDIR), cwd=BASEDIR)
+
+
+def discovery_serialised(endpoint):
+    args = endpoint.process_request()
+    return Endpoint.do_response(endpoint, args["response_args"])
+
+
+def discovery_cached(endpoint, http_info=None):
+    args = endpoint.process_request(http_info=http_info)
+    if "response_code" in args:
+        return endpoint.do_response(**args)
+    return endpoint.do_response(args["response_args"])
+
+
+def jwks_serialised(server):
+    return json.dumps(server.keyjar.export_jwks())
+
+
+def jwks_cached(endpoint, http_info=None):
+    return endpoint.do_response(**endpoint.process_request(http_info=http_info))
+
+
+def main(number: int = 10000):
+    server = setup()
+    _discovery = server.get_endpoint("provider_config")
+    _jwks = server.get_endpoint("jwks")
+    _discovery_etag = discovery_cached(_discovery)["etag"]
+    _jwks_etag = jwks_cached(_jwks)["etag"]
+
+    for _name, _func in [
+        ("discovery serialised", lambda: discovery_serialised(_discovery)),
+        ("discovery cached", lambda: discovery_cached(_discovery)),
+        (
+            "discovery 304",
+            lambda: discovery_cached(_discovery, {"headers": {"If-None-Match": _discovery_etag}}),
+        ),
+        ("jwks serialised", lambda: jwks_serialised(server)),
+        ("jwks cached", lambda: jwks_cached(_jwks)),
+        ("jwks 304", lambda: jwks_cached(_jwks, {"headers": {"If-None-Match": _jwks_etag}})),
+    ]:
+        _time = min(timeit.repeat(_func, number=number, repeat=3))
+        print(f"{_name:22} {number / _time:10.0f} requests/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,724 @@
+"""
+End-to-end benchmarks. An in-process Server and StandAloneClient instances go through
+complete flows, without any network in between:
+
+    code                 authorization request and access token request
+    refresh              refresh access token
+    client_credentials   access token using the client credentials grant
+    introspection        introspection of an access token
+    userinfo             user info request
+    par                  pushed authorization, authorization and access token request
+    dpop                 authorization and access token request with a DPoP proof
+    logout               RP initiated logout
+
+How many users, clients and live sessions there are is configurable. Throughput,
+latency percentiles and memory are reported per flow. The result can be saved as a
+baseline that later runs are compared with.
+
+    python -m benchmarks.bench_flows --users 1000 --clients 10 --sessions 10000
+    python -m benchmarks.bench_flows --save baseline.json
+    python -m benchmarks.bench_flows --compare baseline.json
+"""
+import argparse
+import gc
+import json
+import logging
+import math
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from urllib.parse import parse_qs
+from urllib.parse import urlsplit
+
+try:
+    import resource
+except ImportError:  # Not on Windows
+    resource = None
+
+from requests.structures import CaseInsensitiveDict
+
+from idpyoidc.client.oauth2.stand_alone_client import StandAloneClient
+from idpyoidc.message.oauth2 import is_error_message
+from idpyoidc.message.oidc import AuthorizationRequest
+from idpyoidc.server import Server
+from idpyoidc.server.authn_event import create_authn_event
+from idpyoidc.server.configure import OPConfiguration
+from idpyoidc.server.cookie_handler import CookieHandler
+from idpyoidc.server.user_authn.authn_context import INTERNETPROTOCOLPASSWORD
+
+BASEDIR = os.path.abspath(os.path.dirname(__file__))
+
+ISSUER = "https://op.example.com"
+
+KEYDEFS = [
+    {"type": "RSA", "key": "", "use": ["sig"]},
+    {"type": "EC", "crv": "P-256", "use": ["sig"]},
+]
+
+CRYPT_CONFIG = {
+    "kwargs": {
+        "keys": {
+            "key_defs": [
+                {"type": "OCT", "use": ["enc"], "kid": "password"},
+                {"type": "OCT", "use": ["enc"], "kid": "salt"},
+            ]
+        },
+        "iterations": 1,
+    }
+}
+
+SCOPE = ["openid", "email", "offline_access"]
+
+SERVER_CONF = {
+    "issuer": ISSUER,
+    "httpc_params": {"verify": False},
+    "keys": {"uri_path": "jwks.json", "key_defs": KEYDEFS},
+    "endpoint": {
+        "provider_info": {
+            "path": ".well-known/openid-configuration",
+            "class": "idpyoidc.server.oidc.provider_config.ProviderConfiguration",
+            "kwargs": {},
+        },
+        "jwks": {"path": "jwks.json", "class": "idpyoidc.server.oauth2.jwks.JWKS", "kwargs": {}},
+        "authorization": {
+            "path": "authorization",
+            "class": "idpyoidc.server.oidc.authorization.Authorization",
+            "kwargs": {},
+        },
+        "pushed_authorization": {
+            "path": "pushed_authorization",
+            "class": "idpyoidc.server.oauth2.pushed_authorization.PushedAuthorization",
+            "kwargs": {"client_authn_method": ["client_secret_basic"]},
+        },
+        "token": {
+            "path": "token",
+            "class": "idpyoidc.server.oidc.token.Token",
+            "kwargs": {
+                "client_authn_method": ["client_secret_basic"],
+                "grant_types_helpers": {
+                    "authorization_code": {
+                        "class": "idpyoidc.server.oidc.token_helper.access_token"
+                        ".AccessTokenHelper"
+                    },
+                    "refresh_token": {
+                        "class": "idpyoidc.server.oidc.token_helper.refresh_token"
+                        ".RefreshTokenHelper"
+                    },
+                    "client_credentials": {
+                        "class": "idpyoidc.server.oauth2.token_helper.client_credentials"
+                        ".ClientCredentials"
+                    },
+                },
+            },
+        },
+        "userinfo": {
+            "path": "userinfo",
+            "class": "idpyoidc.server.oidc.userinfo.UserInfo",
+            "kwargs": {"client_authn_method": ["bearer_header"]},
+        },
+        "introspection": {
+            "path": "introspection",
+            "class": "idpyoidc.server.oauth2.introspection.Introspection",
+            "kwargs": {"client_authn_method": ["client_secret_basic"]},
+        },
+        "session": {
+            "path": "end_session",
+            "class": "idpyoidc.server.oidc.session.Session",
+            "kwargs": {
+                "post_logout_uri_path": "post_logout",
+                "signing_alg": "ES256",
+                "logout_verify_url": f"{ISSUER}/verify_logout",
+                "client_authn_method": ["none"],
+            },
+        },
+    },
+    "add_on": {
+        "dpop": {
+            "function": "idpyoidc.server.oauth2.add_on.dpop.add_support",
+            "kwargs": {"dpop_signing_alg_values_supported": ["ES256"]},
+        },
+    },
+    "authentication": {
+        "anon": {
+            "acr": INTERNETPROTOCOLPASSWORD,
+            "class": "idpyoidc.server.user_authn.user.NoAuthn",
+            "kwargs": {"user": "user_0"},
+        }
+    },
+    "authz": {
+        "class": "idpyoidc.server.authz.AuthzHandling",
+        "kwargs": {
+            "grant_config": {
+                "usage_rules": {
+                    "authorization_code": {
+                        "supports_minting": ["access_token", "refresh_token", "id_token"],
+                        "max_usage": 1,
+                    },
+                    "access_token": {},
+                    "refresh_token": {"supports_minting": ["access_token", "refresh_token"]},
+                },
+                "expires_in": 43200,
+            }
+        },
+    },
+    "token_handler_args": {
+        "code": {"kwargs": {"lifetime": 600, "crypt_conf": CRYPT_CONFIG}},
+        "token": {
+            "class": "idpyoidc.server.token.jwt_token.JWTToken",
+            "kwargs": {"lifetime": 3600, "add_claims_by_scope": True},
+        },
+        "refresh": {
+            "class": "idpyoidc.server.token.jwt_token.JWTToken",
+            "kwargs": {"lifetime": 86400},
+        },
+        "id_token": {"class": "idpyoidc.server.token.id_token.IDToken", "kwargs": {}},
+    },
+    "session_params": {"encrypter": CRYPT_CONFIG},
+}
+
+COOKIE_CONF = {
+    "sign_key": "ghsNKDDLshZTPn974nOsIGhedULrsqnsGoBFBLwUKuJhE2ch",
+    "name": {"session": "oidc_op", "register": "oidc_op_reg"},
+}
+
+CLIENT_SERVICES = {
+    "provider_info": {
+        "class": "idpyoidc.client.oidc.provider_info_discovery.ProviderInfoDiscovery"
+    },
+    "authorization": {"class": "idpyoidc.client.oidc.authorization.Authorization"},
+    "accesstoken": {"class": "idpyoidc.client.oidc.access_token.AccessToken"},
+    "refresh_token": {"class": "idpyoidc.client.oidc.refresh_access_token.RefreshAccessToken"},
+    "userinfo": {"class": "idpyoidc.client.oidc.userinfo.UserInfo"},
+    "client_credentials": {
+        "class": "idpyoidc.client.oauth2.client_credentials.CCAccessTokenRequest"
+    },
+    "introspection": {"class": "idpyoidc.client.oauth2.introspection.Introspection"},
+    "end_session": {"class": "idpyoidc.client.oidc.end_session.EndSession"},
+}
+
+# Kinds of clients, a flow picks the one it needs
+CLIENT_ADD_ONS = {
+    "plain": {},
+    "par": {
+        "par": {
+            "function": "idpyoidc.client.oauth2.add_on.par.add_support",
+            "kwargs": {"body_format": "urlencoded", "authn_method": "client_secret_basic"},
+        }
+    },
+    "dpop": {
+        "dpop": {
+            "function": "idpyoidc.client.oauth2.add_on.dpop.add_support",
+            "kwargs": {"dpop_signing_alg_values_supported": ["ES256"]},
+        }
+    },
+}
+
+PERCENTILES = [50, 90, 99]
+
+
+class HTTPResponse(object):
+    def __init__(self, status_code: int, text: str = "", headers: dict = None, cookie=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.cookie = cookie
+
+
+class InProcessHTTP(object):
+    """
+    Takes the place of the HTTP client. Requests are handed to the server endpoint
+    the URL points to, which does what it would have done behind a web server.
+    """
+
+    def __init__(self, server: Server):
+        self.server = server
+        self.endpoint = {_endp.full_path: _endp for _endp in server.endpoint.values()}
+
+    def __call__(self, method, url, data=None, headers=None, cookie=None, **kwargs):
+        _part = urlsplit(url)
+        _url = f"{_part.scheme}://{_part.netloc}{_part.path}"
+        _endpoint = self.endpoint[_url]
+
+        http_info = {"headers": headers or {}, "url": _url, "method": method}
+        if cookie:
+            http_info["cookie"] = cookie
+
+        if data is None and _part.query:
+            data = query(url)
+        _request = _endpoint.parse_request(data, http_info=http_info)
+        if is_error_message(_request):
+            _resp = _request
+        else:
+            _resp = _endpoint.process_request(_request, http_info=http_info)
+
+        if "error" in _resp:
+            _error = {k: v for k, v in _resp.items() if k.startswith("error")}
+            return HTTPResponse(400, json.dumps(_error), {"Content-Type": "application/json"})
+        if "http_response" in _resp:
+            return HTTPResponse(200, json.dumps(_resp["http_response"]))
+        if "redirect_location" in _resp:
+            return HTTPResponse(302, headers={"Location": _resp["redirect_location"]})
+
+        _info = _endpoint.do_response(request=_request, **_resp)
+        if _endpoint.response_placement == "url":
+            return HTTPResponse(
+                302, headers={"Location": _info["response"]}, cookie=_resp.get("cookie")
+            )
+        return HTTPResponse(
+            _info.get("response_code", 200), _info["response"], dict(_info["http_headers"])
+        )
+
+
+def query(url: str) -> dict:
+    return {k: v[0] for k, v in parse_qs(urlsplit(url).query).items()}
+
+
+
+
+def check(response):
+    if is_error_message(response):
+        raise ValueError(f"Error response: {response.to_dict()}")
+    return response
+
+
+class Environment(object):
+    """
+    A server with users, registered clients and live sessions, and the clients.
+
+    :param users: Number of users
+    :param clients: Number of clients of each kind
+    :param sessions: Number of sessions there before anything is measured
+    :param stages: Whether the time spent in each stage should be collected
+    :param seed: Seed for picking users and clients
+    """
+
+    def __init__(self, users=100, clients=10, sessions=1000, stages=False, seed=1):
+        self.users = [f"user_{n}" for n in range(users)]
+        self.client_ids = [f"client_{n}" for n in range(clients)]
+        self.random = random.Random(seed)
+
+        conf = dict(SERVER_CONF)
+        conf["userinfo"] = {
+            "class": "idpyoidc.server.user_info.UserInfo",
+            "kwargs": {"db": {_uid: self.user_info(_uid) for _uid in self.users}},
+        }
+        conf["cookie_handler"] = {"class": CookieHandler, "kwargs": COOKIE_CONF}
+        if stages:
+            conf["instrumentation"] = {
+                "class": "idpyoidc.server.instrumentation.HistogramCollector",
+                "kwargs": {},
+            }
+        self.server = Server(OPConfiguration(conf, base_path=BASEDIR), cwd=BASEDIR)
+        self.context = self.server.context
+        self.http = InProcessHTTP(self.server)
+        # Whoever it's told to is the one that logs in
+        self.authn = self.context.authn_broker.get_method_by_id("anon")
+
+        # (kind, client ID) -> StandAloneClient
+        self.client = {}
+        for _kind in CLIENT_ADD_ONS.keys():
+            for _client_id in self.client_ids:
+                self.client[(_kind, _client_id)] = self.register(_kind, _client_id)
+
+        self.add_sessions(sessions)
+
+    @staticmethod
+    def user_info(uid):
+        return {"sub": uid, "email": f"{uid}@example.org", "email_verified": True}
+
+    def register(self, kind, client_id):
+        """
+        Registers a client at the server and sets up the client.
+
+        :param kind: Which kind of client
+        :param client_id: Client ID, prefixed with the kind
+        :return: A StandAloneClient instance
+        """
+        _id = f"{kind}_{client_id}"
+        _base = f"https://{_id}.example.org"
+        _secret = f"{_id}_secret_of_some_length"
+        self.context.cdb[_id] = {
+            "client_id": _id,
+            "client_secret": _secret,
+            "client_salt": _id,
+            "redirect_uris": [(f"{_base}/cb", {})],
+            "post_logout_redirect_uri": [f"{_base}/logout_cb", ""],
+            "response_types_supported": ["code"],
+            "token_endpoint_auth_method": "client_secret_basic",
+            "grant_types_supported": ["authorization_code", "refresh_token", "client_credentials"],
+            "allowed_scopes": SCOPE,
+        }
+
+        _client = StandAloneClient(
+            config={
+                "base_url": f"{_base}/",
+                "client_id": _id,
+                "client_secret": _secret,
+                "client_type": "oidc",
+                "issuer": ISSUER,
+                "redirect_uris": [f"{_base}/cb"],
+                "post_logout_redirect_uris": [f"{_base}/logout_cb"],
+                "token_endpoint_auth_methods_supported": ["client_secret_basic"],
+                "client_authn_methods": ["client_secret_basic", "bearer_header"],
+                "response_types_supported": ["code"],
+                "services": CLIENT_SERVICES,
+                "add_ons": CLIENT_ADD_ONS[kind],
+            },
+            httpc=self.http,
+        )
+        _client.keyjar.httpc = self.http
+        _context = _client.get_context()
+        if "pushed_authorization" in _context.add_on:
+            _context.add_on["pushed_authorization"]["http_client"] = self.http
+        _client.do_provider_info()
+        _client.do_client_registration()
+        return _client
+
+    def add_sessions(self, number):
+        """
+        Sessions created directly by the session manager, makes the session store as
+        big as it is on a server with that many users logged in.
+        """
+        _mngr = self.context.session_manager
+        for _ in range(number):
+            _uid = self.random.choice(self.users)
+            _client_id = f"plain_{self.random.choice(self.client_ids)}"
+            _request = AuthorizationRequest(
+                client_id=_client_id,
+                redirect_uri=f"https://{_client_id}.example.org/cb",
+                scope=SCOPE,
+                response_type="code",
+            )
+            _mngr.create_session(create_authn_event(_uid), _request, _uid, client_id=_client_id)
+
+    def pick(self, kind="plain"):
+        """
+        :return: A user ID and a client of the given kind
+        """
+        _uid = self.random.choice(self.users)
+        return _uid, self.client[(kind, self.random.choice(self.client_ids))]
+
+    def authorize(self, uid, client, scope=None):
+        """
+        The user is sent to the authorization endpoint, logs in and is sent back to
+        the client.
+
+        :return: The state and the cookie the user agent got
+        """
+        scope = scope or SCOPE
+        _args = {"scope": scope}
+        if "offline_access" in scope:
+            _args["prompt"] = "consent"
+
+        self.authn.user = uid
+        _resp = self.http("GET", client.init_authorization(req_args=_args))
+        _response = query(_resp.headers["location"])
+        check(client.finalize_auth(_response))
+        return _response["state"], _resp.cookie
+
+    def code_flow(self, uid, client, scope=None):
+        _state, _cookie = self.authorize(uid, client, scope)
+        check(client.get_tokens(_state))
+        return _state, _cookie
+
+
+# A flow is a function that prepares a number of runs, returning the arguments for
+# each run, and a function that does one run.
+
+
+def prepare_code(kind="plain", scope=None):
+    def prepare(env, number):
+        return [env.pick(kind) + (scope,) for _ in range(number)]
+
+    return prepare
+
+
+def run_code(env, uid, client, scope):
+    env.code_flow(uid, client, scope)
+
+
+def prepare_tokens(env, number, limit=100):
+    # The tokens can be used over and over again
+    _states = []
+    for _ in range(min(number, limit)):
+        _uid, _client = env.pick()
+        _states.append((_client, env.code_flow(_uid, _client)[0]))
+    return [_states[n % len(_states)] for n in range(number)]
+
+
+def run_refresh(env, client, state):
+    check(client.refresh_access_token(state))
+
+
+def run_introspection(env, client, state):
+    _token = client.get_context().cstate.get_set(state, claim=["access_token"])["access_token"]
+    _resp = client.do_request(
+        "introspection",
+        request_args={"token": _token, "token_type_hint": "access_token"},
+        authn_method="client_secret_basic",
+        state=state,
+    )
+    if not check(_resp)["active"]:
+        raise ValueError("Token not active")
+
+
+def run_userinfo(env, client, state):
+    check(client.get_user_info(state))
+
+
+def prepare_client_credentials(env, number):
+    return [(env.pick()[1], f"cc_{n}") for n in range(number)]
+
+
+def run_client_credentials(env, client, state):
+    _resp = client.do_request(
+        "client_credentials",
+        request_args={"scope": ["email"]},
+        authn_method="client_secret_basic",
+        state=state,
+    )
+    check(_resp)
+
+
+def prepare_logout(env, number):
+    res = []
+    for _ in range(number):
+        _uid, _client = env.pick()
+        res.append((_client,) + env.code_flow(_uid, _client))
+    return res
+
+
+def run_logout(env, client, state, cookie):
+    _context = client.get_context()
+    _info = client.logout(state, _context.get_usage("post_logout_redirect_uris")[0])
+    _resp = env.http("GET", _info["url"], cookie=cookie)
+    # What's done when the user has confirmed the logout
+    _endpoint = env.server.get_endpoint("session")
+    _payload = _endpoint.unpack_signed_jwt(query(_resp.headers["location"])["sjwt"])
+    _endpoint.do_verified_logout(_payload["sid"])
+    client.clear_session(state)
+
+
+FLOWS = {
+    "code": (prepare_code(), run_code),
+    "refresh": (prepare_tokens, run_refresh),
+    "client_credentials": (prepare_client_credentials, run_client_credentials),
+    "introspection": (prepare_tokens, run_introspection),
+    "userinfo": (prepare_tokens, run_userinfo),
+    # The PAR add-on doesn't keep prompt in the authorization request, which
+    # offline_access requires
+    "par": (prepare_code("par", ["openid", "email"]), run_code),
+    "dpop": (prepare_code("dpop"), run_code),
+    "logout": (prepare_logout, run_logout),
+}
+
+# What is compared with a baseline and whether higher is better
+COMPARED = {"throughput": True, "p50": False, "p90": False, "memory": False}
+
+# Differences in memory use per run smaller than this are noise
+MEMORY_SLACK = 1024
+
+
+def percentile(samples, q):
+    """
+    :param samples: Sorted samples
+    :param q: Percentile, 0-100
+    :return: The nearest rank percentile
+    """
+    return samples[max(0, math.ceil(q / 100.0 * len(samples)) - 1)]
+
+
+def measure(env, name, runs=200, warmup=20, memory_runs=50):
+    """
+    Times a number of runs of a flow, one at a time, and then measures the memory
+    used by some more runs. Memory is measured separately since tracing allocations
+    makes everything slower.
+
+    :return: A dictionary with the result
+    """
+    prepare, run = FLOWS[name]
+    _args = prepare(env, warmup + runs + memory_runs)
+    for _arg in _args[:warmup]:
+        run(env, *_arg)
+
+    _instrumentation = env.context.instrumentation
+    if _instrumentation.enabled:
+        _instrumentation.reset()
+
+    gc.collect()
+    _times = []
+    _start = time.perf_counter()
+    for _arg in _args[warmup : warmup + runs]:
+        _begin = time.perf_counter()
+        run(env, *_arg)
+        _times.append(time.perf_counter() - _begin)
+    _total = time.perf_counter() - _start
+    _times.sort()
+
+    res = {"runs": runs, "throughput": runs / _total}
+    for _q in PERCENTILES:
+        res[f"p{_q}"] = percentile(_times, _q)
+    res["max"] = _times[-1]
+    if _instrumentation.enabled:
+        res["stages"] = stages(_instrumentation)
+
+    gc.collect()
+    tracemalloc.start()
+    _before = tracemalloc.get_traced_memory()[0]
+    for _arg in _args[warmup + runs :]:
+        run(env, *_arg)
+    gc.collect()
+    _after, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    res["memory"] = (_after - _before) / max(memory_runs, 1)
+    res["peak"] = _peak - _before
+    return res
+
+
+def stages(collector, number=5):
+    """
+    :return: The stages where the most time was spent, with mean and 99th percentile
+    """
+    _summary = sorted(collector.summary().items(), key=lambda x: x[1]["sum"], reverse=True)
+    return [
+        {
+            "stage": f"{_endpoint}.{_stage}",
+            "count": _info["count"],
+            "mean": _info["mean"],
+            "p99": collector.percentile(_endpoint, _stage, 99),
+        }
+        for (_endpoint, _stage), _info in _summary[:number]
+    ]
+
+
+def report(results, baseline=None):
+    _head = f"{'flow':20} {'runs':>6} {'ops/s':>9}"
+    _head += "".join(f" {f'p{_q} ms':>8}" for _q in PERCENTILES)
+    _head += f" {'kB/run':>8} {'peak kB':>8}"
+    print(_head)
+    for _name, _res in results.items():
+        _line = f"{_name:20} {_res['runs']:6} {_res['throughput']:9.1f}"
+        _line += "".join(f" {_res[f'p{_q}'] * 1000:8.2f}" for _q in PERCENTILES)
+        _line += f" {_res['memory'] / 1024:8.1f} {_res['peak'] / 1024:8.1f}"
+        _base = (baseline or {}).get(_name)
+        if _base:
+            _line += f"   {(_res['throughput'] / _base['throughput'] - 1) * 100:+6.1f}% ops/s"
+        print(_line)
+        for _stage in _res.get("stages", []):
+            print(
+                f"    {_stage['stage']:40} {_stage['count']:6} {_stage['mean'] * 1000:8.3f} ms"
+                f" mean {_stage['p99'] * 1000:8.3f} ms p99"
+            )
+
+
+def regressions(results, baseline, tolerance=0.25):
+    """
+    Compares results with a baseline.
+
+    :param results: Result per flow
+    :param baseline: Result per flow from an earlier run
+    :param tolerance: How much worse, as a fraction, a value may be
+    :return: A list of (flow, what, baseline value, value) tuples
+    """
+    res = []
+    for _name, _res in results.items():
+        _base = baseline.get(_name)
+        if not _base:
+            continue
+        for _key, _higher_is_better in COMPARED.items():
+            _old = _base[_key]
+            _new = _res[_key]
+            if _key == "memory":
+                _worse = _new - _old > max(MEMORY_SLACK, abs(_old) * tolerance)
+            elif _higher_is_better:
+                _worse = _new < _old / (1 + tolerance)
+            else:
+                _worse = _new > _old * (1 + tolerance)
+            if _worse:
+                res.append((_name, _key, _old, _new))
+    return res
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=100, help="Number of users")
+    parser.add_argument("--clients", type=int, default=10, help="Number of clients of each kind")
+    parser.add_argument("--sessions", type=int, default=1000, help="Number of live sessions")
+    parser.add_argument("--runs", type=int, default=200, help="Timed runs per flow")
+    parser.add_argument("--warmup", type=int, default=20, help="Runs before the timed ones")
+    parser.add_argument(
+        "--memory-runs", type=int, default=50, help="Runs per flow when measuring memory"
+    )
+    parser.add_argument("--seed", type=int, default=1, help="Seed for picking users and clients")
+    parser.add_argument("--flows", nargs="+", choices=list(FLOWS.keys()), default=list(FLOWS))
+    parser.add_argument(
+        "--stages", action="store_true", help="Show the stages where most time is spent"
+    )
+    parser.add_argument("--save", help="Store the result as a baseline in this file")
+    parser.add_argument("--compare", help="Compare with the baseline in this file")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="Allowed regression, as a fraction"
+    )
+    args = parser.parse_args(argv)
+
+    # The clients complain about content types that are fine
+    logging.basicConfig(level=logging.ERROR)
+
+    scale = {"users": args.users, "clients": args.clients, "sessions": args.sessions}
+    _start = time.perf_counter()
+    env = Environment(stages=args.stages, seed=args.seed, **scale)
+    print(
+        f"{args.users} users, {args.clients} clients of each kind, {args.sessions} sessions,"
+        f" set up in {time.perf_counter() - _start:.1f} s"
+    )
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fp:
+            _saved = json.load(fp)
+        if _saved["scale"] != scale:
+            print(f"Baseline is for another scale: {_saved['scale']}")
+        baseline = _saved["flows"]
+
+    results = {}
+    for _name in args.flows:
+        results[_name] = measure(
+            env, _name, runs=args.runs, warmup=args.warmup, memory_runs=args.memory_runs
+        )
+    report(results, baseline)
+
+    _mngr = env.context.session_manager
+    print(f"{len(_mngr.db.db)} items in the session store")
+    if resource:
+        _rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"{_rss / 1024:.0f} MB max resident set size")
+
+    if args.save:
+        with open(args.save, "w") as fp:
+            json.dump(
+                {
+                    "scale": scale,
+                    "runs": args.runs,
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "flows": results,
+                },
+                fp,
+                indent=2,
+                sort_keys=True,
+            )
+
+    if baseline:
+        _found = regressions(results, baseline, args.tolerance)
+        for _name, _key, _old, _new in _found:
+            print(f"REGRESSION {_name} {_key}: {_old:.6g} -> {_new:.6g}")
+        if _found:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Compares the per token cost of introspection without a cache, with a cache and
+when done in batches.
+"""
+import os
+import timeit
+
+from idpyoidc.message.oidc import AuthorizationRequest
+from idpyoidc.server import Server
+from idpyoidc.server.authn_event import create_authn_event
+from idpyoidc.server.client_authn import verify_client
+from idpyoidc.server.configure import ASConfiguration
+from idpyoidc.server.oauth2.introspection import BatchIntrospection
+from idpyoidc.server.oauth2.introspection import Introspection
+from idpyoidc.server.user_info import UserInfo
+
+BASEDIR = os.path.abspath(os.path.dirname(__file__))
+
+CRYPT_CONFIG = {
+    "kwargs": {
+        "keys": {
+            "key_defs": [
+                {"type": "OCT", "use": ["enc"], "kid": "password"},
+                {"type": "OCT", "use": ["enc"], "kid": "salt"},
+            ]
+        },
+        "iterations": 1,
+    }
+}
+
+AUTH_REQ = AuthorizationRequest(
+    client_id="client_1",
+    redirect_uri="https://example.com/cb",
+    scope=["openid"],
+    state="STATE",
+    response_type="code",
+)
+
+CONF = {
+    "issuer": "https://example.com/",
+    "httpc_params": {"verify": False},
+    "keys": {"key_defs": [{"type": "RSA", "key": "", "use": ["sig"]}]},
+    "token_handler_args": {
+        "code": {"kwargs": {"lifetime": 600, "crypt_conf": CRYPT_CONFIG}},
+        "token": {"kwargs": {"lifetime": 3600, "crypt_conf": CRYPT_CONFIG}},
+    },
+    "endpoint": {
+        "introspection": {
+            "path": "introspection",
+            "class": Introspection,
+            "kwargs": {"client_authn_method": ["client_secret_post"]},
+        },
+        "batch_introspection": {
+            "path": "batch_introspection",
+            "class": BatchIntrospection,
+            "kwargs": {"client_authn_method": ["client_secret_post"], "max_tokens": 1000},
+        },
+    },
+    "authentication": {
+        "anon": {
+            "acr": "urn:oasis:names:tc:SAML:2.0:ac:classes:InternetProtocolPassword",
+            "class": "idpyoidc.server.user_authn.user.NoAuthn",
+            "kwargs": {"user": "diana"},
+        }
+    },
+    "userinfo": {"class": UserInfo, "kwargs": {"db": {}}},
+    "client_authn": verify_client,
+    "session_params": {"encrypter": CRYPT_CONFIG},
+}
+
+
+def setup(tokens: int):
+    server = Server(ASConfiguration(conf=CONF, base_path=BASEDIR), cwd=BASEDIR)
+    context = server.context
+    context.cdb["client_1"] = {
+        "client_secret": "hemligt",
+        "redirect_uris": [("https://example.com/cb", None)],
+        "client_salt": "salted",
+        "endpoint_auth_method": "client_secret_post",
+        "response_types": ["code"],
+        "allowed_scopes": ["openid"],
+    }
+    _mngr = context.session_manager
+    _values = []
+    for _ in range(tokens):
+        session_id = _mngr.create_session(
+            create_authn_event("diana"), AUTH_REQ, "diana", client_id="client_1"
+        )
+        grant = context.authz(session_id, AUTH_REQ)
+        _token = grant.mint_token(
+            session_id=session_id,
+            context=context,
+            token_class="access_token",
+            token_handler=_mngr.token_handler["access_token"],
+        )
+        _values.append(_token.value)
+    return server, _values
+
+
+def introspect_each(endpoint, tokens):
+    for _token in tokens:
+        endpoint.process_request(
+            {"token": _token, "client_id": "client_1", "authenticated": True}
+        )
+
+
+def introspect_batch(endpoint, tokens):
+    endpoint.process_request(
+        {"tokens": tokens, "client_id": "client_1", "authenticated": True}
+    )
+
+
+def main(number: int = 20, tokens: int = 100):
+    server, values = setup(tokens)
+    endpoint = server.get_endpoint("introspection")
+    batch_endpoint = server.get_endpoint("batch_introspection")
+
+    for _label, _lifetime in [("uncached", 0), ("cached", 60)]:
+        endpoint.cache_lifetime = batch_endpoint.cache_lifetime = _lifetime
+        for _name, _func, _endp in [
+            ("single", introspect_each, endpoint),
+            ("batch", introspect_batch, batch_endpoint),
+        ]:
+            _time = min(timeit.repeat(lambda: _func(_endp, values), number=number, repeat=3))
+            print(f"{_label:8} {_name:6} {_time / (number * tokens) * 1e6:8.1f} us/token")
+
+
+if __name__ == "__main__":
+    main()
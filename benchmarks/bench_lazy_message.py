@@ -0,0 +1,52 @@
+"""
+Parse authorization requests carrying the identity assurance claims requests in
+tests/ekyc_examples/request eagerly and lazily. The lazily parsed request is
+only used for its top level parameters and serialized again.
+"""
+import json
+import os
+import timeit
+
+from idpyoidc.message.oidc import AuthorizationRequest
+
+EXAMPLES = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "ekyc_examples", "request"
+)
+
+
+def load_requests():
+    _res = []
+    for fname in sorted(os.listdir(EXAMPLES)):
+        with open(os.path.join(EXAMPLES, fname)) as fp:
+            _claims = json.load(fp)
+        _res.append(
+            json.dumps(
+                {
+                    "response_type": "code",
+                    "client_id": "client_1",
+                    "redirect_uri": "https://example.com/cb",
+                    "scope": "openid",
+                    "state": "STATE",
+                    "claims": _claims,
+                }
+            )
+        )
+    return _res
+
+
+def handle(requests, lazy):
+    for _req in requests:
+        msg = AuthorizationRequest().from_json(_req, lazy=lazy)
+        msg["client_id"]
+        msg.to_json()
+
+
+def main(number: int = 200):
+    requests = load_requests()
+    for lazy in [False, True]:
+        _time = min(timeit.repeat(lambda: handle(requests, lazy), number=number, repeat=5))
+        print(f"lazy={lazy!s:5} {_time / (number * len(requests)) * 1e6:8.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Time from_dict, to_dict, from_urlencoded and verify for the most common request
+and response classes.
+"""
+import timeit
+
+from idpyoidc.message.oauth2 import AccessTokenRequest
+from idpyoidc.message.oidc import AccessTokenResponse
+from idpyoidc.message.oidc import AuthorizationRequest
+from idpyoidc.message.oidc import AuthorizationResponse
+from idpyoidc.message.oidc import OpenIDSchema
+from idpyoidc.message.oidc import ProviderConfigurationResponse
+
+SAMPLES = [
+    (
+        AuthorizationRequest,
+        {
+            "response_type": "code",
+            "client_id": "client_1",
+            "redirect_uri": "https://example.com/cb",
+            "scope": ["openid", "email", "profile"],
+            "state": "STATE",
+            "nonce": "NONCE",
+            "prompt": ["consent"],
+        },
+    ),
+    (AuthorizationResponse, {"code": "Z0FBQUFBQmFkdFFjQ1ZfbTAt", "state": "STATE"}),
+    (
+        AccessTokenRequest,
+        {
+            "grant_type": "authorization_code",
+            "code": "Z0FBQUFBQmFkdFFjQ1ZfbTAt",
+            "redirect_uri": "https://example.com/cb",
+            "client_id": "client_1",
+        },
+    ),
+    (
+        AccessTokenResponse,
+        {
+            "access_token": "2YotnFZFEjr1zCsicMWpAA",
+            "token_type": "Bearer",
+            "expires_in": 3600,
+            "refresh_token": "tGzv3JOkF0XG5Qx2TlKWIA",
+            "scope": ["openid", "email"],
+        },
+    ),
+    (
+        OpenIDSchema,
+        {
+            "sub": "248289761001",
+            "name": "Jane Doe",
+            "name#ja-Kana-JP": "ジェーン・ドウ",
+            "given_name": "Jane",
+            "family_name": "Doe",
+            "email": "janedoe@example.com",
+            "email_verified": True,
+        },
+    ),
+    (
+        ProviderConfigurationResponse,
+        {
+            "issuer": "https://example.com",
+            "authorization_endpoint": "https://example.com/authz",
+            "token_endpoint": "https://example.com/token",
+            "jwks_uri": "https://example.com/jwks.json",
+            "response_types_supported": ["code", "id_token", "code id_token"],
+            "subject_types_supported": ["public", "pairwise"],
+            "id_token_signing_alg_values_supported": ["RS256", "ES256"],
+            "scopes_supported": ["openid", "email", "profile"],
+        },
+    ),
+]
+
+
+def _time(func, number):
+    # The best of a few runs is less sensitive to noise
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def main(number: int = 2000):
+    for cls, args in SAMPLES:
+        msg = cls(**args)
+        _urlenc = msg.to_urlencoded()
+        _res = {
+            "from_dict": _time(lambda: cls().from_dict(args), number),
+            "to_dict": _time(msg.to_dict, number),
+            "from_urlencoded": _time(lambda: cls().from_urlencoded(_urlenc), number),
+            "verify": _time(msg.verify, number),
+        }
+        print(
+            f"{cls.__name__:30} "
+            + " ".join(f"{k}={v * 1e6:6.1f}us" for k, v in _res.items())
+        )
+
+
+if __name__ == "__main__":
+    main()
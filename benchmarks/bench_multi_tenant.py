@@ -0,0 +1,115 @@
+"""
+Starts 1000 tenants in one process, as separate Server instances each with its
+own parsed configuration and as tenants of a MultiTenantServer. Prints the time
+it takes and the memory used per tenant.
+"""
+import os
+import time
+import tracemalloc
+
+from idpyoidc.server import Server
+from idpyoidc.server.configure import OPConfiguration
+from idpyoidc.server.multi_tenant import MultiTenantServer
+from idpyoidc.server.oidc.authorization import Authorization
+from idpyoidc.server.oidc.provider_config import ProviderConfiguration
+from idpyoidc.server.oidc.registration import Registration
+from idpyoidc.server.oidc.token import Token
+from idpyoidc.server.oidc.userinfo import UserInfo
+from idpyoidc.server.user_authn.authn_context import INTERNETPROTOCOLPASSWORD
+
+BASEDIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "tests"))
+
+CRYPT_CONFIG = {
+    "kwargs": {
+        "keys": {
+            "key_defs": [
+                {"type": "OCT", "use": ["enc"], "kid": "password"},
+                {"type": "OCT", "use": ["enc"], "kid": "salt"},
+            ]
+        },
+    }
+}
+
+# EC keys, generating RSA keys would dominate the start up time
+KEYDEFS = [{"type": "EC", "crv": "P-256", "use": ["sig"]}]
+
+CONF = {
+    "issuer": "https://op.example.com/",
+    "httpc_params": {"verify": False},
+    "keys": {"uri_path": "static/jwks.json", "key_defs": KEYDEFS},
+    "token_handler_args": {
+        "code": {"kwargs": {"lifetime": 600, "crypt_conf": CRYPT_CONFIG}},
+        "token": {"kwargs": {"lifetime": 3600, "crypt_conf": CRYPT_CONFIG}},
+        "refresh": {"kwargs": {"lifetime": 86400, "crypt_conf": CRYPT_CONFIG}},
+        "id_token": {"class": "idpyoidc.server.token.id_token.IDToken", "kwargs": {}},
+    },
+    "endpoint": {
+        "provider_config": {
+            "path": ".well-known/openid-configuration",
+            "class": ProviderConfiguration,
+            "kwargs": {},
+        },
+        "registration": {"path": "registration", "class": Registration, "kwargs": {}},
+        "authorization": {"path": "authorization", "class": Authorization, "kwargs": {}},
+        "token": {"path": "token", "class": Token, "kwargs": {}},
+        "userinfo": {"path": "userinfo", "class": UserInfo, "kwargs": {}},
+    },
+    "authentication": {
+        "anon": {
+            "acr": INTERNETPROTOCOLPASSWORD,
+            "class": "idpyoidc.server.user_authn.user.NoAuthn",
+            "kwargs": {"user": "diana"},
+        }
+    },
+    "template_dir": "template",
+    "session_params": {"encrypter": CRYPT_CONFIG},
+}
+
+
+def issuer(n: int) -> str:
+    return f"https://op.example.com/tenant{n}"
+
+
+def separate(tenants: int):
+    _servers = {}
+    for n in range(tenants):
+        _conf = CONF.copy()
+        _conf["issuer"] = issuer(n)
+        _servers[issuer(n)] = Server(OPConfiguration(_conf, base_path=BASEDIR), cwd=BASEDIR)
+    return _servers
+
+
+def multi_tenant(tenants: int):
+    _host = MultiTenantServer(
+        CONF, tenants={issuer(n): {} for n in range(tenants)}, cwd=BASEDIR, base_path=BASEDIR
+    )
+    for n in range(tenants):
+        _host.route(f"{issuer(n)}/.well-known/openid-configuration")
+    return _host
+
+
+def measure(name, func, tenants):
+    _start = time.perf_counter()
+    func(tenants)
+    _time = time.perf_counter() - _start
+    # Tracing slows things down so memory is measured separately
+    tracemalloc.start()
+    _res = func(tenants)
+    _memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(
+        f"{name:14} {_time:8.2f} s {_time / tenants * 1000:8.2f} ms/tenant "
+        f"{_memory / tenants / 1024:8.1f} KiB/tenant"
+    )
+    return _res
+
+
+def main(tenants: int = 1000):
+    measure("separate", separate, tenants)
+    _host = measure("multi tenant", multi_tenant, tenants)
+    _usage = _host.memory_usage()
+    print(f"memory_usage() {sum(_usage.values()) / len(_usage) / 1024:8.1f} KiB/tenant")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Times the bulk operations of the session manager on a large session database.
+
+Finding the sessions of a client by walking the whole tree is compared to using
+the client index. Then all the sessions of one client are revoked and the oldest
+grants purged.
+
+The number of users can be given on the command line, e.g. 1000000.
+"""
+import sys
+import time
+import timeit
+
+from idpyoidc.server.constant import DIVIDER
+from idpyoidc.server.session.grant import Grant
+from idpyoidc.server.session.manager import SessionManager
+
+CLIENTS = 10
+
+
+def setup(users: int):
+    _mngr = SessionManager(handler=None)
+    _now = int(time.time())
+    for n in range(users):
+        _user_id = f"user_{n}"
+        _client_id = f"client_{n % CLIENTS}"
+        grant = Grant()
+        # Spread the issue times over the last 100 days
+        grant.issued_at = _now - (n % 100) * 86400
+        _mngr.set([_user_id, _client_id, grant.id], grant)
+    return _mngr
+
+
+def scan(mngr, client_id):
+    return [
+        _key
+        for _key in list(mngr.db.keys())
+        if DIVIDER not in _key and mngr.branch_key(_key, client_id) in mngr.db
+    ]
+
+
+def main(users: int = 100000):
+    _start = time.perf_counter()
+    mngr = setup(users)
+    print(f"setup {users} users {time.perf_counter() - _start:8.2f} s")
+
+    _time = min(timeit.repeat(lambda: scan(mngr, "client_1"), number=1, repeat=3))
+    print(f"find client sessions, scan  {_time * 1e3:10.2f} ms")
+    _time = min(
+        timeit.repeat(lambda: mngr._get_index().client_sessions("client_1"), number=1, repeat=3)
+    )
+    print(f"find client sessions, index {_time * 1e3:10.2f} ms")
+
+    _start = time.perf_counter()
+    _count = mngr.revoke_by_client("client_2")
+    print(f"revoke_by_client  {_count:8} grants {(time.perf_counter() - _start) * 1e3:10.2f} ms")
+
+    _start = time.perf_counter()
+    _count = mngr.purge_older_than(int(time.time()) - 90 * 86400)
+    print(f"purge_older_than  {_count:8} grants {(time.perf_counter() - _start) * 1e3:10.2f} ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
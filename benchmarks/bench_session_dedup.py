@@ -0,0 +1,74 @@
+"""
+Memory used by, and the size of a dump of, a session database where users log in to
+the same clients again and again. Every grant is given its own authorization request
+and authentication event, as when they are parsed from incoming requests. As with real
+clients, every authorization request has its own state, nonce and PKCE code challenge.
+
+The number of users can be given on the command line, e.g. 1000.
+"""
+import json
+import sys
+import tracemalloc
+
+from idpyoidc.message.oidc import AuthorizationRequest
+from idpyoidc.server.authn_event import create_authn_event
+from idpyoidc.server.session.database import Database
+from idpyoidc.server.session.grant import Grant
+from idpyoidc.util import rndstr
+
+CLIENTS = 5
+LOGINS = 10
+
+AUTH_REQ = {
+    "redirect_uri": "https://example.com/cb",
+    "scope": ["openid", "profile", "email"],
+    "response_type": "code",
+    "code_challenge_method": "S256",
+}
+
+
+def authorization_request(client_id: str) -> AuthorizationRequest:
+    return AuthorizationRequest(
+        client_id=client_id,
+        state=rndstr(24),
+        nonce=rndstr(24),
+        code_challenge=rndstr(43),
+        **AUTH_REQ,
+    )
+
+
+def populate(users: int) -> Database:
+    _db = Database()
+    for u in range(users):
+        for login in range(LOGINS):
+            _event = create_authn_event(f"user_{u}", authn_time=1700000000 + login)
+            for c in range(CLIENTS):
+                _grant = Grant(
+                    scope=["openid", "profile", "email"],
+                    authorization_request=authorization_request(f"client_{c}"),
+                    authentication_event=create_authn_event(**_event.to_dict()),
+                    sub=f"sub_{u}",
+                )
+                _db.set([f"user_{u}", f"client_{c}", _grant.id], _grant)
+    return _db
+
+
+def main(users: int = 200):
+    _grants = users * CLIENTS * LOGINS
+    tracemalloc.start()
+    _db = populate(users)
+    _memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    _dump = _db.dump()
+    # The rest of the dump is the crypt configuration
+    _size = len(json.dumps({k: v for k, v in _dump.items() if k in ["db", "shared"]}))
+    print(f"{_grants} grants")
+    print(f"memory {_memory / _grants:8.0f} bytes/grant")
+    print(f"dump   {_size / _grants:8.0f} bytes/grant")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
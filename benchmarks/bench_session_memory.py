@@ -0,0 +1,100 @@
+"""
+Memory used per session. A session is a user, a client, a grant and the
+authorization code, access token and refresh token minted from the grant.
+Measured for sessions created in memory and for sessions loaded from a dump.
+
+The number of sessions can be given on the command line, e.g. 100000.
+"""
+import copy
+import sys
+import tracemalloc
+
+from idpyoidc.message.oidc import AuthorizationRequest
+from idpyoidc.server.authn_event import create_authn_event
+from idpyoidc.server.session.grant import Grant
+from idpyoidc.server.session.info import ClientSessionInfo
+from idpyoidc.server.session.info import UserSessionInfo
+from idpyoidc.server.session.token import AccessToken
+from idpyoidc.server.session.token import AuthorizationCode
+from idpyoidc.server.session.token import RefreshToken
+
+AUTH_REQ = AuthorizationRequest(
+    client_id="client_1",
+    redirect_uri="https://example.com/cb",
+    scope=["openid", "profile"],
+    state="STATE",
+    response_type="code",
+)
+
+USAGE_RULES = {
+    "authorization_code": {
+        "supports_minting": ["access_token", "refresh_token", "id_token"],
+        "max_usage": 1,
+    },
+    "access_token": {},
+    "refresh_token": {"supports_minting": ["access_token", "refresh_token"]},
+}
+
+
+def session(n: int):
+    _grant = Grant(
+        scope=["openid", "profile"],
+        authorization_request=AUTH_REQ,
+        authentication_event=create_authn_event(f"user_{n}"),
+        # As done by AuthzHandling
+        usage_rules=copy.deepcopy(USAGE_RULES),
+        sub=f"sub_{n}",
+    )
+    for _class, _token_class in [
+        (AuthorizationCode, "authorization_code"),
+        (AccessToken, "access_token"),
+        (RefreshToken, "refresh_token"),
+    ]:
+        _grant.issued_token.append(
+            _class(
+                token_class=_token_class,
+                value=f"{_token_class}_{n}",
+                usage_rules=_grant.shared_usage_rules().get(_token_class),
+                scope=_grant.scope,
+                expires_in=3600,
+            )
+        )
+    _client = ClientSessionInfo(f"client_{n % 10}")
+    _client.add_subordinate(_grant.id)
+    _user = UserSessionInfo(f"user_{n}")
+    _user.add_subordinate(_client.id)
+    return _user, _client, _grant
+
+
+def created(sessions: int):
+    return [session(n) for n in range(sessions)]
+
+
+def loaded(dumps):
+    return [
+        (UserSessionInfo().load(u), ClientSessionInfo().load(c), Grant().load(g))
+        for u, c, g in dumps
+    ]
+
+
+def measure(name, func, arg, sessions):
+    tracemalloc.start()
+    _res = func(arg)
+    _memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{name:8} {_memory / sessions:8.0f} bytes/session")
+    return _res
+
+
+def main(sessions: int = 10000):
+    _sessions = measure("created", created, sessions, sessions)
+    _dumps = [(u.dump(), c.dump(), g.dump()) for u, c, g in _sessions]
+    del _sessions
+    measure("loaded", loaded, _dumps, sessions)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
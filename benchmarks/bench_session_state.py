@@ -0,0 +1,48 @@
+"""
+Simulates many relying parties polling for session state changes. Every poll is
+checked by computing the session_state anew and by using the cached browser state.
+"""
+import random
+import timeit
+
+from idpyoidc.server.browser_state import BrowserState
+from idpyoidc.server.cookie_handler import compute_session_state
+
+
+def setup(browsers: int, clients: int):
+    browser_state = BrowserState(max_browsers=browsers)
+    polls = []
+    for b in range(browsers):
+        _cookie = {"name": "oidc_op_sman", "value": f"opbs_{b:032d}"}
+        _opbs = browser_state.get_cookie(f"user_{b}", 1000, lambda: _cookie)["value"]
+        for c in range(clients):
+            _redirect_uri = f"https://rp{c}.example.org/authz_cb"
+            _session_state = browser_state.session_state(_opbs, f"client_{c}", _redirect_uri)
+            polls.append((_opbs, f"client_{c}", f"https://rp{c}.example.org", _session_state))
+    random.shuffle(polls)
+    return browser_state, polls
+
+
+def poll_computed(polls):
+    for _opbs, _client_id, _origin, _session_state in polls:
+        _salt = _session_state.rsplit(".", 1)[1]
+        assert compute_session_state(_opbs, _salt, _client_id, _origin) == _session_state
+
+
+def poll_cached(browser_state, polls):
+    for _opbs, _client_id, _origin, _session_state in polls:
+        assert browser_state.validate(_opbs, _client_id, _origin, _session_state)
+
+
+def main(number: int = 5, browsers: int = 1000, clients: int = 20):
+    browser_state, polls = setup(browsers, clients)
+    _polls = number * len(polls)
+
+    _time = min(timeit.repeat(lambda: poll_computed(polls), number=number, repeat=3))
+    print(f"computed {_time / _polls * 1e6:8.2f} us/poll")
+    _time = min(timeit.repeat(lambda: poll_cached(browser_state, polls), number=number, repeat=3))
+    print(f"cached   {_time / _polls * 1e6:8.2f} us/poll")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Constructs a Server with everything set up at startup and with subsystems set
+up the first time they are used. Prints the per-subsystem startup report for both.
+"""
+import os
+import timeit
+
+from idpyoidc.server import Server
+from idpyoidc.server.configure import OPConfiguration
+from idpyoidc.server.oidc.authorization import Authorization
+from idpyoidc.server.oidc.provider_config import ProviderConfiguration
+from idpyoidc.server.oidc.registration import Registration
+from idpyoidc.server.oidc.token import Token
+from idpyoidc.server.oidc.userinfo import UserInfo
+from idpyoidc.server.user_authn.authn_context import INTERNETPROTOCOLPASSWORD
+
+BASEDIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "tests"))
+
+# The default number of iterations, key derivation is what makes an encrypter expensive
+CRYPT_CONFIG = {
+    "kwargs": {
+        "keys": {
+            "key_defs": [
+                {"type": "OCT", "use": ["enc"], "kid": "password"},
+                {"type": "OCT", "use": ["enc"], "kid": "salt"},
+            ]
+        },
+    }
+}
+
+KEYDEFS = [
+    {"type": "RSA", "key": "", "use": ["sig"]},
+    {"type": "EC", "crv": "P-256", "use": ["sig"]},
+]
+
+
+def conf(lazy_init: bool):
+    return {
+        "issuer": "https://example.com/",
+        "httpc_params": {"verify": False},
+        "keys": {"uri_path": "static/jwks.json", "key_defs": KEYDEFS},
+        "lazy_init": lazy_init,
+        "token_handler_args": {
+            "code": {"kwargs": {"lifetime": 600, "crypt_conf": CRYPT_CONFIG}},
+            "token": {"kwargs": {"lifetime": 3600, "crypt_conf": CRYPT_CONFIG}},
+            "refresh": {"kwargs": {"lifetime": 86400, "crypt_conf": CRYPT_CONFIG}},
+            "id_token": {"class": "idpyoidc.server.token.id_token.IDToken", "kwargs": {}},
+        },
+        "endpoint": {
+            "provider_config": {
+                "path": ".well-known/openid-configuration",
+                "class": ProviderConfiguration,
+                "kwargs": {},
+            },
+            "registration": {"path": "registration", "class": Registration, "kwargs": {}},
+            "authorization": {"path": "authorization", "class": Authorization, "kwargs": {}},
+            "token": {"path": "token", "class": Token, "kwargs": {}},
+            "userinfo": {"path": "userinfo", "class": UserInfo, "kwargs": {}},
+        },
+        "authentication": {
+            "anon": {
+                "acr": INTERNETPROTOCOLPASSWORD,
+                "class": "idpyoidc.server.user_authn.user.NoAuthn",
+                "kwargs": {"user": "diana"},
+            }
+        },
+        "userinfo": {
+            "class": "idpyoidc.server.user_info.UserInfo",
+            "kwargs": {"db_file": "users.json"},
+        },
+        "template_dir": "template",
+        "session_params": {"encrypter": CRYPT_CONFIG},
+    }
+
+
+def setup(lazy_init: bool):
+    return Server(OPConfiguration(conf=conf(lazy_init), base_path=BASEDIR), cwd=BASEDIR)
+
+
+def main(number: int = 20):
+    for _name, _lazy in [("at startup", False), ("at first use", True)]:
+        _time = min(timeit.repeat(lambda: setup(_lazy), number=number, repeat=3))
+        print(f"{_name:14} {_time / number * 1000:8.2f} ms per Server(conf)")
+        print(setup(_lazy).startup_report)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Time spent computing pairwise subject identifiers when the same users log in to the
+same clients again and again, with and without the subject cache. And the time it
+takes to compute them for all users and sectors, as for an export.
+"""
+import time
+
+from idpyoidc.server.session.manager import pairwise_id
+from idpyoidc.server.session.subject import SubjectCache
+
+USERS = [f"user_{n}" for n in range(1000)]
+SECTORS = [f"https://rp{n}.example.com/sector" for n in range(5)]
+LOGINS = 20
+SALT = "salt"
+
+
+def uncached():
+    for _ in range(LOGINS):
+        for _uid in USERS:
+            for _sector in SECTORS:
+                pairwise_id(_uid, salt=SALT, sector_identifier=_sector)
+
+
+def cached():
+    _cache = SubjectCache({"pairwise": pairwise_id})
+    for _ in range(LOGINS):
+        for _uid in USERS:
+            for _sector in SECTORS:
+                _cache("pairwise", _uid, _sector, salt=SALT)
+
+
+def batch():
+    _cache = SubjectCache({"pairwise": pairwise_id})
+    _cache.batch("pairwise", USERS, SECTORS, salt=SALT)
+
+
+def measure(name, func, count, rounds=5):
+    _times = []
+    for _ in range(rounds):
+        _start = time.perf_counter()
+        func()
+        _times.append(time.perf_counter() - _start)
+    _time = min(_times)
+    print(f"{name:9} {_time:8.3f} s {_time / count * 1e6:8.2f} us/sub")
+
+
+def main():
+    _subs = len(USERS) * len(SECTORS)
+    measure("uncached", uncached, _subs * LOGINS)
+    measure("cached", cached, _subs * LOGINS)
+    measure("batch", batch, _subs)
+
+
+if __name__ == "__main__":
+    main()
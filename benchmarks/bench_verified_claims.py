@@ -0,0 +1,69 @@
+"""
+Checking verified_claims in the responses in tests/ekyc_examples/response by
+building VerifiedClaims instances compared to the compiled validator, and
+matching them against a claims request.
+"""
+import json
+import os
+import timeit
+
+from idpyoidc.message.oidc.identity_assurance import VerifiedClaims
+from idpyoidc.message.oidc.identity_assurance import match_verified_claims
+from idpyoidc.message.oidc.identity_assurance import verify_verified_claims
+
+EXAMPLES = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "ekyc_examples"
+)
+
+
+def load(typ):
+    _res = []
+    _dir = os.path.join(EXAMPLES, typ)
+    for fname in sorted(os.listdir(_dir)):
+        with open(os.path.join(_dir, fname)) as fp:
+            _res.append(json.load(fp))
+    return _res
+
+
+def with_messages(responses):
+    for _vc in responses:
+        for _element in _vc if isinstance(_vc, list) else [_vc]:
+            try:
+                VerifiedClaims(**_element).verify()
+            except Exception:
+                pass
+
+
+def compiled(responses):
+    for _vc in responses:
+        verify_verified_claims(_vc)
+
+
+def match(responses, requests):
+    for _vc in responses:
+        for _req in requests:
+            match_verified_claims(_vc, _req)
+
+
+def main(number: int = 200):
+    responses = [r["verified_claims"] for r in load("response") if "verified_claims" in r]
+    requests = [
+        r[k]["verified_claims"]
+        for r in load("request")
+        for k in ["userinfo", "id_token"]
+        if "verified_claims" in r.get(k, {})
+    ]
+
+    for name, func in [
+        ("messages", lambda: with_messages(responses)),
+        ("compiled", lambda: compiled(responses)),
+    ]:
+        _time = min(timeit.repeat(func, number=number, repeat=5))
+        print(f"{name:10} {_time / (number * len(responses)) * 1e6:8.1f} us/verified_claims")
+
+    _time = min(timeit.repeat(lambda: match(responses, requests), number=10, repeat=3))
+    print(f"{'match':10} {_time / (10 * len(responses) * len(requests)) * 1e6:8.1f} us/match")
+
+
+if __name__ == "__main__":
+    main()
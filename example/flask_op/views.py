@@ -21,6 +21,7 @@ import werkzeug
 
 from idpyoidc.server.exception import FailedAuthentication
 from idpyoidc.server.exception import ClientAuthenticationError
+from idpyoidc.server.oidc.session import front_channel_logout_page
 from idpyoidc.server.oidc.token import Token
 
 # logger = logging.getLogger(__name__)
@@ -332,10 +333,9 @@ def rp_logout():
     _iframes = _endp.do_verified_logout(alla=alla, **_info)
 
     if _iframes:
-        res = render_template('frontchannel_logout.html',
-                              frames=" ".join(_iframes), size=len(_iframes),
-                              timeout=5000,
-                              postLogoutRedirectUri=_info['redirect_uri'])
+        # The page is sent while it is built
+        res = Response(front_channel_logout_page(_iframes, _info['redirect_uri'], timeout=5000),
+                       mimetype='text/html')
     else:
         res = redirect(_info['redirect_uri'])
 
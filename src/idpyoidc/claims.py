@@ -1,4 +1,5 @@
 from functools import cmp_to_key
+from functools import lru_cache
 from typing import Callable
 from typing import Optional
 
@@ -240,12 +241,18 @@ def alg_cmp(a, b):
         return -1
 
 
-def get_signing_algs():
+@lru_cache(maxsize=1)
+def _sorted_signing_algs():
     # Assumes Cryptojwt
     _list = list(SIGNER_ALGS.keys())
     # know how to do none but should not
     _list.remove("none")
-    return sorted(_list, key=cmp_to_key(alg_cmp))
+    return tuple(sorted(_list, key=cmp_to_key(alg_cmp)))
+
+
+def get_signing_algs():
+    # Sorted once, callers get their own list
+    return list(_sorted_signing_algs())
 
 
 def get_encryption_algs():
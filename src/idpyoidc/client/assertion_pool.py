@@ -0,0 +1,158 @@
+"""
+A pool of pre-signed client assertions.
+
+Signing a client assertion, in particular with an RSA key, is by far the most expensive
+part of constructing a request that uses private_key_jwt or client_secret_jwt client
+authentication. The pool moves that cost out of the request path. A background thread
+signs single-use assertions ahead of time, per audience, and the request path just
+takes one. How many are kept in store depends on how fast they are used.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AssertionPool(object):
+    def __init__(
+        self,
+        size: Optional[int] = 20,
+        lifetime: Optional[int] = 60,
+        min_lifetime: Optional[int] = 10,
+        refill_interval: Optional[float] = 1.0,
+        background: Optional[bool] = True,
+        clock: Optional[Callable] = time.time,
+    ):
+        """
+        :param size: The largest number of assertions kept per audience
+        :param lifetime: The lifetime, in seconds, of a pre-signed assertion
+        :param min_lifetime: An assertion that expires within this number of seconds
+            is not handed out
+        :param refill_interval: How often, in seconds, the pool is topped up
+        :param background: Whether to use a background thread to do the signing
+        :param clock: Returns the present time
+        """
+        self.size = size
+        self.lifetime = lifetime
+        self.min_lifetime = min_lifetime
+        self.refill_interval = refill_interval
+        self.background = background
+        self.clock = clock
+        # key -> deque of (expires_at, assertion)
+        self._pool = {}
+        # key -> function that given a lifetime signs a new assertion
+        self._factory = {}
+        # key -> number of assertions asked for since the last refill
+        self._taken = {}
+        # key -> assertions asked for per second
+        self._rate = {}
+        self._last_refill = self.clock()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.metrics = {"hits": 0, "misses": 0, "signed": 0, "expired": 0}
+
+    def _sign(self, key: tuple) -> tuple:
+        _exp = self.clock() + self.lifetime
+        _assertion = self._factory[key](lifetime=self.lifetime)
+        self.metrics["signed"] += 1
+        return _exp, _assertion
+
+    def get(self, key: tuple, factory: Callable) -> str:
+        """
+        Hands out a pre-signed assertion. If there is none one is signed on the spot.
+
+        :param key: Identifies the signer and audience of the assertion
+        :param factory: Function that given a lifetime signs a new assertion
+        :return: A signed JWT
+        """
+        if key not in self._factory:
+            with self._lock:
+                self._factory[key] = factory
+                self._pool[key] = deque()
+                self._taken[key] = 0
+                self._rate[key] = 0.0
+
+        self._taken[key] += 1
+        _pool = self._pool[key]
+        _now = self.clock()
+        while True:
+            try:
+                _exp, _assertion = _pool.popleft()
+            except IndexError:
+                break
+            if _exp - _now >= self.min_lifetime:
+                self.metrics["hits"] += 1
+                return _assertion
+            self.metrics["expired"] += 1
+
+        self.metrics["misses"] += 1
+        if self.background:
+            self._start()
+            self._wakeup.set()
+        return self._sign(key)[1]
+
+    def refill(self):
+        """Drops assertions that are about to expire and tops up the pool."""
+        _now = self.clock()
+        _elapsed = max(_now - self._last_refill, self.refill_interval)
+        self._last_refill = _now
+        for key in list(self._factory.keys()):
+            _taken, self._taken[key] = self._taken[key], 0
+            self._rate[key] = (self._rate[key] + _taken / _elapsed) / 2
+
+            _pool = self._pool[key]
+            while _pool and _pool[0][0] - _now < self.min_lifetime:
+                try:
+                    _pool.popleft()
+                except IndexError:
+                    break
+                self.metrics["expired"] += 1
+
+            # Enough to last two refill intervals at the present rate
+            _target = min(self.size, int(self._rate[key] * 2 * self.refill_interval + 0.5))
+            while len(_pool) < _target:
+                try:
+                    _pool.append(self._sign(key))
+                except Exception as err:
+                    logger.error(f"Could not sign client assertion: {err}")
+                    break
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.refill_interval)
+            self._wakeup.clear()
+            if self._stop.is_set():
+                break
+            self.refill()
+
+    def _start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="assertion_pool", daemon=True
+                    )
+                    self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._stop.clear()
+
+    def stats(self) -> dict:
+        """
+        :return: The metrics together with the number of assertions kept per key
+        """
+        _stats = dict(self.metrics)
+        _stats["pooled"] = {k: len(v) for k, v in self._pool.items()}
+        _stats["rate"] = dict(self._rate)
+        return _stats
@@ -10,6 +10,7 @@ from cryptojwt.jws.jws import SIGNER_ALGS
 from cryptojwt.jws.utils import alg2keytype
 from cryptojwt.utils import importer
 
+from idpyoidc.client.assertion_pool import AssertionPool
 from idpyoidc.defaults import DEF_SIGN_ALG
 from idpyoidc.defaults import JWT_BEARER
 from idpyoidc.message.oauth2 import AccessTokenRequest
@@ -383,6 +384,15 @@ class JWSAuthnMethod(ClientAuthnMethod):
     Web Tokens.
     """
 
+    def __init__(self, assertion_pool: Optional[Union[dict, AssertionPool]] = None):
+        """
+        :param assertion_pool: If given, client assertions are signed ahead of time.
+            Either an AssertionPool instance or the keyword arguments to create one.
+        """
+        if isinstance(assertion_pool, dict):
+            assertion_pool = AssertionPool(**assertion_pool)
+        self.assertion_pool = assertion_pool
+
     @staticmethod
     def choose_algorithm(context, **kwargs):
         """
@@ -501,6 +511,20 @@ class JWSAuthnMethod(ClientAuthnMethod):
         except KeyError:
             _args = {}
 
+        if self.assertion_pool is not None and not _args:
+            _key = (
+                _entity.client_id,
+                audience,
+                algorithm,
+                signing_key[0].kid or signing_key[0].thumbprint("SHA-256"),
+            )
+            return self.assertion_pool.get(
+                _key,
+                lambda lifetime: assertion_jwt(
+                    _entity.client_id, signing_key, audience, algorithm, lifetime=lifetime
+                ),
+            )
+
         # construct the signed JWT with the assertions and add
         # it as value to the 'client_assertion' claim of the request
         return assertion_jwt(_entity.client_id, signing_key, audience, algorithm, **_args)
@@ -2,7 +2,6 @@ import json
 from typing import Optional
 
 from idpyoidc.message.oidc import AuthorizationRequest
-from idpyoidc.message.oidc.identity_assurance import VerifiedClaims
 from idpyoidc.message.oidc.identity_assurance import match_verified_claims
 from idpyoidc.message.oidc.identity_assurance import verification_per_claim
 
@@ -21,8 +20,7 @@ def format_response(format, response, verified_response):
             else:
                 _resp.update(vr["claims"])
     elif format == "per_claim":
-        verified_response[""] = _base_claims
-        _resp = verification_per_claim(verified_response)
+        _resp = verification_per_claim(verified_response, _base_claims)
     else:  # format == "per_verification"
         _resp = {"": _base_claims}
         for vr in verified_response:
@@ -38,10 +36,11 @@ def identity_assurance_process(response, service_context, state):
     auth_request = service_context.cstate.get_set(state, message=AuthorizationRequest)
     claims_request = auth_request.get("claims")
     if claims_request and "userinfo" in claims_request:
-        vc = VerifiedClaims(**response["verified_claims"])
-
-        # find the claims request in the authorization request
-        verified_response = match_verified_claims(vc, claims_request["userinfo"]["verified_claims"])
+        # verified_claims is checked and matched against the claims request in the
+        # authorization request as it is, no Message instances are constructed.
+        verified_response = match_verified_claims(
+            response["verified_claims"], claims_request["userinfo"]["verified_claims"]
+        )
         _response_format = service_context.add_on["identity_assurance"]["response_format"]
         response = format_response(_response_format, response, verified_response)
     return response
@@ -1,8 +1,12 @@
 import logging
+import threading
+from typing import List
 from typing import Optional
 from typing import Union
 
+from idpyoidc.client.exception import OidcServiceError
 from idpyoidc.client.service import Service
+from idpyoidc.client.token_manager import SharedTokenManager
 from idpyoidc.message import Message
 from idpyoidc.message import oauth2
 from idpyoidc.time_util import time_sans_frac
@@ -23,6 +27,10 @@ class CCAccessTokenRequest(Service):
     def __init__(self, upstream_get, conf=None):
         Service.__init__(self, upstream_get, conf=conf)
         self.pre_construct.append(self.cc_pre_construct)
+        self._token_manager = None
+        self._token_manager_lock = threading.Lock()
+        # cache key -> request arguments
+        self._request_args = {}
 
     def cc_pre_construct(
         self, request: Union[Message, dict], service: Service, post_args: Optional[dict], **_args
@@ -39,3 +47,74 @@ class CCAccessTokenRequest(Service):
         if "expires_in" in resp:
             resp["__expires_at"] = time_sans_frac() + int(resp["expires_in"])
         self.upstream_get("context").cstate.update(key, resp)
+
+    def get_token_manager(self) -> SharedTokenManager:
+        """
+        The token cache is configured with the 'token_cache' service configuration
+        parameter, e.g. {"refresh_ahead": 60, "store": {"class": ..., "kwargs": {...}}}.
+        """
+        with self._token_manager_lock:
+            if self._token_manager is None:
+                _conf = self.conf.get("token_cache") or {}
+                self._token_manager = SharedTokenManager(
+                    self.upstream_get("context").cstate, refresh=self._fetch, **_conf
+                )
+        return self._token_manager
+
+    def cache_key(
+        self,
+        scope: Optional[List[str]] = None,
+        resource: Optional[List[str]] = None,
+        audience: Optional[List[str]] = None,
+    ) -> str:
+        """
+        Tokens are cached per client, set of scopes and set of audiences/resources.
+        """
+        _context = self.upstream_get("context")
+        # Before the first request is made the client_id may only be a preference
+        _client_id = _context.get_client_id() or _context.get_preference("client_id")
+        return ";;".join(
+            [
+                "client_credentials",
+                _client_id or "",
+                " ".join(sorted(set(scope or []))),
+                " ".join(sorted(set(resource or []))),
+                " ".join(sorted(set(audience or []))),
+            ]
+        )
+
+    def _fetch(self, key: str):
+        _resp = self.upstream_get("entity").do_request(
+            self.service_name, request_args=self._request_args[key], state=key
+        )
+        if "error" in _resp:
+            raise OidcServiceError(_resp["error"])
+
+    def get_access_token(
+        self,
+        scope: Optional[List[str]] = None,
+        resource: Optional[List[str]] = None,
+        audience: Optional[List[str]] = None,
+    ) -> tuple:
+        """
+        Returns a cached access token for the given scopes and audiences. A new token
+        is fetched when the cached one is about to expire. However many threads, and
+        if a shared store is configured processes, that ask for the same token at the
+        same time only one request is sent to the token endpoint.
+
+        :param scope: The scopes the token should be valid for
+        :param resource: Resource indicators, RFC 8707
+        :param audience: The intended audiences of the token
+        :return: An access token and when it expires (0 if never).
+        """
+        _key = self.cache_key(scope, resource, audience)
+        if _key not in self._request_args:
+            _args = {}
+            if scope:
+                _args["scope"] = sorted(set(scope))
+            if resource:
+                _args["resource"] = sorted(set(resource))
+            if audience:
+                _args["audience"] = sorted(set(audience))
+            self._request_args[_key] = _args
+        return self.get_token_manager().get_access_token(_key)
@@ -1,5 +1,6 @@
 import logging
 import sys
+import threading
 import traceback
 from typing import List
 from typing import Optional
@@ -15,6 +16,7 @@ from idpyoidc.client.exception import Unsupported
 from idpyoidc.client.oauth2 import Client
 from idpyoidc.client.oauth2 import dynamic_provider_info_discovery
 from idpyoidc.client.oauth2.utils import pick_redirect_uri
+from idpyoidc.client.token_manager import TokenManager
 from idpyoidc.exception import MessageException
 from idpyoidc.exception import MissingRequiredAttribute
 from idpyoidc.exception import NotForMe
@@ -32,6 +34,9 @@ from idpyoidc.util import rndstr
 
 logger = logging.getLogger(__name__)
 
+# Guards the lazy construction of token managers
+_token_manager_lock = threading.Lock()
+
 
 class StandAloneClient(Client):
 
@@ -644,6 +649,33 @@ class StandAloneClient(Client):
             else:
                 raise OidcServiceError("No valid access token")
 
+    def get_token_manager(self) -> TokenManager:
+        """
+        The token manager is configured with the 'token_manager' configuration
+        parameter, e.g. {"refresh_ahead": 60, "jitter": 10}.
+        """
+        with _token_manager_lock:
+            _manager = getattr(self, "_token_manager", None)
+            if _manager is None:
+                _context = self.get_context()
+                _conf = _context.config.conf.get("token_manager") or {}
+                _manager = TokenManager(
+                    _context.cstate, refresh=self.refresh_access_token, **_conf
+                )
+                self._token_manager = _manager
+        return _manager
+
+    def get_fresh_access_token(self, state: str) -> tuple:
+        """
+        Like get_valid_access_token but will use a refresh token, if there is one, to
+        get a new access token before the present one expires. Safe to use from many
+        threads at the same time, only one refresh per state will be done.
+
+        :param state: Key into the state database
+        :return: An access token and when it expires (0 if never).
+        """
+        return self.get_token_manager().get_access_token(state)
+
     def logout(
             self,
             state: str,
@@ -689,6 +721,8 @@ class StandAloneClient(Client):
 
     def clear_session(self, state):
         self.get_context().cstate.remove_state(state)
+        if getattr(self, "_token_manager", None):
+            self._token_manager.forget(state)
 
 
 def backchannel_logout(client, request="", request_args=None):
@@ -0,0 +1,223 @@
+"""
+A persistent cache of what a RP learns about an OP when it first talks to it:
+the provider information, the OP's keys and the result of dynamic client registration.
+
+With the cache in a store that survives a restart the first login to an OP after a
+restart does not have to wait for discovery, fetching the JWKS and registration.
+The provider information is kept as long as the HTTP caching headers of the discovery
+response allows, the registration until the client secret expires and the keys are kept
+together with the information about when they have to be fetched again.
+"""
+import json
+import logging
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable
+from typing import Optional
+from typing import Union
+
+from cryptojwt.key_issuer import KeyIssuer
+
+from idpyoidc.storage import ConcurrentUpdate
+from idpyoidc.storage.versioned import VersionedStore
+from idpyoidc.util import instantiate
+
+logger = logging.getLogger(__name__)
+
+
+def cache_lifetime(headers: Optional[dict], default: int) -> Optional[int]:
+    """
+    How long a response may be kept according to its HTTP caching headers.
+
+    :param headers: The HTTP headers of the response
+    :param default: What to use if the headers have nothing to say
+    :return: Number of seconds or None if the response must not be kept
+    """
+    if not headers:
+        return default
+
+    _cache_control = headers.get("Cache-Control") or headers.get("cache-control") or ""
+    _directives = {}
+    for _part in _cache_control.split(","):
+        _name, _, _value = _part.strip().partition("=")
+        if _name:
+            _directives[_name.lower()] = _value.strip('"')
+
+    if "no-store" in _directives or "no-cache" in _directives:
+        return None
+    if "max-age" in _directives:
+        try:
+            _max_age = int(_directives["max-age"])
+        except ValueError:
+            return None
+        return _max_age if _max_age > 0 else None
+
+    _expires = headers.get("Expires") or headers.get("expires")
+    if _expires:
+        try:
+            _lifetime = int(parsedate_to_datetime(_expires).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+        return _lifetime if _lifetime > 0 else None
+
+    return default
+
+
+class _HeaderRecorder(object):
+    """Wraps a HTTP client and remembers the headers of the last response."""
+
+    def __init__(self, httpc: Callable):
+        self.httpc = httpc
+        self.headers = None
+
+    def __call__(self, method, url, **kwargs):
+        _resp = self.httpc(method, url, **kwargs)
+        self.headers = getattr(_resp, "headers", None)
+        return _resp
+
+
+class ProviderCache(object):
+    def __init__(
+        self,
+        store: Optional[Union[dict, VersionedStore]] = None,
+        default_lifetime: Optional[int] = 86400,
+        clock: Optional[Callable] = None,
+    ):
+        """
+        :param store: A versioned store, or the configuration of one, where the
+            information is kept. Should be one that survives a restart.
+        :param default_lifetime: How long, in seconds, to keep the provider information
+            if the discovery response has no caching headers
+        :param clock: Function returning the present time
+        """
+        if store is None:
+            store = VersionedStore()
+        elif isinstance(store, dict):
+            store = instantiate(store["class"], **store.get("kwargs", {}))
+        self.store = store
+        self.default_lifetime = default_lifetime
+        self.clock = clock or time.time
+
+    def _read(self, key: str, now: float) -> Optional[dict]:
+        _item = self.store.read(key)
+        if _item is None:
+            return None
+        _entry = json.loads(_item[1])
+        if _entry["expires_at"] and _entry["expires_at"] <= now:
+            return None
+        return _entry["value"]
+
+    def _write(self, key: str, value: dict, expires_at: float):
+        _value = json.dumps({"expires_at": expires_at, "value": value})
+        _item = self.store.read(key)
+        try:
+            self.store.write(key, _value, _item[0] if _item else 0)
+        except ConcurrentUpdate:
+            # Someone else got there first, what they wrote is as good
+            logger.debug(f"Concurrent update of {key}")
+
+    def forget(self, iss_id: str):
+        """
+        Remove all that is cached about an OP. Necessary if the RP's configuration
+        for the OP has changed in a way that requires a new registration.
+
+        :param iss_id: Issuer ID
+        """
+        for _part in ["provider_info", "jwks", "registration"]:
+            self.store.delete(f"{iss_id};{_part}")
+
+    @staticmethod
+    def _discovery_service(client):
+        if client.client_type == "oidc":
+            return client.get_service("provider_info")
+        return client.get_service("server_metadata")
+
+    @staticmethod
+    def _static_provider_info(client) -> bool:
+        _pi = client.get_context().get("provider_info")
+        if not _pi:
+            return False
+        return not (len(_pi) == 1 and "issuer" in _pi)
+
+    def _provider_info(self, client, iss_id: str, now: float, behaviour_args: Optional[dict]):
+        _context = client.get_context()
+        _keyjar = client.get_attribute("keyjar")
+
+        _provider_info = self._read(f"{iss_id};provider_info", now)
+        if _provider_info is not None:
+            _service = self._discovery_service(client)
+            _response = _service.response_cls(**_provider_info)
+            _jwks = self._read(f"{iss_id};jwks", now)
+            if _jwks is None:
+                _service.update_service_context(_response)
+            else:
+                # Given a jwks_uri the keys would be fetched at once
+                _service.update_service_context(
+                    _service.response_cls(
+                        **{k: v for k, v in _provider_info.items() if k != "jwks_uri"}
+                    )
+                )
+                _context.provider_info = _response
+                _keyjar[_context.issuer] = KeyIssuer().load(_jwks)
+            logger.debug(f"Provider info for {iss_id} from cache")
+            return _context.issuer
+
+        _recorder = _HeaderRecorder(client.httpc)
+        client.httpc = _recorder
+        try:
+            issuer = client.do_provider_info(behaviour_args=behaviour_args)
+        finally:
+            client.httpc = _recorder.httpc
+
+        _lifetime = cache_lifetime(_recorder.headers, self.default_lifetime)
+        if _lifetime is None:
+            return issuer
+
+        _expires_at = now + _lifetime
+        self._write(f"{iss_id};provider_info", _context.provider_info.to_dict(), _expires_at)
+        # Make sure the keys are fetched now rather than at the first login
+        _key_issuer = _keyjar.return_issuer(_context.issuer)
+        _key_issuer.all_keys()
+        self._write(f"{iss_id};jwks", _key_issuer.dump(), _expires_at)
+        return issuer
+
+    def _registration(self, client, iss_id: str, now: float, behaviour_args: Optional[dict]):
+        _context = client.get_context()
+        if not _context.get_client_id():
+            _registration = self._read(f"{iss_id};registration", now)
+            if _registration is not None:
+                _service = client.get_service("registration")
+                _service.update_service_context(_service.response_cls(**_registration))
+                logger.debug(f"Registration with {iss_id} from cache")
+                return
+
+            client.do_client_registration(behaviour_args=behaviour_args)
+            _response = _context.registration_response
+            if _response:
+                # 0 means the secret never expires
+                self._write(
+                    f"{iss_id};registration",
+                    _response.to_dict(),
+                    _response.get("client_secret_expires_at", 0),
+                )
+        else:
+            client.do_client_registration(behaviour_args=behaviour_args)
+
+    def setup(self, client, iss_id: str, behaviour_args: Optional[dict] = None) -> str:
+        """
+        Does what :py:meth:`idpyoidc.client.rp_handler.RPHandler.client_setup` does
+        after a client has been initiated; provider info discovery and client
+        registration. Using cached information where there is some.
+
+        :param client: A Client instance
+        :param iss_id: Issuer ID, the key by which the OP is known in the cache
+        :param behaviour_args: To fine tune behaviour
+        :return: The issuer ID from the provider information
+        """
+        _now = self.clock()
+        if self._static_provider_info(client):
+            issuer = client.do_provider_info(behaviour_args=behaviour_args)
+        else:
+            issuer = self._provider_info(client, iss_id, _now, behaviour_args)
+        self._registration(client, iss_id, _now, behaviour_args)
+        return issuer
@@ -1,6 +1,8 @@
 import logging
 import sys
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 from typing import Optional
 
@@ -16,6 +18,7 @@ from idpyoidc.client.defaults import DEFAULT_RP_KEY_DEFS
 from idpyoidc.client.exception import ConfigurationError
 from idpyoidc.client.exception import OidcServiceError
 from idpyoidc.client.oauth2.stand_alone_client import StandAloneClient
+from idpyoidc.client.provider_cache import ProviderCache
 from idpyoidc.exception import MessageException
 from idpyoidc.exception import MissingRequiredAttribute
 from idpyoidc.exception import NotForMe
@@ -26,6 +29,7 @@ from idpyoidc.message.oidc import OpenIDSchema
 from idpyoidc.message.oidc.session import BackChannelLogoutRequest
 from idpyoidc.time_util import utc_time_sans_frac
 from idpyoidc.util import add_path
+from idpyoidc.util import instantiate
 from idpyoidc.util import rndstr
 from .oauth2 import Client
 from ..message import Message
@@ -114,6 +118,21 @@ class RPHandler(object):
         if not self.keyjar.httpc_params:
             self.keyjar.httpc_params = self.httpc_params
 
+        _provider_cache = kwargs.get("provider_cache")
+        if _provider_cache is None and config:
+            _provider_cache = config.conf.get("provider_cache")
+        if isinstance(_provider_cache, dict):
+            _provider_cache = instantiate(
+                _provider_cache.get("class", ProviderCache), **_provider_cache.get("kwargs", {})
+            )
+        self.provider_cache = _provider_cache
+
+        # One lock per issuer so only one client is set up per issuer at the time
+        self._setup_lock = threading.Lock()
+        self._issuer_lock = {}
+        # issuer ID as given to client_setup -> issuer ID in the provider info
+        self._setup_issuer = {}
+
     def state2issuer(self, state):
         """
         Given the state value find the Issuer ID of the OP/AS that state value
@@ -322,25 +341,65 @@ class RPHandler(object):
             temporary_client = None
 
         try:
-            client = self.issuer2rp[iss_id]
+            return self.issuer2rp[self._setup_issuer.get(iss_id, iss_id)]
         except KeyError:
+            pass
+
+        with self._setup_lock:
+            _lock = self._issuer_lock.setdefault(iss_id, threading.Lock())
+
+        with _lock:
+            # Someone else may have done it while I was waiting
+            try:
+                return self.issuer2rp[self._setup_issuer.get(iss_id, iss_id)]
+            except KeyError:
+                pass
+
             if temporary_client:
                 client = temporary_client
             else:
                 logger.debug("Creating new client: %s", iss_id)
                 client = self.init_client(iss_id)
-        else:
-            return client
 
-        logger.debug("Get provider info")
-        issuer = client.do_provider_info(behaviour_args=behaviour_args)
+            if self.provider_cache and iss_id:
+                logger.debug("Get provider info and do client registration")
+                issuer = self.provider_cache.setup(client, iss_id, behaviour_args=behaviour_args)
+            else:
+                logger.debug("Get provider info")
+                issuer = client.do_provider_info(behaviour_args=behaviour_args)
 
-        logger.debug("Do client registration")
-        client.do_client_registration(behaviour_args=behaviour_args)
+                logger.debug("Do client registration")
+                client.do_client_registration(behaviour_args=behaviour_args)
 
-        self.issuer2rp[issuer] = client
+            self.issuer2rp[issuer] = client
+            if iss_id:
+                self._setup_issuer[iss_id] = issuer
         return client
 
+    def warm_up(self, issuers: Optional[List[str]] = None, max_workers: int = 8) -> dict:
+        """
+        Set up clients for a number of OPs, typically all the configured ones at startup,
+        so the first user logging in to an OP doesn't have to wait for it.
+
+        :param issuers: Issuer IDs, by default all the configured ones
+        :param max_workers: How many clients are set up at the same time
+        :return: Dictionary with issuer ID as key and None or, if set up failed, the
+            exception as value
+        """
+        if issuers is None:
+            issuers = [_iss for _iss in self.client_configs.keys() if _iss]
+
+        def _setup(iss_id):
+            try:
+                self.client_setup(iss_id)
+            except Exception as err:
+                logger.warning(f"Could not set up client for {iss_id}: {err}")
+                return err
+            return None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return dict(zip(issuers, executor.map(_setup, issuers)))
+
     def _get_response_type(self, context, req_args: Optional[dict] = None):
         if req_args:
             return req_args.get("response_type", context.claims.get_usage("response_types")[0])
@@ -593,6 +652,18 @@ class RPHandler(object):
         client = self.get_client_from_session_key(state)
         return client.get_valid_access_token(state)
 
+    def get_fresh_access_token(self, state):
+        """
+        Find a valid access token, use the refresh token to get a new one if the
+        present is about to expire.
+
+        :param state:
+        :return: An access token and when it expires. Other wise raise exception.
+        """
+
+        client = self.get_client_from_session_key(state)
+        return client.get_fresh_access_token(state)
+
     def logout(
             self,
             state: str,
@@ -0,0 +1,287 @@
+"""
+Keeps the access tokens kept in the client state fresh.
+
+An access token is refreshed some time before it expires. Exactly when is
+randomized a bit per token so that tokens issued at the same time are not all
+refreshed at the same moment. When a number of threads needs an access token for
+the same state at the same time only one of them will do the refresh, the others
+will either continue to use the still valid token or wait for the refresh to finish
+and then use the new token.
+
+Tokens that can be fetched whenever one is needed, like those got using the client
+credentials grant, are handled by the SharedTokenManager. It can keep the tokens in a
+versioned store shared by a number of processes, one of which fetches a new token
+when one is needed while the others wait for it to appear in the store.
+"""
+import json
+import logging
+import random
+import threading
+import time
+from typing import Callable
+from typing import Optional
+from typing import Union
+from uuid import uuid4
+
+from idpyoidc.client.current import Current
+from idpyoidc.client.exception import OidcServiceError
+from idpyoidc.storage import ConcurrentUpdate
+from idpyoidc.storage.versioned import VersionedStore
+from idpyoidc.util import instantiate
+
+logger = logging.getLogger(__name__)
+
+CLAIMS = ["access_token", "__expires_at", "refresh_token"]
+
+
+class _Flight(object):
+    """An ongoing refresh."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class TokenManager(object):
+    def __init__(
+        self,
+        cstate: Current,
+        refresh: Callable,
+        refresh_ahead: Optional[int] = 60,
+        jitter: Optional[int] = 10,
+        timeout: Optional[int] = 30,
+        clock: Optional[Callable] = time.time,
+    ):
+        """
+        :param cstate: Where the tokens are kept
+        :param refresh: Function that given a state refreshes the access token bound to it
+        :param refresh_ahead: Number of seconds before expiration a token is refreshed
+        :param jitter: Up to this number of seconds is randomly added to refresh_ahead
+        :param timeout: The longest time, in seconds, to wait for someone else's refresh
+        :param clock: Returns the present time
+        """
+        self.cstate = cstate
+        self.refresh = refresh
+        self.refresh_ahead = refresh_ahead
+        self.jitter = jitter
+        self.timeout = timeout
+        self.clock = clock
+        self._flights = {}
+        # state -> (expires_at, refresh at)
+        self._refresh_at = {}
+        self._lock = threading.Lock()
+
+    def _refresh_time(self, state: str, expires_at: int) -> float:
+        _prev = self._refresh_at.get(state)
+        if _prev and _prev[0] == expires_at:
+            return _prev[1]
+
+        _at = expires_at - self.refresh_ahead - random.uniform(0, self.jitter)
+        self._refresh_at[state] = (expires_at, _at)
+        return _at
+
+    def _needs_refresh(self, state: str, info: dict, now: float) -> bool:
+        if "access_token" not in info:
+            return True
+        _exp = info.get("__expires_at", 0)
+        if not _exp:  # No expiry date, lives forever
+            return False
+        return now >= self._refresh_time(state, _exp)
+
+    @staticmethod
+    def _valid(info: dict, now: float) -> bool:
+        if "access_token" not in info:
+            return False
+        _exp = info.get("__expires_at", 0)
+        return not _exp or now < _exp
+
+    @staticmethod
+    def _result(info: dict) -> tuple:
+        return info["access_token"], info.get("__expires_at", 0)
+
+    def _info(self, state: str) -> dict:
+        return self.cstate.get_set(state, claim=CLAIMS)
+
+    def _can_refresh(self, info: dict) -> bool:
+        return "refresh_token" in info
+
+    def _refresh(self, state: str):
+        self.refresh(state)
+
+    def get_access_token(self, state: str) -> tuple:
+        """
+        Find a valid access token, refresh it if it's about to expire.
+
+        :param state: Key into the state database
+        :return: An access token and when it expires (0 if never).
+        """
+        _info = self._info(state)
+        now = self.clock()
+        if not self._needs_refresh(state, _info, now):
+            return self._result(_info)
+
+        _valid = self._valid(_info, now)
+        if not self._can_refresh(_info):
+            if _valid:
+                return self._result(_info)
+            raise OidcServiceError("No valid access token")
+
+        with self._lock:
+            _flight = self._flights.get(state)
+            leader = _flight is None
+            if leader:
+                _flight = self._flights[state] = _Flight()
+
+        if leader:
+            try:
+                _info = self._info(state)
+                # Someone may just have finished a refresh
+                if self._needs_refresh(state, _info, self.clock()):
+                    logger.debug(f"Refreshing access token for {state}")
+                    self._refresh(state)
+                    _info = self._info(state)
+                _flight.result = self._result(_info)
+            except Exception as err:
+                _flight.error = err
+            finally:
+                with self._lock:
+                    del self._flights[state]
+                _flight.done.set()
+        elif _valid:
+            # The present token is still usable while someone else refreshes it
+            return self._result(_info)
+        elif not _flight.done.wait(self.timeout):
+            raise OidcServiceError("Timeout waiting for access token refresh")
+
+        if _flight.error:
+            if _valid:
+                logger.warning(f"Refresh of access token failed: {_flight.error}")
+                return self._result(_info)
+            raise _flight.error
+        return _flight.result
+
+    def forget(self, state: str):
+        self._refresh_at.pop(state, None)
+
+
+class SharedTokenManager(TokenManager):
+    # What is kept in the shared store
+    SHARED = ["access_token", "token_type", "__expires_at"]
+
+    def __init__(
+        self,
+        cstate: Current,
+        refresh: Callable,
+        store: Optional[Union[dict, VersionedStore]] = None,
+        lease: Optional[int] = 30,
+        poll_interval: Optional[float] = 0.1,
+        **kwargs,
+    ):
+        """
+        :param cstate: Where the tokens are kept
+        :param refresh: Function that given a key fetches a new access token and
+            places it in cstate under that key
+        :param store: A versioned store, or the configuration of one, shared with other
+            processes
+        :param lease: For how long, in seconds, a process may hold the right to fetch
+            a token before someone else may take over
+        :param poll_interval: How often, in seconds, to look for a token fetched by
+            another process
+        :param kwargs: Passed on to TokenManager
+        """
+        TokenManager.__init__(self, cstate, refresh, **kwargs)
+        if isinstance(store, dict):
+            store = instantiate(store["class"], **store.get("kwargs", {}))
+        self.store = store
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._owner = uuid4().hex
+
+    def _local(self, key: str) -> dict:
+        try:
+            return self.cstate.get_set(key, claim=CLAIMS)
+        except KeyError:
+            return {}
+
+    def _adopt(self, key: str) -> dict:
+        """Use the token in the shared store if it is newer than what we have."""
+        _info = self._local(key)
+        _item = self.store.read(key)
+        if _item is None:
+            return _info
+
+        _shared = json.loads(_item[1])
+        if "access_token" not in _info or _shared.get("__expires_at", 0) > _info.get(
+            "__expires_at", 0
+        ):
+            self.cstate.update(key, _shared)
+            return self._local(key)
+        return _info
+
+    def _info(self, key: str) -> dict:
+        _info = self._local(key)
+        if self.store is not None and self._needs_refresh(key, _info, self.clock()):
+            _info = self._adopt(key)
+        return _info
+
+    def _can_refresh(self, info: dict) -> bool:
+        return True
+
+    def _acquire(self, key: str) -> bool:
+        _lease_key = f"{key};lease"
+        _item = self.store.read(_lease_key)
+        if _item is None:
+            _revision = 0
+        elif float(_item[1].split(" ")[0]) > self.clock():
+            return False
+        else:
+            _revision = _item[0]
+
+        try:
+            self.store.write(_lease_key, f"{self.clock() + self.lease} {self._owner}", _revision)
+        except ConcurrentUpdate:
+            return False
+        return True
+
+    def _release(self, key: str):
+        _lease_key = f"{key};lease"
+        _item = self.store.read(_lease_key)
+        if _item and _item[1].endswith(self._owner):
+            try:
+                self.store.write(_lease_key, "0 ", _item[0])
+            except ConcurrentUpdate:
+                pass
+
+    def _save(self, key: str):
+        _info = self.cstate.get(key)
+        _value = json.dumps({k: _info[k] for k in self.SHARED if k in _info})
+        _item = self.store.read(key)
+        try:
+            self.store.write(key, _value, _item[0] if _item else 0)
+        except ConcurrentUpdate:
+            # Someone else stored a token at the same time, either will do
+            pass
+
+    def _refresh(self, key: str):
+        if self.store is None:
+            self.refresh(key)
+            return
+
+        _deadline = time.monotonic() + self.timeout
+        while True:
+            if self._acquire(key):
+                try:
+                    # Some other process may have just stored a new token
+                    if self._needs_refresh(key, self._adopt(key), self.clock()):
+                        self.refresh(key)
+                        self._save(key)
+                finally:
+                    self._release(key)
+                return
+
+            time.sleep(self.poll_interval)
+            if not self._needs_refresh(key, self._adopt(key), self.clock()):
+                return
+            if time.monotonic() > _deadline:
+                raise OidcServiceError("Timeout waiting for access token")
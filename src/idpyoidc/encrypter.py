@@ -1,4 +1,5 @@
 import os
+import threading
 from typing import Optional
 
 from cryptojwt.key_jar import init_key_jar
@@ -43,8 +44,36 @@ def get_crypt_config(conf):
     return _crypt_config
 
 
+class LazyEncrypter(object):
+    """
+    Creates the encrypter the first time something is to be encrypted or decrypted.
+    Deriving a key from a password is deliberately slow so this saves time
+    when starting up.
+    """
+
+    def __init__(self, cls, **kwargs):
+        self.cls = cls
+        self.kwargs = kwargs
+        self._encrypter = None
+        self._lock = threading.Lock()
+
+    @property
+    def encrypter(self):
+        if self._encrypter is None:
+            with self._lock:
+                if self._encrypter is None:
+                    self._encrypter = instantiate(self.cls, **self.kwargs)
+        return self._encrypter
+
+    def encrypt(self, msg, **kwargs):
+        return self.encrypter.encrypt(msg, **kwargs)
+
+    def decrypt(self, msg, **kwargs):
+        return self.encrypter.decrypt(msg, **kwargs)
+
+
 # This is pretty complex because it must be able to cope with many variants.
-def init_encrypter(conf: Optional[dict] = None):
+def init_encrypter(conf: Optional[dict] = None, lazy: Optional[bool] = False):
     if conf is None:
         conf = default_crypt_config()
         _kwargs = conf.get("kwargs")
@@ -98,7 +127,11 @@ def init_encrypter(conf: Optional[dict] = None):
                 if attr == "keys":
                     continue
                 _kwargs[attr] = val
+    if lazy:
+        _encrypter = LazyEncrypter(_class, **_kwargs)
+    else:
+        _encrypter = instantiate(_class, **_kwargs)
     return {
-        "encrypter": instantiate(_class, **_kwargs),
+        "encrypter": _encrypter,
         "conf": {"class": _class, "kwargs": _kwargs},
     }
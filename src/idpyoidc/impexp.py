@@ -16,6 +16,8 @@ def fully_qualified_name(cls):
 
 
 class ImpExp:
+    # So that subclasses can use __slots__
+    __slots__ = ()
     parameter = {}
     special_load_dump = {}
     init_args = []
@@ -1,3 +1,4 @@
+import json
 from typing import List
 from typing import Optional
 
@@ -5,6 +6,7 @@ from cryptojwt.utils import importer
 from cryptojwt.utils import qualified_name
 
 from idpyoidc.impexp import ImpExp
+from idpyoidc.storage import ConcurrentUpdate
 
 
 class DLDict(ImpExp):
@@ -78,3 +80,86 @@ class DLDict(ImpExp):
 
     def __len__(self):
         return len(self.db)
+
+
+class VersionedDLDict(DLDict):
+    """
+    A DLDict where the items are kept in a shared versioned store. Items are cached
+    locally and reloaded when the revision in the store differs from the cached one.
+    Writes are compare-and-swap operations based on the revision the item was read at,
+    a write based on an outdated revision raises ConcurrentUpdate.
+    """
+
+    def __init__(self, store=None, **kwargs):
+        DLDict.__init__(self, **kwargs)
+        self.store = store
+
+    def _load(self, key: str):
+        _info = self.store.read(key)
+        if _info is None:
+            self.db.pop(key, None)
+            raise KeyError(key)
+
+        _rev, _val = _info
+        _item = self.db.get(key)
+        if _item is None or getattr(_item, "revision", 0) != _rev:
+            _class, _spec = json.loads(_val)
+            _item = importer(_class)().load(_spec)
+            _item.revision = _rev
+            self.db[key] = _item
+        return _item
+
+    def __setitem__(self, key: str, val):
+        _spec = [qualified_name(val.__class__), val.dump()]
+        try:
+            val.revision = self.store.write(key, json.dumps(_spec), getattr(val, "revision", 0))
+        except ConcurrentUpdate:
+            # The local copy is outdated, make sure it's reloaded next time
+            self.db.pop(key, None)
+            raise
+        self.db[key] = val
+
+    def __getitem__(self, key: str):
+        return self._load(key)
+
+    def __delitem__(self, key: str):
+        self.store.delete(key)
+        self.db.pop(key, None)
+
+    def dump(self, exclude_attributes: Optional[List[str]] = None) -> dict:
+        res = {}
+        for k, v in self.items():
+            res[k] = [qualified_name(v.__class__), v.dump(exclude_attributes=exclude_attributes)]
+        return res
+
+    def keys(self):
+        return self.store.keys()
+
+    def items(self):
+        res = []
+        for k in self.store.keys():
+            try:
+                res.append((k, self._load(k)))
+            except KeyError:  # removed by someone else in the meantime
+                pass
+        return res
+
+    def values(self):
+        return [v for k, v in self.items()]
+
+    def __contains__(self, item):
+        return self.store.read(item) is not None
+
+    def get(self, item, default=None):
+        try:
+            return self._load(item)
+        except KeyError:
+            return default
+
+    def __len__(self):
+        return len(self.store.keys())
+
+    def flush(self):
+        self.store.clear()
+        self.db = {}
+        return self
@@ -25,6 +25,152 @@ logger = logging.getLogger(__name__)
 ERRTXT = "On '%s': %s"
 
 
+# Value types that from_dict and to_dict can pass through untouched
+PLAIN_TYPES = (str, int, bool)
+
+
+class CompiledSchema(object):
+    """
+    Lookup tables derived from a message class' c_param and c_allowed_values.
+    Built the first time the class is used and then kept on the class.
+    """
+
+    def __init__(self, c_param, c_allowed_values):
+        self.c_param = c_param
+        self.size = len(c_param)
+        self.c_allowed_values = c_allowed_values
+        self.allowed_size = len(c_allowed_values)
+        # parameter name -> (spec, value adder)
+        self.adders = {}
+        # Only parameters that are required or have a restricted set of values
+        # need to be looked at by verify.
+        self.verify_plan = []
+        for attribute, (typ, required, _, _, na) in c_param.items():
+            if attribute == "*":
+                continue
+            if required or attribute in c_allowed_values:
+                self.verify_plan.append(
+                    (attribute, typ, required, na, c_allowed_values.get(attribute))
+                )
+
+    def matches(self, c_param, c_allowed_values):
+        return (
+            self.c_param is c_param
+            and self.size == len(c_param)
+            and self.c_allowed_values is c_allowed_values
+            and self.allowed_size == len(c_allowed_values)
+        )
+
+    def spec(self, key):
+        """
+        Find the specification for a parameter. The parameter name may carry a
+        language tag. If there is no specification for the parameter the wildcard
+        specification, if there is one, is returned.
+
+        :param key: Parameter name
+        :return: A tuple with the name the specification was found under and the
+            specification. Or (None, None) if there is no specification.
+        """
+        _spec = self.c_param.get(key)
+        if _spec is not None:
+            return key, _spec
+
+        skey = str(key)
+        if "#" in skey or skey is not key:
+            _key = skey.split("#")[0]
+            _spec = self.c_param.get(_key)
+            if _spec is not None:
+                return _key, _spec
+
+        _spec = self.c_param.get("*")
+        if _spec is not None:
+            return "*", _spec
+        return None, None
+
+    def adder(self, name, spec):
+        """
+        Return the function that adds a value for the parameter *name*.
+
+        :param name: The name under which the specification is found in c_param
+        :param spec: The specification
+        """
+        try:
+            _spec, _adder = self.adders[name]
+        except KeyError:
+            pass
+        else:
+            if _spec is spec:
+                return _adder
+
+        _adder = compile_adder(spec)
+        self.adders[name] = (spec, _adder)
+        return _adder
+
+
+def compile_adder(spec):
+    """
+    Create a function that adds a value to a message according to a parameter
+    specification. Plain values that match the specified type are stored directly,
+    everything else is handled by Message._add_value.
+
+    :param spec: A parameter specification
+    :return: A function with the signature (message, skey, key, value, sformat)
+    """
+    vtyp, _, _, _deser, null_allowed = spec
+
+    def _add_value(msg, skey, key, val, sformat):
+        msg._add_value(skey, vtyp, key, val, _deser, null_allowed, sformat=sformat)
+
+    _typ = vtyp[0] if isinstance(vtyp, tuple) else vtyp
+
+    if _typ in PLAIN_TYPES:
+
+        def _add_plain(msg, skey, key, val, sformat):
+            if type(val) is _typ:
+                msg._dict[skey] = val
+            elif val is None:
+                msg._dict[skey] = None
+            else:
+                _add_value(msg, skey, key, val, sformat)
+
+        return _add_plain
+
+    if isinstance(_typ, list) and _typ[0] is str and _deser in (None, list_deserializer):
+
+        def _add_str_list(msg, skey, key, val, sformat):
+            if type(val) is list and val and all(type(v) is str for v in val):
+                msg._dict[skey] = val
+            else:
+                _add_value(msg, skey, key, val, sformat)
+
+        return _add_str_list
+
+    return _add_value
+
+
+class RawValue(object):
+    """
+    A nested value kept in the form it was received in. It is deserialized the
+    first time it is accessed.
+    """
+
+    __slots__ = ["value", "key", "adder"]
+
+    def __init__(self, value, key, adder):
+        self.value = value
+        self.key = key
+        self.adder = adder
+
+
+def is_nested(val):
+    """
+    Whether a value is a JSON object or a list of JSON objects.
+    """
+    if type(val) is dict:
+        return bool(val)
+    return type(val) is list and bool(val) and type(val[0]) is dict
+
+
 class Message(MutableMapping):
     """
     Represents a basic protocol nessage/item in OAuth2/OIDC
@@ -33,6 +179,8 @@ class Message(MutableMapping):
     c_param = {}
     c_default = {}
     c_allowed_values = {}
+    # Set when there are RawValue instances in _dict
+    _lazy = False
 
     def __init__(self, set_defaults=True, **kwargs):
         if set_defaults:
@@ -46,6 +194,34 @@ class Message(MutableMapping):
         self.from_dict(kwargs)
         self.verify_ssl = True
 
+    def _schema(self):
+        _cls = self.__class__
+        _schema = _cls.__dict__.get("_compiled_schema")
+        if _schema is None or not _schema.matches(self.c_param, self.c_allowed_values):
+            _schema = CompiledSchema(self.c_param, self.c_allowed_values)
+            _cls._compiled_schema = _schema
+        return _schema
+
+    def _materialize(self, skey, raw):
+        raw.adder(self, skey, raw.key, raw.value, "dict")
+        val = self._dict[skey]
+        if val is raw:  # The value was ignored
+            del self._dict[skey]
+            raise KeyError(skey)
+        return val
+
+    def _materialize_all(self):
+        if not self._lazy:
+            return
+
+        for key, val in list(self._dict.items()):
+            if type(val) is RawValue:
+                try:
+                    self._materialize(key, val)
+                except KeyError:
+                    pass
+        self._lazy = False
+
     def __iter__(self):
         """
         Returns an iterator over all the key, value pairs in this class instance
@@ -84,27 +260,22 @@ class Message(MutableMapping):
         :return: A string of the application/x-www-form-urlencoded format
         """
 
-        _spec = self.c_param
+        self._materialize_all()
+        _schema = self._schema()
         if not self.lax:
-            for attribute, (_, req, _ser, _, _) in _spec.items():
+            for attribute, _, req, _, _ in _schema.verify_plan:
                 if req and attribute not in self._dict:
                     raise MissingRequiredAttribute("%s" % attribute, "%s" % self)
 
         params = []
 
         for key, val in self._dict.items():
-            try:
-                (_, req, _ser, _, null_allowed) = _spec[key]
-            except KeyError:  # extra attribute
-                try:
-                    _key = key.split("#")[0]
-                    (_, req, _ser, _deser, null_allowed) = _spec[_key]
-                except (ValueError, KeyError):
-                    try:
-                        (_, req, _ser, _, null_allowed) = _spec["*"]
-                    except KeyError:
-                        _ser = None
-                        null_allowed = False
+            _, _spec = _schema.spec(key)
+            if _spec:
+                (_, req, _ser, _, null_allowed) = _spec
+            else:  # extra attribute
+                _ser = None
+                null_allowed = False
 
             if val is None and null_allowed is False:
                 continue
@@ -189,28 +360,22 @@ class Message(MutableMapping):
         elif isinstance(urlencoded, list):
             urlencoded = urlencoded[0]
 
-        _spec = self.c_param
+        _schema = self._schema()
 
         _info = parse_qs(urlencoded)
         if len(urlencoded) and _info == {}:
             raise FormatError("Wrong format")
 
         for key, val in _info.items():
-            try:
-                (typ, _, _, _deser, _) = _spec[key]
-            except KeyError:
-                try:
-                    _key = key.split("#")[0]
-                    (typ, _, _, _deser, _) = _spec[_key]
-                except (ValueError, KeyError):
-                    try:
-                        (typ, _, _, _deser, _) = _spec["*"]
-                    except KeyError:
-                        if len(val) == 1:
-                            val = val[0]
+            _, _spec = _schema.spec(key)
+            if _spec is None:
+                if len(val) == 1:
+                    val = val[0]
+
+                self._dict[key] = val
+                continue
 
-                        self._dict[key] = val
-                        continue
+            (typ, _, _, _deser, _) = _spec
 
             if isinstance(typ, list):
                 if _deser:
@@ -237,24 +402,26 @@ class Message(MutableMapping):
         :return: A dict
         """
 
-        _spec = self.c_param
+        _schema = self._schema()
+        _c_param = _schema.c_param
 
         _res = {}
         for key, val in self._dict.items():
-            try:
-                _ser = _spec[str(key)][2]
-            except KeyError:
-                try:
-                    _key = key.split("#")[0]
-                    _ser = _spec[_key][2]
-                except (ValueError, KeyError):
-                    try:
-                        _ser = _spec["*"][2]
-                    except KeyError:
-                        _ser = None
+            if type(val) is RawValue:
+                # Untouched since it was received
+                _res[key] = val.value
+                continue
+
+            _spec = _c_param.get(key)
+            if _spec is None:
+                _, _spec = _schema.spec(str(key))
+            _ser = _spec[2] if _spec else None
 
             if _ser:
                 val = _ser(val, "dict")
+            elif type(val) in PLAIN_TYPES:
+                _res[key] = val
+                continue
 
             if isinstance(val, Message):
                 _res[key] = val.to_dict()
@@ -265,16 +432,23 @@ class Message(MutableMapping):
 
         return _res
 
-    def from_dict(self, dictionary, **kwargs):
+    def from_dict(self, dictionary, lazy=False, **kwargs):
         """
         Direct translation, so the value for one key might be a list or a
         single value.
 
         :param dictionary: The info
+        :param lazy: If True nested values (JSON objects or lists of JSON
+            objects) are kept as they are and deserialized, and checked, the
+            first time they are accessed.
         :return: A class instance or raise an exception on error
         """
 
-        _spec = self.c_param
+        if not dictionary:
+            return self
+
+        _schema = self._schema()
+        _c_param = _schema.c_param
 
         for key, val in dictionary.items():
             # Earlier versions of python don't like unicode strings as
@@ -282,36 +456,24 @@ class Message(MutableMapping):
             if val in ["", [""]]:
                 continue
 
-            skey = str(key)
-            try:
-                (vtyp, _, _, _deser, null_allowed) = _spec[key]
-            except KeyError:
-                # might be a parameter with a lang tag
-                try:
-                    _key = skey.split("#")[0]
-                except ValueError:
-                    try:
-                        (vtyp, _, _, _deser, null_allowed) = _spec["*"]
-                        if val is None:
-                            self._dict[key] = val
-                            continue
-                    except KeyError:
-                        self._dict[key] = val
-                        continue
-                else:
-                    try:
-                        (vtyp, _, _, _deser, null_allowed) = _spec[_key]
-                    except KeyError:
-                        try:
-                            (vtyp, _, _, _deser, null_allowed) = _spec["*"]
-                            if val is None:
-                                self._dict[key] = val
-                                continue
-                        except KeyError:
-                            self._dict[key] = val
-                            continue
-
-            self._add_value(skey, vtyp, key, val, _deser, null_allowed, sformat="dict")
+            _spec = _c_param.get(key)
+            if _spec is not None:
+                _name = key
+            else:
+                _name, _spec = _schema.spec(key)
+            if _spec is None:
+                self._dict[key] = val
+                continue
+            elif val is None and _name == "*" and key != "*":
+                self._dict[key] = val
+                continue
+
+            if lazy and _spec[3] and is_nested(val):
+                self._dict[str(key)] = RawValue(val, key, _schema.adder(_name, _spec))
+                self._lazy = True
+                continue
+
+            _schema.adder(_name, _spec)(self, str(key), key, val, "dict")
         return self
 
     def _add_value(self, skey, vtyp, key, val, _deser, null_allowed, sformat="urlencoded"):
@@ -363,7 +525,10 @@ class Message(MutableMapping):
                     try:
                         _val = []
                         for v in val:
-                            _val.append(vtype(**{str(x): y for x, y in v.items()}))
+                            if isinstance(v, vtype):
+                                _val.append(v)
+                            else:
+                                _val.append(vtype(**{str(x): y for x, y in v.items()}))
                         val = _val
                     except Exception as exc:
                         raise DecodeError(ERRTXT % (key, exc))
@@ -435,7 +600,7 @@ class Message(MutableMapping):
         :return: The instantiated instance
         """
         _dict = json.loads(txt)
-        return self.from_dict(_dict)
+        return self.from_dict(_dict, lazy=kwargs.get("lazy", False))
 
     def to_jwt(self, key=None, algorithm="", lifetime=0):
         """
@@ -482,10 +647,12 @@ class Message(MutableMapping):
             signature of the JWT
         :param verify: Whether the signature should be verified or not
         :param keyjar: A KeyJar that might contain the necessary key.
-        :param kwargs: Extra key word arguments
+        :param kwargs: Extra key word arguments. If 'lazy' is among them and True,
+            nested values in the payload are deserialized on first access.
         :return: A class instance
         """
 
+        lazy = kwargs.pop("lazy", False)
         algarg = {}
         if "encalg" in kwargs:
             algarg["alg"] = kwargs["encalg"]
@@ -540,7 +707,7 @@ class Message(MutableMapping):
             jso = json.loads(txt)
 
         self.jwt = txt
-        return self.from_dict(jso)
+        return self.from_dict(jso, lazy=lazy)
 
     def __str__(self):
         """
@@ -573,16 +740,7 @@ class Message(MutableMapping):
         Make sure all the required values are there and that the values are
         of the correct type
         """
-        _spec = self.c_param
-        try:
-            _allowed = self.c_allowed_values
-        except KeyError:
-            _allowed = {}
-
-        for (attribute, (typ, required, _, _, na)) in _spec.items():
-            if attribute == "*":
-                continue
-
+        for attribute, typ, required, na, _allowed_val in self._schema().verify_plan:
             try:
                 val = self._dict[attribute]
             except KeyError:
@@ -597,11 +755,9 @@ class Message(MutableMapping):
                         raise MissingRequiredAttribute("%s" % attribute)
                     continue
 
-            try:
-                _allowed_val = _allowed[attribute]
-            except KeyError:
-                pass
-            else:
+            if _allowed_val is not None:
+                if type(val) is RawValue:
+                    val = self[attribute]
                 if not self._type_check(typ, _allowed_val, val, na):
                     raise NotAllowedValue(val)
 
@@ -623,7 +779,10 @@ class Message(MutableMapping):
         :param item:
         :return:
         """
-        return self._dict[item]
+        val = self._dict[item]
+        if type(val) is RawValue:
+            return self._materialize(item, val)
+        return val
 
     def get(self, item, default=None):
         """
@@ -647,9 +806,11 @@ class Message(MutableMapping):
 
         :return: iterator
         """
+        self._materialize_all()
         return self._dict.items()
 
     def values(self):
+        self._materialize_all()
         return self._dict.values()
 
     def __contains__(self, item):
@@ -703,6 +864,8 @@ class Message(MutableMapping):
         if self.type() != other.type():
             return False
 
+        self._materialize_all()
+        other._materialize_all()
         if self._dict != other._dict:
             return False
 
@@ -730,7 +893,7 @@ class Message(MutableMapping):
         :return: The key,value pairs for keys that are not in the c_params
             specification,
         """
-        return dict([(key, val) for key, val in self._dict.items() if key not in self.c_param])
+        return dict([(key, val) for key, val in self.items() if key not in self.c_param])
 
     def only_extras(self):
         """
@@ -11,6 +11,7 @@ from idpyoidc.exception import MissingRequiredAttribute
 from idpyoidc.exception import VerificationError
 from idpyoidc.message import Message
 from idpyoidc.message import msg_ser
+from idpyoidc.message import OPTIONAL_LIST_OF_MESSAGES
 from idpyoidc.message import OPTIONAL_LIST_OF_SP_SEP_STRINGS
 from idpyoidc.message import OPTIONAL_LIST_OF_STRINGS
 from idpyoidc.message import REQUIRED_LIST_OF_SP_SEP_STRINGS
@@ -303,6 +304,8 @@ class CCAccessTokenRequest(Message):
         "client_secret": SINGLE_OPTIONAL_STRING,
         "grant_type": SINGLE_REQUIRED_STRING,
         "scope": OPTIONAL_LIST_OF_SP_SEP_STRINGS,
+        "resource": OPTIONAL_LIST_OF_STRINGS,  # From RFC8707
+        "audience": OPTIONAL_LIST_OF_STRINGS,
     }
 
     def verify(self, **kwargs):
@@ -485,6 +488,22 @@ class TokenIntrospectionResponse(Message):
     }
 
 
+class TokenBatchIntrospectionRequest(Message):
+    c_param = {
+        "tokens": REQUIRED_LIST_OF_SP_SEP_STRINGS,
+        "token_type_hint": SINGLE_OPTIONAL_STRING,
+        # The ones below are part of authentication information
+        "client_id": SINGLE_OPTIONAL_STRING,
+        "client_assertion_type": SINGLE_OPTIONAL_STRING,
+        "client_assertion": SINGLE_OPTIONAL_STRING,
+    }
+
+
+class TokenBatchIntrospectionResponse(Message):
+    # One TokenIntrospectionResponse per token, in the order the tokens were given.
+    c_param = {"responses": OPTIONAL_LIST_OF_MESSAGES}
+
+
 # RFC 8693
 class TokenExchangeRequest(Message):
     c_param = {
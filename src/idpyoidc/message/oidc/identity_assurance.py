@@ -1,9 +1,12 @@
 import abc
 import datetime
 import json
+import re
+import time
 
 from cryptojwt.utils import importer
 
+from idpyoidc.exception import MissingRequiredAttribute
 from idpyoidc.message import Message
 from idpyoidc.message import OPTIONAL_LIST_OF_STRINGS
 from idpyoidc.message import OPTIONAL_MESSAGE
@@ -628,3 +631,460 @@ class ClaimsConstructor:
 
     def to_json(self):
         return json.dumps(self.to_dict())
+
+
+# =============================================================================
+# Validation of verified_claims JSON documents without building Message
+# instances. The schema below is compiled once into a tree of check functions.
+
+ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+ISO_TIME = re.compile(r"^\d{4}-\d{2}-\d{2}(T\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}(:?\d{2})?)?)?$")
+
+DATE = "date"
+TIME = "time"
+NULLABLE_STRING = "nullable_string"
+ANY_OBJECT = "any_object"
+
+
+class OneOf(object):
+    """
+    A JSON object whose schema is chosen by the value of one of its members.
+    """
+
+    def __init__(self, key, schemas):
+        self.key = key
+        self.schemas = schemas
+
+
+_ADDRESS = {
+    "formatted": (str, False),
+    "street_address": (str, False),
+    "locality": (str, False),
+    "region": (str, False),
+    "postal_code": (str, False),
+    "country": (str, False),
+    "country_code": (str, False),
+}
+
+_ISSUER = dict(_ADDRESS, name=(str, False), jurisdiction=(str, False))
+
+_CHECK_METHOD = {"type": (str, True), "policy": (str, False), "procedure": (str, False)}
+
+_VERIFIER = {"organization": (str, True), "txn": (str, False)}
+
+_ATTACHMENT = {
+    "desc": (str, False),
+    "content_type": (str, False),
+    "content": (str, False),
+    "url": (str, False),
+    "access_token": (NULLABLE_STRING, False),
+    "expires_in": (int, False),
+    "digest": ({"alg": (str, True), "value": (str, True)}, False),
+    "txn": (str, False),
+}
+
+_EVIDENCE_COMMON = {
+    "type": (str, True),
+    "attachments": ([_ATTACHMENT], False),
+}
+
+_CHECKED_EVIDENCE = dict(
+    _EVIDENCE_COMMON,
+    method=(str, False),
+    validation_method=(dict(_CHECK_METHOD, status=(str, False)), False),
+    verification_method=(_CHECK_METHOD, False),
+    verifier=(_VERIFIER, False),
+    time=(TIME, False),
+)
+
+_LEGACY_DOCUMENT = {
+    "type": (str, True),
+    "number": (str, False),
+    "issuer": (_ISSUER, False),
+    "date_of_issuance": (DATE, False),
+    "date_of_expiry": (DATE, False),
+}
+
+EVIDENCE_SCHEMA = OneOf(
+    "type",
+    {
+        "document": dict(
+            _CHECKED_EVIDENCE,
+            document=(_LEGACY_DOCUMENT, False),
+            document_details=(
+                {
+                    "type": (str, True),
+                    "document_number": (str, False),
+                    "personal_number": (str, False),
+                    "serial_number": (str, False),
+                    "date_of_issuance": (DATE, False),
+                    "date_of_expiry": (DATE, False),
+                    "issuer": (_ISSUER, False),
+                },
+                False,
+            ),
+        ),
+        "electronic_record": dict(
+            _CHECKED_EVIDENCE,
+            record=(
+                {
+                    "type": (str, True),
+                    "personal_number": (str, False),
+                    "created_at": (TIME, False),
+                    "date_of_expiry": (DATE, False),
+                    "source": (_ISSUER, False),
+                },
+                False,
+            ),
+        ),
+        "vouch": dict(
+            _CHECKED_EVIDENCE,
+            attestation=(
+                {
+                    "type": (str, True),
+                    "reference_number": (str, False),
+                    "personal_number": (str, False),
+                    "date_of_issuance": (DATE, False),
+                    "date_of_expiry": (DATE, False),
+                    "voucher": (
+                        dict(
+                            _ADDRESS,
+                            name=(str, False),
+                            given_name=(str, False),
+                            family_name=(str, False),
+                            birthdate=(DATE, False),
+                            occupation=(str, False),
+                            organization=(str, False),
+                        ),
+                        False,
+                    ),
+                },
+                False,
+            ),
+        ),
+        "electronic_signature": dict(
+            _EVIDENCE_COMMON,
+            signature_type=(str, True),
+            issuer=(str, True),
+            serial_number=(str, True),
+            created_at=(TIME, False),
+        ),
+        # Evidence types from earlier drafts
+        "id_document": dict(_CHECKED_EVIDENCE, document=(_LEGACY_DOCUMENT, False)),
+        "utility_bill": dict(
+            _EVIDENCE_COMMON,
+            provider=(dict(_ADDRESS, name=(str, False)), False),
+            date=(DATE, False),
+        ),
+        "qes": dict(
+            _EVIDENCE_COMMON,
+            issuer=(str, True),
+            serial_number=(str, True),
+            created_at=(TIME, False),
+        ),
+    },
+)
+
+VERIFICATION_SCHEMA = {
+    "trust_framework": (str, True),
+    "assurance_level": (str, False),
+    "assurance_process": (
+        {
+            "policy": (str, False),
+            "procedure": (str, False),
+            "assurance_details": (
+                [
+                    {
+                        "assurance_type": (str, False),
+                        "assurance_classification": (str, False),
+                        "evidence_ref": (
+                            [
+                                {
+                                    "txn": (str, True),
+                                    "evidence_metadata": (
+                                        {"evidence_classification": (str, False)},
+                                        False,
+                                    ),
+                                }
+                            ],
+                            False,
+                        ),
+                    }
+                ],
+                False,
+            ),
+        },
+        False,
+    ),
+    "time": (TIME, False),
+    "verification_process": (str, False),
+    "evidence": ([EVIDENCE_SCHEMA], False),
+}
+
+VERIFIED_CLAIMS_SCHEMA = {
+    "verification": (VERIFICATION_SCHEMA, True),
+    "claims": (ANY_OBJECT, True),
+}
+
+
+def _wrong_type(expected):
+    return ValueError(f": expected {expected}")
+
+
+def _in(err, where):
+    # Paths are only constructed when something is wrong
+    err.args = (f"{where}{err.args[0]}",) + err.args[1:]
+    return err
+
+
+def _check_str(value):
+    if type(value) is not str:
+        raise _wrong_type("a string")
+
+
+def _check_nullable_str(value):
+    if value is not None and type(value) is not str:
+        raise _wrong_type("a string or null")
+
+
+def _check_int(value):
+    if type(value) is not int:
+        raise _wrong_type("an integer")
+
+
+def _check_date(value):
+    if type(value) is not str or not ISO_DATE.match(value):
+        raise _wrong_type("an ISO 8601 date")
+
+
+def _check_time(value):
+    if type(value) is not str or not ISO_TIME.match(value):
+        raise _wrong_type("an ISO 8601 time")
+
+
+def _check_any_object(value):
+    if type(value) is not dict or not value:
+        raise _wrong_type("a non-empty JSON object")
+
+
+_LEAF_CHECKS = {
+    str: _check_str,
+    int: _check_int,
+    NULLABLE_STRING: _check_nullable_str,
+    DATE: _check_date,
+    TIME: _check_time,
+    ANY_OBJECT: _check_any_object,
+}
+
+
+def compile_schema(schema):
+    """
+    Turn a schema description into a function that checks a JSON value.
+
+    A schema is one of: a key in _LEAF_CHECKS, a dictionary mapping member names to
+    (schema, required) tuples, a list with one schema (a non-empty array of values
+    all following that schema) or a OneOf instance.
+
+    :param schema: A schema description
+    :return: A function that takes a value and raises ValueError or
+        MissingRequiredAttribute if the value does not follow the schema.
+    """
+    if isinstance(schema, OneOf):
+        _key = schema.key
+        _checks = {name: compile_schema(spec) for name, spec in schema.schemas.items()}
+
+        def _check_one_of(value):
+            if type(value) is not dict:
+                raise _wrong_type("a JSON object")
+            try:
+                _check = _checks[value[_key]]
+            except KeyError:
+                if _key not in value:
+                    raise MissingRequiredAttribute(f"/{_key}")
+                raise ValueError(f"/{_key}: unknown value '{value[_key]}'")
+            except TypeError:
+                raise _in(_wrong_type("a string"), f"/{_key}")
+            _check(value)
+
+        return _check_one_of
+    elif isinstance(schema, dict):
+        _members = tuple(
+            (name, compile_schema(spec), required) for name, (spec, required) in schema.items()
+        )
+
+        def _check_object(value):
+            if type(value) is not dict:
+                raise _wrong_type("a JSON object")
+            for name, _check, required in _members:
+                try:
+                    _val = value[name]
+                except KeyError:
+                    if required:
+                        raise MissingRequiredAttribute(f"/{name}")
+                    continue
+                try:
+                    _check(_val)
+                except (ValueError, MissingRequiredAttribute) as err:
+                    raise _in(err, f"/{name}")
+
+        return _check_object
+    elif isinstance(schema, list):
+        _item_check = compile_schema(schema[0])
+
+        def _check_array(value):
+            if type(value) is not list or not value:
+                raise _wrong_type("a non-empty array")
+            for n, _val in enumerate(value):
+                try:
+                    _item_check(_val)
+                except (ValueError, MissingRequiredAttribute) as err:
+                    raise _in(err, f"[{n}]")
+
+        return _check_array
+    else:
+        return _LEAF_CHECKS[schema]
+
+
+_check_verified_claims_element = compile_schema(VERIFIED_CLAIMS_SCHEMA)
+
+
+def verify_verified_claims(verified_claims):
+    """
+    Check a verified_claims value, a JSON object or an array of JSON objects, in one
+    pass.
+
+    :param verified_claims: The value as parsed from JSON
+    :return: A list of verified claims elements
+    """
+    if isinstance(verified_claims, Message):
+        verified_claims = verified_claims.to_dict()
+
+    if type(verified_claims) is dict:
+        verified_claims = [verified_claims]
+    elif type(verified_claims) is not list or not verified_claims:
+        raise _in(_wrong_type("a JSON object or a non-empty array"), "verified_claims")
+
+    for n, _element in enumerate(verified_claims):
+        try:
+            _check_verified_claims_element(_element)
+        except (ValueError, MissingRequiredAttribute) as err:
+            raise _in(err, f"verified_claims[{n}]")
+    return verified_claims
+
+
+def _time_stamp(value):
+    # Anything ISO_TIME accepts
+    _val = value.replace("Z", "+00:00")
+    if len(_val) == 10:
+        _val += "T00:00"
+    _m = re.search(r"[+-]\d{2}$", _val)
+    if _m:
+        _val += ":00"
+    return datetime.datetime.fromisoformat(_val).timestamp()
+
+
+def _fulfills(spec, value, now):
+    """
+    Check a value against a claims request member as described in
+    OpenID Connect for Identity Assurance, section 6.
+
+    :param spec: The request member, None, a dictionary or a list
+    :param value: The value from the response or None if there is none
+    :param now: The present time as seconds since epoch
+    :return: True/False
+    """
+    if spec is None:
+        return True
+
+    if isinstance(spec, list):
+        if value is None:
+            return True
+        if type(value) is not list:
+            return False
+        return all(any(_fulfills(_spec, _val, now) for _val in value) for _spec in spec)
+
+    if value is None:
+        return not spec.get("essential", False)
+
+    for key, _spec in spec.items():
+        if key == "value":
+            if value != _spec:
+                return False
+        elif key == "values":
+            if value not in _spec:
+                return False
+        elif key == "max_age":
+            try:
+                if now - _time_stamp(value) > _spec:
+                    return False
+            except (TypeError, ValueError, AttributeError):
+                return False
+        elif key in ["essential", "purpose", "if_unavailable", "if_different"]:
+            pass
+        elif type(value) is dict:
+            if not _fulfills(_spec, value.get(key), now):
+                return False
+
+    return True
+
+
+def match_verified_claims(verified_claims, request):
+    """
+    Match the verified claims returned by the OP against what was asked for.
+
+    :param verified_claims: verified_claims as received, a JSON object or an array
+    :param request: The verified_claims member of the claims request
+    :return: A list with one item per element in the request. Each item is a
+        dictionary with the keys 'verification', the verification element that
+        matched or False if none did, and 'claims', the requested claims that were
+        returned.
+    """
+    verified_claims = verify_verified_claims(verified_claims)
+
+    if not isinstance(request, list):
+        request = [request]
+    request = [r.to_dict() if isinstance(r, Message) else r for r in request]
+
+    now = time.time()
+    res = []
+    for _request in request:
+        _req_verification = _request.get("verification")
+        _req_claims = _request.get("claims") or {}
+        _match = {"verification": False, "claims": {}}
+        for _element in verified_claims:
+            if not _fulfills(_req_verification, _element["verification"], now):
+                continue
+
+            _claims = {
+                name: _val
+                for name, _val in _element["claims"].items()
+                if name in _req_claims and _fulfills(_req_claims[name], _val, now)
+            }
+            if _claims:
+                _match = {"verification": _element["verification"], "claims": _claims}
+                break
+        res.append(_match)
+    return res
+
+
+def verification_per_claim(verified_response, base_claims=None):
+    """
+    Rearrange the outcome of match_verified_claims per claim.
+
+    :param verified_response: What match_verified_claims returned
+    :param base_claims: Claims that were returned outside verified_claims
+    :return: A dictionary with claim names as keys and dictionaries with the keys
+        'value' and 'verification' (a list of verification elements) as values.
+    """
+    res = {}
+    for name, value in (base_claims or {}).items():
+        res[name] = {"value": value, "verification": []}
+
+    for _match in verified_response:
+        if _match["verification"] is False:
+            continue
+        for name, value in _match["claims"].items():
+            _item = res.setdefault(name, {"value": value, "verification": []})
+            _item["value"] = value
+            _item["verification"].append(_match["verification"])
+    return res
@@ -1,5 +1,6 @@
 # Server specific defaults and a basic Server class
 import logging
+import time
 from typing import Any
 from typing import Callable
 from typing import Optional
@@ -15,6 +16,8 @@ from idpyoidc.server.configure import ASConfiguration
 from idpyoidc.server.configure import OPConfiguration
 from idpyoidc.server.endpoint import Endpoint
 from idpyoidc.server.endpoint_context import EndpointContext
+from idpyoidc.server.instrumentation import ENDPOINT_STAGES
+from idpyoidc.server.startup_report import StartupReport
 
 # from idpyoidc.server.session.manager import create_session_manager
 # from idpyoidc.server.user_authn.authn_context import populate_authn_broker
@@ -47,27 +50,34 @@ class Server(Unit):
         entity_id: Optional[str] = "",
         key_conf: Optional[dict] = None,
     ):
+        _start = time.perf_counter()
+        # How long it took to set up the different parts
+        self.startup_report = StartupReport()
         self.entity_id = entity_id or conf.get("entity_id")
         self.issuer = conf.get("issuer", self.entity_id)
 
-        Unit.__init__(
-            self,
-            config=conf,
-            keyjar=keyjar,
-            httpc=httpc,
-            upstream_get=upstream_get,
-            httpc_params=httpc_params,
-            key_conf=key_conf,
-            issuer_id=self.issuer,
-        )
+        with self.startup_report.measure("keyjar"):
+            Unit.__init__(
+                self,
+                config=conf,
+                keyjar=keyjar,
+                httpc=httpc,
+                upstream_get=upstream_get,
+                httpc_params=httpc_params,
+                key_conf=key_conf,
+                issuer_id=self.issuer,
+            )
 
         self.upstream_get = upstream_get
         if isinstance(conf, OPConfiguration) or isinstance(conf, ASConfiguration):
             self.conf = conf
         else:
             self.conf = OPConfiguration(conf)
+        # Set up subsystems the first time they are used
+        self.lazy_init = self.conf.get("lazy_init", False)
 
-        self.endpoint = do_endpoints(self.conf, self.unit_get)
+        with self.startup_report.measure("endpoints"):
+            self.endpoint = do_endpoints(self.conf, self.unit_get)
 
         self.context = EndpointContext(
             conf=self.conf,
@@ -76,10 +86,16 @@ class Server(Unit):
             cookie_handler=cookie_handler,
             keyjar=self.keyjar,
         )
+        if self.context.client_keys is not None:
+            # The key jar that loads client keys when needed
+            self.keyjar = self.context.keyjar
 
         # Need to have context in place before doing this
         self.context.do_add_on(endpoints=self.endpoint)
 
+        for endpoint_name, _endp in self.endpoint.items():
+            self.context.instrumentation.instrument(_endp, endpoint_name, ENDPOINT_STAGES)
+
         for endpoint_name, _ in self.endpoint.items():
             self.endpoint[endpoint_name].upstream_get = self.unit_get
 
@@ -89,6 +105,24 @@ class Server(Unit):
         if _token_endp:
             _token_endp.allow_refresh = allow_refresh_token(self.context)
 
+        _revocation_endp = self.endpoint.get("token_revocation")
+        if _revocation_endp:
+            _revocation_endp.compile_policies()
+
+        _session_endp = self.endpoint.get("session")
+        if _session_endp:
+            _session_endp.compile_front_channel_templates()
+
+        # Tokens refer to the token status list by the URL of the endpoint publishing it
+        _status_list = self.context.session_manager.status_list
+        if _status_list is not None and not _status_list.uri:
+            for _endp in self.endpoint.values():
+                if _endp.endpoint_name == "status_list_endpoint":
+                    _status_list.uri = _endp.full_path
+
+        self.startup_report.total = time.perf_counter() - _start
+        logger.debug(f"Startup times:\n{self.startup_report}")
+
     def get_endpoints(self, *arg):
         return self.endpoint
 
@@ -0,0 +1,157 @@
+"""
+The OP browser state (opbs) used by OpenID Connect Session Management.
+
+The opbs is the value of the session management cookie. Together with a salt, the
+client_id and the origin of the client it is hashed into the session_state that is
+returned in the authorization response. Relying parties then keep polling the
+check_session_iframe to find out whether the session_state has changed.
+
+The browser state is kept the same for as long as the user stays logged in, that
+is until the next login or logout, so the session_state of a client only has to be
+computed once per opbs.
+"""
+import hmac
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable
+from typing import Optional
+from urllib.parse import urlparse
+
+from idpyoidc.server.cookie_handler import compute_session_state
+from idpyoidc.util import rndstr
+
+
+@lru_cache(maxsize=1024)
+def origin(uri: str) -> str:
+    """
+    :param uri: A URL
+    :return: The origin of the URL, scheme and network location
+    """
+    _part = urlparse(uri)
+    return f"{_part.scheme}://{_part.netloc}"
+
+
+class BrowserState(object):
+    def __init__(self, max_browsers: Optional[int] = 100000, salt_length: Optional[int] = 8):
+        """
+        :param max_browsers: The largest number of browser states kept. When there are
+            more the least recently used ones are dropped.
+        :param salt_length: The length of the salt used when computing session_state
+        """
+        self.max_browsers = max_browsers
+        self.salt_length = salt_length
+        # (user_id, authn_time) -> session management cookie
+        self._browser = OrderedDict()
+        # user_id -> set of authn_time
+        self._user = {}
+        # opbs -> {(client_id, origin): session_state}
+        self._state = {}
+        # opbs values that have been rotated away from
+        self._ended = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _drop(self, key: tuple):
+        _cookie = self._browser.pop(key)
+        self._state.pop(_cookie["value"], None)
+        self._ended[_cookie["value"]] = True
+        if len(self._ended) > self.max_browsers:
+            self._ended.popitem(last=False)
+        _times = self._user.get(key[0])
+        if _times is not None:
+            _times.discard(key[1])
+            if not _times:
+                del self._user[key[0]]
+
+    def get_cookie(self, user_id: str, authn_time: int, make_cookie: Callable) -> dict:
+        """
+        Returns the session management cookie of a login. A new login gets a new
+        cookie, and with that a new opbs.
+
+        :param user_id: User ID
+        :param authn_time: When the user was authenticated
+        :param make_cookie: Function without arguments that creates a new cookie
+        :return: Cookie content
+        """
+        _key = (user_id, authn_time)
+        with self._lock:
+            _cookie = self._browser.get(_key)
+            if _cookie is None:
+                _cookie = make_cookie()
+                self._browser[_key] = _cookie
+                self._state[_cookie["value"]] = {}
+                self._user.setdefault(user_id, set()).add(authn_time)
+                while len(self._browser) > self.max_browsers:
+                    self._drop(next(iter(self._browser)))
+            else:
+                self._browser.move_to_end(_key)
+        return dict(_cookie)
+
+    def session_state(self, opbs: str, client_id: str, redirect_uri: str) -> str:
+        """
+        :param opbs: The OP browser state
+        :param client_id: Client ID
+        :param redirect_uri: Where the client gets the authorization response
+        :return: The session state of the client
+        """
+        _key = (client_id, origin(redirect_uri))
+        _states = self._state.get(opbs)
+        if _states is not None:
+            _session_state = _states.get(_key)
+            # An empty value means the user has logged out from the client
+            if _session_state:
+                return _session_state
+
+        _session_state = compute_session_state(
+            opbs, rndstr(self.salt_length), client_id, redirect_uri
+        )
+        if _states is not None:
+            _states[_key] = _session_state
+        return _session_state
+
+    def validate(self, opbs: str, client_id: str, client_origin: str, session_state: str) -> bool:
+        """
+        Checks whether a session state is still valid. Meant to be used when serving
+        the polling from relying parties.
+
+        :param opbs: The OP browser state
+        :param client_id: Client ID
+        :param client_origin: The origin of the client
+        :param session_state: The session state the client got
+        :return: True if the session state is valid for the browser state
+        """
+        if opbs in self._ended:
+            return False
+
+        _states = self._state.get(opbs)
+        _expected = None
+        if _states is not None:
+            _expected = _states.get((client_id, origin(client_origin)))
+        if _expected is None:
+            # Not computed here, could have been done by another process
+            try:
+                _salt = session_state.rsplit(".", 1)[1]
+            except IndexError:
+                return False
+            _expected = compute_session_state(opbs, _salt, client_id, client_origin)
+        return hmac.compare_digest(_expected, session_state)
+
+    def logout(self, user_id: str, client_id: Optional[str] = ""):
+        """
+        Ends the browser states of a user. If a client is given the user is only
+        logged out from that client and the session states of the client are dropped.
+
+        :param user_id: User ID
+        :param client_id: Client ID
+        """
+        with self._lock:
+            _times = list(self._user.get(user_id, []))
+            for _authn_time in _times:
+                _key = (user_id, _authn_time)
+                if client_id:
+                    _states = self._state.get(self._browser[_key]["value"], {})
+                    for _state_key in [k for k in _states if k[0] == client_id]:
+                        # Not valid, not even by way of computing it
+                        _states[_state_key] = ""
+                else:
+                    self._drop(_key)
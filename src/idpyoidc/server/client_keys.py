@@ -0,0 +1,220 @@
+"""
+Keys belonging to clients are loaded into the server's key jar when they are first
+needed, not when the client is registered. They are read from the client database,
+*jwks* and *client_secret*, or fetched from the client's *jwks_uri*.
+
+At most *max_clients* clients have their keys in memory. If the keys of more are needed
+the keys of the least recently used client are dropped, to be loaded again when needed.
+Keys fetched from a *jwks_uri* are refreshed in the background a while before they
+would otherwise have been refetched while a request waits. Only one request at the
+time fetches a *jwks_uri*, others that need the same keys wait for it.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from typing import Optional
+
+from cryptojwt import KeyJar
+from cryptojwt.key_bundle import KeyBundle
+from cryptojwt.key_issuer import KeyIssuer
+
+logger = logging.getLogger(__name__)
+
+
+class ClientKeyJar(KeyJar):
+    """
+    A key jar that asks a :py:class:`ClientKeys` instance for the keys of issuers it
+    doesn't know about.
+    """
+
+    def __init__(self, keyjar: KeyJar, client_keys: "ClientKeys"):
+        # Shares issuers and settings with the key jar it extends
+        self.__dict__.update(keyjar.__dict__)
+        self.client_keys = client_keys
+
+    def _get_issuer(self, issuer_id: str) -> Optional[KeyIssuer]:
+        _issuer = self._issuers.get(issuer_id)
+        if _issuer is None:
+            if issuer_id:
+                return self.client_keys.load(issuer_id)
+            return None
+        self.client_keys.touch(issuer_id)
+        return _issuer
+
+
+class ClientKeys(object):
+    def __init__(
+        self,
+        upstream_get: Callable,
+        max_clients: Optional[int] = 10000,
+        refresh_ahead: Optional[int] = 30,
+        max_workers: Optional[int] = 2,
+    ):
+        """
+        :param upstream_get: Function to get information from the server
+        :param max_clients: The maximum number of clients whose keys are kept in memory
+        :param refresh_ahead: How many seconds before keys fetched from a jwks_uri
+            should be refetched the background refresh is started
+        :param max_workers: The number of threads doing background refreshes
+        """
+        self.upstream_get = upstream_get
+        self.max_clients = max_clients
+        self.refresh_ahead = refresh_ahead
+        self.max_workers = max_workers
+        self.keyjar = None
+        # client_id -> jwks_uri, in least recently used order
+        self._loaded = OrderedDict()
+        # jwks_uri -> key bundle, shared by all clients using the same jwks_uri
+        self._bundle = {}
+        self._users = {}
+        self._refreshing = set()
+        # One lock per jwks_uri so it's only fetched once when first needed
+        self._fetch_lock = {}
+        self._executor = None
+        self._lock = threading.RLock()
+
+    def key_jar(self, keyjar: KeyJar) -> ClientKeyJar:
+        """
+        :param keyjar: The server's key jar
+        :return: A key jar that loads client keys when they are needed
+        """
+        self.keyjar = ClientKeyJar(keyjar, self)
+        return self.keyjar
+
+    def _key_issuer(self, client_id: str, cinfo: dict) -> Optional[KeyIssuer]:
+        _keyjar = self.keyjar
+        _issuer = KeyIssuer(
+            name=client_id,
+            httpc=_keyjar.httpc,
+            httpc_params=_keyjar.httpc_params,
+            keybundle_cls=_keyjar.keybundle_cls,
+            remove_after=_keyjar.remove_after,
+        )
+
+        _jwks_uri = cinfo.get("jwks_uri")
+        if _jwks_uri:
+            with self._lock:
+                _kb = self._bundle.get(_jwks_uri)
+            if _kb is None:
+                _kb = _keyjar.keybundle_cls(
+                    source=_jwks_uri, httpc=_keyjar.httpc, httpc_params=_keyjar.httpc_params
+                )
+                # The keys are needed now
+                _kb.update()
+            _issuer.add_kb(_kb)
+        elif cinfo.get("jwks"):
+            _jwks = cinfo["jwks"]
+            if isinstance(_jwks, str):
+                _jwks = json.loads(_jwks)
+            _issuer.add_kb(_keyjar.keybundle_cls(_jwks))
+
+        _secret = cinfo.get("client_secret")
+        if _secret:
+            _issuer.add_symmetric(str(_secret))
+
+        if not len(_issuer):
+            return None
+        return _issuer
+
+    def load(self, client_id: str) -> Optional[KeyIssuer]:
+        """
+        Load the keys of a client into the key jar.
+
+        :param client_id: The client ID
+        :return: A KeyIssuer instance with the client's keys or None if the client is
+            unknown or has no keys
+        """
+        _cinfo = self.upstream_get("context").cdb.get(client_id)
+        if not _cinfo:
+            return None
+
+        _jwks_uri = _cinfo.get("jwks_uri", "")
+        if not _jwks_uri:
+            return self._load(client_id, _cinfo, _jwks_uri)
+
+        with self._lock:
+            _fetch_lock = self._fetch_lock.setdefault(_jwks_uri, threading.Lock())
+        # Whoever comes after the first one gets the keys it fetched
+        with _fetch_lock:
+            return self._load(client_id, _cinfo, _jwks_uri)
+
+    def _load(self, client_id: str, cinfo: dict, jwks_uri: str) -> Optional[KeyIssuer]:
+        _issuer = self._key_issuer(client_id, cinfo)
+        if _issuer is None:
+            return None
+
+        with self._lock:
+            # Someone else may have loaded them while I was at it
+            _present = self.keyjar._issuers.get(client_id)
+            if _present is not None:
+                return _present
+
+            self.keyjar._issuers[client_id] = _issuer
+            self._loaded[client_id] = jwks_uri
+            if jwks_uri:
+                self._bundle.setdefault(jwks_uri, _issuer._bundles[0])
+                self._users[jwks_uri] = self._users.get(jwks_uri, 0) + 1
+
+            while len(self._loaded) > self.max_clients:
+                self._drop(next(iter(self._loaded)))
+
+        logger.debug(f"Loaded keys for {client_id}")
+        return _issuer
+
+    def _drop(self, client_id: str):
+        # Must be called with the lock held
+        _jwks_uri = self._loaded.pop(client_id)
+        self.keyjar._issuers.pop(client_id, None)
+        if _jwks_uri:
+            self._users[_jwks_uri] -= 1
+            if not self._users[_jwks_uri]:
+                del self._users[_jwks_uri]
+                del self._bundle[_jwks_uri]
+                self._fetch_lock.pop(_jwks_uri, None)
+
+    def forget(self, client_id: str):
+        """
+        Drop the keys of a client, for instance because the information about
+        the client in the client database has changed.
+
+        :param client_id: The client ID
+        """
+        with self._lock:
+            if client_id in self._loaded:
+                self._drop(client_id)
+
+    def touch(self, client_id: str):
+        """
+        Keeps track of which clients keys are used and starts refreshing keys
+        fetched from a jwks_uri when it's time.
+
+        :param client_id: The client ID
+        """
+        with self._lock:
+            _jwks_uri = self._loaded.get(client_id)
+            if _jwks_uri is None:  # Not loaded by me
+                return
+            self._loaded.move_to_end(client_id)
+            if not _jwks_uri or _jwks_uri in self._refreshing:
+                return
+            _kb = self._bundle[_jwks_uri]
+            if _kb.time_out - time.time() > self.refresh_ahead:
+                return
+            self._refreshing.add(_jwks_uri)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self._executor.submit(self._refresh, _jwks_uri, _kb)
+
+    def _refresh(self, jwks_uri: str, kb: KeyBundle):
+        try:
+            kb.update()
+        finally:
+            with self._lock:
+                self._refreshing.discard(jwks_uri)
+
+    def __len__(self):
+        return len(self._loaded)
@@ -43,6 +43,7 @@ _DEFAULT_CONFIG = {
     },
     "httpc_params": {"verify": False, "timeout": 4},
     "issuer": "https://{domain}:{port}",
+    "lazy_init": False,
     "template_dir": "templates"
 }
 
@@ -217,11 +218,14 @@ class EntityConfiguration(Base):
         "claims_interface": None,
         "client_db": None,
         "client_authn_methods": {},
+        "client_keys": None,
         "cookie_handler": None,
         "endpoint": {},
         "httpc_params": {},
+        "instrumentation": None,
         "issuer": "",
         "key_conf": None,
+        "lazy_init": False,
         "preference": {},
         "session_params": None,
         "template_dir": None,
@@ -257,7 +261,8 @@ class EntityConfiguration(Base):
 
         for key in self.parameter.keys():
             _val = conf.get(key)
-            if not _val:
+            # False is a value, not a missing one
+            if not _val and _val is not False:
                 if key in self.default_config:
                     _val = self.format(
                         copy.deepcopy(self.default_config[key]),
@@ -272,7 +277,7 @@ class EntityConfiguration(Base):
 
             if key not in DEFAULT_EXTENDED_CONF:
                 logger.warning(f"{key} does not seems to be a valid configuration parameter")
-            elif not _val:
+            elif not _val and _val is not False:
                 logger.warning(f"{key} not configured, using default configuration values")
 
             if key == "oidc_clients":
@@ -293,6 +298,7 @@ class OPConfiguration(EntityConfiguration):
     parameter = EntityConfiguration.parameter.copy()
     parameter.update(
         {
+            "browser_state": None,
             "id_token": None,
             "login_hint2acrs": {},
             "login_hint_lookup": None,
@@ -422,6 +428,14 @@ DEFAULT_EXTENDED_CONF = {
     },
     "scopes_handler": {"class": "idpyoidc.server.scopes.Scopes"},
     "claims_interface": {"class": "idpyoidc.server.session.claims.ClaimsInterface", "kwargs": {}},
+    "browser_state": {
+        "class": "idpyoidc.server.browser_state.BrowserState",
+        "kwargs": {"max_browsers": 100000},
+    },
+    "client_keys": {
+        "class": "idpyoidc.server.client_keys.ClientKeys",
+        "kwargs": {"max_clients": 10000, "refresh_ahead": 30},
+    },
     "cookie_handler": {
         "class": "idpyoidc.server.cookie_handler.CookieHandler",
         "kwargs": {
@@ -541,6 +555,7 @@ DEFAULT_EXTENDED_CONF = {
         "read_only": False,
         "uri_path": "static/jwks.json",
     },
+    "lazy_init": False,
     "login_hint2acrs": {
         "class": "idpyoidc.server.login_hint.LoginHint2Acrs",
         "kwargs": {
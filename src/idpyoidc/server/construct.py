@@ -1,6 +1,7 @@
 import logging
 import re
 from functools import cmp_to_key
+from functools import lru_cache
 
 from cryptojwt import jwe
 from cryptojwt.jws.jws import SIGNER_ALGS
@@ -27,12 +28,17 @@ def sort_sign_alg(alg1, alg2):
     return 0
 
 
+@lru_cache(maxsize=1)
+def _sorted_signing_algs():
+    # Pick supported signing algorithms from crypto library
+    # Sort order RS, ES, HS, PS
+    return tuple(sorted(SIGNER_ALGS.keys(), key=cmp_to_key(sort_sign_alg)))
+
+
 def assign_algorithms(typ):
     if typ == "signing_alg":
-        # Pick supported signing algorithms from crypto library
-        # Sort order RS, ES, HS, PS
-        sign_algs = list(SIGNER_ALGS.keys())
-        return sorted(sign_algs, key=cmp_to_key(sort_sign_alg))
+        # Sorted once, callers get their own list
+        return list(_sorted_signing_algs())
     elif typ == "encryption_alg":
         return jwe.SUPPORTED["alg"]
     elif typ == "encryption_enc":
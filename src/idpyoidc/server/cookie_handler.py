@@ -1,13 +1,18 @@
 import base64
+import binascii
 import hashlib
+import hmac
 import logging
 import os
+import struct
 from typing import List
 from typing import Optional
+from typing import Tuple
 from typing import Union
 from urllib.parse import urlparse
 
 from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptojwt.exception import VerificationError
 from cryptojwt.jwe.aes import AES_GCMEncrypter
 from cryptojwt.jwe.utils import split_ctx_and_tag
@@ -31,6 +36,132 @@ LOGGER = logging.getLogger(__name__)
 # I don't care about the remaining attributes of a cookie.
 
 
+def _key_bytes(key: Union[SYMKey, str, bytes, None]) -> Optional[bytes]:
+    if key is None:
+        return None
+    if isinstance(key, SYMKey):
+        return key.key
+    return SYMKey(k=key).key
+
+
+class CookieCodec:
+    """
+    Compact binary cookie value format.
+
+    The raw value is a 10 byte header (mode, key ID, timestamp) followed by either
+    a nonce and the AES-GCM encrypted payload, the header being the associated data,
+    or by the payload in clear and an HMAC over header and payload.
+    The raw value is base64url encoded without padding.
+
+    The cipher and MAC objects are created once per key, the key ID byte allows
+    cookies made with older keys to be decoded while new cookies use the current key.
+    """
+
+    SIGNED = 1
+    ENCRYPTED = 2
+    header = struct.Struct(">BBQ")
+    nonce_size = 12
+
+    def __init__(
+        self,
+        sign_key: Optional[bytes] = None,
+        enc_key: Optional[bytes] = None,
+        kid: int = 0,
+        sign_alg: str = "SHA256",
+    ):
+        self.kid = kid
+        self.digest = getattr(hashlib, sign_alg.lower())
+        self.mac_size = self.digest().digest_size
+        self.keys = {}
+        self.add_key(kid, sign_key=sign_key, enc_key=enc_key)
+
+    def add_key(self, kid: int, sign_key: Optional[bytes] = None, enc_key: Optional[bytes] = None):
+        """
+        Make a key available for decoding. Only the key with the codec's key ID is
+        used for encoding.
+
+        :param kid: Key ID, a value between 0 and 255
+        :param sign_key: HMAC key
+        :param enc_key: AES key, 16, 24 or 32 bytes long
+        """
+        if not 0 <= kid <= 255:
+            raise ValueError("Key ID must fit in one byte")
+        if not sign_key and not enc_key:
+            raise ValueError("Need a sign and/or an enc key")
+        if enc_key and len(enc_key) not in [16, 24, 32]:
+            raise ValueError("Wrong size of enc_key")
+
+        if sign_key:
+            _mac = hmac.new(sign_key, digestmod=self.digest)
+        else:
+            _mac = None
+
+        if enc_key:
+            _aead = AESGCM(enc_key)
+        else:
+            _aead = None
+
+        self.keys[kid] = (_mac, _aead)
+
+    def encode(self, payload: bytes, timestamp: int) -> bytes:
+        _mac, _aead = self.keys[self.kid]
+        if _aead:  # AES-GCM authenticates so no separate MAC is needed
+            _header = self.header.pack(self.ENCRYPTED, self.kid, timestamp)
+            _nonce = os.urandom(self.nonce_size)
+            _raw = b"".join([_header, _nonce, _aead.encrypt(_nonce, payload, _header)])
+        else:
+            _header = self.header.pack(self.SIGNED, self.kid, timestamp)
+            _hmac = _mac.copy()
+            _hmac.update(_header)
+            _hmac.update(payload)
+            _raw = b"".join([_header, payload, _hmac.digest()])
+
+        return base64.urlsafe_b64encode(_raw).rstrip(b"=")
+
+    def decode(self, value: bytes) -> Optional[Tuple[bytes, int]]:
+        """
+        Verifies and if necessary decrypts a cookie value.
+
+        :param value: The cookie value
+        :return: A tuple with payload and timestamp or None if the value could not
+            be verified.
+        """
+        try:
+            _raw = base64.urlsafe_b64decode(value + b"=" * (-len(value) % 4))
+        except (binascii.Error, ValueError):
+            return None
+
+        _size = self.header.size
+        if len(_raw) < _size:
+            return None
+
+        _mode, _kid, _timestamp = self.header.unpack_from(_raw)
+        try:
+            _mac, _aead = self.keys[_kid]
+        except KeyError:
+            LOGGER.debug(f"Unknown cookie key ID: {_kid}")
+            return None
+
+        if _mode == self.ENCRYPTED and _aead:
+            _nonce = _raw[_size : _size + self.nonce_size]
+            try:
+                _payload = _aead.decrypt(_nonce, _raw[_size + self.nonce_size :], _raw[:_size])
+            except InvalidTag:
+                LOGGER.debug("Decryption failed")
+                return None
+        elif _mode == self.SIGNED and _mac and len(_raw) >= _size + self.mac_size:
+            _payload = _raw[_size : -self.mac_size]
+            _hmac = _mac.copy()
+            _hmac.update(_raw[: -self.mac_size])
+            if not hmac.compare_digest(_hmac.digest(), _raw[-self.mac_size :]):
+                LOGGER.debug("Could not verify signature")
+                return None
+        else:
+            return None
+
+        return _payload, _timestamp
+
+
 class CookieHandler:
     def __init__(
         self,
@@ -40,11 +171,23 @@ class CookieHandler:
         sign_alg: [str] = "SHA256",
         name: Optional[dict] = None,
         crypt_config: Optional[dict] = None,
+        compact: Optional[bool] = False,
+        kid: Optional[int] = 0,
+        previous_keys: Optional[List[dict]] = None,
         **kwargs,
     ):
+        """
+        :param compact: Use the compact cookie format (CookieCodec) for new cookies.
+            Cookies in the old format can still be parsed.
+        :param kid: Key ID of the present keys, used by the compact format.
+        :param previous_keys: Keys, for the compact format, that are no longer used for
+            new cookies but still accepted. A list of dictionaries with the keys
+            'kid', 'sign_key' and/or 'enc_key'.
+        """
         self.sign_key = None
         self.enc_key = None
         self.crypt = None
+        self.codec = None
 
         if keys:
             key_jar = init_key_jar(**keys)
@@ -76,6 +219,26 @@ class CookieHandler:
                 self.enc_key = None
 
         self.sign_alg = sign_alg
+        # Neither of these hold any per message state so they can be reused
+        self._signer = HMACSigner(algorithm=self.sign_alg)
+        self._encrypter = None
+
+        if compact and not (self.sign_key or self.enc_key):
+            # A crypt_config encrypter has no keys the codec can use
+            LOGGER.warning("No sign or enc key, the compact cookie format is not used")
+        elif compact:
+            self.codec = CookieCodec(
+                sign_key=_key_bytes(self.sign_key),
+                enc_key=_key_bytes(self.enc_key),
+                kid=kid,
+                sign_alg=sign_alg,
+            )
+            for _spec in previous_keys or []:
+                self.codec.add_key(
+                    _spec["kid"],
+                    sign_key=_key_bytes(_spec.get("sign_key")),
+                    enc_key=_key_bytes(_spec.get("enc_key")),
+                )
 
         self.time_format = "%a, %d-%b-%Y %H:%M:%S GMT"
 
@@ -97,6 +260,12 @@ class CookieHandler:
             },
         )
 
+    def _aes_gcm(self):
+        # Keyed by the key bytes in case someone replaces enc_key
+        if self._encrypter is None or self._encrypter[0] != self.enc_key.key:
+            self._encrypter = (self.enc_key.key, AES_GCMEncrypter(key=self.enc_key.key))
+        return self._encrypter[1]
+
     def _sign_enc_payload(self, payload: str, timestamp: Optional[Union[int, str]] = 0):
         """
         Creates signed and/or encrypted information.
@@ -117,8 +286,7 @@ class CookieHandler:
         bytes_timestamp = timestamp.encode("utf-8")
 
         if self.sign_key:
-            signer = HMACSigner(algorithm=self.sign_alg)
-            mac = signer.sign(bytes_load + bytes_timestamp, self.sign_key.key)
+            mac = self._signer.sign(bytes_load + bytes_timestamp, self.sign_key.key)
         else:
             mac = b""
 
@@ -126,7 +294,7 @@ class CookieHandler:
             if len(self.enc_key.key) not in [16, 24, 32]:
                 raise ValueError("Wrong size of enc_key")
 
-            encrypter = AES_GCMEncrypter(key=self.enc_key.key)
+            encrypter = self._aes_gcm()
             iv = os.urandom(12)
             if mac:
                 msg = lv_pack(payload, timestamp, base64.b64encode(mac).decode("utf-8"))
@@ -173,8 +341,7 @@ class CookieHandler:
             # verify the cookie signature
             timestamp, payload, b64_mac = parts
             mac = base64.b64decode(b64_mac)
-            verifier = HMACSigner(algorithm=self.sign_alg)
-            if verifier.verify(
+            if self._signer.verify(
                 payload.encode("utf-8") + timestamp.encode("utf-8"),
                 mac,
                 self.sign_key.key,
@@ -187,7 +354,7 @@ class CookieHandler:
             ciphertext = base64.b64decode(parts[2])
             tag = base64.b64decode(parts[3])
 
-            decrypter = AES_GCMEncrypter(key=self.enc_key.key)
+            decrypter = self._aes_gcm()
             try:
                 msg = decrypter.decrypt(ciphertext, iv, tag=tag)
             except InvalidTag:
@@ -198,8 +365,7 @@ class CookieHandler:
             payload = p[0]
             timestamp = p[1]
             if len(p) == 3:
-                verifier = HMACSigner(algorithm=self.sign_alg)
-                if verifier.verify(
+                if self._signer.verify(
                     payload.encode("utf-8") + timestamp.encode("utf-8"),
                     base64.b64decode(p[2]),
                     self.sign_key.key,
@@ -243,7 +409,12 @@ class CookieHandler:
             except TypeError:
                 cookie_payload = "::".join([value[0], typ])
 
-            _cookie_value = self._sign_enc_payload(cookie_payload, timestamp)
+            if self.codec:
+                _cookie_value = self.codec.encode(
+                    cookie_payload.encode("utf-8"), int(timestamp)
+                ).decode("ascii")
+            else:
+                _cookie_value = self._sign_enc_payload(cookie_payload, timestamp)
 
         content = {"name": name, "value": _cookie_value}
 
@@ -279,7 +450,13 @@ class CookieHandler:
         for _cookie in cookies:
             LOGGER.debug(f"Cookie: {_cookie}")
             if "name" in _cookie and _cookie["name"] == name:
-                _content = self._ver_dec_content(_cookie["value"].split("|"))
+                _value = _cookie["value"]
+                if self.codec and "|" not in _value:
+                    _content = self.codec.decode(_value.encode("utf-8"))
+                    if _content:
+                        _content = (_content[0].decode("utf-8"), str(_content[1]))
+                else:  # The old format
+                    _content = self._ver_dec_content(_value.split("|"))
                 if _content:
                     payload, timestamp = _content
                     value, typ = payload.split("::")
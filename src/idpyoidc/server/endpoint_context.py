@@ -1,26 +1,31 @@
 import json
 import logging
+import threading
 from typing import Any
 from typing import Callable
 from typing import Optional
 from typing import Union
 
 from cryptojwt import KeyJar
-from jinja2 import Environment
-from jinja2 import FileSystemLoader
 from requests import request
 
 from idpyoidc.context import OidcContext
 from idpyoidc.server import authz
+from idpyoidc.server.browser_state import BrowserState
 from idpyoidc.server.claims import Claims
 from idpyoidc.server.claims.oauth2 import Claims as OAUTH2_Claims
 from idpyoidc.server.claims.oidc import Claims as OIDC_Claims
 from idpyoidc.server.client_authn import client_auth_setup
 from idpyoidc.server.configure import OPConfiguration
+from idpyoidc.server.instrumentation import SESSION_MANAGER_STAGES
+from idpyoidc.server.instrumentation import TOKEN_HANDLER_STAGES
+from idpyoidc.server.instrumentation import USERINFO_STAGES
+from idpyoidc.server.instrumentation import Instrumentation
 from idpyoidc.server.scopes import SCOPE2CLAIMS
 from idpyoidc.server.scopes import Scopes
 from idpyoidc.server.session.manager import create_session_manager
 from idpyoidc.server.session.manager import SessionManager
+from idpyoidc.server.startup_report import StartupReport
 from idpyoidc.server.template_handler import Jinja2TemplateHandler
 from idpyoidc.server.user_authn.authn_context import populate_authn_broker
 from idpyoidc.server.util import get_http_params
@@ -29,6 +34,20 @@ from idpyoidc.util import rndstr
 
 logger = logging.getLogger(__name__)
 
+# Subsystems that, with lazy_init, are set up the first time they are used.
+# name -> (the method that sets it up, the attributes it sets)
+LAZY_SUBSYSTEMS = {
+    "template_handler": ("setup_template_handler", ["template_handler"]),
+    "authentication": ("setup_authentication", ["authn_broker", "endpoint_to_authn_method"]),
+    "userinfo": ("do_userinfo", ["userinfo"]),
+    "login_hint_lookup": ("setup_login_hint_lookup", ["login_hint_lookup"]),
+    "client_authn_methods": ("setup_client_authn_methods", ["client_authn_methods"]),
+}
+
+LAZY_ATTRIBUTE = {
+    _attr: _name for _name, (_, _attrs) in LAZY_SUBSYSTEMS.items() for _attr in _attrs
+}
+
 
 def init_user_info(conf, cwd: str):
     kwargs = conf.get("kwargs", {})
@@ -152,11 +171,14 @@ class EndpointContext(OidcContext):
         self.args = {}
         self.authn_broker = None
         self.authz = None
+        self.browser_state = None
+        self.client_keys = None
         self.cookie_handler = cookie_handler
         self.claims_interface = None
         self.endpoint_to_authn_method = {}
         self.httpc = httpc or request
         self.idtoken = None
+        self.instrumentation = Instrumentation()
         self.issuer = ""
         # self.jwks_uri = None
         self.login_hint_lookup = None
@@ -172,6 +194,21 @@ class EndpointContext(OidcContext):
         self.token_args_methods = []
         self.userinfo = None
         self.client_authn_method = {}
+        self.client_authn_methods = {}
+
+        if upstream_get:
+            _report = upstream_get("attribute", "startup_report")
+        else:
+            _report = None
+        self.startup_report = _report or StartupReport()
+
+        self.lazy_init = conf.get("lazy_init", False)
+        if self.lazy_init:
+            # Not there until they are used
+            self._pending = set(LAZY_SUBSYSTEMS.keys())
+            self._lazy_lock = threading.RLock()
+            for _attr in LAZY_ATTRIBUTE.keys():
+                del self.__dict__[_attr]
 
         for param in [
             "issuer",
@@ -191,22 +228,12 @@ class EndpointContext(OidcContext):
         self._sub_func = {}
         self.do_sub_func()
 
-        _handler = conf.get("template_handler")
-        if _handler:
-            self.template_handler = _handler
-        else:
-            _loader = conf.get("template_loader")
-
-            if _loader is None:
-                _template_dir = conf.get("template_dir")
-                if _template_dir:
-                    _loader = Environment(loader=FileSystemLoader(_template_dir), autoescape=True)
-
-            if _loader:
-                self.template_handler = Jinja2TemplateHandler(_loader)
+        self._setup("template_handler")
 
         for item in [
+            "instrumentation",
             "cookie_handler",
+            "browser_state",
             "authentication",
             "id_token",
         ]:
@@ -237,37 +264,96 @@ class EndpointContext(OidcContext):
 
         if isinstance(conf, OPConfiguration):
             conf = conf.conf
-        _supports = self.supports()
-        self.keyjar = self.claims.load_conf(conf, supports=_supports, keyjar=keyjar)
-        self.provider_info = self.claims.provider_info(_supports)
-        self.provider_info["issuer"] = self.issuer
-        self.provider_info.update(self._get_endpoint_info())
+        with self.startup_report.measure("keys"):
+            _supports = self.supports()
+            self.keyjar = self.claims.load_conf(conf, supports=_supports, keyjar=keyjar)
+            self.do_client_keys()
+        with self.startup_report.measure("provider_info"):
+            self.provider_info = self.claims.provider_info(_supports)
+            self.provider_info["issuer"] = self.issuer
+            self.provider_info.update(self._get_endpoint_info())
 
         # INTERFACES
 
         self.authz = self.setup_authz()
 
-        self.setup_authentication()
+        self._setup("authentication")
 
-        self.session_manager = create_session_manager(
-            self.unit_get,
-            self.th_args,
-            sub_func=self._sub_func,
-            conf=self.conf,
-        )
+        with self.startup_report.measure("session_manager"):
+            self.session_manager = create_session_manager(
+                self.unit_get,
+                self.th_args,
+                sub_func=self._sub_func,
+                conf=self.conf,
+            )
+        self.instrument_session_manager()
 
-        self.do_userinfo()
+        self._setup("userinfo")
 
         # Must be done after userinfo
-        self.setup_login_hint_lookup()
+        self._setup("login_hint_lookup")
         self.set_remember_token()
 
-        self.setup_client_authn_methods()
+        self._setup("client_authn_methods")
 
         # _id_token_handler = self.session_manager.token_handler.handler.get("id_token")
         # if _id_token_handler:
         #     self.provider_info.update(_id_token_handler.provider_info)
 
+    def _setup(self, name: str):
+        if self.lazy_init:
+            # Done the first time it's used
+            return
+        with self.startup_report.measure(name):
+            getattr(self, LAZY_SUBSYSTEMS[name][0])()
+
+    def __getattr__(self, item):
+        # Only called if there is no such attribute, which with lazy_init is
+        # the case for subsystems that have not been used yet.
+        _pending = self.__dict__.get("_pending")
+        _name = LAZY_ATTRIBUTE.get(item)
+        if not _pending or _name not in _pending:
+            raise AttributeError(item)
+
+        with self._lazy_lock:
+            if _name in self._pending:
+                _method, _attributes = LAZY_SUBSYSTEMS[_name]
+                # Values assigned after startup are kept
+                _given = {_a: self.__dict__[_a] for _a in _attributes if _a in self.__dict__}
+                for _attr in _attributes:
+                    self.__dict__.setdefault(_attr, None)
+                self._pending.discard(_name)
+                with self.startup_report.measure(_name, lazy=True):
+                    getattr(self, _method)()
+                self.__dict__.update(_given)
+        return self.__dict__[item]
+
+    def load(self, item: dict, init_args: Optional[dict] = None, load_args: Optional[dict] = None):
+        # Subsystems not used yet are set up with what was there at startup,
+        # load may replace upstream_get.
+        for _name in list(self.__dict__.get("_pending", [])):
+            getattr(self, LAZY_SUBSYSTEMS[_name][1][0])
+        return OidcContext.load(self, item, init_args=init_args, load_args=load_args)
+
+    def setup_template_handler(self):
+        _handler = self.conf.get("template_handler")
+        if _handler:
+            self.template_handler = _handler
+            return
+
+        _loader = self.conf.get("template_loader")
+        if _loader is None:
+            _template_dir = self.conf.get("template_dir")
+            if _template_dir:
+                # jinja2 takes a while to import and is only needed if there are templates
+                from jinja2 import Environment
+                from jinja2 import FileSystemLoader
+
+                _loader = Environment(loader=FileSystemLoader(_template_dir), autoescape=True)
+
+        if _loader:
+            self.template_handler = Jinja2TemplateHandler(_loader)
+
     def setup_authz(self):
         authz_spec = self.conf.get("authz")
         if authz_spec:
@@ -340,7 +426,9 @@ class EndpointContext(OidcContext):
         _conf = self.conf.get("userinfo")
         if _conf:
             if self.session_manager:
-                self.userinfo = init_user_info(_conf, self.cwd)
+                self.userinfo = self.instrumentation.instrument(
+                    init_user_info(_conf, self.cwd), "userinfo", USERINFO_STAGES
+                )
                 self.session_manager.userinfo = self.userinfo
             else:
                 logger.warning("Cannot init_user_info if no session manager was provided.")
@@ -351,6 +439,37 @@ class EndpointContext(OidcContext):
             if not self.cookie_handler:
                 self.cookie_handler = init_service(_conf)
 
+    def do_client_keys(self):
+        _conf = self.conf.get("client_keys")
+        if _conf and self.keyjar is not None:
+            self.client_keys = init_service(_conf, self.unit_get)
+            self.keyjar = self.client_keys.key_jar(self.keyjar)
+
+    def do_instrumentation(self):
+        _conf = self.conf.get("instrumentation")
+        if _conf:
+            self.instrumentation = init_service(_conf)
+            self.instrumentation.known_client = self._known_client
+
+    def _known_client(self, client_id: str) -> bool:
+        return client_id in self.cdb
+
+    def instrument_session_manager(self):
+        if not self.instrumentation.enabled:
+            return
+        self.instrumentation.instrument(
+            self.session_manager, "session_manager", SESSION_MANAGER_STAGES
+        )
+        for _typ, _handler in self.session_manager.token_handler.handler.items():
+            self.instrumentation.instrument(_handler, f"token_handler.{_typ}", TOKEN_HANDLER_STAGES)
+
+    def do_browser_state(self):
+        _conf = self.conf.get("browser_state")
+        if _conf:
+            self.browser_state = init_service(_conf)
+        else:
+            self.browser_state = BrowserState()
+
     def do_sub_func(self) -> None:
         """
         Loads functions that creates subject "sub" values
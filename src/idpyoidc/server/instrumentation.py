@@ -0,0 +1,329 @@
+"""
+Timing of the stages a request goes through.
+
+An Instrumentation instance is told when a stage starts and when it stops. Stages are
+the steps of the endpoint pipeline (parse_request, client_authentication,
+verify_request, do_post_parse_request, process_request and do_response) and what's done
+by the session manager, the token handlers and the user info store.
+
+The default instrumentation does nothing and nothing is instrumented. With
+HistogramCollector the times are collected in histograms that can be exported in the
+Prometheus text format.
+"""
+import bisect
+import functools
+import threading
+import time
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Union
+
+from idpyoidc.message import Message
+
+# The endpoint methods that are timed
+ENDPOINT_STAGES = [
+    "parse_request",
+    "client_authentication",
+    "verify_request",
+    "do_post_parse_request",
+    "process_request",
+    "do_response",
+]
+SESSION_MANAGER_STAGES = [
+    "create_session",
+    "get_session_info",
+    "get_session_info_by_token",
+    "decrypt_branch_id",
+]
+TOKEN_HANDLER_STAGES = ["__call__", "info"]
+USERINFO_STAGES = ["__call__"]
+
+# What a method is called as a stage
+STAGE_NAME = {"__call__": "call"}
+
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Span(object):
+    __slots__ = ("endpoint", "stage", "client_id", "start")
+
+    def __init__(self, endpoint: str, stage: str, client_id: Optional[str] = ""):
+        self.endpoint = endpoint
+        self.stage = stage
+        self.client_id = client_id
+        self.start = time.perf_counter()
+
+
+def _client_id(item) -> str:
+    if isinstance(item, (Message, dict)):
+        _val = item.get("client_id", "")
+        if isinstance(_val, str):
+            return _val
+    return ""
+
+
+# (class, methods) -> instrumented subclass
+_INSTRUMENTED = {}
+
+
+class Instrumentation(object):
+    """
+    Does nothing. Subclasses that want to know about stages set enabled and
+    override start and stop.
+    """
+
+    enabled = False
+
+    def known_client(self, client_id: str) -> bool:
+        """
+        Whether a client ID belongs to a registered client. A client ID taken from a
+        request can be anything. The endpoint context replaces this with a lookup in
+        its client database.
+
+        :param client_id: The client ID
+        :return: True or False
+        """
+        return True
+
+    def start(self, endpoint: str, stage: str, client_id: Optional[str] = "") -> Span:
+        """
+        Called when a stage starts.
+
+        :param endpoint: The name of the endpoint or component
+        :param stage: The name of the stage
+        :param client_id: The client the request is from, if known
+        :return: A span that is given to stop
+        """
+        return Span(endpoint, stage, client_id)
+
+    def stop(self, span: Span, error: Optional[Union[Exception, Message]] = None):
+        """
+        Called when a stage stops.
+
+        :param span: What start returned
+        :param error: The exception raised or the error response returned, if any
+        """
+        pass
+
+    def _wrap(self, name: str, method: str, func: Callable) -> Callable:
+        _stage = STAGE_NAME.get(method, method)
+
+        @functools.wraps(func)
+        def wrapper(obj, *args, **kwargs):
+            _inst = obj._instrumentation
+            _request = kwargs.get("request", args[0] if args else None)
+            _span = _inst.start(name, _stage, kwargs.get("client_id") or _client_id(_request))
+            try:
+                res = func(obj, *args, **kwargs)
+            except Exception as err:
+                _inst.stop(_span, err)
+                raise
+            if not _span.client_id:
+                _span.client_id = _client_id(res)
+            # Endpoints return errors rather than raise them
+            if isinstance(res, Message) and "error" in res:
+                _inst.stop(_span, res)
+            else:
+                _inst.stop(_span)
+            return res
+
+        return wrapper
+
+    def instrument(self, obj, name: str, methods: List[str]):
+        """
+        Times the given methods of an instance. The class of the instance is replaced
+        by a subclass where the methods are wrapped.
+
+        :param obj: The instance
+        :param name: What the instance is called in the spans
+        :param methods: The names of the methods
+        :return: The instance
+        """
+        if not self.enabled or obj is None:
+            return obj
+
+        _cls = obj.__class__
+        _key = (_cls, name, tuple(methods))
+        _sub = _INSTRUMENTED.get(_key)
+        if _sub is None:
+            _attrs = {
+                m: self._wrap(name, m, getattr(_cls, m)) for m in methods if hasattr(_cls, m)
+            }
+            # Looks like the original when dumped
+            _attrs["__module__"] = _cls.__module__
+            _attrs["__qualname__"] = _cls.__qualname__
+            _sub = _INSTRUMENTED.setdefault(_key, type(_cls.__name__, (_cls,), _attrs))
+
+        obj._instrumentation = self
+        obj.__class__ = _sub
+        return obj
+
+
+class _Histogram(object):
+    __slots__ = ("buckets", "count", "sum", "errors")
+
+    def __init__(self, size: int):
+        self.buckets = [0] * size
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+
+
+class HistogramCollector(Instrumentation):
+    """
+    Collects the time spent in each stage in histograms kept in memory.
+    """
+
+    enabled = True
+
+    def __init__(self, buckets: Optional[List[float]] = None, per_client: Optional[bool] = False):
+        """
+        :param buckets: Upper bounds, in seconds, of the histogram buckets
+        :param per_client: Whether there should be a histogram per client. That's one
+            per client, endpoint and stage, which can be a lot. Requests from client IDs
+            that aren't known are counted without a client.
+        """
+        self.bounds = sorted(buckets or DEFAULT_BUCKETS)
+        self.per_client = per_client
+        # (endpoint, stage, client_id) -> _Histogram
+        self.histogram = {}
+        self._lock = threading.Lock()
+
+    def __deepcopy__(self, memo):
+        # Everything instrumented reports to the same collector
+        return self
+
+    def stop(self, span: Span, error: Optional[Union[Exception, Message]] = None):
+        _duration = time.perf_counter() - span.start
+        # Anyone can send a request with a new client_id, only known ones get a histogram
+        _client_id = ""
+        if self.per_client and span.client_id and self.known_client(span.client_id):
+            _client_id = span.client_id
+        _key = (span.endpoint, span.stage, _client_id)
+        with self._lock:
+            _hist = self.histogram.get(_key)
+            if _hist is None:
+                _hist = self.histogram[_key] = _Histogram(len(self.bounds))
+            i = bisect.bisect_left(self.bounds, _duration)
+            if i < len(self.bounds):
+                _hist.buckets[i] += 1
+            _hist.count += 1
+            _hist.sum += _duration
+            if error is not None:
+                _hist.errors += 1
+
+    def _items(self) -> list:
+        # Histograms are added by the request threads while this is read
+        with self._lock:
+            return list(self.histogram.items())
+
+    def _merged(self, endpoint: str, stage: str) -> Optional[_Histogram]:
+        _res = None
+        for (_endpoint, _stage, _client_id), _hist in self._items():
+            if _endpoint == endpoint and _stage == stage:
+                if _res is None:
+                    _res = _Histogram(len(self.bounds))
+                _res.buckets = [a + b for a, b in zip(_res.buckets, _hist.buckets)]
+                _res.count += _hist.count
+                _res.sum += _hist.sum
+                _res.errors += _hist.errors
+        return _res
+
+    def percentile(self, endpoint: str, stage: str, q: float) -> Optional[float]:
+        """
+        Estimates a percentile of the time spent in a stage. Interpolates within the
+        bucket the percentile falls in.
+
+        :param endpoint: The name of the endpoint or component
+        :param stage: The name of the stage
+        :param q: The percentile, 0-100
+        :return: Seconds or None if the stage hasn't been seen
+        """
+        _hist = self._merged(endpoint, stage)
+        if _hist is None or _hist.count == 0:
+            return None
+
+        _rank = _hist.count * q / 100.0
+        _seen = 0
+        _lower = 0.0
+        for _bound, _count in zip(self.bounds, _hist.buckets):
+            if _count and _seen + _count >= _rank:
+                return _lower + (_bound - _lower) * (_rank - _seen) / _count
+            _seen += _count
+            _lower = _bound
+        # Above the largest bucket
+        return self.bounds[-1]
+
+    def summary(self) -> Dict[tuple, dict]:
+        """
+        :return: Count, total and mean time and number of errors per endpoint and stage
+        """
+        res = {}
+        for (_endpoint, _stage, _client_id), _hist in self._items():
+            _info = res.get((_endpoint, _stage))
+            if _info is None:
+                _info = res[(_endpoint, _stage)] = {"count": 0, "sum": 0.0, "errors": 0}
+            _info["count"] += _hist.count
+            _info["sum"] += _hist.sum
+            _info["errors"] += _hist.errors
+        for _info in res.values():
+            _info["mean"] = _info["sum"] / _info["count"]
+        return res
+
+    def reset(self):
+        with self._lock:
+            self.histogram = {}
+
+    def prometheus(self, prefix: Optional[str] = "idpyoidc") -> str:
+        """
+        The histograms in the Prometheus text exposition format.
+
+        :param prefix: Prefix of the metric names
+        :return: Text
+        """
+        _name = f"{prefix}_stage_duration_seconds"
+        _errors = f"{prefix}_stage_errors_total"
+        lines = [
+            f"# HELP {_name} Time spent in a stage of handling a request.",
+            f"# TYPE {_name} histogram",
+        ]
+        _error_lines = [
+            f"# HELP {_errors} Stages that ended with an exception or an error response.",
+            f"# TYPE {_errors} counter",
+        ]
+        with self._lock:
+            _items = sorted(self.histogram.items())
+            for (_endpoint, _stage, _client_id), _hist in _items:
+                _labels = f'endpoint="{_escape(_endpoint)}",stage="{_escape(_stage)}"'
+                if self.per_client:
+                    _labels += f',client_id="{_escape(_client_id)}"'
+                _cumulative = 0
+                for _bound, _count in zip(self.bounds, _hist.buckets):
+                    _cumulative += _count
+                    lines.append(f'{_name}_bucket{{{_labels},le="{_bound}"}} {_cumulative}')
+                lines.append(f'{_name}_bucket{{{_labels},le="+Inf"}} {_hist.count}')
+                lines.append(f"{_name}_sum{{{_labels}}} {_hist.sum}")
+                lines.append(f"{_name}_count{{{_labels}}} {_hist.count}")
+                _error_lines.append(f"{_errors}{{{_labels}}} {_hist.errors}")
+        return "\n".join(lines + _error_lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,235 @@
+"""
+Many OPs, one per tenant, in one process.
+
+The configuration is parsed once and the template handler is built once. The
+tenants get a shallow copy of the configuration where the issuer and whatever
+else is tenant specific (keys, client database, userinfo, ...) is replaced.
+Everything else is shared, it must therefore not be modified.
+"""
+import copy
+import gc
+import logging
+import sys
+import threading
+from types import BuiltinFunctionType
+from types import FunctionType
+from types import ModuleType
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Union
+from urllib.parse import urlparse
+
+from cryptojwt import KeyJar
+
+from idpyoidc.server import Server
+from idpyoidc.server.configure import OPConfiguration
+from idpyoidc.server.template_handler import Jinja2TemplateHandler
+
+logger = logging.getLogger(__name__)
+
+# Not counted as belonging to a tenant
+SKIP_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType)
+
+# Parts of the configuration that are modified when used, each tenant gets its own copy
+COPIED = ["token_handler_args"]
+
+
+def reachable(roots: List[Any], exclude: Optional[set] = None) -> Dict[int, Any]:
+    """
+    Find all the objects that can be reached from the roots.
+
+    :param roots: Where to start
+    :param exclude: ids of objects that should not be followed
+    :return: A dictionary with object id as key and the object as value
+    """
+    if exclude is None:
+        exclude = set()
+    _seen = {}
+    _todo = list(roots)
+    while _todo:
+        _obj = _todo.pop()
+        _id = id(_obj)
+        if _id in _seen or _id in exclude or isinstance(_obj, SKIP_TYPES):
+            continue
+        _seen[_id] = _obj
+        _todo.extend(gc.get_referents(_obj))
+    return _seen
+
+
+class MultiTenantServer(object):
+    def __init__(
+        self,
+        conf: Union[dict, OPConfiguration],
+        tenants: Optional[Dict[str, dict]] = None,
+        cwd: Optional[str] = "",
+        base_path: Optional[str] = "",
+    ):
+        """
+        :param conf: The configuration common to all tenants
+        :param tenants: issuer ID -> the configuration parameters specific to that tenant
+        :param cwd: Working directory
+        :param base_path: Base path used when parsing the configuration
+        """
+        if isinstance(conf, OPConfiguration):
+            self.conf = conf
+        else:
+            self.conf = OPConfiguration(conf, base_path=base_path)
+        self.cwd = cwd
+
+        self.template_handler = self._template_handler()
+        # issuer ID -> tenant specific configuration and instances
+        self.tenant = {}
+        # issuer ID -> Server, constructed the first time it is used
+        self.server = {}
+        # host -> list of (path, issuer ID), longest path first
+        self.host = {}
+        self._lock = threading.Lock()
+        self._shared = None
+
+        for _issuer, _conf in (tenants or {}).items():
+            self.add_tenant(_issuer, **_conf)
+
+    def _template_handler(self):
+        _handler = self.conf.get("template_handler")
+        if _handler:
+            return _handler
+
+        _template_dir = self.conf.get("template_dir")
+        if _template_dir:
+            from jinja2 import Environment
+            from jinja2 import FileSystemLoader
+
+            return Jinja2TemplateHandler(
+                Environment(loader=FileSystemLoader(_template_dir), autoescape=True)
+            )
+        return None
+
+    def add_tenant(
+        self,
+        issuer: str,
+        keyjar: Optional[KeyJar] = None,
+        cdb: Optional[dict] = None,
+        **kwargs,
+    ):
+        """
+        Add a tenant. The server is constructed the first time it is used.
+
+        :param issuer: The issuer ID of the tenant
+        :param keyjar: The tenant's keys, if not given they are created according to
+            the key configuration
+        :param cdb: The tenant's client database
+        :param kwargs: Configuration parameters that replaces the common ones
+        """
+        with self._lock:
+            if issuer in self.tenant:
+                raise ValueError(f"Tenant {issuer} already added")
+            self.tenant[issuer] = {"conf": kwargs, "keyjar": keyjar, "cdb": cdb}
+
+            _url = urlparse(issuer)
+            _routes = self.host.setdefault(_url.netloc, [])
+            _routes.append((_url.path.rstrip("/"), issuer))
+            _routes.sort(key=lambda x: len(x[0]), reverse=True)
+
+    def remove_tenant(self, issuer: str):
+        with self._lock:
+            del self.tenant[issuer]
+            self.server.pop(issuer, None)
+            _netloc = urlparse(issuer).netloc
+            self.host[_netloc] = [r for r in self.host[_netloc] if r[1] != issuer]
+            if not self.host[_netloc]:
+                del self.host[_netloc]
+
+    def tenant_conf(self, issuer: str) -> OPConfiguration:
+        """
+        :param issuer: The issuer ID of the tenant
+        :return: The common configuration with the tenant specific parameters in place
+        """
+        _conf = copy.copy(self.conf)
+        _conf["issuer"] = issuer
+        # The raw configuration is read too when the server is set up, jwks_uri and
+        # the other values derived from the issuer come from there.
+        _raw = _conf["conf"] = copy.copy(self.conf.conf)
+        _raw["issuer"] = issuer
+        if "base_url" in _raw:
+            _raw["base_url"] = issuer
+        for _key in COPIED:
+            if _key in _conf:
+                _conf[_key] = copy.deepcopy(_conf[_key])
+        if self.template_handler:
+            _conf["template_handler"] = self.template_handler
+        for _key, _val in self.tenant[issuer]["conf"].items():
+            if _key == "keys":
+                _conf["key_conf"] = _val
+                _raw.pop("key_conf", None)
+            else:
+                _conf[_key] = _val
+            _raw[_key] = _val
+        return _conf
+
+    def _create_server(self, issuer: str) -> Server:
+        _tenant = self.tenant[issuer]
+        _server = Server(self.tenant_conf(issuer), keyjar=_tenant["keyjar"], cwd=self.cwd)
+        if _tenant["cdb"] is not None:
+            _server.context.cdb = _tenant["cdb"]
+        logger.debug(f"Tenant {issuer} started in {_server.startup_report.total:.3f} s")
+        return _server
+
+    def get_server(self, issuer: str) -> Optional[Server]:
+        """
+        :param issuer: The issuer ID of the tenant
+        :return: The tenant's server or None if there is no such tenant
+        """
+        _server = self.server.get(issuer)
+        if _server:
+            return _server
+
+        with self._lock:
+            if issuer not in self.tenant:
+                return None
+            _server = self.server.get(issuer)
+            if _server is None:
+                _server = self._create_server(issuer)
+                self.server[issuer] = _server
+        return _server
+
+    def route(self, url: str) -> Optional[Server]:
+        """
+        Find the tenant a request is for.
+
+        :param url: The URL the request was sent to. Host and path are used.
+        :return: The tenant's server or None if no tenant matches
+        """
+        _url = urlparse(url)
+        _path = _url.path.rstrip("/")
+        for _prefix, _issuer in self.host.get(_url.netloc, []):
+            if not _prefix or _path == _prefix or _path.startswith(_prefix + "/"):
+                return self.get_server(_issuer)
+        return None
+
+    def shared(self) -> set:
+        """
+        :return: The ids of the objects that are shared by all tenants
+        """
+        if self._shared is None:
+            self._shared = set(reachable([self.conf, self.template_handler]).keys())
+        return self._shared
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        The approximate amount of memory used by each tenant that has been
+        started, not counting what is shared between tenants.
+
+        :return: issuer ID -> bytes
+        """
+        _exclude = self.shared().copy()
+        _exclude.add(id(self))
+        _exclude.update(id(s) for s in self.server.values())
+        _res = {}
+        for _issuer, _server in list(self.server.items()):
+            _exclude.discard(id(_server))
+            _objects = reachable([_server], _exclude)
+            _res[_issuer] = sum(sys.getsizeof(o) for o in _objects.values())
+            _exclude.add(id(_server))
+        return _res
@@ -15,6 +15,7 @@ from idpyoidc.message import SINGLE_OPTIONAL_STRING
 from idpyoidc.message import SINGLE_REQUIRED_INT
 from idpyoidc.message import SINGLE_REQUIRED_JSON
 from idpyoidc.message import SINGLE_REQUIRED_STRING
+from idpyoidc.message.oauth2 import ResponseMessage
 from idpyoidc.server.client_authn import BearerHeader
 
 logger = logging.getLogger(__name__)
@@ -107,7 +108,12 @@ def token_post_parse_request(request, client_id, context, **kwargs):
     if not _http_info:
         return request
 
-    _dpop = DPoPProof().verify_header(_http_info["headers"]["dpop"])
+    # Without a DPoP proof it's an ordinary bearer token request
+    _header = _http_info.get("headers", {}).get("dpop")
+    if not _header:
+        return request
+
+    _dpop = DPoPProof().verify_header(_header)
 
     # The signature of the JWS is verified, now for checking the
     # content
@@ -126,6 +132,20 @@ def token_post_parse_request(request, client_id, context, **kwargs):
     return request
 
 
+def _dpop_bound(context, token: str) -> bool:
+    """
+    :return: True if the access token was bound to a DPoP key when it was issued
+    """
+    try:
+        _info = context.session_manager.get_session_info_by_token(
+            token, grant=True, handler_key="access_token"
+        )
+    except (KeyError, ValueError):
+        # An unknown token is dealt with by the endpoint
+        return False
+    return bool(_info["grant"].extra.get("dpop_jkt"))
+
+
 def userinfo_post_parse_request(request, client_id, context, auth_info, **kwargs):
     """
     Expect http_info attribute in kwargs. http_info should be a dictionary
@@ -142,7 +162,15 @@ def userinfo_post_parse_request(request, client_id, context, auth_info, **kwargs
     if not _http_info:
         return request
 
-    _dpop = DPoPProof().verify_header(_http_info["headers"]["dpop"])
+    # Without a DPoP proof it's an ordinary bearer token request, unless
+    # the access token is bound to a DPoP key
+    _header = _http_info.get("headers", {}).get("dpop")
+    if not _header:
+        if _dpop_bound(context, auth_info["token"]):
+            return ResponseMessage(error="invalid_token", error_description="DPoP proof missing")
+        return request
+
+    _dpop = DPoPProof().verify_header(_header)
 
     # The signature of the JWS is verified, now for checking the
     # content
@@ -1,3 +1,4 @@
+import functools
 import json
 import logging
 from typing import List
@@ -24,7 +25,6 @@ from idpyoidc.message.oauth2 import AuthorizationRequest
 from idpyoidc.message.oidc import AuthorizationResponse
 from idpyoidc.message.oidc import verified_claim_name
 from idpyoidc.server.authn_event import create_authn_event
-from idpyoidc.server.cookie_handler import compute_session_state
 from idpyoidc.server.endpoint import Endpoint
 from idpyoidc.server.endpoint_context import EndpointContext
 from idpyoidc.server.exception import InvalidRequest
@@ -39,7 +39,6 @@ from idpyoidc.server.session import Revoked
 from idpyoidc.server.token.exception import UnknownToken
 from idpyoidc.server.user_authn.authn_context import pick_auth
 from idpyoidc.time_util import utc_time_sans_frac
-from idpyoidc.util import rndstr
 from idpyoidc.util import split_uri
 from idpyoidc.util import importer
 
@@ -391,7 +390,7 @@ class Authorization(Endpoint):
         return set(request["response_type"]) in _registered
 
     def mint_token(self, token_class, grant, session_id, based_on=None, **kwargs):
-        usage_rules = grant.usage_rules.get(token_class, {})
+        usage_rules = grant.shared_usage_rules().get(token_class, {})
         token = grant.mint_token(
             session_id=session_id,
             context=self.upstream_get("context"),
@@ -408,7 +407,7 @@ class Authorization(Endpoint):
             token.expires_at = utc_time_sans_frac() + _exp_in
 
         _mngr = self.upstream_get("context").session_manager
-        _mngr.set(_mngr.unpack_session_key(session_id), grant)
+        _mngr[session_id] = grant
 
         return token
 
@@ -1027,7 +1026,6 @@ class Authorization(Endpoint):
         logger.debug(f"resp_info: {resp_info}")
 
         if "check_session_iframe" in _context.provider_info:
-            salt = rndstr()
             try:
                 authn_event = _context.session_manager.get_authentication_event(session_id)
             except KeyError:
@@ -1040,9 +1038,15 @@ class Authorization(Endpoint):
 
             _state = b64e(as_bytes(json.dumps({"authn_time": authn_event["authn_time"]})))
 
-            _session_cookie_content = _context.new_cookie(
-                name=_context.cookie_handler.name["session_management"],
-                state=as_unicode(_state),
+            # The browser state stays the same until the user logs in again or logs out
+            _session_cookie_content = _context.browser_state.get_cookie(
+                authn_event["uid"],
+                authn_event["authn_time"],
+                functools.partial(
+                    _context.new_cookie,
+                    name=_context.cookie_handler.name["session_management"],
+                    state=as_unicode(_state),
+                ),
             )
 
             opbs_value = _session_cookie_content["value"]
@@ -1052,16 +1056,17 @@ class Authorization(Endpoint):
             else:
                 re_uri = request["redirect_uri"]
 
+            _session_state = _context.browser_state.session_state(
+                opbs_value, request["client_id"], re_uri
+            )
             logger.debug(
-                "compute_session_state: client_id=%s, origin=%s, opbs=%s, salt=%s",
+                "session_state: client_id=%s, origin=%s, opbs=%s, session_state=%s",
                 request["client_id"],
                 re_uri,
                 opbs_value,
-                salt,
+                _session_state,
             )
 
-            _session_state = compute_session_state(opbs_value, salt, request["client_id"], re_uri)
-
             if _session_cookie_content:
                 if "cookie" in resp_info:
                     resp_info["cookie"].append(_session_cookie_content)
@@ -1,8 +1,13 @@
 """Implements RFC7662"""
 import logging
+import threading
+import time
+from collections import OrderedDict
 from typing import Optional
 
+from idpyoidc.item import VersionedDLDict
 from idpyoidc.message import oauth2
+from idpyoidc.server.constant import DIVIDER
 from idpyoidc.server.endpoint import Endpoint
 from idpyoidc.server.token.exception import UnknownToken
 from idpyoidc.server.token.exception import WrongTokenClass
@@ -16,6 +21,7 @@ class Introspection(Endpoint):
 
     request_cls = oauth2.TokenIntrospectionRequest
     response_cls = oauth2.TokenIntrospectionResponse
+    token_response_cls = oauth2.TokenIntrospectionResponse
     request_format = "urlencoded"
     response_format = "json"
     endpoint_name = "introspection_endpoint"
@@ -33,6 +39,90 @@ class Introspection(Endpoint):
         Endpoint.__init__(self, upstream_get, **kwargs)
         self.offset = kwargs.get("offset", 0)
         self.enforce_aud_restriction = kwargs.get("enforce_audience_restriction", True)
+        # Caching of introspection responses, lifetime in seconds. 0 means no caching.
+        self.cache_lifetime = kwargs.get("cache_lifetime", 0)
+        self.cache_size = kwargs.get("cache_size", 10000)
+        # (token, client_id, release) ->
+        #   (expires, branch key, branch key prefixes, SessionToken, Grant, response)
+        self._cache = OrderedDict()
+        # branch key of a grant, or of a node above it -> cache keys
+        self._cache_index = {}
+        self._cache_lock = threading.Lock()
+        self._listening = None
+
+    def _cache_get(self, key, session_manager):
+        try:
+            _expires, _branch_key, _, _token, _grant, _info = self._cache[key]
+        except KeyError:
+            return None
+
+        # The token or grant may have been revoked without anyone telling us
+        if _expires < time.time() or _token.revoked or _grant.revoked:
+            self._cache_evict(key)
+            return None
+
+        # In a shared store the grant may have been changed, and the token revoked, by
+        # another process. Then the grant is reloaded and is no longer the cached one.
+        if isinstance(session_manager.db, VersionedDLDict):
+            try:
+                _current = session_manager.db[_branch_key]
+            except KeyError:
+                _current = None
+            if _current is not _grant:
+                self._cache_evict(key)
+                return None
+        return _info
+
+    def _cache_set(self, key, branch_key, token, grant, info):
+        _expires = time.time() + self.cache_lifetime
+        if token.expires_at:
+            _expires = min(_expires, token.expires_at)
+
+        # Indexed on the grant and the nodes above it, whichever is revoked
+        _parts = branch_key.split(DIVIDER)
+        _prefixes = [DIVIDER.join(_parts[: i + 1]) for i in range(len(_parts))]
+        with self._cache_lock:
+            _old = self._cache.pop(key, None)
+            if _old:
+                self._unindex(key, _old[2])
+            self._cache[key] = (_expires, branch_key, _prefixes, token, grant, info)
+            for _prefix in _prefixes:
+                self._cache_index.setdefault(_prefix, set()).add(key)
+            while len(self._cache) > self.cache_size:
+                _key, _item = self._cache.popitem(last=False)
+                self._unindex(_key, _item[2])
+
+    def _unindex(self, key, prefixes):
+        for _prefix in prefixes:
+            _keys = self._cache_index.get(_prefix)
+            if _keys:
+                _keys.discard(key)
+                if not _keys:
+                    del self._cache_index[_prefix]
+
+    def _cache_evict(self, key):
+        with self._cache_lock:
+            _item = self._cache.pop(key, None)
+            if _item:
+                self._unindex(key, _item[2])
+
+    def revoked(self, branch_key: str):
+        """
+        Removes all cached responses for tokens that belongs to a branch.
+        Registered as a revocation listener with the session manager.
+
+        :param branch_key: The key of the branch, or part of a branch, that was revoked
+        """
+        with self._cache_lock:
+            for _key in self._cache_index.get(branch_key, set()).copy():
+                _item = self._cache.pop(_key, None)
+                if _item:
+                    self._unindex(_key, _item[2])
+
+    def _listen(self, session_manager):
+        if self._listening is not session_manager:
+            session_manager.add_revocation_listener(self.revoked)
+            self._listening = session_manager
 
     def _introspect(self, token, client_id, grant):
         # Make sure that the token is an access_token or a refresh_token
@@ -97,16 +187,36 @@ class Introspection(Endpoint):
         if "error" in _introspect_request:
             return _introspect_request
 
-        request_token = _introspect_request["token"]
-        _resp = self.response_cls(active=False)
+        _resp = self._introspect_token(_introspect_request["token"], request["client_id"], release)
+        return {"response_args": _resp}
+
+    def _introspect_token(self, request_token: str, client_id: str, release: Optional[list] = None):
+        """
+        Constructs the introspection response for one token.
+
+        :param request_token: The token
+        :param client_id: The client asking
+        :param release: Information about what should be released
+        :return: A TokenIntrospectionResponse instance
+        """
         _context = self.upstream_get("context")
+        if self.cache_lifetime:
+            self._listen(_context.session_manager)
+            _cache_key = (request_token, client_id, tuple(release or []))
+            _info = self._cache_get(_cache_key, _context.session_manager)
+            if _info is not None:
+                _resp = self.token_response_cls()
+                _resp.update(_info)
+                return _resp
+
+        _resp = self.token_response_cls(active=False)
 
         try:
             _session_info = _context.session_manager.get_session_info_by_token(
                 request_token, grant=True
             )
         except (UnknownToken, WrongTokenClass, ToOld):
-            return {"response_args": _resp}
+            return _resp
 
         grant = _session_info["grant"]
         _token = grant.get_token(request_token)
@@ -115,7 +225,6 @@ class Introspection(Endpoint):
         if not aud:
             aud = grant.resources
 
-        client_id = request["client_id"]
         try:
             _cinfo = _context.cdb[client_id]
             enforce_aud_restriction = _cinfo.get(
@@ -124,12 +233,12 @@ class Introspection(Endpoint):
         except:
             enforce_aud_restriction = self.enforce_aud_restriction
         if enforce_aud_restriction:
-            if request["client_id"] not in aud:
-                return {"response_args": _resp}
+            if client_id not in aud:
+                return _resp
 
         _info = self._introspect(_token, _session_info["client_id"], _session_info["grant"])
         if _info is None:
-            return {"response_args": _resp}
+            return _resp
 
         if release:
             if "username" in release:
@@ -153,4 +262,41 @@ class Introspection(Endpoint):
 
         _resp["active"] = True
 
-        return {"response_args": _resp}
+        if self.cache_lifetime:
+            _mngr = _context.session_manager
+            _branch_key = _mngr.branch_key(*_mngr.decrypt_branch_id(_session_info["branch_id"]))
+            self._cache_set(_cache_key, _branch_key, _token, grant, dict(_resp.items()))
+
+        return _resp
+
+
+class BatchIntrospection(Introspection):
+    """
+    Introspection of a number of tokens in one request. Not standardized.
+    The tokens are given as a space separated list in the 'tokens' parameter. The
+    response contains one introspection response per token in the same order.
+    """
+
+    request_cls = oauth2.TokenBatchIntrospectionRequest
+    response_cls = oauth2.TokenBatchIntrospectionResponse
+    endpoint_name = "batch_introspection_endpoint"
+    name = "batch_introspection"
+
+    def __init__(self, upstream_get, **kwargs):
+        Introspection.__init__(self, upstream_get, **kwargs)
+        self.max_tokens = kwargs.get("max_tokens", 100)
+
+    def process_request(self, request=None, release: Optional[list] = None, **kwargs):
+        _introspect_request = self.request_cls(**request)
+        if "error" in _introspect_request:
+            return _introspect_request
+
+        _tokens = _introspect_request["tokens"]
+        if len(_tokens) > self.max_tokens:
+            return self.error_cls(
+                error="invalid_request", error_description=f"More than {self.max_tokens} tokens"
+            )
+
+        _client_id = request["client_id"]
+        _responses = [self._introspect_token(_token, _client_id, release) for _token in _tokens]
+        return {"response_args": self.response_cls(responses=_responses)}
@@ -0,0 +1,84 @@
+"""
+Publishes the public part of the server's keys.
+"""
+import json
+import logging
+from typing import Optional
+from typing import Union
+
+from cryptojwt.exception import IssuerNotFound
+
+from idpyoidc.message import Message
+from idpyoidc.message import oauth2
+from idpyoidc.server.endpoint import Endpoint
+from idpyoidc.server.response_cache import ResponseCache
+from idpyoidc.server.response_cache import etag_matches
+from idpyoidc.server.response_cache import if_none_match
+
+logger = logging.getLogger(__name__)
+
+
+class JWKS(Endpoint):
+    """
+    Serves the JWKS. The response is serialised once per set of keys and supports
+    conditional GET using ETag/If-None-Match.
+    """
+
+    request_cls = oauth2.Message
+    response_cls = oauth2.Message
+    request_format = ""
+    response_format = "json"
+    endpoint_name = "jwks_uri"
+    name = "jwks"
+    response_content_type = "application/jwk-set+json"
+
+    def __init__(self, upstream_get, **kwargs):
+        Endpoint.__init__(self, upstream_get, **kwargs)
+        # Whose keys, by default the server's own
+        self.issuer_id = kwargs.get("issuer_id", "")
+        self.response_cache = ResponseCache(
+            max_age=kwargs.get("max_age", 3600), content_type=self.response_content_type
+        )
+
+    def key_state(self) -> tuple:
+        """
+        Something that changes when the keys do, without having to serialise them.
+
+        :return: A tuple with the identity and state of every key
+        """
+        _keyjar = self.upstream_get("attribute", "keyjar")
+        try:
+            _keys = _keyjar.get_issuer_keys(self.issuer_id)
+        except IssuerNotFound:
+            return ()
+        return tuple((id(k), k.kid, k.inactive_since) for k in _keys)
+
+    def cached_response(self) -> dict:
+        _keyjar = self.upstream_get("attribute", "keyjar")
+        return self.response_cache.get(
+            self.key_state(), lambda: json.dumps(_keyjar.export_jwks(issuer_id=self.issuer_id))
+        )
+
+    def process_request(
+        self,
+        request: Optional[Union[Message, dict]] = None,
+        http_info: Optional[dict] = None,
+        **kwargs
+    ) -> dict:
+        _response = self.cached_response()
+        if etag_matches(if_none_match(http_info), _response["etag"]):
+            return {"response_code": 304, "etag": _response["etag"]}
+        return {"response": _response["response"], "etag": _response["etag"]}
+
+    def do_response(
+        self,
+        response_args: Optional[dict] = None,
+        request: Optional[Union[Message, dict]] = None,
+        error: Optional[str] = "",
+        **kwargs
+    ) -> dict:
+        if error:
+            return Endpoint.do_response(self, response_args, request, error, **kwargs)
+        if kwargs.get("response_code") == 304:
+            return self.response_cache.not_modified(kwargs["etag"])
+        return self.cached_response()
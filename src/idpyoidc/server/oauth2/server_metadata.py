@@ -1,7 +1,13 @@
 import logging
+from typing import Optional
+from typing import Union
 
+from idpyoidc.message import Message
 from idpyoidc.message import oauth2
 from idpyoidc.server.endpoint import Endpoint
+from idpyoidc.server.response_cache import ResponseCache
+from idpyoidc.server.response_cache import etag_matches
+from idpyoidc.server.response_cache import if_none_match
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +22,10 @@ class ServerMetadata(Endpoint):
     def __init__(self, upstream_get, **kwargs):
         Endpoint.__init__(self, upstream_get=upstream_get, **kwargs)
         self.pre_construct.append(self.add_endpoints)
+        # The serialised response, rebuilt when the provider info changes
+        self.response_cache = ResponseCache(
+            max_age=kwargs.get("max_age", 3600), content_type="application/json; charset=utf-8"
+        )
 
     def add_endpoints(self, request, client_id, context, **kwargs):
         for endpoint in [
@@ -31,5 +41,29 @@ class ServerMetadata(Endpoint):
 
         return request
 
-    def process_request(self, request=None, **kwargs):
-        return {"response_args": self.upstream_get("context").provider_info}
+    def cached_response(self, response_args: dict) -> dict:
+        return self.response_cache.get(
+            response_args, lambda: Endpoint.do_response(self, response_args)["response"]
+        )
+
+    def process_request(self, request=None, http_info: Optional[dict] = None, **kwargs):
+        _provider_info = self.upstream_get("context").provider_info
+        _match = if_none_match(http_info)
+        if _match:
+            _etag = self.cached_response(_provider_info)["etag"]
+            if etag_matches(_match, _etag):
+                return {"response_code": 304, "etag": _etag}
+        return {"response_args": _provider_info}
+
+    def do_response(
+        self,
+        response_args: Optional[dict] = None,
+        request: Optional[Union[Message, dict]] = None,
+        error: Optional[str] = "",
+        **kwargs
+    ) -> dict:
+        if kwargs.get("response_code") == 304:
+            return self.response_cache.not_modified(kwargs["etag"])
+        if error or kwargs or not response_args:
+            return Endpoint.do_response(self, response_args, request, error, **kwargs)
+        return self.cached_response(response_args)
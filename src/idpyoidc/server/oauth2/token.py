@@ -12,6 +12,7 @@ from idpyoidc.server.endpoint import Endpoint
 from idpyoidc.server.exception import ProcessError
 from idpyoidc.server.oauth2.token_helper import TokenEndpointHelper
 from idpyoidc.server.session import MintingNotAllowed
+from idpyoidc.storage import ConcurrentUpdate
 from idpyoidc.util import importer
 from .token_helper.access_token import AccessTokenHelper
 from .token_helper.client_credentials import ClientCredentials
@@ -57,6 +58,8 @@ class Token(Endpoint):
         #                                         list(self.grant_type_helper.keys()))
         self.revoke_refresh_on_issue = kwargs.get("revoke_refresh_on_issue", False)
         self.resource_indicators_config = kwargs.get("resource_indicators", None)
+        # How many times to redo the work if the session store reports a concurrent update
+        self.concurrent_update_retries = kwargs.get("concurrent_update_retries", 3)
 
     def configure_types(self, helpers, default_helpers):
         if helpers is None:
@@ -130,6 +133,25 @@ class Token(Endpoint):
                 error_description=f"Do not know how to handle this type of request",
             )
 
+    def _process_with_retry(self, helper: TokenEndpointHelper, request: Message, **kwargs):
+        """
+        If another process updated the grant while this request was processed, the
+        grant is reloaded and checked again before the tokens are minted anew.
+        """
+        _attempt = 0
+        while True:
+            try:
+                return helper.process_request(request, **kwargs)
+            except ConcurrentUpdate:
+                _attempt += 1
+                if _attempt > self.concurrent_update_retries:
+                    raise
+                logger.debug(f"Concurrent update, retry number {_attempt}")
+
+            request = helper.post_parse_request(request, request.get("client_id"))
+            if isinstance(request, self.error_cls):
+                return request
+
     def process_request(self, request: Optional[Union[Message, dict]] = None, **kwargs):
         """
 
@@ -146,12 +168,15 @@ class Token(Endpoint):
         try:
             _helper = self._get_helper(request)
             if _helper:
-                response_args = _helper.process_request(request, **kwargs)
+                response_args = self._process_with_retry(_helper, request, **kwargs)
             else:
                 return self.error_cls(
                     error="invalid_request",
                     error_description=f"Unsupported grant_type: {request['grant_type']}",
                 )
+        except ConcurrentUpdate as err:
+            logger.warning(f"Gave up after repeated concurrent updates of {err}")
+            return self.error_cls(error="invalid_request", error_description="Concurrent update")
         except JWEException as err:
             return self.error_cls(error="invalid_request", error_description="%s" % err)
         except MintingNotAllowed as err:
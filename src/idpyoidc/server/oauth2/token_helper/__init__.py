@@ -44,7 +44,7 @@ class TokenEndpointHelper(object):
     ) -> SessionToken:
         _context = self.endpoint.upstream_get("context")
         _mngr = _context.session_manager
-        usage_rules = grant.usage_rules.get(token_class)
+        usage_rules = grant.shared_usage_rules().get(token_class)
         if usage_rules:
             _exp_in = usage_rules.get("expires_in")
         else:
@@ -79,7 +79,7 @@ class TokenEndpointHelper(object):
             if _exp_in:
                 token.expires_at = utc_time_sans_frac() + _exp_in
 
-        _context.session_manager.set(_context.session_manager.unpack_session_key(session_id), grant)
+        _mngr[session_id] = grant
 
         return token
 
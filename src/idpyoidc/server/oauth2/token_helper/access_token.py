@@ -80,7 +80,9 @@ class AccessTokenHelper(TokenEndpointHelper):
                 token_type = "DPoP"
 
         _based_on = grant.get_token(_access_code)
-        _supports_minting = _based_on.usage_rules.get("supports_minting", [])
+        if _based_on.used:  # Used by someone else since the request was parsed
+            return self.error_cls(error="invalid_grant", error_description="Code inactive")
+        _supports_minting = _based_on.shared_usage_rules().get("supports_minting", [])
 
         _authn_req = grant.authorization_request
 
@@ -147,11 +149,11 @@ class AccessTokenHelper(TokenEndpointHelper):
             else:
                 _response["refresh_token"] = refresh_token.value
 
+        _based_on.register_usage()
+
         # since the grant content has changed. Make sure it's stored
         _mngr[_session_info["branch_id"]] = grant
 
-        _based_on.register_usage()
-
         return _response
 
     def _enforce_resource_indicators_policy(self, request, config):
@@ -14,6 +14,8 @@ logger = logging.getLogger(__name__)
 class ClientCredentials(TokenEndpointHelper):
     def __init__(self, endpoint, config=None):
         TokenEndpointHelper.__init__(self, endpoint, config)
+        # A client's grant is reused until it holds this many tokens that haven't expired
+        self.max_tokens = (config or {}).get("max_tokens", 100)
 
     def process_request(self, req: Union[Message, dict], **kwargs):
         _context = self.endpoint.upstream_get("context")
@@ -35,14 +37,13 @@ class ClientCredentials(TokenEndpointHelper):
                 error="invalid_request", error_description="Unsupported grant type"
             )
 
-        # Is there a previous session ?
-        try:
-            _session_info = _mngr.get(["client_credentials", client_id])
-            _grant = _session_info["grant"]
-        except KeyError:
+        # Is there a previous session with a grant that can still be used ?
+        branch_id = self._active_grant(_mngr, client_id)
+        if not branch_id:
             logger.debug("No previous session")
+            self._remove_spent_grants(_mngr, client_id)
             branch_id = _mngr.add_grant(["client_credentials", client_id])
-            _session_info = _mngr.get_session_info(branch_id)
+        _session_info = _mngr.get_session_info(branch_id)
 
         _grant = _session_info["grant"]
 
@@ -70,6 +71,56 @@ class ClientCredentials(TokenEndpointHelper):
 
         return _resp
 
+    def _active_grant(self, session_manager, client_id: str) -> str:
+        """
+        Expired tokens are removed from the grant that is returned. A grant that still
+        holds max_tokens tokens is not reused.
+
+        :return: The session ID of the newest grant the client got that is still
+            active or an empty string if there is none
+        """
+        try:
+            _client_info = session_manager.get(["client_credentials", client_id])
+        except KeyError:
+            return ""
+
+        for _key in reversed(_client_info.subordinate):
+            _path = session_manager.unpack_branch_key(_key)
+            try:
+                _grant = session_manager.get(_path)
+            except KeyError:
+                continue
+            if _grant.is_active():
+                _now = utc_time_sans_frac()
+                _grant.issued_token = [t for t in _grant.issued_token if t.is_active(_now)]
+                if len(_grant.issued_token) < self.max_tokens:
+                    return session_manager.encrypted_branch_id(*_path)
+                break
+        return ""
+
+    @staticmethod
+    def _remove_spent_grants(session_manager, client_id: str):
+        """
+        Removes the grants of a client that are no longer active or that hold no token
+        that can still be used.
+        """
+        try:
+            _client_info = session_manager.get(["client_credentials", client_id])
+        except KeyError:
+            return
+
+        _now = utc_time_sans_frac()
+        for _key in list(_client_info.subordinate):
+            _path = session_manager.unpack_branch_key(_key)
+            try:
+                _grant = session_manager.get(_path)
+            except KeyError:
+                continue
+            if not _grant.is_active(_now) or not any(
+                t.is_active(_now) for t in _grant.issued_token
+            ):
+                session_manager.delete(_path)
+
     def post_parse_request(
         self, request: Union[Message, dict], client_id: Optional[str] = "", **kwargs
     ):
@@ -66,7 +66,7 @@ class RefreshTokenHelper(TokenEndpointHelper):
         if access_token.expires_at:
             _resp["expires_in"] = access_token.expires_at - utc_time_sans_frac()
 
-        _mints = token.usage_rules.get("supports_minting")
+        _mints = token.shared_usage_rules().get("supports_minting")
         issue_refresh = kwargs.get("issue_refresh", False)
         if "refresh_token" in _mints and issue_refresh:
             refresh_token = self._mint_token(
@@ -77,7 +77,7 @@ class RefreshTokenHelper(TokenEndpointHelper):
                 based_on=token,
                 scope=scope,
             )
-            refresh_token.usage_rules = token.usage_rules.copy()
+            refresh_token.usage_rules = token.shared_usage_rules()
             _resp["refresh_token"] = refresh_token.value
 
         token.register_usage()
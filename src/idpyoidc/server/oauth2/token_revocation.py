@@ -1,6 +1,9 @@
 """Implements RFC7009"""
 
+import copy
 import logging
+from types import MappingProxyType
+from typing import List
 
 from idpyoidc.exception import ImproperlyConfigured
 from idpyoidc.message import oauth2
@@ -38,6 +41,80 @@ class TokenRevocation(Endpoint):
     def __init__(self, upstream_get, **kwargs):
         Endpoint.__init__(self, upstream_get, **kwargs)
         self.token_revocation_kwargs = kwargs
+        self.token_types_supported = kwargs.get("token_types_supported", self.token_types_supported)
+        self.policy = kwargs.get("policy", {"": {"function": validate_token_revocation_policy}})
+        # The policy functions are resolved once, not per request
+        self._default_policy = None
+        # client_id -> (client revocation configuration, RevocationPolicy)
+        self._client_policy = {}
+        self.default_policy()
+
+    def default_policy(self) -> "RevocationPolicy":
+        """
+        Returns the compiled policy used for clients that have none of their own.
+        """
+        _compiled = self._default_policy
+        if (
+            _compiled
+            and _compiled[0] == self.token_types_supported
+            and _compiled[1] == self.policy
+        ):
+            return _compiled[2]
+
+        _policy = RevocationPolicy(self.token_types_supported, self.policy)
+        # Client policies may depend on the defaults
+        self._client_policy = {}
+        self._default_policy = (
+            list(self.token_types_supported),
+            copy.deepcopy(self.policy),
+            _policy,
+        )
+        return _policy
+
+    def compile_policy(self, client_id: str) -> "RevocationPolicy":
+        """
+        Compiles the revocation policy of a client.
+
+        :param client_id: Client ID
+        :return: A RevocationPolicy instance
+        """
+        _default = self.default_policy()
+        _conf = (self.upstream_get("context").cdb.get(client_id) or {}).get("token_revocation")
+        if not _conf:
+            self._client_policy.pop(client_id, None)
+            return _default
+
+        _policy = RevocationPolicy(
+            _conf.get("token_types_supported", self.token_types_supported),
+            _conf.get("policy", self.policy),
+        )
+        self._client_policy[client_id] = (copy.deepcopy(_conf), _policy)
+        return _policy
+
+    def compile_policies(self):
+        """Compiles the revocation policies of all clients that have one of their own."""
+        _cdb = self.upstream_get("context").cdb
+        for client_id in list(_cdb.keys()):
+            if (_cdb.get(client_id) or {}).get("token_revocation"):
+                self.compile_policy(client_id)
+
+    def get_policy(self, client_id: str) -> "RevocationPolicy":
+        """
+        Returns the compiled revocation policy of a client. It is compiled the first
+        time it's needed and again if the client's configuration has changed.
+
+        :param client_id: Client ID
+        :return: A RevocationPolicy instance
+        """
+        _default = self.default_policy()
+        _conf = (self.upstream_get("context").cdb.get(client_id) or {}).get("token_revocation")
+        if not _conf:
+            return _default
+
+        _compiled = self._client_policy.get(client_id)
+        if _compiled and _compiled[0] == _conf:
+            return _compiled[1]
+        return self.compile_policy(client_id)
 
     def get_client_id_from_token(self, endpoint_context, token, request=None):
         _info = endpoint_context.session_manager.get_session_info_by_token(
@@ -75,24 +152,9 @@ class TokenRevocation(Endpoint):
 
         grant = _session_info["grant"]
         _token = grant.get_token(request_token)
+        _policy = self.get_policy(client_id)
 
-        try:
-            self.token_types_supported = _context.cdb[client_id]["token_revocation"][
-                "token_types_supported"
-            ]
-        except Exception:
-            self.token_types_supported = self.token_revocation_kwargs.get(
-                "token_types_supported", self.token_types_supported
-            )
-
-        try:
-            self.policy = _context.cdb[client_id]["token_revocation"]["policy"]
-        except Exception:
-            self.policy = self.token_revocation_kwargs.get(
-                "policy", {"": {"function": validate_token_revocation_policy}}
-            )
-
-        if _token.token_class not in self.token_types_supported:
+        if _token.token_class not in _policy.token_types_supported:
             desc = (
                 "The authorization server does not support the revocation of "
                 "the presented token type. That is, the client tried to revoke an access "
@@ -100,34 +162,58 @@ class TokenRevocation(Endpoint):
             )
             return self.error_cls(error="unsupported_token_type", error_description=desc)
 
-        return self._revoke(_revoke_request, _session_info)
+        return self._revoke(_token, _session_info, _policy)
 
-    def _revoke(self, request, session_info):
-        _context = self.upstream_get("endpoint_context")
-        _mngr = _context.session_manager
-        _token = _mngr.find_token(session_info["branch_id"], request["token"])
+    def _revoke(self, token, session_info, policy):
+        fn, kwargs = policy.function(token.token_class)
+        try:
+            _resp = fn(token, session_info=session_info, **kwargs)
+        except Exception as e:
+            logger.error(f"Error while executing the {fn} policy function: {e}")
+            return self.error_cls(error="server_error", error_description="Internal server error")
 
-        _cls = _token.token_class
-        if _cls not in self.policy:
-            _cls = ""
+        if token.revoked:
+            # make sure the change is stored and that everyone that cares knows about it
+            _mngr = self.upstream_get("endpoint_context").session_manager
+            _mngr.revoke_token(session_info["branch_id"], token.value)
+        return _resp
 
-        temp_policy = self.policy[_cls]
-        function = temp_policy["function"]
-        kwargs = temp_policy.get("kwargs", {})
 
-        if isinstance(function, str):
-            try:
-                fn = importer(function)
-            except Exception:
-                raise ImproperlyConfigured(f"Error importing {function} policy function")
-        else:
-            fn = function
+class RevocationPolicy(object):
+    """The revocation policy of a client with the policy functions resolved."""
 
+    __slots__ = ("token_types_supported", "_functions")
+
+    def __init__(self, token_types_supported: List[str], policy: dict):
+        """
+        :param token_types_supported: The token classes that may be revoked
+        :param policy: Token class to policy function specification
+        """
+        _functions = {}
+        for token_class, spec in policy.items():
+            function = spec["function"]
+            if isinstance(function, str):
+                try:
+                    function = importer(function)
+                except Exception:
+                    raise ImproperlyConfigured(f"Error importing {function} policy function")
+            _functions[token_class] = (function, MappingProxyType(dict(spec.get("kwargs", {}))))
+
+        object.__setattr__(self, "token_types_supported", frozenset(token_types_supported))
+        object.__setattr__(self, "_functions", MappingProxyType(_functions))
+
+    def __setattr__(self, key, value):
+        raise AttributeError("RevocationPolicy instances are immutable")
+
+    def function(self, token_class: str) -> tuple:
+        """
+        :param token_class: The class of the token that is to be revoked
+        :return: The policy function and its keyword arguments
+        """
         try:
-            return fn(_token, session_info=session_info, **kwargs)
-        except Exception as e:
-            logger.error(f"Error while executing the {fn} policy function: {e}")
-            return self.error_cls(error="server_error", error_description="Internal server error")
+            return self._functions[token_class]
+        except KeyError:
+            return self._functions[""]
 
 
 def validate_token_revocation_policy(token, session_info, **kwargs):
@@ -0,0 +1,114 @@
+"""
+Publishes the token status list. See draft-ietf-oauth-status-list.
+"""
+import json
+import logging
+from typing import Optional
+from typing import Union
+
+from cryptojwt import JWT
+from cryptojwt.jws.jws import JWS
+
+from idpyoidc.message import Message
+from idpyoidc.message import oauth2
+from idpyoidc.server.endpoint import Endpoint
+from idpyoidc.time_util import utc_time_sans_frac
+
+logger = logging.getLogger(__name__)
+
+
+class TokenStatusList(Endpoint):
+    """
+    Serves the token status list kept by the session manager. The response is
+    constructed once per version of the list and supports conditional GET using
+    ETag/If-None-Match, so a resource server can poll as often as it likes.
+    """
+
+    request_cls = oauth2.Message
+    response_cls = oauth2.Message
+    request_format = ""
+    response_format = "json"
+    endpoint_name = "status_list_endpoint"
+    name = "token_status_list"
+    response_content_type = "application/statuslist+json"
+
+    def __init__(self, upstream_get, **kwargs):
+        Endpoint.__init__(self, upstream_get, **kwargs)
+        # How long a resource server may use a copy of the list, in seconds
+        self.ttl = kwargs.get("ttl", 300)
+        # If set the list is returned as a signed JWT
+        self.signing_alg = kwargs.get("signing_alg", "")
+        if self.signing_alg:
+            self.response_format = "jwt"
+            self.response_content_type = "application/statuslist+jwt"
+        self._response = (None, "")
+
+    def status_list(self):
+        _status_list = self.upstream_get("context").session_manager.status_list
+        if _status_list is None:
+            raise ValueError("No token status list configured")
+        if not _status_list.uri:
+            _status_list.uri = self.full_path
+        return _status_list
+
+    def _construct(self, status_list, lst: str) -> str:
+        _payload = {
+            "sub": status_list.uri,
+            "iat": utc_time_sans_frac(),
+            "ttl": self.ttl,
+            "status_list": {"bits": 1, "lst": lst},
+        }
+        if self.signing_alg:
+            _issuer = self.upstream_get("context").issuer
+            _payload["iss"] = _issuer
+            _signer = JWT(
+                key_jar=self.upstream_get("attribute", "keyjar"),
+                iss=_issuer,
+                sign_alg=self.signing_alg,
+            )
+            _jws = JWS(json.dumps(_payload), alg=self.signing_alg)
+            return _jws.sign_compact([_signer.pack_key(_issuer)], typ="statuslist+jwt")
+        return json.dumps(_payload)
+
+    def process_request(
+        self,
+        request: Optional[Union[Message, dict]] = None,
+        http_info: Optional[dict] = None,
+        **kwargs
+    ) -> dict:
+        _status_list = self.status_list()
+        _etag, _lst = _status_list.snapshot()
+
+        if http_info:
+            _headers = http_info.get("headers", {})
+            _match = _headers.get("if-none-match", _headers.get("If-None-Match"))
+            if _match == _etag:
+                return {"response_code": 304, "response": "", "etag": _etag}
+
+        _cached_etag, _response = self._response
+        if _cached_etag != _etag:
+            _response = self._construct(_status_list, _lst)
+            self._response = (_etag, _response)
+        return {"response": _response, "etag": _etag}
+
+    def do_response(
+        self,
+        response_args: Optional[dict] = None,
+        request: Optional[Union[Message, dict]] = None,
+        error: Optional[str] = "",
+        **kwargs
+    ) -> dict:
+        if error:
+            return Endpoint.do_response(self, response_args, request, error, **kwargs)
+
+        _info = {
+            "response": kwargs["response"],
+            "http_headers": [
+                ("Content-type", self.response_content_type),
+                ("ETag", kwargs["etag"]),
+                ("Cache-Control", f"max-age={self.ttl}"),
+            ],
+        }
+        if "response_code" in kwargs:
+            _info["response_code"] = kwargs["response_code"]
+        return _info
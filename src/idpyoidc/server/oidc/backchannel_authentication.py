@@ -51,11 +51,32 @@ class BackChannelAuthentication(Endpoint):
         self.expires_in = kwargs.get("expires_in", DEFAULT_EXPIRES_IN)
         self.interval = kwargs.get("interval", DEFAULT_INTERVAL)
 
+    def _id_token_user(self, id_token: dict) -> str:
+        """
+        Finds the user an ID token was issued about. The session ID in the ID token
+        says who the user is, otherwise the subject identifier is looked up.
+
+        :param id_token: The verified ID token
+        :return: User ID
+        """
+        _mngr = self.upstream_get("context").session_manager
+        _sid = id_token.get("sid")
+        if _sid:
+            try:
+                return _mngr.decrypt_branch_id(_sid)[0]
+            except ValueError:
+                pass
+
+        _user_id = _mngr.find_user_id(id_token.get("sub", ""))
+        if _user_id is None:
+            raise KeyError("Unknown subject")
+        return _user_id
+
     def do_request_user(self, request):
         cn = verified_claim_name("id_token_hint")
         _request_user = ""
         if request.get(cn):
-            _request_user = request[cn].get("sub", "")
+            _request_user = self._id_token_user(request[cn])
         elif request.get("login_hint"):
             _login_hint = request.get("login_hint")
             if _login_hint:
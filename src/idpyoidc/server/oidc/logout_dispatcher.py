@@ -0,0 +1,213 @@
+"""
+Delivery of back-channel logout tokens.
+
+When a user logs out, every client that has registered a backchannel_logout_uri
+should get a logout token. Signing and posting them one after the other means the
+user waits for the sum of them. The dispatcher here does the signing and the
+posting concurrently, with an upper limit on how many are in flight at the same
+time, with a timeout per request and with retries, and reports the outcome per
+client.
+"""
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+OK = "ok"
+# The client does not support, or could not in time handle, back-channel logout.
+ACCEPTED = "accepted"
+FAILED = "failed"
+
+
+def _status_code(response) -> int:
+    try:
+        return response.status_code
+    except AttributeError:
+        # aiohttp and the like
+        return response.status
+
+
+class LogoutDispatcher(object):
+    def __init__(
+        self,
+        max_workers: Optional[int] = 8,
+        timeout: Optional[float] = 5.0,
+        retries: Optional[int] = 2,
+        backoff: Optional[float] = 0.5,
+        max_retry_time: Optional[float] = None,
+    ):
+        """
+        The synchronous dispatch is done while the user's logout request waits,
+        retries included. Without max_retry_time that can be up to
+        (retries + 1) * timeout plus the backoff delays.
+
+        :param max_workers: The largest number of logout tokens that are signed or
+            delivered at the same time
+        :param timeout: Timeout, in seconds, of one delivery attempt
+        :param retries: How many times a failed delivery is retried
+        :param backoff: Seconds to wait before the first retry. Doubled for every
+            retry after that.
+        :param max_retry_time: Upper limit, in seconds, of the time spent on
+            delivering one logout token. A retry that could not be finished within
+            it is not made.
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_retry_time = max_retry_time
+
+    def sign(self, tasks: dict) -> dict:
+        """
+        Signs logout tokens in parallel.
+
+        :param tasks: client_id -> function without arguments that returns the
+            (back-channel logout URI, logout token) tuple or None
+        :return: client_id -> (back-channel logout URI, logout token)
+        """
+        if len(tasks) <= 1:
+            _res = {_cid: _task() for _cid, _task in tasks.items()}
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tasks))) as _pool:
+                _futures = {_cid: _pool.submit(_task) for _cid, _task in tasks.items()}
+                _res = {_cid: _future.result() for _cid, _future in _futures.items()}
+        return {_cid: _spec for _cid, _spec in _res.items() if _spec}
+
+    def _request_args(self, logout_token: str, httpc_params: Optional[dict]) -> dict:
+        _args = dict(httpc_params or {})
+        _args.setdefault("timeout", self.timeout)
+        _args["data"] = f"logout_token={logout_token}"
+        _args["headers"] = {"Content-Type": "application/x-www-form-urlencoded"}
+        return _args
+
+    def _evaluate(self, client_id: str, outcome: dict, response=None, error=None) -> bool:
+        """
+        Records the result of one delivery attempt.
+
+        :return: True if another attempt should be made
+        """
+        outcome["attempts"] += 1
+        if error is not None:
+            logger.info(f"Back-channel logout to {client_id} failed: {error}")
+            outcome.update({"status": FAILED, "error": str(error)})
+            return True
+
+        _code = _status_code(response)
+        outcome["status_code"] = _code
+        outcome.pop("error", None)
+        if _code < 300:
+            logger.info(f"Logged out from {client_id}")
+            outcome["status"] = OK
+        elif _code in [501, 504]:
+            logger.info(f"Got a {_code} from {client_id} which is acceptable")
+            outcome["status"] = ACCEPTED
+        else:
+            logger.info(f"Failed to logout from {client_id}, got a {_code}")
+            outcome["status"] = FAILED
+            # A client error will not go away by trying again
+            return _code >= 500
+        return False
+
+    def _give_up(self, retry: bool, outcome: dict, start: float, delay: float) -> bool:
+        if not retry or outcome["attempts"] > self.retries:
+            return True
+        if self.max_retry_time is None:
+            return False
+        return time.monotonic() - start + delay + self.timeout > self.max_retry_time
+
+    def _deliver(
+        self, client_id: str, uri: str, logout_token: str, httpc: Callable, httpc_params: dict
+    ) -> dict:
+        _args = self._request_args(logout_token, httpc_params)
+        _outcome = {"uri": uri, "attempts": 0}
+        _delay = self.backoff
+        _start = time.monotonic()
+        while True:
+            try:
+                _retry = self._evaluate(client_id, _outcome, response=httpc("POST", uri, **_args))
+            except Exception as err:
+                _retry = self._evaluate(client_id, _outcome, error=err)
+            if self._give_up(_retry, _outcome, _start, _delay):
+                return _outcome
+            time.sleep(_delay)
+            _delay *= 2
+
+    def dispatch(
+        self, logouts: dict, httpc: Callable, httpc_params: Optional[dict] = None
+    ) -> dict:
+        """
+        Posts logout tokens to the clients' back-channel logout URIs.
+
+        :param logouts: client_id -> (back-channel logout URI, logout token)
+        :param httpc: HTTP client, same interface as requests.request
+        :param httpc_params: Extra arguments to the HTTP client
+        :return: client_id -> outcome. The outcome has the keys *status* (one of
+            'ok', 'accepted' and 'failed'), *attempts*, *uri* and, depending on how
+            it went, *status_code* and *error*.
+        """
+        if not logouts:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(logouts))) as _pool:
+            _futures = {
+                _cid: _pool.submit(self._deliver, _cid, _uri, _token, httpc, httpc_params)
+                for _cid, (_uri, _token) in logouts.items()
+            }
+            return {_cid: _future.result() for _cid, _future in _futures.items()}
+
+    async def _deliver_async(
+        self,
+        client_id: str,
+        uri: str,
+        logout_token: str,
+        httpc: Callable,
+        httpc_params: dict,
+        semaphore: asyncio.Semaphore,
+    ) -> dict:
+        _args = self._request_args(logout_token, httpc_params)
+        _outcome = {"uri": uri, "attempts": 0}
+        _delay = self.backoff
+        _loop = asyncio.get_running_loop()
+        _start = time.monotonic()
+        while True:
+            async with semaphore:
+                try:
+                    if asyncio.iscoroutinefunction(httpc):
+                        _request = httpc("POST", uri, **_args)
+                    else:
+                        # Keep a blocking client off the event loop
+                        _request = _loop.run_in_executor(
+                            None, functools.partial(httpc, "POST", uri, **_args)
+                        )
+                    # Whether or not the client knows about the timeout argument
+                    _resp = await asyncio.wait_for(_request, self.timeout)
+                    _retry = self._evaluate(client_id, _outcome, response=_resp)
+                except Exception as err:
+                    _retry = self._evaluate(client_id, _outcome, error=err)
+            if self._give_up(_retry, _outcome, _start, _delay):
+                return _outcome
+            await asyncio.sleep(_delay)
+            _delay *= 2
+
+    async def dispatch_async(
+        self, logouts: dict, httpc: Callable, httpc_params: Optional[dict] = None
+    ) -> dict:
+        """
+        As :py:meth:`dispatch` but to be used from within an event loop. The HTTP
+        client can be a coroutine function, if not it is run in the loop's default
+        executor.
+        """
+        _semaphore = asyncio.Semaphore(self.max_workers)
+        _cids = list(logouts.keys())
+        _res = await asyncio.gather(
+            *[
+                self._deliver_async(_cid, _uri, _token, httpc, httpc_params, _semaphore)
+                for _cid, (_uri, _token) in logouts.items()
+            ]
+        )
+        return dict(zip(_cids, _res))
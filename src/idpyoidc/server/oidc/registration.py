@@ -279,15 +279,19 @@ class Registration(Endpoint):
             if item in request:
                 t[item] = request[item]
 
-        # if it can't load keys because the URL is false it will
-        # just silently fail. Waiting for better times.
-        _keyjar.load_keys(client_id, jwks_uri=t["jwks_uri"], jwks=t["jwks"])
+        if _context.client_keys is not None:
+            # Loaded from the client database when first needed
+            _context.client_keys.forget(client_id)
+        else:
+            # if it can't load keys because the URL is false it will
+            # just silently fail. Waiting for better times.
+            _keyjar.load_keys(client_id, jwks_uri=t["jwks_uri"], jwks=t["jwks"])
 
-        n_keys = 0
-        for kb in _keyjar.get(client_id, []):
-            n_keys += len(kb.keys())
-        msg = "found {} keys for client_id={}"
-        logger.debug(msg.format(n_keys, client_id))
+            n_keys = 0
+            for kb in _keyjar.get(client_id, []):
+                n_keys += len(kb.keys())
+            msg = "found {} keys for client_id={}"
+            logger.debug(msg.format(n_keys, client_id))
 
         return _cinfo
 
@@ -469,17 +473,23 @@ class Registration(Endpoint):
         response = self.response_cls(**args)
 
         # Add the client_secret as a symmetric key to the key jar
-        if client_secret:
+        if client_secret and _context.client_keys is None:
             self.upstream_get("attribute", "keyjar").add_symmetric(client_id, str(client_secret))
 
         logger.debug("Stored updated client info in CDB under cid={}".format(client_id))
         logger.debug("ClientInfo: {}".format(_cinfo))
         _context.cdb[client_id] = _cinfo
+        if _context.client_keys is not None:
+            _context.client_keys.forget(client_id)
 
         # Not all databases can be sync'ed
         if hasattr(_context.cdb, "sync") and callable(_context.cdb.sync):
             _context.cdb.sync()
 
+        _session_endp = self.upstream_get("endpoint", "session")
+        if _session_endp:
+            _session_endp.compile_front_channel_template(client_id)
+
         msg = "registration_response: {}"
         logger.info(msg.format(sanitize(response.to_dict())))
 
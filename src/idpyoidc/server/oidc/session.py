@@ -1,8 +1,10 @@
+import functools
 import json
 import logging
 from typing import Optional
 from typing import Union
 from urllib.parse import parse_qs
+from urllib.parse import quote_plus
 from urllib.parse import urlencode
 from urllib.parse import urlparse
 
@@ -26,50 +28,169 @@ from idpyoidc.message.oidc.session import BACK_CHANNEL_LOGOUT_EVENT
 from idpyoidc.message.oidc.session import EndSessionRequest
 from idpyoidc.server.endpoint import Endpoint
 from idpyoidc.server.oauth2.authorization import verify_uri
+from idpyoidc.server.oidc.logout_dispatcher import LogoutDispatcher
 from idpyoidc.util import add_path
+from idpyoidc.util import instantiate
 from idpyoidc.util import rndstr
 
 logger = logging.getLogger(__name__)
 
 
-def do_front_channel_logout_iframe(cinfo, iss, sid):
+class FrontChannelLogoutTemplate(object):
+    """
+    The front-channel logout IFrame of a client with everything but the session ID
+    filled in.
+    """
+
+    __slots__ = ("source", "prefix", "suffix")
+
+    def __init__(self, source: tuple, prefix: str, suffix: Optional[str] = None):
+        """
+        :param source: The client information and issuer ID the template was built from
+        :param prefix: The part before the session ID
+        :param suffix: The part after the session ID, None if the session ID is not used
+        """
+        self.source = source
+        self.prefix = prefix
+        self.suffix = suffix
+
+    def render(self, sid: str) -> str:
+        if self.suffix is None:
+            return self.prefix
+        return self.prefix + quote_plus(sid) + self.suffix
+
+
+def front_channel_logout_template(cinfo, iss):
     """
+    Does the URL parsing and query encoding of a front-channel logout IFrame once.
 
     :param cinfo: Client info
     :param iss: Issuer ID
-    :param sid: Session ID
-    :return: IFrame
+    :return: A FrontChannelLogoutTemplate instance or None if the client has not
+        registered a front-channel logout URI
     """
     try:
         frontchannel_logout_uri = cinfo["frontchannel_logout_uri"]
     except KeyError:
         return None
 
-    try:
-        flsr = cinfo["frontchannel_logout_session_required"]
-    except KeyError:
-        flsr = False
+    flsr = cinfo.get("frontchannel_logout_session_required", False)
+    _source = (frontchannel_logout_uri, flsr, iss)
 
     logger.debug(f"frontchannel_logout_uri: {frontchannel_logout_uri}")
     logger.debug(f"frontchannel_logout_session_required: {flsr}")
-    if flsr:
-        _query = {"iss": iss, "sid": sid}
-        if "?" in frontchannel_logout_uri:
-            p = urlparse(frontchannel_logout_uri)
-            _args = parse_qs(p.query)
-            _args.update(_query)
-            _query = _args
-            _np = p._replace(query="")
-            frontchannel_logout_uri = _np.geturl()
-
-        logger.debug(f"IFrame query: {_query}")
-        _iframe = '<iframe src="{}?{}">'.format(
-            frontchannel_logout_uri, urlencode(_query, doseq=True)
-        )
-    else:
-        _iframe = '<iframe src="{}">'.format(frontchannel_logout_uri)
+    if not flsr:
+        return FrontChannelLogoutTemplate(_source, '<iframe src="{}">'.format(frontchannel_logout_uri))
+
+    _query = {"iss": iss, "sid": None}
+    if "?" in frontchannel_logout_uri:
+        p = urlparse(frontchannel_logout_uri)
+        _args = parse_qs(p.query)
+        _args.update(_query)
+        _query = _args
+        _np = p._replace(query="")
+        frontchannel_logout_uri = _np.geturl()
+
+    # Everything is encoded now except for the session ID
+    _before = []
+    _after = []
+    _part = _before
+    for key, val in _query.items():
+        if key == "sid":
+            _part = _after
+        else:
+            _part.append(urlencode({key: val}, doseq=True))
+
+    _prefix = '<iframe src="{}?{}sid='.format(
+        frontchannel_logout_uri, "".join(f"{q}&" for q in _before)
+    )
+    _suffix = "".join(f"&{q}" for q in _after) + '">'
+    return FrontChannelLogoutTemplate(_source, _prefix, _suffix)
+
+
+def do_front_channel_logout_iframe(cinfo, iss, sid):
+    """
 
-    return _iframe
+    :param cinfo: Client info
+    :param iss: Issuer ID
+    :param sid: Session ID
+    :return: IFrame
+    """
+    _template = front_channel_logout_template(cinfo, iss)
+    if _template is None:
+        return None
+    return _template.render(sid)
+
+
+FRONT_CHANNEL_LOGOUT_HEAD = """<!DOCTYPE html>
+<head>
+  <meta charset="utf-8">
+  <title>Logout</title>
+  <meta name="viewport" content="width=device-width, initial-scale=1, shrink-to-fit=no">
+  <style>
+    iframe{{visibility:hidden;position:absolute;left:0;top:0;height:0;width:0;border:none}}
+  </style>
+  <script>
+    var loaded = 0;
+    var expected = null;
+    function redirect() {{
+      window.location.replace({redirect_uri});
+    }}
+    function frameOnLoad() {{
+      loaded += 1;
+      if (expected !== null && loaded >= expected) {{
+        redirect();
+      }}
+    }}
+    setTimeout(redirect, {timeout});
+  </script>
+</head>
+<body>
+"""
+
+FRONT_CHANNEL_LOGOUT_TAIL = """<script>
+  expected = {size};
+  if (loaded >= expected) {{
+    redirect();
+  }}
+</script>
+</body>
+</html>
+"""
+
+
+def front_channel_logout_page(iframes, post_logout_redirect_uri, timeout=5000, chunk_size=50):
+    """
+    Builds the page that logs the user out from the clients that use front-channel
+    logout, piece by piece. Since nothing but the IFrames depends on the number of
+    clients, the page can be sent to the user agent while it is being built.
+
+    :param iframes: Iterable over IFrames as returned by do_front_channel_logout_iframe
+    :param post_logout_redirect_uri: Where the user agent is sent when all the
+        clients have been loaded or when the timeout has passed
+    :param timeout: Milliseconds to wait for the clients
+    :param chunk_size: The number of IFrames in one piece
+    :return: Iterator over pieces of HTML
+    """
+    # A JavaScript string that can not end the script element
+    _uri = json.dumps(post_logout_redirect_uri).replace("</", "<\\/")
+    yield FRONT_CHANNEL_LOGOUT_HEAD.format(redirect_uri=_uri, timeout=int(timeout))
+
+    _size = 0
+    _chunk = []
+    for _iframe in iframes:
+        _chunk.append(_iframe.replace("<iframe ", '<iframe onload="frameOnLoad()" ', 1))
+        if not _iframe.endswith("</iframe>"):
+            _chunk.append("</iframe>")
+        _chunk.append("\n")
+        _size += 1
+        if _size % chunk_size == 0:
+            yield "".join(_chunk)
+            _chunk = []
+    if _chunk:
+        yield "".join(_chunk)
+
+    yield FRONT_CHANNEL_LOGOUT_TAIL.format(size=_size)
 
 
 class Session(Endpoint):
@@ -96,6 +217,12 @@ class Session(Endpoint):
             kwargs["check_session_iframe"] = add_path(upstream_get("unit").issuer, _csi)
         Endpoint.__init__(self, upstream_get, **kwargs)
         self.iv = as_bytes(rndstr(24))
+        _dispatcher = kwargs.get("logout_dispatcher") or {}
+        self.logout_dispatcher = instantiate(
+            _dispatcher.get("class", LogoutDispatcher), **_dispatcher.get("kwargs", {})
+        )
+        # client_id -> FrontChannelLogoutTemplate
+        self._fc_templates = {}
 
     def _encrypt_sid(self, sid):
         encrypter = AES_GCMEncrypter(key=as_bytes(self.upstream_get("context").symkey))
@@ -147,6 +274,54 @@ class Session(Endpoint):
 
         return back_channel_logout_uri, _logout_token
 
+    def compile_front_channel_template(self, client_id: str):
+        """
+        Builds the front-channel logout template of a client. Should be done when a
+        client is registered or its registration is changed.
+
+        :param client_id: Client ID
+        :return: A FrontChannelLogoutTemplate instance or None
+        """
+        _context = self.upstream_get("context")
+        _cinfo = _context.cdb.get(client_id)
+        _template = None
+        if _cinfo:
+            _template = front_channel_logout_template(_cinfo, _context.issuer)
+        if _template is None:
+            self._fc_templates.pop(client_id, None)
+        else:
+            self._fc_templates[client_id] = _template
+        return _template
+
+    def compile_front_channel_templates(self):
+        """Builds the front-channel logout templates of all the registered clients."""
+        self._fc_templates = {}
+        for _client_id in list(self.upstream_get("context").cdb.keys()):
+            self.compile_front_channel_template(_client_id)
+
+    def front_channel_logout_iframe(self, client_id: str, sid: str) -> Optional[str]:
+        """
+        :param client_id: Client ID
+        :param sid: Session ID
+        :return: The front-channel logout IFrame of the client or None
+        """
+        _template = self._fc_templates.get(client_id)
+        if _template is not None:
+            # The client registration may have been changed by someone else
+            _context = self.upstream_get("context")
+            _cinfo = _context.cdb[client_id]
+            if _template.source != (
+                _cinfo.get("frontchannel_logout_uri"),
+                _cinfo.get("frontchannel_logout_session_required", False),
+                _context.issuer,
+            ):
+                _template = None
+        if _template is None:
+            _template = self.compile_front_channel_template(client_id)
+            if _template is None:
+                return None
+        return _template.render(sid)
+
     def clean_sessions(self, usids):
         # Revoke all sessions
         _context = self.upstream_get("context")
@@ -160,14 +335,13 @@ class Session(Endpoint):
 
         # Front-/Backchannel logout ?
         _cdb = _context.cdb
-        _iss = _context.issuer
         _user_id = _session_info["user_id"]
         logger.debug(
             f"(logout_all_clients) user_id={_user_id},  client_id={_session_info['client_id']}, "
             f"grant_id={_session_info['grant_id']}"
         )
 
-        bc_logouts = {}
+        bc_tasks = {}
         fc_iframes = {}
         _rel_sid = []
         for _client_key in _session_info["user"].subordinate:
@@ -184,9 +358,10 @@ class Session(Endpoint):
                     idt = grant.last_issued_token_of_type("id_token")
                     if idt:
                         _rel_sid.append(idt.session_id)
-                        _spec = self.do_back_channel_logout(_cdb[_client_id], idt.session_id)
-                        if _spec:
-                            bc_logouts[_client_id] = _spec
+                        # The logout tokens are signed in parallel further down
+                        bc_tasks[_client_id] = functools.partial(
+                            self.do_back_channel_logout, _cdb[_client_id], idt.session_id
+                        )
                         break
             elif "frontchannel_logout_uri" in _cdb[_client_id]:
                 _cli = _mngr.get(_path)
@@ -199,14 +374,14 @@ class Session(Endpoint):
                     if idt:
                         _rel_sid.append(idt.session_id)
                         # Construct an IFrame
-                        _spec = do_front_channel_logout_iframe(
-                            _cdb[_client_id], _iss, idt.session_id
-                        )
+                        _spec = self.front_channel_logout_iframe(_client_id, idt.session_id)
                         if _spec:
                             fc_iframes[_client_id] = _spec
                         break
 
+        bc_logouts = self.logout_dispatcher.sign(bc_tasks)
         self.clean_sessions(_rel_sid)
+        _context.browser_state.logout(_user_id)
 
         res = {}
         if bc_logouts:
@@ -242,11 +417,12 @@ class Session(Endpoint):
                 res["blu"] = {_client_id: _spec}
         elif "frontchannel_logout_uri" in _cdb[_client_id]:
             # Construct an IFrame
-            _spec = do_front_channel_logout_iframe(_cdb[_client_id], _context.issuer, sid)
+            _spec = self.front_channel_logout_iframe(_client_id, sid)
             if _spec:
                 res["flu"] = {_client_id: _spec}
 
         self.clean_sessions([sid])
+        _context.browser_state.logout(_session_information["user_id"], _client_id)
         return res
 
     def process_request(
@@ -372,9 +548,11 @@ class Session(Endpoint):
             pass
         elif isinstance(auth_info, ResponseMessage):
             return auth_info
-        else:
+        elif auth_info.get("client_id"):
             request["client_id"] = auth_info["client_id"]
-            request["access_token"] = auth_info["token"]
+            # Only there if the client authenticated using a bearer token
+            if "token" in auth_info:
+                request["access_token"] = auth_info["token"]
 
         if isinstance(request, dict):
             _context = self.upstream_get("context")
@@ -395,6 +573,21 @@ class Session(Endpoint):
 
         return request
 
+    def dispatch_back_channel_logouts(self, logouts: dict) -> dict:
+        """
+        Delivers logout tokens to the clients.
+
+        :param logouts: client_id -> (back-channel logout URI, logout token)
+        :return: client_id -> outcome, see
+            :py:meth:`idpyoidc.server.oidc.logout_dispatcher.LogoutDispatcher.dispatch`
+        """
+        _context = self.upstream_get("context")
+        for _cid, (_url, _) in logouts.items():
+            logger.info("logging out from {} at {}".format(_cid, _url))
+        return self.logout_dispatcher.dispatch(
+            logouts, httpc=_context.httpc, httpc_params=_context.httpc_params
+        )
+
     def do_verified_logout(self, sid, alla=False, **kwargs):
         logger.debug(f"(do_verified_logout): sid={sid}")
         if alla:
@@ -404,26 +597,8 @@ class Session(Endpoint):
 
         bcl = _res.get("blu")
         if bcl:
-            _context = self.upstream_get("context")
             # take care of Back channel logout first
-            for _cid, spec in bcl.items():
-                _url, sjwt = spec
-                logger.info("logging out from {} at {}".format(_cid, _url))
-
-                res = _context.httpc(
-                    "POST",
-                    _url,
-                    data="logout_token={}".format(sjwt),
-                    headers={"Content-Type": "application/x-www-form-urlencoded"},
-                    **_context.httpc_params,
-                )
-
-                if res.status_code < 300:
-                    logger.info("Logged out from {}".format(_cid))
-                elif res.status_code in [501, 504]:
-                    logger.info("Got a %s which is acceptable", res.status_code)
-                elif res.status_code >= 400:
-                    logger.info("failed to logout from {}".format(_cid))
+            self.dispatch_back_channel_logouts(bcl)
 
         return _res["flu"].values() if _res.get("flu") else []
 
@@ -74,7 +74,9 @@ class AccessTokenHelper(TokenEndpointHelper):
                 token_type = "DPoP"
 
         _based_on = grant.get_token(_access_code)
-        _supports_minting = _based_on.usage_rules.get("supports_minting", [])
+        if _based_on.used:  # Used by someone else since the request was parsed
+            return self.error_cls(error="invalid_grant", error_description="Code inactive")
+        _supports_minting = _based_on.shared_usage_rules().get("supports_minting", [])
 
         _authn_req = grant.authorization_request
 
@@ -133,7 +135,7 @@ class AccessTokenHelper(TokenEndpointHelper):
         _mngr[_session_info["branch_id"]] = grant
 
         if "openid" in _authn_req["scope"] and "id_token" in _supports_minting:
-            if "id_token" in _based_on.usage_rules.get("supports_minting"):
+            if "id_token" in _based_on.shared_usage_rules().get("supports_minting"):
                 try:
                     _idtoken = self._mint_token(
                         token_class="id_token",
@@ -153,6 +155,7 @@ class AccessTokenHelper(TokenEndpointHelper):
                 _response["id_token"] = _idtoken.value
 
         _based_on.register_usage()
+        _mngr[_session_info["branch_id"]] = grant
 
         return _response
 
@@ -183,7 +186,7 @@ class AccessTokenHelper(TokenEndpointHelper):
 
         if code.used:  # Has been used already
             # invalidate all tokens that has been minted using this code
-            grant.revoke_token(based_on=request["code"], recursive=True)
+            _mngr.revoke_token(_session_info["branch_id"], request["code"], recursive=True)
             return self.error_cls(error="invalid_grant", error_description="Code inactive")
 
         if code.is_active() is False:
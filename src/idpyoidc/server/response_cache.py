@@ -0,0 +1,100 @@
+"""
+Responses that are the same for everyone and seldom change, like the provider
+configuration and the JWKS, are serialised once and then served as they are until
+what they were built from changes. They carry a strong ETag so a client can do a
+conditional GET and get a 304 (Not Modified) back.
+"""
+import copy
+import hashlib
+import threading
+from typing import Callable
+from typing import Optional
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """
+    :param header: The value of an If-None-Match header
+    :param etag: The present ETag
+    :return: True if the header matches the ETag
+    """
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    for _tag in header.split(","):
+        _tag = _tag.strip()
+        # If-None-Match uses the weak comparison
+        if _tag.startswith("W/"):
+            _tag = _tag[2:]
+        if _tag == etag:
+            return True
+    return False
+
+
+def if_none_match(http_info: Optional[dict]) -> Optional[str]:
+    if not http_info:
+        return None
+    _headers = http_info.get("headers") or {}
+    return _headers.get("if-none-match", _headers.get("If-None-Match"))
+
+
+class ResponseCache(object):
+    def __init__(self, max_age: Optional[int] = 3600, content_type: Optional[str] = ""):
+        """
+        :param max_age: How long, in seconds, a client may use its copy of the response
+        :param content_type: The content type of the response
+        """
+        self.max_age = max_age
+        self.content_type = content_type
+        # (source, response)
+        self._entry = None
+        self._lock = threading.Lock()
+
+    def get(self, source, build: Callable) -> dict:
+        """
+        Returns the cached response if it was built from the same source, otherwise
+        builds a new one.
+
+        :param source: What the response is built from, must be comparable
+        :param build: Function without arguments that returns the serialised response
+        :return: Dictionary with the keys *response*, *etag* and *http_headers*
+        """
+        _entry = self._entry
+        if _entry is not None and _entry[0] == source:
+            return self._copy(_entry[1])
+
+        with self._lock:
+            _entry = self._entry
+            if _entry is None or _entry[0] != source:
+                _source = copy.deepcopy(source)
+                _body = build()
+                _etag = '"{}"'.format(hashlib.sha256(_body.encode("utf-8")).hexdigest())
+                _response = {
+                    "response": _body,
+                    "etag": _etag,
+                    "http_headers": [
+                        ("Content-type", self.content_type),
+                        ("ETag", _etag),
+                        ("Cache-Control", f"max-age={self.max_age}"),
+                    ],
+                }
+                _entry = (_source, _response)
+                self._entry = _entry
+            return self._copy(_entry[1])
+
+    @staticmethod
+    def _copy(response: dict) -> dict:
+        # The HTTP headers may be added to by the caller
+        _response = response.copy()
+        _response["http_headers"] = list(response["http_headers"])
+        return _response
+
+    def not_modified(self, etag: str) -> dict:
+        return {
+            "response": "",
+            "response_code": 304,
+            "http_headers": [("ETag", etag), ("Cache-Control", f"max-age={self.max_age}")],
+        }
+
+    def clear(self):
+        self._entry = None
@@ -11,18 +11,25 @@ from idpyoidc.encrypter import default_crypt_config
 from idpyoidc.encrypter import init_encrypter
 from idpyoidc.impexp import ImpExp
 from idpyoidc.item import DLDict
+from idpyoidc.item import VersionedDLDict
 from idpyoidc.server.constant import DIVIDER
 from idpyoidc.server.util import lv_pack
 from idpyoidc.server.util import lv_unpack
+from idpyoidc.storage import ConcurrentUpdate
+from idpyoidc.util import instantiate
 from idpyoidc.util import rndstr
 from .grant import Grant
 from .info import NodeInfo
+from .shared import SHARED_ATTRIBUTES
+from .shared import SharedItems
 
 logger = logging.getLogger(__name__)
 
 
 class Database(ImpExp):
     parameter = {"db": DLDict, "crypt_config": {}}
+    # How many times a node above the leaf is stored again after a concurrent update
+    concurrent_update_retries = 3
 
     def __init__(self, crypt_config: Optional[dict] = None, **kwargs):
         ImpExp.__init__(self)
@@ -34,7 +41,7 @@ class Database(ImpExp):
         if crypt_config is None:
             crypt_config = default_crypt_config()
 
-        _crypt = init_encrypter(crypt_config)
+        _crypt = init_encrypter(crypt_config, lazy=kwargs.get("lazy_init", False))
         self.crypt = _crypt["encrypter"]
         self.crypt_config = _crypt["conf"]
 
@@ -42,6 +49,17 @@ class Database(ImpExp):
         self.node_type = session_params.get("node_type")
         self.node_info_class = session_params.get("node_info_class")
 
+        # A store shared between processes. Writes are compare-and-swap.
+        _storage = session_params.get("storage")
+        if _storage:
+            if isinstance(_storage, dict):
+                _storage = instantiate(_storage["class"], **_storage.get("kwargs", {}))
+            self.db = VersionedDLDict(store=_storage)
+
+        # Authorization requests and authentication events are stored once. Not so in a
+        # shared store, where other processes may remove grants.
+        self.shared = SharedItems()
+
     @staticmethod
     def branch_key(*args):
         """Construct a key using a list of names"""
@@ -86,39 +104,98 @@ class Database(ImpExp):
 
         _len = len(path)
 
-        _superior = None
+        _branch = []
         for i in range(_len):
             _key = self.branch_key(*path[0 : i + 1])
             # _key = path[i]
             _info = self.db.get(_key)
-            if _info is None:
-                if i == _len - 1:
-                    _info = value
+            _changed = True
+            if i == _len - 1:
+                _info = value  # overwrite old value
+            elif _info is None:
+                if self.node_type:
+                    try:
+                        _cls = self.node_info_class[self.node_type[i]]
+                    except KeyError:
+                        raise ValueError("Missing node info class definition")
                 else:
-                    if self.node_type:
-                        try:
-                            _cls = self.node_info_class[self.node_type[i]]
-                        except KeyError:
-                            raise ValueError("Missing node info class definition")
-                    else:
-                        _cls = NodeInfo
-                    _info = _cls(path[i])
+                    _cls = NodeInfo
+                _info = _cls(path[i])
             else:
-                if i == _len - 1:
-                    _info = value  # overwrite old value
-
-            if _superior:
-                if _key not in getattr(_superior, "subordinate", {}):
-                    _superior.add_subordinate(_key)
+                _changed = False
+
+            if _branch:
+                _superior = _branch[-1]
+                if _key not in getattr(_superior[1], "subordinate", {}):
+                    _superior[1].add_subordinate(_key)
+                    _superior[2] = True
+
+            _branch.append([_key, _info, _changed])
+
+        if isinstance(value, Grant) and not isinstance(self.db, VersionedDLDict):
+            self.shared.share(_branch[-1][0], value)
+
+        # Store from the leaf and upwards so a superior never points to a
+        # subordinate that is not there.
+        _leaf_key = _branch[-1][0]
+        _new_leaf = getattr(value, "revision", 0) == 0
+        self.db[_leaf_key] = value
+        _sub = _leaf_key
+        _created = False
+        for _key, _info, _changed in reversed(_branch[:-1]):
+            if _changed or _created:
+                try:
+                    _created = self._set_superior(_key, _info, _sub)
+                except ConcurrentUpdate:
+                    # Don't leave a new node behind that nothing points to
+                    if _new_leaf:
+                        self.db.__delitem__(_leaf_key)
+                    raise
+            _sub = _key
 
-            self.db[_key] = _info
-            _superior = _info
+    def _set_superior(self, key: str, info: NodeInfo, subordinate: str) -> bool:
+        """
+        Store a node above the leaf. Such a node is only changed by adding a subordinate.
+        If someone else stored the node in the meantime the subordinate is added to
+        their version instead.
+
+        :param key: The key of the node
+        :param info: The node
+        :param subordinate: The key of the subordinate that was added
+        :return: True if the node had been removed by someone else and was created again
+        """
+        _created = False
+        _attempt = 0
+        while True:
+            info.add_subordinate(subordinate)
+            try:
+                self.db[key] = info
+                return _created
+            except ConcurrentUpdate:
+                _attempt += 1
+                if _attempt > self.concurrent_update_retries:
+                    raise
+                logger.debug(f"Concurrent update of {key}, retry number {_attempt}")
+
+            _stored = self.db.get(key)
+            if _stored is None:
+                # Removed by someone else, together with its subordinates
+                info.revision = 0
+                info.subordinate = []
+                _created = True
+            else:
+                info = _stored
+                _created = False
 
     def get(self, path: List[str]) -> Union[NodeInfo, Grant]:
         """Given a path return the node that matches the path."""
         _key = self.branch_key(*path)
         return self.db[_key]
 
+    def _delete(self, key: str):
+        self.db.__delitem__(key)
+        self.shared.discard(key)
+
     def delete_sub_tree(self, key: str):
         """
         Removes all a node and all its subordinates
@@ -131,7 +208,7 @@ class Database(ImpExp):
             for _sub in _node.subordinate:
                 self.delete_sub_tree(_sub)
 
-        self.db.__delitem__(key)
+        self._delete(key)
 
     def delete(self, path: List[str]):
         """
@@ -146,7 +223,7 @@ class Database(ImpExp):
             return
 
         if len(path) == 1:
-            self.db.__delitem__(path[0])
+            self._delete(path[0])
             return
 
         # start at leaf and work our way upwards
@@ -163,14 +240,15 @@ class Database(ImpExp):
                     if _sub in _node.subordinate:
                         _node.subordinate.remove(_sub)
                         if _node.subordinate == []:
-                            self.db.__delitem__(_key)
+                            self._delete(_key)
                         else:
+                            self.db[_key] = _node
                             return
                 else:
                     if isinstance(_node, NodeInfo) and _node.subordinate:
                         for _s in _node.subordinate:
                             self.delete_sub_tree(_s)
-                    self.db.__delitem__(_key)
+                    self._delete(_key)
             _sub = _key
 
     def update(self, path: List[str], new_info: dict):
@@ -180,7 +258,55 @@ class Database(ImpExp):
         self.set(path, _info)
 
     def flush(self):
-        self.db = DLDict()
+        if isinstance(self.db, VersionedDLDict):
+            self.db.flush()
+        else:
+            self.db = DLDict()
+        self.shared = SharedItems()
+
+    def dump(self, exclude_attributes: Optional[List[str]] = None) -> dict:
+        info = ImpExp.dump(self, exclude_attributes=exclude_attributes)
+        if not self.shared.refs or "db" not in info:
+            return info
+
+        # Grants refer to the shared items by hash
+        for _key, _refs in self.shared.refs.items():
+            _spec = info["db"].get(_key)
+            if _spec is None:
+                continue
+            for attr, _hash in _refs.items():
+                if attr in _spec[1]:
+                    _spec[1][attr] = _hash
+        info["shared"] = self.shared.dump()
+        return info
+
+    def load(self, item: dict, init_args: Optional[dict] = None, load_args: Optional[dict] = None):
+        _shared = item.get("shared")
+        _refs = {}
+        if _shared and "db" in item:
+            # Take out the references, the grants are given the shared items afterwards
+            _db = {}
+            for _key, (_cls, _spec) in item["db"].items():
+                _ref = {k: _spec[k] for k in SHARED_ATTRIBUTES if isinstance(_spec.get(k), str)}
+                if _ref:
+                    _refs[_key] = _ref
+                    _spec = {k: v for k, v in _spec.items() if k not in _ref}
+                _db[_key] = [_cls, _spec]
+            item = dict(item, db=_db)
+
+        ImpExp.load(self, item, init_args=init_args, load_args=load_args)
+
+        self.shared = SharedItems()
+        if isinstance(self.db, VersionedDLDict):
+            return self
+
+        if _shared:
+            self.shared.load(_shared)
+        for _key, _node in self.db.items():
+            if isinstance(_node, Grant):
+                self.shared.share(_key, _node, _refs.get(_key))
+        self.shared.collect()
+        return self
 
     def local_load_adjustments(self, **kwargs):
         _crypt = init_encrypter(self.crypt_config)
@@ -74,7 +74,11 @@ def token_map_dump(info: dict, **kwargs):
 
 
 def token_map_load(items: dict, **kwargs):
-    return {k: importer(v) for k, v in items.items()}
+    _map = {k: importer(v) for k, v in items.items()}
+    # Most grants use the default
+    if _map == TOKEN_MAP:
+        return TOKEN_MAP
+    return _map
 
 
 def remember_token(token):
@@ -82,6 +86,24 @@ def remember_token(token):
 
 
 class Grant(Item):
+    # __dict__ since the authorization handler may add any attribute
+    __slots__ = (
+        "authentication_event",
+        "authorization_details",
+        "authorization_request",
+        "claims",
+        "extra",
+        "id",
+        "issued_token",
+        "remember_token",
+        "remove_inactive_token",
+        "resources",
+        "revision",
+        "scope",
+        "sub",
+        "token_map",
+        "__dict__",
+    )
     parameter = Item.parameter.copy()
     parameter.update(
         {
@@ -90,6 +112,7 @@ class Grant(Item):
             "authorization_request": AuthorizationRequest,
             "claims": {},
             "extra": {},
+            "id": "",
             "issued_token": [SessionToken],
             "resources": [],
             "scope": [],
@@ -122,6 +145,7 @@ class Grant(Item):
         extra: Optional[Dict[str, str]] = None,
         remember_token: Optional[Callable] = None,
         remove_inactive_token: Optional[bool] = False,
+        id: Optional[str] = "",
     ):
         Item.__init__(
             self,
@@ -138,11 +162,13 @@ class Grant(Item):
         self.claims = claims or {}  # default is to not release any user information
         self.resources = resources or []
         self.issued_token = issued_token or []
-        self.id = uuid1().hex
+        self.id = id or uuid1().hex
         self.sub = sub
         self.extra = extra or {}
         self.remember_token = remember_token
         self.remove_inactive_token = remove_inactive_token
+        # Bumped by a versioned store every time the grant is written
+        self.revision = 0
 
         if token_map is None:
             self.token_map = TOKEN_MAP
@@ -293,8 +319,8 @@ class Grant(Item):
         else:
             _base_on_ref = None
 
-        if usage_rules is None and token_class in self.usage_rules:
-            usage_rules = self.usage_rules[token_class]
+        if usage_rules is None and token_class in self.shared_usage_rules():
+            usage_rules = self.shared_usage_rules()[token_class]
 
         if claims:  # convert list to claims specification dict
             claims = {x: None for x in claims}
@@ -361,6 +387,11 @@ class Grant(Item):
             if token_class == "id_token":
                 item.session_id = session_id
 
+            _status_list = context.session_manager.status_list
+            if _status_list and token_class in _status_list.token_class:
+                item.status_index = _status_list.allocate()
+                handler_args["status"] = _status_list.reference(item.status_index)
+
             token_payload = self.payload_arguments(
                 session_id,
                 context,
@@ -392,33 +423,61 @@ class Grant(Item):
 
     def revoke_token(
         self, value: Optional[str] = "", based_on: Optional[str] = "", recursive: bool = True
-    ):
-        remain = []
-        for t in self.issued_token:
-            if not value and not based_on:
-                t.revoked = True
-            elif value and based_on:
-                if value == t.value and based_on == t.based_on:
-                    t.revoked = True
-            elif value and t.value == value:
-                t.revoked = True
-                if recursive:
-                    self.revoke_token(based_on=t.value)
-            elif based_on and t.based_on == based_on:
+    ) -> int:
+        """
+        Revokes tokens. Which ones is decided by the token value and/or the value of the
+        token it was based on. If neither is given all tokens are revoked.
+
+        :param value: The value of the token
+        :param based_on: The value of the token the tokens was minted based on
+        :param recursive: Also revoke all the tokens that was minted based on a revoked
+            token, and the tokens based on those and so on.
+        :return: The number of tokens that were revoked
+        """
+        if not value and not based_on:
+            _hit = self.issued_token
+            recursive = False
+        elif value and based_on:
+            _hit = [t for t in self.issued_token if t.value == value and t.based_on == based_on]
+            recursive = False
+        elif value:
+            _hit = [t for t in self.issued_token if t.value == value]
+        else:
+            _hit = [t for t in self.issued_token if t.based_on == based_on]
+
+        if recursive and _hit:
+            # token value -> the tokens based on it
+            _derived = {}
+            for t in self.issued_token:
+                if t.based_on:
+                    _derived.setdefault(t.based_on, []).append(t)
+            _seen = set()
+            _queue = list(_hit)
+            _hit = []
+            while _queue:
+                t = _queue.pop()
+                if id(t) in _seen:
+                    continue
+                _seen.add(id(t))
+                _hit.append(t)
+                _queue.extend(_derived.get(t.value, []))
+
+        _count = 0
+        for t in _hit:
+            if not t.revoked:
                 t.revoked = True
-                if recursive:
-                    self.revoke_token(based_on=t.value)
+                _count += 1
 
-            if t.revoked:
-                if self.remove_inactive_token:
+        if self.remove_inactive_token:
+            remain = []
+            for t in self.issued_token:
+                if t.revoked:
                     if self.remember_token:
                         self.remember_token(t)
                 else:
                     remain.append(t)
-            else:
-                remain.append(t)
-
-        self.issued_token = remain
+            self.issued_token = remain
+        return _count
 
     def get_spec(self, token: SessionToken) -> Optional[dict]:
         if self.is_active() is False or token.is_active is False:
@@ -473,8 +532,10 @@ def get_usage_rules(token_type, context, grant, client_id):
     if not _usage:
         _usage = DEFAULT_USAGE[token_type]
 
-    _grant_usage = grant.usage_rules.get(token_type)
+    _grant_usage = grant.shared_usage_rules().get(token_type)
     if _grant_usage:
+        # Neither the defaults nor the grant's rules should be modified
+        _usage = dict(_usage)
         _usage.update(_grant_usage)
 
     return _usage
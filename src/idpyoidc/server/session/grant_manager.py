@@ -49,6 +49,21 @@ class GrantManager(Database):
         self.token_handler = handler
         self.remember_token = remember_token
         self.remove_inactive_token = remove_inactive_token
+        # Called with the key of a branch when the branch, or a part of it, has been
+        # revoked or removed.
+        self.revocation_listeners = []
+
+    def add_revocation_listener(self, func: Callable):
+        """
+        Register a function that wants to know about revocations.
+
+        :param func: A function that is called with a branch key as argument
+        """
+        self.revocation_listeners.append(func)
+
+    def _revoked(self, key: str):
+        for func in self.revocation_listeners:
+            func(key)
 
     def get_salt(self):
         """returns the original salt assigned in init"""
@@ -211,12 +226,21 @@ class GrantManager(Database):
         grant = self[branch_id]
         return getattr(grant, arg)
 
-    def _revoke_tree(self, node):
+    def _revoke_tree(self, node, key: Optional[str] = "") -> int:
+        """
+        Revokes a node and all nodes below it.
+
+        :return: The number of grants that were not already revoked
+        """
+        _count = 1 if isinstance(node, Grant) and not node.revoked else 0
         node.revoke()
+        if key:  # make sure the change is stored
+            self.db[key] = node
         if isinstance(node, NodeInfo):
             for _sub in node.subordinate:
                 _sub_node = self.db[_sub]
-                self._revoke_tree(_sub_node)
+                _count += self._revoke_tree(_sub_node, _sub)
+        return _count
 
     def revoke_sub_tree(self, branch_id: str, level: Optional[int] = None):
         """
@@ -226,13 +250,13 @@ class GrantManager(Database):
         :param level: the node number
         """
         _path = self.decrypt_branch_id(branch_id)
-        if level is None:
-            _node = self.get(_path)
-        else:
+        if level is not None:
             if level > len(_path):
                 raise ValueError("Looking for level beyond what is available")
-            _node = self.get(_path[0 : level + 1])
-        self._revoke_tree(_node)
+            _path = _path[0 : level + 1]
+        _key = self.branch_key(*_path)
+        self._revoke_tree(self.get(_path), _key)
+        self._revoked(_key)
 
     def _grants(self, path):
         _res = []
@@ -276,6 +300,11 @@ class GrantManager(Database):
 
     def remove_branch(self, branch_id: str):
         _path = self.decrypt_branch_id(branch_id)
+        _key = self.branch_key(*_path)
+        if self.revocation_listeners:
+            # Tokens in a removed branch are as good as revoked
+            self._revoke_tree(self.get(_path), _key)
+            self._revoked(_key)
         self.delete(_path)
 
     def flush(self):
@@ -0,0 +1,97 @@
+"""
+Secondary indexes over the session database.
+
+The session database is a tree keyed by user, client and grant. Finding all the
+sessions a client has, or all the grants issued before a certain time, would mean
+walking the whole tree. The indexes kept here make those lookups proportional to the
+number of hits instead. They are kept in memory, are not part of a dump and are
+rebuilt from the database when needed.
+"""
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+from idpyoidc.server.constant import DIVIDER
+
+
+class SessionIndex(object):
+    def __init__(self, bucket_size: Optional[int] = 3600):
+        """
+        :param bucket_size: The width, in seconds, of the time buckets grants are
+            sorted into based on when they were issued.
+        """
+        self.bucket_size = bucket_size
+        # client_id -> set of client session keys
+        self.client = {}
+        # time bucket -> set of grant keys
+        self.time = {}
+        # grant key -> time bucket
+        self._bucket = {}
+
+    def add(self, path: List[str], issued_at: int):
+        """
+        Adds a grant.
+
+        :param path: The path to the grant, the last two nodes are the client and grant
+        :param issued_at: When the grant was issued
+        """
+        _key = DIVIDER.join(path)
+        if _key in self._bucket:
+            return
+
+        self.client.setdefault(path[-2], set()).add(DIVIDER.join(path[:-1]))
+        _bucket = issued_at // self.bucket_size
+        self.time.setdefault(_bucket, set()).add(_key)
+        self._bucket[_key] = _bucket
+
+    def discard(self, key: str):
+        """
+        Removes a grant.
+
+        :param key: The key of the grant
+        """
+        _bucket = self._bucket.pop(key, None)
+        if _bucket is None:
+            return
+        _keys = self.time.get(_bucket)
+        if _keys is not None:
+            _keys.discard(key)
+            if not _keys:
+                del self.time[_bucket]
+
+    def discard_client_session(self, key: str):
+        """
+        Removes a client session.
+
+        :param key: The key of the client session
+        """
+        _client_id = key.split(DIVIDER)[-1]
+        _keys = self.client.get(_client_id)
+        if _keys is not None:
+            _keys.discard(key)
+            if not _keys:
+                del self.client[_client_id]
+
+    def client_sessions(self, client_id: str) -> List[str]:
+        """
+        :param client_id: Client ID
+        :return: The keys of all client sessions the client has
+        """
+        return list(self.client.get(client_id, []))
+
+    def issued_before(self, timestamp: int) -> Iterator[tuple]:
+        """
+        Finds grants that may have been issued before a certain time.
+
+        :param timestamp: Seconds since the epoch
+        :return: Iterator over (grant keys, exact) tuples. If exact is False the grants
+            in that bucket must be checked one by one.
+        """
+        _limit = timestamp // self.bucket_size
+        for _bucket in sorted(b for b in self.time.keys() if b <= _limit):
+            yield list(self.time[_bucket]), _bucket < _limit
+
+    def clear(self):
+        self.client = {}
+        self.time = {}
+        self._bucket = {}
@@ -5,6 +5,8 @@ from idpyoidc.impexp import ImpExp
 
 
 class NodeInfo(ImpExp):
+    # __dict__ since Database.update may add any attribute
+    __slots__ = ("extra_args", "id", "revision", "revoked", "subordinate", "type", "__dict__")
     parameter = {"subordinate": [], "revoked": bool, "type": "", "extra_args": {}, "id": ""}
 
     def __init__(
@@ -21,6 +23,8 @@ class NodeInfo(ImpExp):
         self.revoked = revoked
         self.type = type
         self.extra_args = {}
+        # Bumped by a versioned store every time the node is written
+        self.revision = 0
 
     def add_subordinate(self, value: str) -> "NodeInfo":
         if value not in self.subordinate:
@@ -43,6 +47,8 @@ class NodeInfo(ImpExp):
 
 
 class UserSessionInfo(NodeInfo):
+    __slots__ = ()
+
     def __init__(self, id: Optional[str] = "", **kwargs):
         NodeInfo.__init__(self, id, **kwargs)
         self.type = "UserSessionInfo"
@@ -50,6 +56,8 @@ class UserSessionInfo(NodeInfo):
 
 
 class ClientSessionInfo(NodeInfo):
+    __slots__ = ()
+
     def __init__(self, id: Optional[str] = "", **kwargs):
         NodeInfo.__init__(self, id, **kwargs)
         self.type = "ClientSessionInfo"
@@ -1,27 +1,36 @@
 import hashlib
 import logging
 import os
+import time
 from typing import Callable
 from typing import List
 from typing import Optional
 import uuid
 
 from idpyoidc.encrypter import default_crypt_config
+from idpyoidc.item import VersionedDLDict
 from idpyoidc.message.oauth2 import AuthorizationRequest
 from idpyoidc.message.oauth2 import TokenExchangeRequest
 from idpyoidc.server.authn_event import AuthnEvent
+from idpyoidc.server.constant import DIVIDER
 from idpyoidc.server.exception import ConfigurationError
 from idpyoidc.server.session.grant_manager import GrantManager
+from idpyoidc.util import instantiate
 from idpyoidc.util import rndstr
 from .database import Database
 from .grant import Grant
 from .grant import SessionToken
+from .index import SessionIndex
 from .info import ClientSessionInfo
 from .info import UserSessionInfo
+from .shared import copy_item
+from .subject import CACHEABLE_SUB_TYPES
+from .subject import SubjectCache
 from ..token import UnknownToken
 from ..token import WrongTokenClass
 from ..token import handler
 from ..token.handler import TokenHandler
+from ..token.status_list import StatusList
 
 logger = logging.getLogger(__name__)
 
@@ -79,6 +88,7 @@ def ephemeral_id(*args, **kwargs):
 
 class SessionManager(GrantManager):
     parameter = Database.parameter.copy()
+    parameter.update({"status_list": StatusList})
     # parameter.update({"salt": ""})
     init_args = ["handler"]
 
@@ -127,9 +137,49 @@ class SessionManager(GrantManager):
                 self.sub_func["pairwise"] = pairwise_id
             if "ephemeral" not in sub_func:
                 self.sub_func["ephemeral"] = ephemeral_id
+        self.subject = SubjectCache(self.sub_func, session_params.get("subject_cache_size", 10000))
 
         self.auth_req_id_map = {}
 
+        # Publication of revoked tokens
+        _status_list = session_params.get("status_list")
+        if _status_list and isinstance(self.db, VersionedDLDict):
+            # Indexes and bits are kept per process, processes sharing a store would
+            # hand out the same index and publish different lists.
+            raise ConfigurationError("status_list can not be used with a shared storage")
+        if _status_list:
+            self.status_list = instantiate(
+                _status_list.get("class", StatusList), **_status_list.get("kwargs", {})
+            )
+            self.add_revocation_listener(self._update_status_list)
+        else:
+            self.status_list = None
+
+        # Secondary indexes used by the bulk operations
+        self._index = SessionIndex(session_params.get("index_bucket_size", 3600))
+        # A shared store may have been changed by others, then the index must be rebuilt
+        self._index_ready = not isinstance(self.db, VersionedDLDict)
+
+    def _update_status_list(self, key: str, revoked: Optional[bool] = False):
+        """
+        Marks all revoked tokens below a node in the status list.
+
+        :param key: The branch key of the node
+        :param revoked: Whether a node above this one has been revoked
+        """
+        _node = self.db.get(key)
+        if _node is None:
+            return
+
+        revoked = revoked or _node.revoked
+        if isinstance(_node, Grant):
+            for _token in _node.issued_token:
+                if _token.status_index is not None and (revoked or _token.revoked):
+                    self.status_list.revoke(_token.status_index)
+        else:
+            for _sub in _node.subordinate:
+                self._update_status_list(_sub, revoked)
+
     def get_user_info(self, uid: str) -> UserSessionInfo:
         usi = self.get([uid])
         if isinstance(usi, UserSessionInfo):
@@ -197,9 +247,7 @@ class SessionManager(GrantManager):
             token_usage_rules=token_usage_rules,
             authorization_request=auth_req,
             authentication_event=authn_event,
-            sub=self.sub_func[sub_type](
-                user_id, salt=self.get_salt(), sector_identifier=sector_identifier
-            ),
+            sub=self.subject(sub_type, user_id, sector_identifier, salt=self.get_salt()),
             usage_rules=token_usage_rules,
             scope=scopes,
             claims=_claims,
@@ -208,6 +256,47 @@ class SessionManager(GrantManager):
             resources=resources,
         )
 
+    def subjects(
+        self,
+        uids: List[str],
+        sector_identifiers: Optional[List[str]] = None,
+        sub_type: Optional[str] = "public",
+    ) -> dict:
+        """
+        Computes the subject identifiers for a number of users and sectors.
+
+        :param uids: User IDs
+        :param sector_identifiers: Sector identifiers, only used by pairwise subject
+            identifiers
+        :param sub_type: The type of subject identifier
+        :return: A dictionary with (user ID, sector identifier) as keys and subject
+            identifiers as values
+        """
+        return self.subject.batch(sub_type, uids, sector_identifiers or [""], salt=self.get_salt())
+
+    def find_user_id(self, sub: str, sub_type: Optional[str] = "") -> Optional[str]:
+        """
+        Finds the user a subject identifier belongs to. If it's not one of the
+        remembered subject identifiers the grants in the session database are searched.
+
+        :param sub: Subject identifier
+        :param sub_type: The type of subject identifier, if not given any type
+        :return: User ID or None if not found
+        """
+        for _type in [sub_type] if sub_type else CACHEABLE_SUB_TYPES:
+            _found = self.subject.user_id(_type, sub)
+            if _found:
+                return _found[0]
+
+        _len = len(self.node_type)
+        for _key in list(self.db.keys()):
+            if _key.count(DIVIDER) != _len - 1:
+                continue
+            _grant = self.db.get(_key)
+            if isinstance(_grant, Grant) and _grant.sub == sub:
+                return self.unpack_branch_key(_key)[0]
+        return None
+
     def create_exchange_grant(
         self,
         exchange_request: TokenExchangeRequest,
@@ -361,14 +450,18 @@ class SessionManager(GrantManager):
         :param recursive: Revoke all tokens that was minted using this token or
             tokens minted by this token. Recursively.
         """
-        token = self.find_token(session_id, token_value)
+        _path = self.decrypt_branch_id(session_id)
+        grant = self.get(_path)
+        token = grant.get_token(token_value)
         if token is None:  # pragma: no cover
             raise UnknownToken()
 
         token.revoked = True
         if recursive:  # TODO: not covered yet!
-            grant = self[session_id]
             grant.revoke_token(value=token.value)
+        # make sure the change is stored
+        self.set(_path, grant)
+        self._revoked(self.branch_key(*_path))
 
     def get_authentication_events(
         self,
@@ -392,7 +485,7 @@ class SessionManager(GrantManager):
             raise AttributeError("Must have session_id or user_id and client_id")
 
         _grants = [self.get(self.unpack_branch_key(gid)) for gid in c_info.subordinate]
-        return [g.authentication_event for g in _grants]
+        return [copy_item(g.authentication_event) for g in _grants]
 
     def get_authorization_request(self, session_id):
         res = self.get_session_info(session_id=session_id, authorization_request=True)
@@ -421,7 +514,139 @@ class SessionManager(GrantManager):
 
         :param session_id: A session identifier
         """
-        self._revoke_tree(self.get_grant(session_id))
+        _path = self.decrypt_branch_id(session_id)
+        _key = self.branch_key(*_path)
+        self._revoke_tree(self.get(_path), _key)
+        self._revoked(_key)
+
+    def revoke_sessions(
+        self,
+        user_id: Optional[str] = "",
+        client_id: Optional[str] = "",
+        session_id: Optional[str] = "",
+    ) -> int:
+        """
+        Revokes all grants given by a user, to a client, by a user to a client or the
+        grant pointed to by a session identifier. Every subtree is walked once and
+        whoever listens for revocations is told once per subtree.
+
+        :param user_id: User ID
+        :param client_id: Client ID
+        :param session_id: A session identifier
+        :return: The number of grants that were revoked
+        """
+        if session_id:
+            _keys = [self.branch_key(*self.decrypt_branch_id(session_id))]
+        elif user_id and client_id:
+            _keys = [self.branch_key(user_id, client_id)]
+        elif user_id:
+            return self.revoke_by_user(user_id)
+        elif client_id:
+            return self.revoke_by_client(client_id)
+        else:
+            raise AttributeError("Must have session_id, user_id or client_id")
+
+        return self._revoke_batches(_keys)
+
+    def _get_index(self) -> SessionIndex:
+        if not self._index_ready:
+            self._index.clear()
+            _len = len(self.node_type)
+            for _key in list(self.db.keys()):
+                if _key.count(DIVIDER) != _len - 1:
+                    continue
+                _grant = self.db.get(_key)
+                if isinstance(_grant, Grant):
+                    self._index.add(self.unpack_branch_key(_key), _grant.issued_at)
+            self._index_ready = not isinstance(self.db, VersionedDLDict)
+        return self._index
+
+    def _revoke_batches(self, keys: List[str], batch_size: Optional[int] = 1000) -> int:
+        _count = 0
+        for i in range(0, len(keys), batch_size):
+            for _key in keys[i : i + batch_size]:
+                _node = self.db.get(_key)
+                if _node is None:
+                    self._index.discard_client_session(_key)
+                    continue
+                _count += self._revoke_tree(_node, _key)
+                self._revoked(_key)
+            # Let other threads in between batches
+            time.sleep(0)
+        return _count
+
+    def revoke_by_user(self, user_id: str, batch_size: Optional[int] = 1000) -> int:
+        """
+        Revokes all the client sessions, and the grants below them, of a user.
+
+        :param user_id: User ID
+        :param batch_size: The number of client sessions revoked in one go
+        :return: The number of grants that were revoked
+        """
+        _user = self.db.get(user_id)
+        if _user is None:
+            return 0
+        return self._revoke_batches(list(_user.subordinate), batch_size)
+
+    def revoke_by_client(self, client_id: str, batch_size: Optional[int] = 1000) -> int:
+        """
+        Revokes all the sessions a client has, whoever the user.
+
+        :param client_id: Client ID
+        :param batch_size: The number of client sessions revoked in one go
+        :return: The number of grants that were revoked
+        """
+        return self._revoke_batches(self._get_index().client_sessions(client_id), batch_size)
+
+    def purge_older_than(self, timestamp: int, batch_size: Optional[int] = 1000) -> int:
+        """
+        Removes all grants issued before a certain time. Client sessions and users that
+        are left without grants are removed too.
+
+        :param timestamp: Seconds since the epoch
+        :param batch_size: The number of grants removed in one go
+        :return: The number of grants that were removed
+        """
+        _count = 0
+        for _keys, _exact in self._get_index().issued_before(timestamp):
+            for i in range(0, len(_keys), batch_size):
+                for _key in _keys[i : i + batch_size]:
+                    _grant = self.db.get(_key)
+                    if _grant is None:
+                        self._index.discard(_key)
+                        continue
+                    if not _exact and _grant.issued_at >= timestamp:
+                        continue
+                    if self.revocation_listeners:
+                        # Tokens in a removed branch are as good as revoked
+                        self._revoke_tree(_grant, _key)
+                        self._revoked(_key)
+                    self.delete(self.unpack_branch_key(_key))
+                    _count += 1
+                time.sleep(0)
+        return _count
+
+    def set(self, path: List[str], value):
+        super().set(path, value)
+        if isinstance(value, Grant) and len(path) == len(self.node_type):
+            self._index.add(path, value.issued_at)
+
+    def delete(self, path: List[str]):
+        super().delete(path)
+        if len(path) == len(self.node_type):
+            self._index.discard(self.branch_key(*path))
+            _client_key = self.branch_key(*path[:-1])
+            if _client_key not in self.db:
+                self._index.discard_client_session(_client_key)
+
+    def flush(self):
+        super().flush()
+        self._index.clear()
+        self._index_ready = not isinstance(self.db, VersionedDLDict)
+
+    def local_load_adjustments(self, **kwargs):
+        super().local_load_adjustments(**kwargs)
+        self._index_ready = False
 
     # def grants(
     #         self,
@@ -470,11 +695,12 @@ class SessionManager(GrantManager):
         """
         res = self.branch_info(session_id)
 
+        # These may be shared with other grants, the caller is given a copy to modify
         if authentication_event:
-            res["authentication_event"] = res["grant"].authentication_event
+            res["authentication_event"] = copy_item(res["grant"].authentication_event)
 
         if authorization_request:
-            res["authorization_request"] = res["grant"].authorization_request
+            res["authorization_request"] = copy_item(res["grant"].authorization_request)
 
         return res
 
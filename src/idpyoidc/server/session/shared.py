@@ -0,0 +1,149 @@
+"""
+Content addressed storage of what grants have in common.
+
+A user that logs in to the same client again and again gets grants with equal
+authorization requests, and the grants created after one login share the
+authentication event. Here each distinct item is kept once, addressed by a hash of its
+serialised form and counted by the grants that refer to it. An item that no grant
+refers to anymore is removed. In a dump the grants refer to the items by hash.
+
+A shared item must not be modified. SessionManager gives whoever asks for the
+authorization request or the authentication event of a session a copy.
+"""
+import base64
+import hashlib
+import json
+from typing import Dict
+from typing import Optional
+
+from cryptojwt import as_unicode
+from cryptojwt.utils import importer
+from cryptojwt.utils import qualified_name
+
+from idpyoidc.message import Message
+
+# The grant attributes that are shared
+SHARED_ATTRIBUTES = ["authorization_request", "authentication_event"]
+
+
+def serialise(item: Message) -> dict:
+    return {qualified_name(item.__class__): item.to_dict()}
+
+
+def deserialise(spec: dict) -> Message:
+    _cls_name, _info = list(spec.items())[0]
+    return importer(_cls_name)().from_dict(_info)
+
+
+def copy_item(item: Optional[Message]) -> Optional[Message]:
+    """
+    A shared item must not be modified, a copy of it can.
+
+    :param item: An item that may be shared by many grants
+    :return: A copy of the item
+    """
+    if item is None:
+        return None
+    return item.copy()
+
+
+def content_hash(spec: dict) -> str:
+    # 128 bits is plenty, and keeps the references in a dump short
+    _digest = hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).digest()
+    return as_unicode(base64.urlsafe_b64encode(_digest[:16]).rstrip(b"="))
+
+
+class SharedItems(object):
+    def __init__(self):
+        # hash -> [item, number of grants referring to it]
+        self.item = {}
+        # grant key -> {attribute: hash}
+        self.refs = {}
+        # id(item) -> hash. So a shared item isn't hashed again.
+        self._hash = {}
+
+    def add(self, item: Message, hash: Optional[str] = "", spec: Optional[dict] = None):
+        """
+        Adds a reference to an item.
+
+        :param item: The item, not needed if the hash is known
+        :param hash: The hash of the serialised item
+        :param spec: The serialised item
+        :return: A tuple of the hash and the shared item
+        """
+        if not hash:
+            hash = self._hash.get(id(item))
+            if hash is None:
+                spec = serialise(item)
+                hash = content_hash(spec)
+
+        _entry = self.item.get(hash)
+        if _entry is None:
+            # A copy of its own, so it's not changed by whoever created the item. A deep
+            # copy shares the strings with the item, a deserialised one would not.
+            _copy = deserialise(spec) if item is None else item.copy()
+            _entry = self.item[hash] = [_copy, 0]
+            self._hash[id(_entry[0])] = hash
+        else:
+            # Every reference uses the same string
+            hash = self._hash[id(_entry[0])]
+        _entry[1] += 1
+        return hash, _entry[0]
+
+    def release(self, hash: str):
+        _entry = self.item.get(hash)
+        if _entry is None:
+            return
+        _entry[1] -= 1
+        if _entry[1] <= 0:
+            del self.item[hash]
+            del self._hash[id(_entry[0])]
+
+    def share(self, key: str, grant, refs: Optional[Dict[str, str]] = None):
+        """
+        Replaces the items of a grant with shared ones.
+
+        :param key: The key of the grant in the session database
+        :param grant: A Grant instance
+        :param refs: Attribute name and hash of items already known to be shared
+        """
+        _refs = {}
+        for attr in SHARED_ATTRIBUTES:
+            if refs and attr in refs:
+                _hash, _item = self.add(None, hash=refs[attr])
+            else:
+                _item = getattr(grant, attr, None)
+                if not isinstance(_item, Message):
+                    continue
+                _hash, _item = self.add(_item)
+            setattr(grant, attr, _item)
+            _refs[attr] = _hash
+
+        # The grant may have been stored before
+        self.discard(key)
+        if _refs:
+            self.refs[key] = _refs
+
+    def discard(self, key: str):
+        """
+        Removes the references a grant has.
+
+        :param key: The key of the grant in the session database
+        """
+        for _hash in self.refs.pop(key, {}).values():
+            self.release(_hash)
+
+    def collect(self):
+        """Removes the items no grant refers to."""
+        for _hash in [k for k, (_item, _count) in self.item.items() if _count <= 0]:
+            self.release(_hash)
+
+    def dump(self) -> dict:
+        return {_hash: serialise(_item) for _hash, (_item, _count) in self.item.items()}
+
+    def load(self, spec: dict):
+        for _hash, _spec in spec.items():
+            if _hash not in self.item:
+                _item = deserialise(_spec)
+                self.item[_hash] = [_item, 0]
+                self._hash[id(_item)] = _hash
@@ -0,0 +1,162 @@
+"""
+Memory of the subject identifiers that have been computed.
+
+Public and pairwise subject identifiers are hashes over the user ID, the sector
+identifier and a salt. The same ones are needed every time a user logs in to a
+client. Here they are remembered, together with which user a subject identifier
+belongs to. The memory is bounded, the least recently used identifiers are forgotten
+first. If the salt, or the function used to compute the identifiers, changes all the
+identifiers of that type are forgotten.
+"""
+from collections import OrderedDict
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+from typing import Tuple
+
+# Subject types where the same input always gives the same identifier
+CACHEABLE_SUB_TYPES = ["public", "pairwise"]
+
+
+class SubjectCache(object):
+    def __init__(self, sub_func: Dict[str, Callable], size: Optional[int] = 10000):
+        """
+        :param sub_func: Subject type and the function computing subject identifiers of
+            that type. Looked up every time so functions can be replaced.
+        :param size: The largest number of subject identifiers remembered
+        """
+        self.sub_func = sub_func
+        self.size = size
+        # (sub_type, user ID, sector identifier) -> subject identifier
+        self._sub = OrderedDict()
+        # (sub_type, subject identifier) -> (user ID, sector identifier)
+        self._uid = {}
+        # sub_type -> (function, salt) the remembered identifiers were computed with
+        self._basis = {}
+
+    def _check_basis(self, sub_type: str, func: Callable, salt: str):
+        # A function that knows its own salt doesn't use the one it's given
+        _salt = getattr(func, "salt", salt)
+        _old = self._basis.get(sub_type)
+        if _old is not None and _old[0] is func and _old[1] == _salt:
+            return
+        if _old is not None:
+            self.clear(sub_type)
+        self._basis[sub_type] = (func, _salt)
+
+    def _trim(self):
+        while len(self._sub) > self.size:
+            (_type, _uid, _sector), _sub = self._sub.popitem(last=False)
+            self._uid.pop((_type, _sub), None)
+
+    def _remember(self, key: Tuple[str, str, str], sub: str):
+        self._sub[key] = sub
+        self._uid[(key[0], sub)] = (key[1], key[2])
+        if len(self._sub) > self.size:
+            self._trim()
+
+    def __call__(
+        self,
+        sub_type: str,
+        uid: str,
+        sector_identifier: Optional[str] = "",
+        salt: Optional[str] = "",
+    ) -> str:
+        """
+        Returns the subject identifier of a user.
+
+        :param sub_type: The type of subject identifier
+        :param uid: User ID
+        :param sector_identifier: The sector identifier
+        :param salt: Salt used by the function computing the identifier
+        :return: A subject identifier
+        """
+        _func = self.sub_func[sub_type]
+        if sub_type not in CACHEABLE_SUB_TYPES:
+            return _func(uid, salt=salt, sector_identifier=sector_identifier)
+
+        self._check_basis(sub_type, _func, salt)
+        _key = (sub_type, uid, sector_identifier)
+        try:
+            self._sub.move_to_end(_key)
+        except KeyError:
+            _sub = _func(uid, salt=salt, sector_identifier=sector_identifier)
+            self._remember(_key, _sub)
+            return _sub
+        return self._sub[_key]
+
+    def batch(
+        self,
+        sub_type: str,
+        uids: Iterable[str],
+        sector_identifiers: Optional[Iterable[str]] = ("",),
+        salt: Optional[str] = "",
+        remember: Optional[bool] = True,
+    ) -> Dict[Tuple[str, str], str]:
+        """
+        Computes the subject identifiers for a number of users and sectors.
+
+        :param sub_type: The type of subject identifier
+        :param uids: User IDs
+        :param sector_identifiers: Sector identifiers
+        :param salt: Salt used by the function computing the identifiers
+        :param remember: Whether the identifiers should be remembered. A batch larger
+            than the cache pushes out what was there before.
+        :return: A dictionary with (user ID, sector identifier) as keys and subject
+            identifiers as values
+        """
+        _func = self.sub_func[sub_type]
+        if sub_type in CACHEABLE_SUB_TYPES:
+            self._check_basis(sub_type, _func, salt)
+        else:
+            remember = False
+        _sectors = list(sector_identifiers)
+        _known = self._sub
+
+        res = {}
+        _new = {}
+        for _uid in uids:
+            for _sector in _sectors:
+                _sub = _known.get((sub_type, _uid, _sector))
+                if _sub is None:
+                    _sub = _new[(sub_type, _uid, _sector)] = _func(
+                        _uid, salt=salt, sector_identifier=_sector
+                    )
+                res[(_uid, _sector)] = _sub
+
+        if remember and _new:
+            self._sub.update(_new)
+            self._uid.update(((k[0], v), (k[1], k[2])) for k, v in _new.items())
+            self._trim()
+        return res
+
+    def user_id(self, sub_type: str, sub: str) -> Optional[Tuple[str, str]]:
+        """
+        Finds the user a remembered subject identifier belongs to.
+
+        :param sub_type: The type of subject identifier
+        :param sub: Subject identifier
+        :return: A tuple of user ID and sector identifier or None if not known
+        """
+        return self._uid.get((sub_type, sub))
+
+    def clear(self, sub_type: Optional[str] = ""):
+        """
+        Forgets subject identifiers.
+
+        :param sub_type: Only those of this type. If not given all of them.
+        """
+        if not sub_type:
+            self._sub.clear()
+            self._uid.clear()
+            self._basis.clear()
+            return
+
+        for _key in [k for k in self._sub.keys() if k[0] == sub_type]:
+            _sub = self._sub.pop(_key)
+            self._uid.pop((sub_type, _sub), None)
+        self._basis.pop(sub_type, None)
+
+    def __len__(self):
+        return len(self._sub)
@@ -1,4 +1,6 @@
+import copy
 import json
+from typing import List
 from typing import Optional
 from uuid import uuid1
 
@@ -10,7 +12,78 @@ class MintingNotAllowed(Exception):
     pass
 
 
+class SharedUsageRules(dict):
+    """
+    Usage rules shared between grants and tokens. Can not be modified, a copy can.
+    Lists in the rules are kept as tuples.
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Shared usage rules can not be modified, make a copy")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __copy__(self):
+        return _thaw(self)
+
+    def __deepcopy__(self, memo):
+        return _thaw(self, memo)
+
+    def __reduce__(self):
+        return dict, (_thaw(self),)
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return intern_usage_rules(value)
+    elif isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value, memo: Optional[dict] = None):
+    if isinstance(value, dict):
+        return {k: _thaw(v, memo) for k, v in value.items()}
+    elif isinstance(value, tuple):
+        return [_thaw(v, memo) for v in value]
+    return copy.deepcopy(value, memo)
+
+
+# Usage rules are seldom unique, equal rules are represented by the same instance
+_USAGE_RULES = {}
+MAX_INTERNED_USAGE_RULES = 1024
+
+
+def intern_usage_rules(rules: Optional[dict]) -> dict:
+    """
+    Returns a shared, read-only, instance equal to the given usage rules.
+    Nothing in it is shared with the given rules.
+
+    :param rules: Usage rules
+    :return: Usage rules
+    """
+    if rules is None:
+        rules = {}
+    elif isinstance(rules, SharedUsageRules):
+        return rules
+
+    try:
+        _key = json.dumps(rules, sort_keys=True)
+    except TypeError:
+        # Not something that can be compared by value
+        return rules
+
+    _rules = _USAGE_RULES.get(_key)
+    if _rules is None:
+        _rules = SharedUsageRules((k, _freeze(v)) for k, v in rules.items())
+        if len(_USAGE_RULES) < MAX_INTERNED_USAGE_RULES:
+            _rules = _USAGE_RULES.setdefault(_key, _rules)
+    return _rules
+
+
 class Item(ImpExp):
+    __slots__ = ("expires_at", "issued_at", "not_before", "revoked", "_usage_rules", "used")
     parameter = {
         "expires_at": 0,
         "issued_at": 0,
@@ -40,14 +113,40 @@ class Item(ImpExp):
 
         self.revoked = revoked
         self.used = used
-        self.usage_rules = usage_rules or {}
+        self.usage_rules = usage_rules
+
+    @property
+    def usage_rules(self) -> dict:
+        # Whoever asks for the usage rules may modify them, so they get their own copy
+        if isinstance(self._usage_rules, SharedUsageRules):
+            self._usage_rules = copy.deepcopy(self._usage_rules)
+        return self._usage_rules
+
+    @usage_rules.setter
+    def usage_rules(self, rules: Optional[dict]):
+        self._usage_rules = intern_usage_rules(rules)
+
+    def shared_usage_rules(self) -> dict:
+        """
+        The usage rules without making a copy of them. Must not be modified.
+
+        :return: Usage rules
+        """
+        return self._usage_rules
+
+    def dump(self, exclude_attributes: Optional[List[str]] = None) -> dict:
+        _rules = self._usage_rules
+        info = ImpExp.dump(self, exclude_attributes=exclude_attributes)
+        # Dumping doesn't modify the usage rules, keep sharing them
+        self._usage_rules = _rules
+        return info
 
     def set_expires_at(self, expires_in):
         self.expires_at = utc_time_sans_frac() + expires_in
 
     def max_usage_reached(self):
-        if "max_usage" in self.usage_rules:
-            return self.used >= self.usage_rules["max_usage"]
+        if "max_usage" in self._usage_rules:
+            return self.used >= self._usage_rules["max_usage"]
         else:
             return False
 
@@ -76,6 +175,17 @@ class Item(ImpExp):
 
 
 class SessionToken(Item):
+    __slots__ = (
+        "based_on",
+        "claims",
+        "id",
+        "name",
+        "resources",
+        "scope",
+        "status_index",
+        "token_class",
+        "value",
+    )
     parameter = Item.parameter.copy()
     parameter.update(
         {
@@ -85,6 +195,7 @@ class SessionToken(Item):
             "name": "",
             "resources": [],
             "scope": [],
+            "status_index": 0,
             "token_class": "",
             "value": "",
         }
@@ -106,6 +217,7 @@ class SessionToken(Item):
         scope: Optional[list] = None,
         claims: Optional[dict] = None,
         resources: Optional[list] = None,
+        status_index: Optional[int] = None,
     ):
         Item.__init__(
             self,
@@ -126,6 +238,8 @@ class SessionToken(Item):
         self.scope = scope or []
         self.claims = claims or {}  # default is to not release any user information
         self.resources = resources or []
+        # Where in the token status list this token is, if anywhere
+        self.status_index = status_index
         self.name = self.__class__.__name__
 
     def set_defaults(self):
@@ -138,7 +252,7 @@ class SessionToken(Item):
         return self.used != 0
 
     def supports_minting(self, token_class):
-        _supports_minting = self.usage_rules.get("supports_minting")
+        _supports_minting = self._usage_rules.get("supports_minting")
         if _supports_minting is None:
             return False
         else:
@@ -159,6 +273,7 @@ class SessionToken(Item):
 
 
 class AccessToken(SessionToken):
+    __slots__ = ("token_type",)
     parameter = SessionToken.parameter.copy()
     parameter.update({"token_type": ""})
 
@@ -179,6 +294,7 @@ class AccessToken(SessionToken):
         claims: Optional[dict] = None,
         resources: Optional[list] = None,
         token_type: Optional[str] = "bearer",
+        status_index: Optional[int] = None,
     ):
         SessionToken.__init__(
             self,
@@ -196,30 +312,43 @@ class AccessToken(SessionToken):
             scope=scope,
             claims=claims,
             resources=resources,
+            status_index=status_index,
         )
 
         self.token_type = token_type
 
 
 class AuthorizationCode(SessionToken):
+    __slots__ = ()
+
     def set_defaults(self):
-        if "supports_minting" not in self.usage_rules:
-            self.usage_rules["supports_minting"] = [
+        if "supports_minting" in self._usage_rules and self._usage_rules.get("max_usage") == 1:
+            return
+
+        _rules = dict(self._usage_rules)
+        if "supports_minting" not in _rules:
+            _rules["supports_minting"] = [
                 "access_token",
                 "refresh_token",
                 "id_token",
             ]
 
-        self.usage_rules["max_usage"] = 1
+        _rules["max_usage"] = 1
+        self.usage_rules = _rules
 
 
 class RefreshToken(SessionToken):
+    __slots__ = ()
+
     def set_defaults(self):
-        if "supports_minting" not in self.usage_rules:
-            self.usage_rules["supports_minting"] = ["access_token", "refresh_token"]
+        if "supports_minting" not in self._usage_rules:
+            _rules = dict(self._usage_rules)
+            _rules["supports_minting"] = ["access_token", "refresh_token"]
+            self.usage_rules = _rules
 
 
 class IDToken(SessionToken):
+    __slots__ = ("session_id",)
     parameter = SessionToken.parameter.copy()
     parameter.update({"session_id": ""})
 
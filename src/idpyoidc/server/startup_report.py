@@ -0,0 +1,48 @@
+"""
+Keeps track of how long it took to set up the different parts of a server.
+Parts that are built the first time they are used are reported when that happens.
+"""
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+
+class StartupReport(object):
+    def __init__(self):
+        # name -> seconds, in the order the parts were set up
+        self.timing = {}
+        self.lazy = set()
+        # Wall clock time for the whole startup, set by whoever knows it
+        self.total = None
+
+    @contextmanager
+    def measure(self, name: str, lazy: Optional[bool] = False):
+        """
+        Measure how long the block takes.
+
+        :param name: The name of the part of the server that is set up
+        :param lazy: Whether the part is set up at first use rather than at startup
+        """
+        _start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timing[name] = self.timing.get(name, 0.0) + time.perf_counter() - _start
+            if lazy:
+                self.lazy.add(name)
+
+    def startup_time(self) -> float:
+        """
+        :return: The total time, in seconds, spent at startup
+        """
+        if self.total is not None:
+            return self.total
+        return sum(v for k, v in self.timing.items() if k not in self.lazy)
+
+    def __str__(self):
+        _lines = []
+        for _name, _seconds in sorted(self.timing.items(), key=lambda x: x[1], reverse=True):
+            _when = " (first use)" if _name in self.lazy else ""
+            _lines.append(f"{_seconds * 1000:10.2f} ms  {_name}{_when}")
+        _lines.append(f"{self.startup_time() * 1000:10.2f} ms  total at startup")
+        return "\n".join(_lines)
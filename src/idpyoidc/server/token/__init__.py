@@ -86,7 +86,12 @@ class DefaultToken(Token):
         **kwargs
     ):
         Token.__init__(self, token_class, **kwargs)
-        _res = init_encrypter(crypt_conf)
+        _upstream_get = kwargs.get("upstream_get")
+        if _upstream_get:
+            _lazy = _upstream_get("attribute", "lazy_init")
+        else:
+            _lazy = False
+        _res = init_encrypter(crypt_conf, lazy=_lazy)
         self.crypt = _res["encrypter"]
         self.crypt_config = _res["conf"]
         self.token_type = token_type
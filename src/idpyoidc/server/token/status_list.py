@@ -0,0 +1,149 @@
+"""
+A compact, publishable, record of which tokens have been revoked.
+
+Every token that is covered gets an index in a bit string. When a token is revoked the
+corresponding bit is set. The bit string is published, zlib compressed and base64url
+encoded, in the format defined in the IETF OAuth Token Status List draft. A resource
+server that keeps a copy of the list can check the status of JWT access tokens without
+having to do introspection.
+"""
+import base64
+import threading
+import zlib
+from typing import List
+from typing import Optional
+
+from idpyoidc.impexp import ImpExp
+
+VALID = 0
+INVALID = 1
+
+
+def decode(lst: str) -> bytes:
+    """
+    Unpacks a published status list. To be used by a resource server.
+
+    :param lst: The 'lst' value of a status list
+    :return: The bit string
+    """
+    return zlib.decompress(base64.urlsafe_b64decode(lst + "=" * (-len(lst) % 4)))
+
+
+def status(bits: bytes, index: int) -> int:
+    """
+    Reads the status of one token from an unpacked status list.
+
+    :param bits: The bit string as returned by decode()
+    :param index: The index of the token
+    :return: VALID or INVALID
+    """
+    return (bits[index >> 3] >> (index & 7)) & 1
+
+
+class StatusList(ImpExp):
+    parameter = {"lst": "", "size": 0, "token_class": [], "uri": "", "version": 0}
+
+    def __init__(
+        self,
+        token_class: Optional[List[str]] = None,
+        uri: Optional[str] = "",
+        chunk_size: Optional[int] = 1024,
+    ):
+        ImpExp.__init__(self)
+        self.token_class = token_class or ["access_token"]
+        self.uri = uri
+        # Number of bytes the bit string grows with when it's full
+        self.chunk_size = chunk_size
+        self.size = 0
+        self.version = 0
+        self._bits = bytearray()
+        self._encoded = None
+        self._lock = threading.Lock()
+
+    def allocate(self) -> int:
+        """
+        Hands out the next unused index.
+
+        :return: An index into the status list
+        """
+        with self._lock:
+            index = self.size
+            if index >> 3 >= len(self._bits):
+                self._bits.extend(bytes(self.chunk_size))
+            self.size += 1
+        return index
+
+    def set(self, index: int, status: Optional[int] = INVALID):
+        """
+        Sets the status of the token with a specific index.
+
+        :param index: The index of the token
+        :param status: VALID or INVALID
+        """
+        if index < 0 or index >= self.size:
+            raise IndexError(index)
+
+        _mask = 1 << (index & 7)
+        with self._lock:
+            _byte = self._bits[index >> 3]
+            if status == INVALID:
+                _new = _byte | _mask
+            else:
+                _new = _byte & ~_mask
+            if _new != _byte:
+                self._bits[index >> 3] = _new
+                self.version += 1
+
+    def revoke(self, index: int):
+        self.set(index, INVALID)
+
+    def get(self, index: int) -> int:
+        if index < 0 or index >= self.size:
+            raise IndexError(index)
+        return (self._bits[index >> 3] >> (index & 7)) & 1
+
+    def reference(self, index: int) -> dict:
+        """
+        The status claim to place in a token that has been assigned an index.
+
+        :param index: The index of the token
+        :return: A dictionary
+        """
+        return {"status_list": {"idx": index, "uri": self.uri}}
+
+    def snapshot(self):
+        """
+        The bit string, zlib compressed and base64url encoded, together with an ETag
+        for that version. The whole allocated bit string is published so the value only
+        changes when a token is revoked or when the bit string grows. Minting tokens
+        does not invalidate a published copy.
+
+        :return: A (ETag, lst) tuple
+        """
+        with self._lock:
+            _etag = self.etag
+            if self._encoded and self._encoded[0] == _etag:
+                return self._encoded
+            _bits = bytes(self._bits)
+
+        _lst = base64.urlsafe_b64encode(zlib.compress(_bits, 9)).rstrip(b"=").decode()
+        self._encoded = (_etag, _lst)
+        return self._encoded
+
+    @property
+    def lst(self) -> str:
+        return self.snapshot()[1]
+
+    @lst.setter
+    def lst(self, value: str):
+        _bits = decode(value)
+        with self._lock:
+            self._bits = bytearray(_bits)
+            self._encoded = None
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.version}-{len(self._bits)}"'
+
+    def to_dict(self) -> dict:
+        return {"bits": 1, "lst": self.lst}
@@ -116,9 +116,10 @@ class UserAuthnMethod(object):
                 _info = json.loads(val["value"])
                 _info["timestamp"] = int(val["timestamp"])
 
-                # verify session ID
+                # verify session ID, decrypt it only once
                 try:
-                    _context.session_manager[_info["sid"]]
+                    session_id = _context.session_manager.decrypt_session_id(_info["sid"])
+                    _context.session_manager.get(session_id)
                 except (
                     KeyError,
                     ValueError,
@@ -129,7 +130,6 @@ class UserAuthnMethod(object):
                     logger.info(f"Verifying session ID fail due to {err}")
                     return {}
 
-                session_id = _context.session_manager.decrypt_session_id(_info["sid"])
                 logger.debug("cookie_info: session id={}".format(session_id))
 
                 if session_id[1] != client_id:
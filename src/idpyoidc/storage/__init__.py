@@ -1,3 +1,9 @@
 class DictType(object):
     def __init__(self, **kwargs):
         self.kwargs = kwargs
+
+
+class ConcurrentUpdate(Exception):
+    """Raised when a compare-and-swap write finds that someone else updated the item first."""
+
+    pass
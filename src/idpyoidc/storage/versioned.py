@@ -0,0 +1,142 @@
+"""
+Key-value stores where every value carries a revision number.
+
+Writes are compare-and-swap operations: the writer states which revision it based its
+change on and the write is only accepted if that is still the current revision.
+This allows several processes to share one store without a global lock.
+"""
+import logging
+import os
+import sqlite3
+import threading
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from idpyoidc.storage import ConcurrentUpdate
+from idpyoidc.storage import DictType
+
+logger = logging.getLogger(__name__)
+
+
+class VersionedStore(DictType):
+    """
+    Process local, thread safe, versioned store. Mostly useful for testing and as
+    the reference implementation of the interface.
+    """
+
+    def __init__(self, **kwargs):
+        DictType.__init__(self, **kwargs)
+        self._db = {}
+        self._lock = threading.Lock()
+
+    def read(self, key: str) -> Optional[Tuple[int, str]]:
+        """
+        Return the current revision and value bound to a key.
+
+        :param key: The key
+        :return: A (revision, value) tuple or None if the key is unknown
+        """
+        return self._db.get(key)
+
+    def write(self, key: str, value: str, revision: int = 0) -> int:
+        """
+        Bind a value to a key if the current revision of the key is *revision*.
+        Revision 0 means that the key must not exist.
+
+        :param key: The key
+        :param value: The serialized value
+        :param revision: The revision the change is based on
+        :return: The new revision
+        """
+        with self._lock:
+            _cur = self._db.get(key)
+            _rev = _cur[0] if _cur else 0
+            if _rev != revision:
+                raise ConcurrentUpdate(key)
+            self._db[key] = (revision + 1, value)
+        return revision + 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._db.pop(key, None)
+
+    def keys(self) -> List[str]:
+        return list(self._db.keys())
+
+    def clear(self):
+        with self._lock:
+            self._db = {}
+
+
+class SQLiteVersionedStore(VersionedStore):
+    """
+    Versioned store kept in a SQLite database file. Can be shared by any number of
+    processes on the same host.
+    """
+
+    def __init__(self, filename: str = "", table: Optional[str] = "item", timeout: int = 30):
+        DictType.__init__(self, filename=filename, table=table, timeout=timeout)
+        self.filename = filename
+        self.table = table
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+        with self._lock:
+            self._connection().execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                "(key TEXT PRIMARY KEY, revision INTEGER NOT NULL, value TEXT NOT NULL)"
+            )
+
+    def _connection(self):
+        # A connection must never be reused in a forked child process
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(
+                self.filename, timeout=self.timeout, isolation_level=None, check_same_thread=False
+            )
+            self._pid = os.getpid()
+        return self._conn
+
+    def read(self, key: str) -> Optional[Tuple[int, str]]:
+        with self._lock:
+            _row = (
+                self._connection()
+                .execute(f"SELECT revision, value FROM {self.table} WHERE key=?", (key,))
+                .fetchone()
+            )
+        if _row is None:
+            return None
+        return _row[0], _row[1]
+
+    def write(self, key: str, value: str, revision: int = 0) -> int:
+        with self._lock:
+            _conn = self._connection()
+            if revision == 0:
+                _cur = _conn.execute(
+                    f"INSERT OR IGNORE INTO {self.table} (key, revision, value) VALUES (?, 1, ?)",
+                    (key, value),
+                )
+            else:
+                _cur = _conn.execute(
+                    f"UPDATE {self.table} SET revision=?, value=? WHERE key=? AND revision=?",
+                    (revision + 1, value, key, revision),
+                )
+        if _cur.rowcount != 1:
+            logger.debug(f"Concurrent update of {key} based on revision {revision}")
+            raise ConcurrentUpdate(key)
+        return revision + 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._connection().execute(f"DELETE FROM {self.table} WHERE key=?", (key,))
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            _rows = self._connection().execute(f"SELECT key FROM {self.table}").fetchall()
+        return [r[0] for r in _rows]
+
+    def clear(self):
+        with self._lock:
+            self._connection().execute(f"DELETE FROM {self.table}")
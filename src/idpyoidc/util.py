@@ -147,7 +147,8 @@ def qualified_name(cls):
     :return: fully qualified class name
     """
 
-    try:
-        return cls.__module__ + "." + cls.name
-    except AttributeError:
-        return cls.__module__ + "." + cls.__name__
+    _name = getattr(cls, "name", None)
+    # A class with a name slot has a descriptor here
+    if isinstance(_name, str):
+        return cls.__module__ + "." + _name
+    return cls.__module__ + "." + cls.__name__
@@ -20,3 +20,13 @@ CRYPT_CONFIG = {
 }
 
 SESSION_PARAMS = {"encrypter": CRYPT_CONFIG}
+
+
+class Clock(object):
+    """A clock that stands still until a test moves it by setting now."""
+
+    def __init__(self):
+        self.now = 1000000
+
+    def __call__(self):
+        return self.now
@@ -519,3 +519,126 @@ def test_error_description():
 
     msg = ResponseMessage(error="foobar", error_description="abc def")
     msg.verify()
+
+
+class SchemaMessage(Message):
+    c_param = {
+        "req_str": SINGLE_REQUIRED_STRING,
+        "opt_int": SINGLE_OPTIONAL_INT,
+        "opt_str_list": OPTIONAL_LIST_OF_STRINGS,
+        "name": SINGLE_OPTIONAL_STRING,
+    }
+
+
+def test_compiled_schema_is_cached():
+    msg = SchemaMessage(req_str="foo")
+    _schema = msg._schema()
+    assert SchemaMessage(req_str="bar")._schema() is _schema
+    # Not shared with the super class
+    assert Message()._schema() is not _schema
+
+
+def test_compiled_schema_follows_c_param():
+    msg = SchemaMessage(req_str="foo", extra="1")
+    assert msg["extra"] == "1"
+
+    SchemaMessage.c_param["extra"] = SINGLE_OPTIONAL_INT
+    try:
+        msg = SchemaMessage(req_str="foo", extra="1")
+        assert msg["extra"] == 1
+        # Replacing a specification is also noticed
+        SchemaMessage.c_param["extra"] = OPTIONAL_LIST_OF_STRINGS
+        msg = SchemaMessage(req_str="foo", extra="1")
+        assert msg["extra"] == ["1"]
+    finally:
+        del SchemaMessage.c_param["extra"]
+
+
+def test_compiled_schema_values():
+    msg = SchemaMessage().from_dict(
+        {
+            "req_str": "foo",
+            "opt_int": "12",
+            "opt_str_list": "bar",
+            "name#sv": "Börje",
+            "name#en": None,
+            "other": [1, 2],
+        }
+    )
+    assert msg.to_dict() == {
+        "req_str": "foo",
+        "opt_int": 12,
+        "opt_str_list": ["bar"],
+        "name#sv": "Börje",
+        "name#en": None,
+        "other": [1, 2],
+    }
+    assert msg.verify()
+
+    with pytest.raises(ValueError):
+        SchemaMessage(req_str=True)
+    with pytest.raises(DecodeError):
+        SchemaMessage(opt_str_list=["a", 1])
+
+    msg = SchemaMessage().from_urlencoded(msg.to_urlencoded())
+    assert msg["opt_str_list"] == ["bar"]
+    assert msg["name#sv"] == "Börje"
+
+
+def test_lazy_from_dict():
+    from idpyoidc.message.oidc import AuthorizationRequest
+    from idpyoidc.message.oidc import ClaimsRequest
+
+    _claims = {
+        "userinfo": {"given_name": {"essential": True}, "email": None},
+        "id_token": {"auth_time": {"essential": True}},
+    }
+    _args = {
+        "response_type": "code",
+        "client_id": "client_1",
+        "scope": ["openid"],
+        "redirect_uri": "https://example.com/cb",
+        "claims": _claims,
+    }
+    msg = AuthorizationRequest().from_dict(_args, lazy=True)
+    assert "claims" in msg
+    assert msg.to_dict()["claims"] is _claims
+    assert json.loads(msg.to_json()) == AuthorizationRequest(**_args).to_dict()
+
+    _claims_req = msg["claims"]
+    assert isinstance(_claims_req, ClaimsRequest)
+    assert msg["claims"] is _claims_req
+    assert msg == AuthorizationRequest(**_args)
+
+
+def test_lazy_from_dict_errors_on_access():
+    class Outer(Message):
+        c_param = {"inner": OPTIONAL_MESSAGE, "list": OPTIONAL_LIST_OF_MESSAGES}
+
+    msg = Outer().from_dict({"inner": {"a": 1}, "list": [{"a": "b"}, {"a": 2}]}, lazy=True)
+    assert list(msg.keys()) == ["inner", "list"]
+    assert msg["inner"].to_dict() == {"a": 1}
+
+    msg = Outer().from_json(json.dumps({"list": [{"a": "b"}, 1]}), lazy=True)
+    assert "list" in msg
+    with pytest.raises(DecodeError):
+        msg["list"]
+
+
+def test_lazy_from_jwt():
+    from idpyoidc.message.oidc import AddressClaim
+    from idpyoidc.message.oidc import IdToken
+
+    _idt = IdToken(
+        iss="issuer",
+        sub="subject",
+        aud=["client_1"],
+        iat=1700000000,
+        exp=1700003600,
+        address={"street_address": "Kungsgatan 1", "locality": "Umeå", "country": "Sweden"},
+    )
+    _jwt = _idt.to_jwt(IKEYJAR.get_signing_key("rsa", issuer_id="issuer"), "RS256")
+    msg = IdToken().from_jwt(_jwt, IKEYJAR, lazy=True)
+    assert msg["sub"] == "subject"
+    assert msg.to_dict() == _idt.to_dict()
+    assert isinstance(msg["address"], AddressClaim)
@@ -1,15 +1,25 @@
+import json
+import os
 import time
 from urllib.parse import quote_plus
 
+import pytest
+
+from idpyoidc.exception import MissingRequiredAttribute
 from idpyoidc.message.oidc import Claims
 from idpyoidc.message.oidc.identity_assurance import ClaimsConstructor
 from idpyoidc.message.oidc.identity_assurance import IDAClaimsRequest
 from idpyoidc.message.oidc.identity_assurance import VerificationElement
 from idpyoidc.message.oidc.identity_assurance import VerifiedClaims
 from idpyoidc.message.oidc.identity_assurance import from_iso8601_2004_time
+from idpyoidc.message.oidc.identity_assurance import match_verified_claims
 from idpyoidc.message.oidc.identity_assurance import to_iso8601_2004_time
+from idpyoidc.message.oidc.identity_assurance import verification_per_claim
+from idpyoidc.message.oidc.identity_assurance import verify_verified_claims
 from idpyoidc.time_util import time_sans_frac
 
+BASEDIR = os.path.abspath(os.path.dirname(__file__))
+
 
 def test_time_stamp():
     now = time_sans_frac()
@@ -444,3 +454,107 @@ def test_construct_5_2_1():
 
     _val = verified_claims.to_json()
     assert _val == '{"verification": {"time": null, "evidence": null}, "claims": null}'
+
+
+EKYC_EXAMPLES = os.path.join(BASEDIR, "ekyc_examples")
+
+
+def _example(typ, name):
+    with open(os.path.join(EKYC_EXAMPLES, typ, f"{name}.json")) as fp:
+        return json.load(fp)
+
+
+def test_verify_verified_claims_examples():
+    for fname in os.listdir(os.path.join(EKYC_EXAMPLES, "response")):
+        _resp = _example("response", fname[:-5])
+        if "verified_claims" in _resp:
+            assert verify_verified_claims(_resp["verified_claims"])
+
+
+@pytest.mark.parametrize(
+    "verified_claims,exception",
+    [
+        ({"claims": {"given_name": "Max"}}, MissingRequiredAttribute),
+        ({"verification": {"trust_framework": "de_aml"}, "claims": {}}, ValueError),
+        ({"verification": {"trust_framework": 2}, "claims": {"given_name": "Max"}}, ValueError),
+        (
+            {
+                "verification": {"trust_framework": "de_aml", "time": "yesterday"},
+                "claims": {"given_name": "Max"},
+            },
+            ValueError,
+        ),
+        (
+            {
+                "verification": {"trust_framework": "de_aml", "evidence": [{"type": "magic"}]},
+                "claims": {"given_name": "Max"},
+            },
+            ValueError,
+        ),
+        (
+            {
+                "verification": {
+                    "trust_framework": "de_aml",
+                    "evidence": [{"type": "document", "document_details": {"number": "1"}}],
+                },
+                "claims": {"given_name": "Max"},
+            },
+            MissingRequiredAttribute,
+        ),
+        ([], ValueError),
+    ],
+)
+def test_verify_verified_claims_errors(verified_claims, exception):
+    with pytest.raises(exception):
+        verify_verified_claims(verified_claims)
+
+
+def test_match_verified_claims():
+    _resp = _example("response", "document_with_attachments")["verified_claims"]
+
+    _req = _example("request", "verification_deeper")["userinfo"]["verified_claims"]
+    res = match_verified_claims(_resp, _req)
+    assert len(res) == 1
+    assert res[0]["verification"] == _resp["verification"]
+    assert res[0]["claims"] == {
+        "given_name": "Max",
+        "family_name": "Meier",
+        "birthdate": "1956-01-28",
+    }
+
+    # Asks for another trust framework
+    _req = _example("request", "verification_max_age")["userinfo"]["verified_claims"]
+    res = match_verified_claims(_resp, _req)
+    assert res == [{"verification": False, "claims": {}}]
+
+    # Too old
+    _req = {
+        "verification": {"trust_framework": {"value": "de_aml"}, "time": {"max_age": 3600}},
+        "claims": {"given_name": None},
+    }
+    assert match_verified_claims(_resp, _req)[0]["verification"] is False
+    _req["verification"]["time"] = {"max_age": 1000000000}
+    assert match_verified_claims(_resp, _req)[0]["claims"] == {"given_name": "Max"}
+
+
+def test_match_multiple_verified_claims():
+    _resp = _example("response", "multiple_verified_claims")["verified_claims"]
+    _req = [
+        {"verification": {"trust_framework": {"value": "eidas"}}, "claims": {"given_name": None}},
+        {
+            "verification": {
+                "trust_framework": {"values": ["de_aml", "jp_aml"]},
+                "evidence": [{"type": {"value": "document"}}],
+            },
+            "claims": {"address": None, "given_name": None},
+        },
+    ]
+    res = match_verified_claims(_resp, _req)
+    assert res[0]["verification"]["trust_framework"] == "eidas"
+    assert set(res[0]["claims"].keys()) == {"given_name"}
+    assert res[1]["verification"]["trust_framework"] == "de_aml"
+    assert set(res[1]["claims"].keys()) == {"address"}
+
+    _per_claim = verification_per_claim(res, {"sub": "248289761001"})
+    assert _per_claim["sub"] == {"value": "248289761001", "verification": []}
+    assert _per_claim["given_name"]["verification"] == [res[0]["verification"]]
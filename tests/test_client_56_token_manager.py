@@ -0,0 +1,197 @@
+import json
+import threading
+import time
+from urllib.parse import parse_qs
+
+import pytest
+import responses
+
+from idpyoidc.client.current import Current
+from idpyoidc.client.exception import OidcServiceError
+from idpyoidc.client.oauth2.stand_alone_client import StandAloneClient
+from idpyoidc.client.token_manager import TokenManager
+from tests import Clock
+
+ISSUER = "https://op.example.com"
+
+CONFIG = {
+    "base_url": "https://example.com/cli/",
+    "client_id": "Number5",
+    "client_type": "oidc",
+    "client_secret": "asdflkjh0987654321",
+    "client_authn_methods": ["client_secret_basic"],
+    "token_manager": {"refresh_ahead": 30, "jitter": 5},
+    "provider_info": {
+        "issuer": ISSUER,
+        "authorization_endpoint": "https://op.example.com/authn",
+        "token_endpoint": "https://op.example.com/token",
+    },
+}
+
+
+class TestTokenManager(object):
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.cstate = Current()
+        self.clock = Clock()
+        self.refreshed = []
+        self.manager = TokenManager(
+            self.cstate, self._refresh, refresh_ahead=60, jitter=10, clock=self.clock
+        )
+        self.state = self.cstate.create_state(
+            access_token="token_0",
+            refresh_token="refresh",
+            __expires_at=self.clock.now + 3600,
+        )
+
+    def _refresh(self, state):
+        self.refreshed.append(state)
+        self.cstate.update(
+            state,
+            {
+                "access_token": f"token_{len(self.refreshed)}",
+                "__expires_at": self.clock() + 3600,
+            },
+        )
+
+    def test_valid(self):
+        assert self.manager.get_access_token(self.state) == ("token_0", self.clock.now + 3600)
+        assert self.refreshed == []
+
+    def test_refresh_ahead(self):
+        _exp = self.clock.now + 3600
+        # Outside the refresh window
+        self.clock.now = _exp - 71
+        assert self.manager.get_access_token(self.state)[0] == "token_0"
+        # Inside whatever the jitter
+        self.clock.now = _exp - 59
+        assert self.manager.get_access_token(self.state)[0] == "token_1"
+        assert self.refreshed == [self.state]
+
+    def test_jitter_is_stable(self):
+        _exp = self.clock.now + 3600
+        self.manager.get_access_token(self.state)
+        _at = self.manager._refresh_at[self.state][1]
+        assert _exp - 70 <= _at <= _exp - 60
+        self.manager.get_access_token(self.state)
+        assert self.manager._refresh_at[self.state][1] == _at
+
+    def test_no_expiry(self):
+        self.cstate.rm_claim(self.state, "__expires_at")
+        self.clock.now += 10 * 3600
+        assert self.manager.get_access_token(self.state) == ("token_0", 0)
+
+    def test_expired_without_refresh_token(self):
+        self.cstate.rm_claim(self.state, "refresh_token")
+        self.clock.now += 3590
+        # Within the refresh window but nothing to refresh with
+        assert self.manager.get_access_token(self.state)[0] == "token_0"
+        self.clock.now += 20
+        with pytest.raises(OidcServiceError):
+            self.manager.get_access_token(self.state)
+
+    def test_failed_refresh(self):
+        def _fail(state):
+            raise OidcServiceError("invalid_grant")
+
+        self.manager.refresh = _fail
+        self.clock.now += 3590
+        # The old token is still good
+        assert self.manager.get_access_token(self.state)[0] == "token_0"
+        self.clock.now += 20
+        with pytest.raises(OidcServiceError):
+            self.manager.get_access_token(self.state)
+
+    def test_single_flight(self):
+        _started = threading.Event()
+        _release = threading.Event()
+
+        def _slow_refresh(state):
+            _started.set()
+            _release.wait(5)
+            self._refresh(state)
+
+        self.manager.refresh = _slow_refresh
+        self.clock.now += 3600  # expired
+        _results = []
+
+        def _worker():
+            _results.append(self.manager.get_access_token(self.state)[0])
+
+        _threads = [threading.Thread(target=_worker) for _ in range(10)]
+        _threads[0].start()
+        _started.wait(5)
+        for t in _threads[1:]:
+            t.start()
+        time.sleep(0.1)
+        _release.set()
+        for t in _threads:
+            t.join(5)
+
+        assert self.refreshed == [self.state]
+        assert _results == ["token_1"] * 10
+
+
+class TestStandAloneClient(object):
+    @pytest.fixture(autouse=True)
+    def client_setup(self):
+        self.client = StandAloneClient(config=CONFIG)
+        self.client.do_provider_info()
+        self.client.do_client_registration()
+        _cstate = self.client.get_context().cstate
+        self.state = _cstate.create_state(iss=ISSUER)
+        _cstate.update(
+            self.state,
+            {
+                "access_token": "access_token_0",
+                "refresh_token": "refresh_token_0",
+                "token_type": "Bearer",
+                "__expires_at": int(time.time()) + 10,
+            },
+        )
+        self.calls = []
+
+    def _token_endpoint(self, request):
+        # A stand-in OP that takes a while to answer
+        self.calls.append(parse_qs(request.body))
+        time.sleep(0.2)
+        _resp = {
+            "access_token": f"access_token_{len(self.calls)}",
+            "refresh_token": f"refresh_token_{len(self.calls)}",
+            "token_type": "Bearer",
+            "expires_in": 3600,
+        }
+        return 200, {"Content-Type": "application/json"}, json.dumps(_resp)
+
+    def test_concurrent_refresh(self):
+        _results = []
+
+        def _worker():
+            _results.append(self.client.get_fresh_access_token(self.state))
+
+        with responses.RequestsMock() as rsps:
+            rsps.add_callback(
+                "POST", CONFIG["provider_info"]["token_endpoint"], callback=self._token_endpoint
+            )
+            _threads = [threading.Thread(target=_worker) for _ in range(20)]
+            for t in _threads:
+                t.start()
+            for t in _threads:
+                t.join(10)
+
+        assert len(self.calls) == 1
+        assert self.calls[0]["grant_type"] == ["refresh_token"]
+        assert self.calls[0]["refresh_token"] == ["refresh_token_0"]
+        # The token was still valid so a caller may have got the old one
+        assert {r[0] for r in _results} <= {"access_token_0", "access_token_1"}
+        assert self.client.get_fresh_access_token(self.state)[0] == "access_token_1"
+
+    def test_clear_session(self):
+        with responses.RequestsMock() as rsps:
+            rsps.add_callback(
+                "POST", CONFIG["provider_info"]["token_endpoint"], callback=self._token_endpoint
+            )
+            self.client.get_fresh_access_token(self.state)
+        assert self.state in self.client.get_token_manager()._refresh_at
+        self.client.clear_session(self.state)
+        assert self.state not in self.client.get_token_manager()._refresh_at
@@ -0,0 +1,222 @@
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qs
+
+import pytest
+import responses
+
+from idpyoidc.client.current import Current
+from idpyoidc.client.exception import OidcServiceError
+from idpyoidc.client.oauth2 import Client
+from idpyoidc.client.token_manager import SharedTokenManager
+from idpyoidc.storage.versioned import SQLiteVersionedStore
+from idpyoidc.storage.versioned import VersionedStore
+from tests import Clock
+
+BASE_URL = "https://example.com"
+TOKEN_ENDPOINT = "https://example.com/token"
+
+BASEDIR = os.path.abspath(os.path.dirname(__file__))
+
+
+def make_client(token_cache=None):
+    _conf = {}
+    if token_cache is not None:
+        _conf["token_cache"] = token_cache
+    services = {
+        "client_credentials": {
+            "class": "idpyoidc.client.oauth2.client_credentials.CCAccessTokenRequest",
+            "kwargs": _conf,
+        }
+    }
+    client = Client(
+        config={
+            "client_id": "client_id",
+            "client_secret": "another password",
+            "base_url": BASE_URL,
+        },
+        services=services,
+    )
+    client.get_service("client_credentials").endpoint = TOKEN_ENDPOINT
+    return client
+
+
+class TestSharedTokenManager(object):
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.clock = Clock()
+        self.store = VersionedStore()
+        self.fetched = []
+
+    def _manager(self):
+        _cstate = Current()
+
+        def _fetch(key):
+            self.fetched.append(key)
+            _cstate.update(
+                key,
+                {
+                    "access_token": f"token_{len(self.fetched)}",
+                    "token_type": "Bearer",
+                    "__expires_at": self.clock() + 3600,
+                },
+            )
+
+        return SharedTokenManager(
+            _cstate, _fetch, store=self.store, refresh_ahead=60, jitter=0, clock=self.clock
+        )
+
+    def test_fetch_when_missing(self):
+        _manager = self._manager()
+        assert _manager.get_access_token("key") == ("token_1", self.clock.now + 3600)
+        assert _manager.get_access_token("key")[0] == "token_1"
+        assert self.fetched == ["key"]
+
+    def test_shared_between_managers(self):
+        assert self._manager().get_access_token("key")[0] == "token_1"
+        # A different process, same store
+        assert self._manager().get_access_token("key")[0] == "token_1"
+        assert self.fetched == ["key"]
+
+    def test_refresh_ahead(self):
+        _first = self._manager()
+        _other = self._manager()
+        _first.get_access_token("key")
+        self.clock.now += 3600 - 59
+        assert _first.get_access_token("key")[0] == "token_2"
+        # Picks up what the first one fetched
+        assert _other.get_access_token("key")[0] == "token_2"
+        assert self.fetched == ["key", "key"]
+
+    def test_lease(self):
+        _manager = self._manager()
+        _other = self._manager()
+        assert _manager._acquire("key")
+        assert not _other._acquire("key")
+        _manager._release("key")
+        assert _other._acquire("key")
+
+    def test_expired_lease(self):
+        _manager = self._manager()
+        assert _manager._acquire("key")
+        # The holder died
+        self.clock.now += _manager.lease + 1
+        assert self._manager()._acquire("key")
+
+    def test_wait_for_other_process(self):
+        _holder = self._manager()
+        assert _holder._acquire("key")
+        _waiter = self._manager()
+        _waiter.poll_interval = 0.01
+        _result = []
+
+        _thread = threading.Thread(target=lambda: _result.append(_waiter.get_access_token("key")))
+        _thread.start()
+        time.sleep(0.1)
+        # The lease holder gets a token and stores it
+        _holder.refresh("key")
+        _holder._save("key")
+        _holder._release("key")
+        _thread.join(5)
+
+        assert _result[0][0] == "token_1"
+        assert self.fetched == ["key"]
+
+    def test_wait_timeout(self):
+        assert self._manager()._acquire("key")
+        _waiter = self._manager()
+        _waiter.poll_interval = 0.01
+        _waiter.timeout = 0.05
+        with pytest.raises(OidcServiceError):
+            _waiter.get_access_token("key")
+
+
+class TestCCTokenCache(object):
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.calls = []
+
+    def _token_endpoint(self, request):
+        self.calls.append(parse_qs(request.body))
+        time.sleep(0.1)
+        _resp = {
+            "access_token": f"access_token_{len(self.calls)}",
+            "token_type": "Bearer",
+            "expires_in": 3600,
+        }
+        return 200, {"Content-Type": "application/json"}, json.dumps(_resp)
+
+    def test_cache_key(self):
+        _srv = make_client().get_service("client_credentials")
+        assert _srv.cache_key(["read", "write"]) == _srv.cache_key(["write", "read", "read"])
+        assert _srv.cache_key(["read"]) != _srv.cache_key(["read", "write"])
+        assert _srv.cache_key(["read"], audience=["a"]) != _srv.cache_key(["read"])
+        assert _srv.cache_key(["read"], resource=["a"]) != _srv.cache_key(["read"], audience=["a"])
+
+    def test_one_token_per_scope(self):
+        _srv = make_client().get_service("client_credentials")
+        with responses.RequestsMock() as rsps:
+            rsps.add_callback("POST", TOKEN_ENDPOINT, callback=self._token_endpoint)
+            _read = _srv.get_access_token(["read"])
+            assert _srv.get_access_token(["read"]) == _read
+            _write = _srv.get_access_token(["write"], resource=["https://rs.example.com"])
+
+        assert _read[0] == "access_token_1"
+        assert _write[0] == "access_token_2"
+        assert self.calls[0]["grant_type"] == ["client_credentials"]
+        assert self.calls[0]["scope"] == ["read"]
+        assert self.calls[1]["resource"] == ["https://rs.example.com"]
+
+    def test_concurrent(self):
+        _srv = make_client().get_service("client_credentials")
+        _results = []
+
+        def _worker():
+            _results.append(_srv.get_access_token(["read"])[0])
+
+        with responses.RequestsMock() as rsps:
+            rsps.add_callback("POST", TOKEN_ENDPOINT, callback=self._token_endpoint)
+            _threads = [threading.Thread(target=_worker) for _ in range(20)]
+            for t in _threads:
+                t.start()
+            for t in _threads:
+                t.join(10)
+
+        assert len(self.calls) == 1
+        assert _results == ["access_token_1"] * 20
+
+    def test_error_response(self):
+        _srv = make_client().get_service("client_credentials")
+        with responses.RequestsMock() as rsps:
+            rsps.add(
+                "POST",
+                TOKEN_ENDPOINT,
+                json={"error": "invalid_scope"},
+                status=400,
+            )
+            with pytest.raises(OidcServiceError):
+                _srv.get_access_token(["admin"])
+
+    def test_shared_store(self):
+        _db_file = os.path.join(BASEDIR, "cc_token_cache.db")
+        if os.path.exists(_db_file):
+            os.unlink(_db_file)
+        _cache = {
+            "store": {
+                "class": "idpyoidc.storage.versioned.SQLiteVersionedStore",
+                "kwargs": {"filename": _db_file},
+            }
+        }
+        try:
+            _workers = [make_client(_cache).get_service("client_credentials") for _ in range(2)]
+            assert isinstance(_workers[0].get_token_manager().store, SQLiteVersionedStore)
+            with responses.RequestsMock() as rsps:
+                rsps.add_callback("POST", TOKEN_ENDPOINT, callback=self._token_endpoint)
+                _tokens = [w.get_access_token(["read"])[0] for w in _workers]
+        finally:
+            os.unlink(_db_file)
+
+        assert len(self.calls) == 1
+        assert _tokens == ["access_token_1", "access_token_1"]
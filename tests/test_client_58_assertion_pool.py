@@ -0,0 +1,161 @@
+import os
+import time
+
+import pytest
+from cryptojwt.jwt import JWT
+from cryptojwt.key_bundle import KeyBundle
+from cryptojwt.key_jar import KeyJar
+from cryptojwt.key_jar import init_key_jar
+
+from idpyoidc.client.assertion_pool import AssertionPool
+from idpyoidc.client.client_auth import PrivateKeyJWT
+from idpyoidc.client.entity import Entity
+from idpyoidc.message.oauth2 import AccessTokenRequest
+from tests import Clock
+
+BASE_PATH = os.path.abspath(os.path.dirname(__file__))
+
+CLIENT_CONF = {
+    "issuer": "https://example.com/as",
+    "client_secret": "white boarding pass",
+    "client_id": "A",
+}
+
+KEY_CONF = {
+    "key_defs": [
+        {"type": "RSA", "key": "", "use": ["sig"]},
+        {"type": "EC", "crv": "P-256", "use": ["sig"]},
+    ],
+    "read_only": False,
+}
+
+
+class TestAssertionPool(object):
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.clock = Clock()
+        self.pool = AssertionPool(
+            size=5, lifetime=60, min_lifetime=10, background=False, clock=self.clock
+        )
+        self.signed = 0
+
+    def _factory(self, lifetime):
+        self.signed += 1
+        return f"assertion_{self.signed}"
+
+    def test_miss(self):
+        assert self.pool.get("aud", self._factory) == "assertion_1"
+        assert self.pool.get("aud", self._factory) == "assertion_2"
+        assert self.pool.metrics["misses"] == 2
+        assert self.pool.metrics["hits"] == 0
+
+    def test_refill_follows_rate(self):
+        for _ in range(2):
+            self.pool.get("aud", self._factory)
+        self.clock.now += 1
+        self.pool.refill()
+        # Two per second, enough for two refill intervals
+        assert self.pool.stats()["pooled"]["aud"] == 2
+
+        _signed = self.signed
+        assert self.pool.get("aud", self._factory) == f"assertion_{_signed - 1}"
+        assert self.pool.get("aud", self._factory) == f"assertion_{_signed}"
+        assert self.pool.metrics["hits"] == 2
+
+    def test_refill_is_bounded(self):
+        for _ in range(100):
+            self.pool.get("aud", self._factory)
+        self.pool.refill()
+        assert self.pool.stats()["pooled"]["aud"] == 5
+
+    def test_idle_key_is_not_refilled(self):
+        self.pool.get("aud", self._factory)
+        self.pool.refill()
+        assert self.pool.stats()["pooled"]["aud"] == 1
+        for _ in range(5):
+            self.clock.now += 60
+            self.pool.refill()
+        assert self.pool.stats()["pooled"]["aud"] == 0
+
+    def test_no_near_expiry(self):
+        self.pool.get("aud", self._factory)
+        self.pool.refill()
+        self.clock.now += 55
+        # Only 5 seconds left, less than min_lifetime
+        assert self.pool.get("aud", self._factory) == f"assertion_{self.signed}"
+        assert self.pool.metrics["expired"] == 1
+        assert self.pool.metrics["hits"] == 0
+
+    def test_per_key(self):
+        self.pool.get("aud_1", self._factory)
+        self.pool.refill()
+        assert self.pool.stats()["pooled"] == {"aud_1": 1}
+        assert self.pool.get("aud_2", self._factory) == "assertion_3"
+
+    def test_background(self):
+        _pool = AssertionPool(size=5, refill_interval=0.05)
+        try:
+            for _ in range(5):
+                _pool.get("aud", self._factory)
+            time.sleep(0.3)
+            assert _pool.stats()["pooled"]["aud"] > 0
+            _pool.get("aud", self._factory)
+            assert _pool.metrics["hits"] == 1
+        finally:
+            _pool.stop()
+
+
+class TestPrivateKeyJWT(object):
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.entity = Entity(
+            config=CLIENT_CONF,
+            services={"base": {"class": "idpyoidc.client.service.Service"}},
+            keyjar=init_key_jar(**KEY_CONF),
+            client_type="oidc",
+        )
+        _context = self.entity.get_service_context()
+        _context.map_supported_to_preferred()
+        _context.map_preferred_to_registered()
+        self.service = self.entity.get_service("")
+
+        self.kb_rsa = KeyBundle(
+            source="file://{}".format(os.path.join(BASE_PATH, "data/keys/rsa.key")),
+            fileformat="der",
+        )
+        for key in self.kb_rsa:
+            key.add_kid()
+        self.entity.keyjar.add_kb("", self.kb_rsa)
+        _context.provider_info = {
+            "issuer": "https://example.com/",
+            "token_endpoint": "https://example.com/token",
+        }
+        self.method = PrivateKeyJWT(assertion_pool={"background": False})
+
+    def _assertion(self):
+        request = AccessTokenRequest()
+        self.method.construct(request, service=self.service, authn_endpoint="token_endpoint")
+        _kj = KeyJar()
+        _kj.import_jwks(self.entity.keyjar.export_jwks(), issuer_id="A")
+        return JWT(key_jar=_kj).unpack(request["client_assertion"])
+
+    def test_pooled(self):
+        _first = self._assertion()
+        self.method.assertion_pool.refill()
+        _pool = self.method.assertion_pool
+        assert sum(_pool.stats()["pooled"].values()) == 1
+
+        _second = self._assertion()
+        assert _pool.metrics == {"hits": 1, "misses": 1, "signed": 2, "expired": 0}
+        assert _second["aud"] == ["https://example.com/token"]
+        assert _second["iss"] == "A"
+        assert _second["exp"] - _second["iat"] == _pool.lifetime
+        # Single use
+        assert _first["jti"] != _second["jti"]
+
+    def test_lifetime_bypasses_pool(self):
+        request = AccessTokenRequest()
+        self.method.construct(
+            request, service=self.service, authn_endpoint="token_endpoint", lifetime=30
+        )
+        assert self.method.assertion_pool.metrics["signed"] == 0
@@ -0,0 +1,220 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+import pytest
+from cryptojwt.key_jar import build_keyjar
+
+from idpyoidc.client.defaults import DEFAULT_KEY_DEFS
+from idpyoidc.client.provider_cache import ProviderCache
+from idpyoidc.client.provider_cache import cache_lifetime
+from idpyoidc.client.rp_handler import RPHandler
+from idpyoidc.storage.versioned import SQLiteVersionedStore
+
+BASE_URL = "https://rp.example.com"
+
+
+class OpenIDProvider(object):
+    """Stand-in for an OP that does discovery and dynamic client registration."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.keyjar = build_keyjar(DEFAULT_KEY_DEFS)
+        self.requests = {}
+        self.cache_control = "max-age=3600"
+        self.client_secret_expires_at = 0
+        self.lock = threading.Lock()
+
+        _op = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self, body, headers=None):
+                _body = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(_body)))
+                for _name, _value in (headers or {}).items():
+                    self.send_header(_name, _value)
+                self.end_headers()
+                self.wfile.write(_body)
+
+            def do_GET(self):
+                _op.count(self.path)
+                time.sleep(_op.delay)
+                if self.path == "/.well-known/openid-configuration":
+                    _headers = {}
+                    if _op.cache_control:
+                        _headers["Cache-Control"] = _op.cache_control
+                    self._respond(_op.provider_info(), _headers)
+                else:
+                    self._respond(_op.keyjar.export_jwks())
+
+            def do_POST(self):
+                _op.count(self.path)
+                _request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                _request.update(
+                    {
+                        "client_id": f"client_{_op.requests[self.path]}",
+                        "client_secret": "a_very_long_and_secret_client_secret",
+                        "client_secret_expires_at": _op.client_secret_expires_at,
+                    }
+                )
+                self._respond(_request)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.issuer = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def count(self, path):
+        with self.lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def provider_info(self):
+        return {
+            "issuer": self.issuer,
+            "authorization_endpoint": f"{self.issuer}/authorization",
+            "token_endpoint": f"{self.issuer}/token",
+            "registration_endpoint": f"{self.issuer}/registration",
+            "jwks_uri": f"{self.issuer}/jwks",
+            "response_types_supported": ["code"],
+            "subject_types_supported": ["public"],
+            "id_token_signing_alg_values_supported": ["RS256", "ES256"],
+        }
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def test_cache_lifetime():
+    assert cache_lifetime(None, 10) == 10
+    assert cache_lifetime({"Cache-Control": "public, max-age=60"}, 10) == 60
+    assert cache_lifetime({"cache-control": "no-store"}, 10) is None
+    assert cache_lifetime({"Cache-Control": "max-age=0"}, 10) is None
+    assert cache_lifetime({"Expires": "Thu, 01 Jan 1970 00:00:00 GMT"}, 10) is None
+    assert cache_lifetime({"Content-Type": "application/json"}, 10) == 10
+
+
+class TestProviderCache(object):
+    @pytest.fixture(autouse=True)
+    def setup(self, tmpdir):
+        self.op = OpenIDProvider()
+        self.db_file = os.path.join(tmpdir.strpath, "provider_cache.db")
+        self.now = time.time()
+        yield
+        self.op.close()
+
+    def _rph(self, delay=0.0):
+        self.op.delay = delay
+        _cache = ProviderCache(
+            store={
+                "class": SQLiteVersionedStore,
+                "kwargs": {"filename": self.db_file, "table": "provider"},
+            },
+            clock=lambda: self.now,
+        )
+        return RPHandler(
+            BASE_URL,
+            client_configs={
+                "": {"client_type": "oidc", "preference": {"response_types": ["code"]}},
+                "op": {
+                    "issuer": self.op.issuer,
+                    "client_type": "oidc",
+                    "redirect_uris": [f"{BASE_URL}/authz_cb"],
+                    "preference": {"response_types": ["code"]},
+                },
+            },
+            keyjar=build_keyjar(DEFAULT_KEY_DEFS),
+            httpc_params={"verify": False},
+            provider_cache=_cache,
+        )
+
+    def test_restart(self):
+        client = self._rph().client_setup("op")
+        _context = client.get_context()
+        assert _context.get_client_id() == "client_1"
+        assert self.op.requests == {
+            "/.well-known/openid-configuration": 1,
+            "/jwks": 1,
+            "/registration": 1,
+        }
+
+        # A new RPHandler, as after a restart, with the same store
+        client = self._rph().client_setup("op")
+        _context = client.get_context()
+        assert _context.issuer == self.op.issuer
+        assert _context.get_client_id() == "client_1"
+        assert _context.get_usage("client_secret") == "a_very_long_and_secret_client_secret"
+        assert client.get_service("accesstoken").endpoint == f"{self.op.issuer}/token"
+        assert len(client.keyjar.get_issuer_keys(self.op.issuer)) == 2
+        # Nothing more was fetched
+        assert self.op.requests == {
+            "/.well-known/openid-configuration": 1,
+            "/jwks": 1,
+            "/registration": 1,
+        }
+
+    def test_provider_info_expires(self):
+        self._rph().client_setup("op")
+        self.now += 3601
+        client = self._rph().client_setup("op")
+        assert self.op.requests["/.well-known/openid-configuration"] == 2
+        # The registration is still valid
+        assert self.op.requests["/registration"] == 1
+        assert client.get_context().get_client_id() == "client_1"
+
+    def test_no_store(self):
+        self.op.cache_control = "no-store"
+        self._rph().client_setup("op")
+        self._rph().client_setup("op")
+        assert self.op.requests["/.well-known/openid-configuration"] == 2
+
+    def test_client_secret_expires(self):
+        self.op.client_secret_expires_at = int(self.now) + 60
+        self._rph().client_setup("op")
+        self.now += 61
+        client = self._rph().client_setup("op")
+        assert self.op.requests["/registration"] == 2
+        assert client.get_context().get_client_id() == "client_2"
+
+    def test_single_flight(self):
+        rph = self._rph(delay=0.2)
+        _clients = []
+
+        def _setup():
+            _clients.append(rph.client_setup("op"))
+
+        _threads = [threading.Thread(target=_setup) for _ in range(5)]
+        for _thread in _threads:
+            _thread.start()
+        for _thread in _threads:
+            _thread.join()
+
+        assert len(set(id(c) for c in _clients)) == 1
+        assert self.op.requests["/.well-known/openid-configuration"] == 1
+        assert self.op.requests["/registration"] == 1
+
+    def test_warm_up(self):
+        rph = self._rph()
+        rph.client_configs["unknown"] = {
+            "issuer": "http://127.0.0.1:1",
+            "client_type": "oidc",
+            "redirect_uris": [f"{BASE_URL}/authz_cb"],
+        }
+        _result = rph.warm_up()
+        assert set(_result.keys()) == {"op", "unknown"}
+        assert _result["op"] is None
+        assert _result["unknown"] is not None
+        assert self.op.issuer in rph.issuer2rp
+
+        # The first login needs nothing from the OP
+        client = rph.client_setup("op")
+        assert client is rph.issuer2rp[self.op.issuer]
+        assert self.op.requests["/.well-known/openid-configuration"] == 1
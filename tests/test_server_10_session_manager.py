@@ -650,6 +650,100 @@ class TestSessionManager:
         assert len(grant.issued_token) == 1
         assert grant.issued_token[0].token_class == "authorization_code"
 
+    def test_revoke_dependent_chain(self):
+        _session_id = self._create_session(AUTH_REQ)
+        grant = self.session_manager[_session_id]
+
+        code = self._mint_token("authorization_code", grant, _session_id)
+        refresh_token = self._mint_token("refresh_token", grant, _session_id, code)
+        access_token = self._mint_token("access_token", grant, _session_id, refresh_token)
+        other = self._mint_token("access_token", grant, _session_id)
+
+        assert grant.revoke_token(value=code.value) == 3
+        assert code.revoked and refresh_token.revoked and access_token.revoked
+        assert other.revoked is False
+        # Already revoked
+        assert grant.revoke_token(value=code.value) == 0
+
+    def _sessions(self):
+        _sessions = {}
+        for user_id in ["diana", "ewa"]:
+            for client_id in ["client_1", "client_2"]:
+                _sessions[(user_id, client_id)] = self.session_manager.create_session(
+                    authn_event=self.authn_event,
+                    auth_req=AUTH_REQ,
+                    user_id=user_id,
+                    client_id=client_id,
+                )
+        return _sessions
+
+    def test_revoke_sessions_by_client(self):
+        _sessions = self._sessions()
+        _revoked = []
+        self.session_manager.add_revocation_listener(_revoked.append)
+
+        assert self.session_manager.revoke_sessions(client_id="client_2") == 2
+        for (user_id, client_id), session_id in _sessions.items():
+            assert self.session_manager[session_id].revoked is (client_id == "client_2")
+        assert sorted(_revoked) == ["diana;;client_2", "ewa;;client_2"]
+
+    def test_revoke_sessions_by_user(self):
+        _sessions = self._sessions()
+        assert self.session_manager.revoke_sessions(user_id="ewa") == 2
+        for (user_id, client_id), session_id in _sessions.items():
+            assert self.session_manager[session_id].revoked is (user_id == "ewa")
+        # Nothing more to revoke
+        assert self.session_manager.revoke_sessions(user_id="ewa") == 0
+
+    def test_revoke_sessions_by_grant(self):
+        _sessions = self._sessions()
+        _session_id = _sessions[("diana", "client_1")]
+        assert self.session_manager.revoke_sessions(session_id=_session_id) == 1
+        assert self.session_manager[_session_id].revoked
+        assert self.session_manager[_sessions[("ewa", "client_1")]].revoked is False
+
+    def test_revoke_by_client(self):
+        _sessions = self._sessions()
+        assert self.session_manager.revoke_by_client("client_1", batch_size=1) == 2
+        for (user_id, client_id), session_id in _sessions.items():
+            assert self.session_manager[session_id].revoked is (client_id == "client_1")
+        assert self.session_manager.revoke_by_client("client_1") == 0
+        assert self.session_manager.revoke_by_client("unknown") == 0
+
+    def test_revoke_by_user(self):
+        _sessions = self._sessions()
+        # Two grants for the same user and client
+        self.session_manager.create_session(
+            authn_event=self.authn_event, auth_req=AUTH_REQ, user_id="diana", client_id="client_1"
+        )
+        assert self.session_manager.revoke_by_user("diana") == 3
+        assert self.session_manager.revoke_by_user("unknown") == 0
+
+    def test_purge_older_than(self):
+        _sessions = self._sessions()
+        _old = _sessions[("diana", "client_1")]
+        self.session_manager[_old].issued_at -= 7200
+        # As after a load, the index has to be rebuilt
+        self.session_manager._index_ready = False
+
+        _now = utc_time_sans_frac()
+        assert self.session_manager.purge_older_than(_now - 3600) == 1
+        with pytest.raises(KeyError):
+            self.session_manager.get_client_session_info(_old)
+        assert self.session_manager.revoke_by_client("client_1") == 1
+
+        assert self.session_manager.purge_older_than(_now + 1) == 3
+        assert self.session_manager.revoke_by_client("client_2") == 0
+        assert len(self.session_manager.db) == 0
+
+    def test_bulk_after_load(self):
+        self._sessions()
+        _dump = self.session_manager.dump()
+        self.session_manager.flush()
+        assert self.session_manager.revoke_by_client("client_1") == 0
+        self.session_manager.load(_dump)
+        assert self.session_manager.revoke_by_client("client_1") == 2
+
     def test_grants(self):
         token_usage_rules = self.endpoint_context.authz.usage_rules("client_1")
         _session_id = self.session_manager.create_session(
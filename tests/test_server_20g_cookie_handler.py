@@ -287,3 +287,87 @@ class TestCookieHandlerFernetEnc(object):
         assert _c_info[0]["type"] == "sso"
         assert _c_info[1]["value"] == "session_state"
         assert _c_info[1]["type"] == "session"
+
+    def test_compact(self):
+        # There are no keys for the compact format so the old one is used
+        cookie_handler = CookieHandler(crypt_config=CRYPT_CONFIG, compact=True)
+        assert cookie_handler.codec is None
+        _cookie = cookie_handler.make_cookie_content("idpyoidc.server", "value", "sso")
+        assert len(_cookie["value"].split("|")) == 2
+        _info = cookie_handler.parse_cookie("idpyoidc.server", [_cookie])
+        assert _info[0]["value"] == "value"
+
+
+SIGN_KEY = "ghsNKDDLshZTPn974nOsIGhedULrsqnsGoBFBLwUKuJhE2ch"
+ENC_KEY = "NXi6HD473d_YS4exVRn7z9z23mGmvU641MuvKqH0o7Y"
+
+
+class TestCookieHandlerCompact(object):
+    @pytest.fixture(autouse=True)
+    def make_cookie_content_handler(self):
+        self.cookie_conf = {
+            "sign_key": SYMKey(k=SIGN_KEY),
+            "enc_key": SYMKey(k=ENC_KEY),
+            "compact": True,
+        }
+        self.cookie_handler = CookieHandler(**self.cookie_conf)
+
+    def test_make_cookie_content(self):
+        _cookie_info = self.cookie_handler.make_cookie_content("idpyoidc.server", "value", "sso")
+        assert set(_cookie_info.keys()) == {"name", "value", "samesite", "httponly", "secure"}
+        assert "|" not in _cookie_info["value"]
+        assert "value" not in _cookie_info["value"]
+
+    def test_read_cookie_info(self):
+        _cookie_info = [self.cookie_handler.make_cookie_content("idpyoidc.server", "value", "sso")]
+        _info = self.cookie_handler.parse_cookie("idpyoidc.server", _cookie_info)
+        assert len(_info) == 1
+        assert set(_info[0].keys()) == {"value", "type", "timestamp"}
+        assert _info[0]["value"] == "value"
+        assert _info[0]["type"] == "sso"
+
+    def test_sign_only(self):
+        cookie_handler = CookieHandler(sign_key=SIGN_KEY, compact=True)
+        _cookie = cookie_handler.make_cookie_content("idpyoidc.server", "value", "sso")
+        _info = cookie_handler.parse_cookie("idpyoidc.server", [_cookie])
+        assert _info[0]["value"] == "value"
+
+        # tamper with the content
+        _val = _cookie["value"]
+        _cookie["value"] = _val[:-2] + ("AA" if _val[-2:] != "AA" else "BB")
+        assert cookie_handler.parse_cookie("idpyoidc.server", [_cookie]) == []
+
+    def test_tampered(self):
+        _cookie = self.cookie_handler.make_cookie_content("idpyoidc.server", "value", "sso")
+        _val = _cookie["value"]
+        _cookie["value"] = _val[:-2] + ("AA" if _val[-2:] != "AA" else "BB")
+        assert self.cookie_handler.parse_cookie("idpyoidc.server", [_cookie]) == []
+
+    def test_legacy_cookie(self):
+        _legacy_handler = CookieHandler(sign_key=SIGN_KEY, enc_key=ENC_KEY)
+        _cookie = _legacy_handler.make_cookie_content("idpyoidc.server", "value", "sso")
+        assert len(_cookie["value"].split("|")) == 4
+        _info = self.cookie_handler.parse_cookie("idpyoidc.server", [_cookie])
+        assert _info[0]["value"] == "value"
+        assert _info[0]["type"] == "sso"
+
+    def test_key_rotation(self):
+        _cookie = self.cookie_handler.make_cookie_content("idpyoidc.server", "value", "sso")
+
+        _new_handler = CookieHandler(
+            sign_key="ZiyX0q5iT9MtRv3nSAuQNKaQ5GeyVt9eoMJVoKZ9a-g",
+            enc_key="m46UNrsBFthk19Cwnt6Ogw6v1-HqaG-SZ1q7smOMxU4",
+            compact=True,
+            kid=1,
+            previous_keys=[{"kid": 0, "sign_key": SIGN_KEY, "enc_key": ENC_KEY}],
+        )
+        _info = _new_handler.parse_cookie("idpyoidc.server", [_cookie])
+        assert _info[0]["value"] == "value"
+
+        # but the old handler does not know about the new key
+        _new_cookie = _new_handler.make_cookie_content("idpyoidc.server", "value", "sso")
+        assert self.cookie_handler.parse_cookie("idpyoidc.server", [_new_cookie]) == []
+
+    def test_garbage(self):
+        _cookie = {"name": "idpyoidc.server", "value": "not a cookie"}
+        assert self.cookie_handler.parse_cookie("idpyoidc.server", [_cookie]) == []
@@ -936,6 +936,93 @@ class TestClientCredentialsFlow(object):
             "expires_in",
         }
 
+    def test_client_credentials_again(self):
+        request = CCAccessTokenRequest(
+            client_id="client_1",
+            client_secret="hemligt",
+            grant_type="client_credentials",
+            scope="whatever",
+        )
+        _tokens = []
+        for _ in range(2):
+            _req = self.token_endpoint.parse_request(request.to_dict())
+            response = self.token_endpoint.process_request(_req)
+            _tokens.append(response["response_args"]["access_token"])
+        assert _tokens[0] != _tokens[1]
+        # Both are in the same session
+        _info = [
+            self.session_manager.get_session_info_by_token(t, handler_key="access_token")
+            for t in _tokens
+        ]
+        assert _info[0]["grant"] is _info[1]["grant"]
+
+    def test_client_credentials_revoked(self):
+        request = CCAccessTokenRequest(
+            client_id="client_1",
+            client_secret="hemligt",
+            grant_type="client_credentials",
+            scope="whatever",
+        )
+        _req = self.token_endpoint.parse_request(request.to_dict())
+        response = self.token_endpoint.process_request(_req)
+        _info = self.session_manager.get_session_info_by_token(
+            response["response_args"]["access_token"], handler_key="access_token"
+        )
+        self.session_manager.revoke_grant(_info["branch_id"])
+
+        # A new grant is used
+        _req = self.token_endpoint.parse_request(request.to_dict())
+        response = self.token_endpoint.process_request(_req)
+        assert "access_token" in response["response_args"]
+        _new_info = self.session_manager.get_session_info_by_token(
+            response["response_args"]["access_token"], handler_key="access_token"
+        )
+        assert _new_info["grant"] is not _info["grant"]
+        assert _new_info["grant"].is_active()
+
+    def test_client_credentials_many(self):
+        request = CCAccessTokenRequest(
+            client_id="client_1",
+            client_secret="hemligt",
+            grant_type="client_credentials",
+            scope="whatever",
+        )
+        self.token_endpoint.grant_type_helper["client_credentials"].max_tokens = 5
+
+        def _grants():
+            _client_info = self.session_manager.get(["client_credentials", "client_1"])
+            return [
+                self.session_manager.get(self.session_manager.unpack_branch_key(k))
+                for k in _client_info.subordinate
+            ]
+
+        def _request(expire=False):
+            _req = self.token_endpoint.parse_request(request.to_dict())
+            response = self.token_endpoint.process_request(_req)
+            assert "access_token" in response["response_args"]
+            if expire:
+                for _grant in _grants():
+                    for _token in _grant.issued_token:
+                        _token.expires_at = utc_time_sans_frac() - 1
+
+        # Expired tokens are removed from the grant
+        for _ in range(10):
+            _request(expire=True)
+        assert [len(g.issued_token) for g in _grants()] == [1]
+
+        # A new grant when the grant is full
+        for _ in range(6):
+            _request()
+        assert [len(g.issued_token) for g in _grants()] == [5, 1]
+
+        # Grants without any token that can be used are removed
+        for _grant in _grants():
+            for _token in _grant.issued_token:
+                _token.expires_at = utc_time_sans_frac() - 1
+        for _ in range(6):
+            _request()
+        assert [len(g.issued_token) for g in _grants()] == [5, 1]
+
 
 class TestResourceOwnerPasswordCredentialsFlow(object):
     @pytest.fixture(autouse=True)
@@ -754,6 +754,26 @@ class TestEndpoint(object):
         _resp = self.endpoint.process_request(_pr_resp)
         assert "session_state" in _resp["response_args"]
 
+    def test_check_session_iframe_browser_state(self):
+        _context = self.endpoint.upstream_get("context")
+        _context.provider_info["check_session_iframe"] = "https://example.com/csi"
+        _pr_resp = self.endpoint.parse_request(AUTH_REQ_DICT)
+        _resp = self.endpoint.process_request(_pr_resp)
+        _session_state = _resp["response_args"]["session_state"]
+        _opbs = [
+            c["value"]
+            for c in _resp["cookie"]
+            if c["name"] == _context.cookie_handler.name["session_management"]
+        ][0]
+        assert _context.browser_state.validate(
+            _opbs, AUTH_REQ_DICT["client_id"], AUTH_REQ_DICT["redirect_uri"], _session_state
+        )
+
+        _context.browser_state.logout("diana")
+        assert not _context.browser_state.validate(
+            _opbs, AUTH_REQ_DICT["client_id"], AUTH_REQ_DICT["redirect_uri"], _session_state
+        )
+
     def test_setup_auth_login_hint(self):
         request = AuthorizationRequest(
             client_id="client_id",
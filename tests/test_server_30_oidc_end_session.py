@@ -2,6 +2,7 @@ import copy
 import json
 import os
 from urllib.parse import parse_qs
+from urllib.parse import urlencode
 from urllib.parse import urlparse
 
 from cryptojwt.key_jar import build_keyjar
@@ -25,6 +26,8 @@ from idpyoidc.server.oidc.provider_config import ProviderConfiguration
 from idpyoidc.server.oidc.registration import Registration
 from idpyoidc.server.oidc.session import Session
 from idpyoidc.server.oidc.session import do_front_channel_logout_iframe
+from idpyoidc.server.oidc.session import front_channel_logout_page
+from idpyoidc.server.oidc.session import front_channel_logout_template
 from idpyoidc.server.oidc.token import Token
 from idpyoidc.server.user_authn.authn_context import INTERNETPROTOCOLPASSWORD
 from idpyoidc.server.user_info import UserInfo
@@ -240,6 +243,15 @@ class TestEndpoint(object):
         with pytest.raises(ValueError):
             _ = self.session_endpoint.process_request("", http_info=http_info)
 
+    def test_parse_request_client_authn(self):
+        # The client authenticates with something else than a bearer token
+        self.session_endpoint.client_authn_method = ["client_secret_post"]
+        request = self.session_endpoint.parse_request(
+            {"client_id": "client_1", "client_secret": "hemligt", "state": "abc"}
+        )
+        assert request["client_id"] == "client_1"
+        assert "access_token" not in request
+
     def _create_cookie(self, session_id):
         ec = self.session_endpoint.upstream_get("context")
         return ec.new_cookie(
@@ -487,6 +499,52 @@ class TestEndpoint(object):
         for i in test_res:
             assert i in res
 
+    def test_front_channel_logout_template(self):
+        _cinfo = {
+            "frontchannel_logout_uri": "https://example.com/fc_logout?entity_id=foo&sid=x",
+            "frontchannel_logout_session_required": True,
+        }
+        _template = front_channel_logout_template(_cinfo, ISS)
+        for sid in ["_sid_", "a b/c+d&e"]:
+            assert _template.render(sid) == (
+                '<iframe src="https://example.com/fc_logout?'
+                + urlencode({"entity_id": ["foo"], "sid": sid, "iss": ISS}, doseq=True)
+                + '">'
+            )
+        assert front_channel_logout_template({}, ISS) is None
+
+    def test_front_channel_template_follows_registration(self):
+        _cdb = self.session_endpoint.upstream_get("context").cdb
+        _cdb["client_1"]["frontchannel_logout_uri"] = "https://example.com/fc_logout"
+        self.session_endpoint.compile_front_channel_template("client_1")
+        _iframe = self.session_endpoint.front_channel_logout_iframe("client_1", "_sid_")
+        assert _iframe == '<iframe src="https://example.com/fc_logout">'
+
+        # Changed without the template being rebuilt
+        _cdb["client_1"]["frontchannel_logout_session_required"] = True
+        _iframe = self.session_endpoint.front_channel_logout_iframe("client_1", "_sid_")
+        assert _iframe == do_front_channel_logout_iframe(_cdb["client_1"], ISS, "_sid_")
+        assert "sid=_sid_" in _iframe
+
+        del _cdb["client_1"]["frontchannel_logout_uri"]
+        assert self.session_endpoint.front_channel_logout_iframe("client_1", "_sid_") is None
+
+    def test_front_channel_logout_page(self):
+        _iframes = [f'<iframe src="https://rp{n}.example.com/fc_logout">' for n in range(5)]
+        _pieces = list(
+            front_channel_logout_page(
+                _iframes, "https://example.com/post_logout</script>", chunk_size=2
+            )
+        )
+        # head, three chunks of IFrames and tail
+        assert len(_pieces) == 5
+        _page = "".join(_pieces)
+        assert _page.count('<iframe onload="frameOnLoad()" src=') == 5
+        assert _page.count("</iframe>") == 5
+        assert "expected = 5;" in _page
+        assert '"https://example.com/post_logout<\\/script>"' in _page
+        assert _page.endswith("</html>\n")
+
     def test_logout_from_client_bc(self):
         _resp = self._code_auth("1234567")
         _code = _resp["response_args"]["code"]
@@ -607,6 +665,26 @@ class TestEndpoint(object):
             res = self.session_endpoint.do_verified_logout(_session_info["branch_id"])
             assert res == []
 
+    def test_dispatch_back_channel_logouts(self):
+        _resp = self._code_auth("1234567")
+        _code = _resp["response_args"]["code"]
+        _session_info = self.session_manager.get_session_info_by_token(
+            _code, handler_key="authorization_code"
+        )
+        _cdb = self.session_endpoint.upstream_get("context").cdb
+        _cdb["client_1"]["backchannel_logout_uri"] = "https://example.com/bc_logout"
+        _cdb["client_1"]["client_id"] = "client_1"
+
+        res = self.session_endpoint.logout_from_client(_session_info["branch_id"])
+        with responses.RequestsMock() as rsps:
+            rsps.add("POST", "https://example.com/bc_logout", status=503)
+            rsps.add("POST", "https://example.com/bc_logout", body="OK", status=200)
+            self.session_endpoint.logout_dispatcher.backoff = 0
+            _outcome = self.session_endpoint.dispatch_back_channel_logouts(res["blu"])
+
+        assert _outcome["client_1"]["status"] == "ok"
+        assert _outcome["client_1"]["attempts"] == 2
+
     def test_logout_from_client_unknow_sid(self):
         _resp = self._code_auth("1234567")
         _code = _resp["response_args"]["code"]
@@ -18,8 +18,10 @@ from idpyoidc.server.client_authn import verify_client
 from idpyoidc.server.configure import ASConfiguration
 from idpyoidc.server.exception import ClientAuthenticationError
 from idpyoidc.server.oauth2.authorization import Authorization
+from idpyoidc.server.oauth2.introspection import BatchIntrospection
 from idpyoidc.server.oauth2.introspection import Introspection
 from idpyoidc.server.oidc.token import Token
+from idpyoidc.server.session.database import Database
 from idpyoidc.server.user_authn.authn_context import INTERNETPROTOCOLPASSWORD
 from idpyoidc.server.user_info import UserInfo
 from idpyoidc.time_util import utc_time_sans_frac
@@ -135,6 +137,16 @@ class TestEndpoint:
                         "enforce_audience_restriction": True,
                     },
                 },
+                "batch_introspection": {
+                    "path": "{}/batch_intro",
+                    "class": BatchIntrospection,
+                    "kwargs": {
+                        "client_authn_method": ["client_secret_post"],
+                        "enforce_audience_restriction": True,
+                        "cache_lifetime": 60,
+                        "max_tokens": 3,
+                    },
+                },
                 "token": {
                     "path": "token",
                     "class": Token,
@@ -211,6 +223,7 @@ class TestEndpoint:
             server.keyjar.export_jwks_as_json(private=True), context.issuer
         )
         self.introspection_endpoint = server.get_endpoint("introspection")
+        self.batch_introspection_endpoint = server.get_endpoint("batch_introspection")
         self.token_endpoint = server.get_endpoint("token")
         self.session_manager = context.session_manager
         self.user_id = "diana"
@@ -526,3 +539,142 @@ class TestEndpoint:
         _resp = self.introspection_endpoint.process_request(_req)
 
         assert _resp["response_args"]["active"] is False
+
+    def _introspect(self, token_value):
+        _context = self.introspection_endpoint.upstream_get("context")
+        _req = self.introspection_endpoint.parse_request(
+            {
+                "token": token_value,
+                "client_id": "client_1",
+                "client_secret": _context.cdb["client_1"]["client_secret"],
+            }
+        )
+        return self.introspection_endpoint.process_request(_req)["response_args"]
+
+    def test_cache(self):
+        self.introspection_endpoint.cache_lifetime = 60
+        access_token = self._get_access_token(AUTH_REQ)
+
+        _resp = self._introspect(access_token.value)
+        assert _resp["active"] is True
+        assert len(self.introspection_endpoint._cache) == 1
+
+        _cached_resp = self._introspect(access_token.value)
+        assert _cached_resp.to_dict() == _resp.to_dict()
+        assert len(self.introspection_endpoint._cache) == 1
+
+    def test_cache_revoke_token(self):
+        self.introspection_endpoint.cache_lifetime = 60
+        access_token = self._get_access_token(AUTH_REQ)
+        assert self._introspect(access_token.value)["active"] is True
+
+        _session_id = self.session_manager.get_session_id_by_token(access_token.value)
+        self.session_manager.revoke_token(_session_id, access_token.value)
+        assert self.introspection_endpoint._cache == {}
+        assert self._introspect(access_token.value)["active"] is False
+
+    def test_cache_revoke_grant(self):
+        self.introspection_endpoint.cache_lifetime = 60
+        access_token = self._get_access_token(AUTH_REQ)
+        assert self._introspect(access_token.value)["active"] is True
+
+        _session_id = self.session_manager.get_session_id_by_token(access_token.value)
+        self.session_manager.revoke_grant(_session_id)
+        assert self.introspection_endpoint._cache == {}
+
+    def test_cache_revoke_client_session(self):
+        self.introspection_endpoint.cache_lifetime = 60
+        access_token = self._get_access_token(AUTH_REQ)
+        assert self._introspect(access_token.value)["active"] is True
+
+        _session_id = self.session_manager.get_session_id_by_token(access_token.value)
+        self.session_manager.revoke_client_session(_session_id)
+        assert self.introspection_endpoint._cache == {}
+
+    def test_cache_revoke_user(self):
+        self.introspection_endpoint.cache_lifetime = 60
+        access_token = self._get_access_token(AUTH_REQ)
+        assert self._introspect(access_token.value)["active"] is True
+        assert set(self.introspection_endpoint._cache_index.keys()) >= {self.user_id}
+
+        self.session_manager.revoke_sessions(user_id=self.user_id)
+        assert self.introspection_endpoint._cache == {}
+        assert self.introspection_endpoint._cache_index == {}
+
+    def test_cache_revoked_by_other_process(self, tmp_path):
+        _params = {
+            **SESSION_PARAMS,
+            "storage": {
+                "class": "idpyoidc.storage.versioned.SQLiteVersionedStore",
+                "kwargs": {"filename": str(tmp_path / "session.db")},
+            },
+        }
+        self.session_manager.db = Database(crypt_config=CRYPT_CONFIG, session_params=_params).db
+        self.introspection_endpoint.cache_lifetime = 60
+        access_token = self._get_access_token(AUTH_REQ)
+        _session_id = self.session_manager.get_session_id_by_token(access_token.value)
+        # Store the grant with the minted tokens
+        self.session_manager[_session_id] = self.session_manager[_session_id]
+        assert self._introspect(access_token.value)["active"] is True
+        assert self._introspect(access_token.value)["active"] is True
+
+        # Another process, using the same store, revokes the token
+        _other = Database(crypt_config=CRYPT_CONFIG, session_params=_params)
+        _path = self.session_manager.decrypt_branch_id(_session_id)
+        _grant = _other.get(_path)
+        _grant.get_token(access_token.value).revoke()
+        _other.set(_path, _grant)
+
+        assert self._introspect(access_token.value)["active"] is False
+
+    def test_cache_token_revoked_in_place(self):
+        self.introspection_endpoint.cache_lifetime = 60
+        access_token = self._get_access_token(AUTH_REQ)
+        assert self._introspect(access_token.value)["active"] is True
+
+        access_token.revoked = True
+        assert self._introspect(access_token.value)["active"] is False
+
+    def test_cache_expired(self):
+        self.introspection_endpoint.cache_lifetime = 60
+        access_token = self._get_access_token(AUTH_REQ)
+        assert self._introspect(access_token.value)["active"] is True
+
+        _key = list(self.introspection_endpoint._cache.keys())[0]
+        _item = self.introspection_endpoint._cache[_key]
+        self.introspection_endpoint._cache[_key] = (0,) + _item[1:]
+        access_token.expires_at = utc_time_sans_frac() - 10
+        assert self._introspect(access_token.value)["active"] is False
+
+    def test_batch(self):
+        _tokens = [self._get_access_token(AUTH_REQ).value for _ in range(2)]
+        _tokens.append("not_a_token")
+
+        _context = self.batch_introspection_endpoint.upstream_get("context")
+        _req = self.batch_introspection_endpoint.parse_request(
+            {
+                "tokens": " ".join(_tokens),
+                "client_id": "client_1",
+                "client_secret": _context.cdb["client_1"]["client_secret"],
+            }
+        )
+        _resp = self.batch_introspection_endpoint.process_request(_req)
+        _responses = _resp["response_args"]["responses"]
+        assert [r["active"] for r in _responses] == [True, True, False]
+
+        msg_info = self.batch_introspection_endpoint.do_response(request=_req, **_resp)
+        _payload = json.loads(msg_info["response"])
+        assert len(_payload["responses"]) == 3
+        assert _payload["responses"][0]["client_id"] == "client_1"
+
+    def test_batch_too_many(self):
+        _context = self.batch_introspection_endpoint.upstream_get("context")
+        _req = self.batch_introspection_endpoint.parse_request(
+            {
+                "tokens": "a b c d",
+                "client_id": "client_1",
+                "client_secret": _context.cdb["client_1"]["client_secret"],
+            }
+        )
+        _resp = self.batch_introspection_endpoint.process_request(_req)
+        assert _resp["error"] == "invalid_request"
@@ -577,3 +577,65 @@ class TestEndpoint:
             "error_description": err_dscr,
         }
         assert code.revoked is False
+
+    def _revoke(self, token):
+        _context = self.revocation_endpoint.upstream_get("endpoint_context")
+        _req = self.revocation_endpoint.parse_request(
+            {
+                "token": token.value,
+                "client_id": "client_1",
+                "client_secret": _context.cdb["client_1"]["client_secret"],
+            }
+        )
+        return self.revocation_endpoint.process_request(_req)
+
+    def test_policy_function_imported_once(self, monkeypatch):
+        import idpyoidc.server.oauth2.token_revocation as token_revocation
+
+        _imported = []
+
+        def _importer(name):
+            _imported.append(name)
+            return validate_token_revocation_policy
+
+        monkeypatch.setattr(token_revocation, "importer", _importer)
+        _context = self.revocation_endpoint.upstream_get("endpoint_context")
+        _context.cdb["client_1"]["token_revocation"] = {
+            "policy": {"": {"function": "some.module.policy_function"}},
+        }
+        for _ in range(3):
+            access_token = self._get_access_token(AUTH_REQ)
+            assert "response_msg" in self._revoke(access_token)
+            assert access_token.revoked
+        assert _imported == ["some.module.policy_function"]
+
+    def test_policy_recompiled_on_client_update(self):
+        _context = self.revocation_endpoint.upstream_get("endpoint_context")
+        access_token = self._get_access_token(AUTH_REQ)
+        _policy = self.revocation_endpoint.get_policy("client_1")
+        assert "access_token" in _policy.token_types_supported
+        # Unchanged configuration, same policy
+        assert self.revocation_endpoint.get_policy("client_1") is _policy
+
+        _context.cdb["client_1"]["token_revocation"] = {"token_types_supported": ["refresh_token"]}
+        assert "error" in self._revoke(access_token)
+        # Changed in place
+        _context.cdb["client_1"]["token_revocation"]["token_types_supported"].append(
+            "access_token"
+        )
+        assert "response_msg" in self._revoke(access_token)
+
+    def test_policy_is_immutable(self):
+        _policy = self.revocation_endpoint.get_policy("client_1")
+        with pytest.raises(AttributeError):
+            _policy.token_types_supported = frozenset(["access_token"])
+
+    def test_unknown_policy_function(self):
+        from idpyoidc.exception import ImproperlyConfigured
+
+        _context = self.revocation_endpoint.upstream_get("endpoint_context")
+        _context.cdb["client_1"]["token_revocation"] = {
+            "policy": {"": {"function": "no.such.module.function"}},
+        }
+        with pytest.raises(ImproperlyConfigured):
+            self.revocation_endpoint.compile_policies()
@@ -0,0 +1,331 @@
+import multiprocessing
+import os
+
+import pytest
+
+from idpyoidc.message.oidc import AccessTokenRequest
+from idpyoidc.message.oidc import AuthorizationRequest
+from idpyoidc.server import Server
+from idpyoidc.server.authn_event import create_authn_event
+from idpyoidc.server.authz import AuthzHandling
+from idpyoidc.server.client_authn import verify_client
+from idpyoidc.server.configure import ASConfiguration
+from idpyoidc.server.oauth2.authorization import Authorization
+from idpyoidc.server.oauth2.token import Token
+from idpyoidc.server.session.database import Database
+from idpyoidc.server.session.grant import Grant
+from idpyoidc.server.session.info import ClientSessionInfo
+from idpyoidc.server.session.info import UserSessionInfo
+from idpyoidc.server.session.token import SessionToken
+from idpyoidc.server.user_authn.authn_context import INTERNETPROTOCOLPASSWORD
+from idpyoidc.server.user_info import UserInfo
+from idpyoidc.storage import ConcurrentUpdate
+from idpyoidc.storage.versioned import SQLiteVersionedStore
+from idpyoidc.storage.versioned import VersionedStore
+from tests import CRYPT_CONFIG
+from tests import SESSION_PARAMS
+
+BASEDIR = os.path.abspath(os.path.dirname(__file__))
+
+KEYDEFS = [
+    {"type": "RSA", "key": "", "use": ["sig"]},
+    {"type": "EC", "crv": "P-256", "use": ["sig"]},
+]
+
+AUTH_REQ = AuthorizationRequest(
+    client_id="client_1",
+    redirect_uri="https://example.com/cb",
+    scope=["email"],
+    state="STATE",
+    response_type="code",
+)
+
+TOKEN_REQ = AccessTokenRequest(
+    client_id="client_1",
+    redirect_uri="https://example.com/cb",
+    state="STATE",
+    grant_type="authorization_code",
+    client_secret="hemligt",
+)
+
+NODE_INFO_CLASS = {"user": UserSessionInfo, "client": ClientSessionInfo, "grant": Grant}
+
+
+@pytest.mark.parametrize("store_class", [VersionedStore, SQLiteVersionedStore])
+def test_compare_and_swap(store_class, tmp_path):
+    if store_class == SQLiteVersionedStore:
+        store = store_class(filename=str(tmp_path / "store.db"))
+    else:
+        store = store_class()
+
+    assert store.read("foo") is None
+    assert store.write("foo", "bar") == 1
+    with pytest.raises(ConcurrentUpdate):
+        store.write("foo", "xyz")  # must not exist
+    assert store.write("foo", "xyz", 1) == 2
+    with pytest.raises(ConcurrentUpdate):
+        store.write("foo", "abc", 1)
+    assert store.read("foo") == (2, "xyz")
+
+    store.delete("foo")
+    assert store.keys() == []
+
+
+class TestSharedDatabase:
+    @pytest.fixture(autouse=True)
+    def setup_environment(self, tmp_path):
+        _params = {
+            "node_type": ["user", "client", "grant"],
+            "node_info_class": NODE_INFO_CLASS,
+            "storage": {
+                "class": "idpyoidc.storage.versioned.SQLiteVersionedStore",
+                "kwargs": {"filename": str(tmp_path / "session.db")},
+            },
+        }
+        # Two views of the same store, as two processes would have
+        self.db = Database(crypt_config=CRYPT_CONFIG, session_params=_params)
+        self.other = Database(crypt_config=CRYPT_CONFIG, session_params=_params)
+
+    def test_set_get(self):
+        grant = Grant(authentication_event=create_authn_event(uid="diana"))
+        self.db.set(["diana", "client_1", grant.id], grant)
+
+        _grant = self.other.get(["diana", "client_1", grant.id])
+        assert _grant.id == grant.id
+        assert _grant.revision == 1
+        _client_info = self.other.get(["diana", "client_1"])
+        assert _client_info.subordinate == [self.db.branch_key("diana", "client_1", grant.id)]
+
+    def test_lost_update(self):
+        grant = Grant()
+        _path = ["diana", "client_1", grant.id]
+        self.db.set(_path, grant)
+
+        _grant = self.db.get(_path)
+        _other_grant = self.other.get(_path)
+
+        _grant.issued_token.append(SessionToken("access_token", value="1234567890"))
+        self.db.set(_path, _grant)
+
+        _other_grant.issued_token.append(SessionToken("access_token", value="0987654321"))
+        with pytest.raises(ConcurrentUpdate):
+            self.other.set(_path, _other_grant)
+
+        # A fresh read sees the update done by the other party
+        _other_grant = self.other.get(_path)
+        assert [t.value for t in _other_grant.issued_token] == ["1234567890"]
+
+    def test_revoke_is_stored(self):
+        grant = Grant()
+        _path = ["diana", "client_1", grant.id]
+        self.db.set(_path, grant)
+        self.db.update(_path, {"revoked": True})
+        assert self.other.get(_path).revoked is True
+
+    def test_delete(self):
+        grant = Grant()
+        _path = ["diana", "client_1", grant.id]
+        self.db.set(_path, grant)
+        self.db.delete(_path)
+        assert self.db.branch_key(*_path) not in self.other.db
+
+    def test_concurrent_grants(self, monkeypatch):
+        grant = Grant()
+        self.db.set(["diana", "client_1", grant.id], grant)
+
+        # The other process adds a grant after this one read the client node
+        _client_key = self.db.branch_key("diana", "client_1")
+        _other_grant = Grant()
+        _store = self.db.db.store
+        _write = _store.write
+
+        def _write_after_other(key, value, revision=0):
+            if key == _client_key and _other_grant.revision == 0:
+                self.other.set(["diana", "client_1", _other_grant.id], _other_grant)
+            return _write(key, value, revision)
+
+        monkeypatch.setattr(_store, "write", _write_after_other)
+        _grant = Grant()
+        self.db.set(["diana", "client_1", _grant.id], _grant)
+
+        _client_info = self.other.get(["diana", "client_1"])
+        assert _client_info.subordinate == [
+            self.db.branch_key("diana", "client_1", g.id) for g in [grant, _other_grant, _grant]
+        ]
+
+    def test_concurrent_grants_give_up(self, monkeypatch):
+        grant = Grant()
+        self.db.set(["diana", "client_1", grant.id], grant)
+
+        _client_key = self.db.branch_key("diana", "client_1")
+        _store = self.db.db.store
+        _write = _store.write
+
+        def _always_outdated(key, value, revision=0):
+            if key == _client_key:
+                raise ConcurrentUpdate(key)
+            return _write(key, value, revision)
+
+        monkeypatch.setattr(_store, "write", _always_outdated)
+        _grant = Grant()
+        with pytest.raises(ConcurrentUpdate):
+            self.db.set(["diana", "client_1", _grant.id], _grant)
+
+        # Nothing is left behind
+        assert self.db.branch_key("diana", "client_1", _grant.id) not in self.other.db
+        assert self.other.get(["diana", "client_1"]).subordinate == [
+            self.db.branch_key("diana", "client_1", grant.id)
+        ]
+
+
+def _exchange_code(token_endpoint, code, queue):
+    _req = TOKEN_REQ.to_dict()
+    _req["code"] = code
+    _parsed = token_endpoint.parse_request(_req)
+    if "error" in _parsed:
+        queue.put("error")
+        return
+    _resp = token_endpoint.process_request(request=_parsed)
+    if "response_args" in _resp:
+        queue.put("access_token")
+    else:
+        queue.put("error")
+
+
+class TestTokenEndpoint:
+    @pytest.fixture(autouse=True)
+    def create_endpoint(self, tmp_path):
+        conf = {
+            "issuer": "https://example.com/",
+            "httpc_params": {"verify": False},
+            "keys": {"uri_path": "jwks.json", "key_defs": KEYDEFS},
+            "token_handler_args": {
+                "jwks_file": "private/token_jwks.json",
+                "code": {"lifetime": 600, "kwargs": {"crypt_conf": CRYPT_CONFIG}},
+                "token": {
+                    "class": "idpyoidc.server.token.jwt_token.JWTToken",
+                    "kwargs": {"lifetime": 3600, "aud": ["https://example.org/appl"]},
+                },
+            },
+            "endpoint": {
+                "authorization": {"path": "authorization", "class": Authorization, "kwargs": {}},
+                "token": {
+                    "path": "token",
+                    "class": Token,
+                    "kwargs": {"client_authn_method": ["client_secret_post"]},
+                },
+            },
+            "authentication": {
+                "anon": {
+                    "acr": INTERNETPROTOCOLPASSWORD,
+                    "class": "idpyoidc.server.user_authn.user.NoAuthn",
+                    "kwargs": {"user": "diana"},
+                }
+            },
+            "userinfo": {"class": UserInfo, "kwargs": {"db": {}}},
+            "client_authn": verify_client,
+            "claims_interface": {
+                "class": "idpyoidc.server.session.claims.OAuth2ClaimsInterface",
+                "kwargs": {},
+            },
+            "authz": {
+                "class": AuthzHandling,
+                "kwargs": {
+                    "grant_config": {
+                        "usage_rules": {
+                            "authorization_code": {
+                                "expires_in": 300,
+                                "supports_minting": ["access_token"],
+                                "max_usage": 1,
+                            },
+                            "access_token": {"expires_in": 600},
+                        },
+                        "expires_in": 43200,
+                    }
+                },
+            },
+            "session_params": {
+                "encrypter": SESSION_PARAMS,
+                "storage": {
+                    "class": "idpyoidc.storage.versioned.SQLiteVersionedStore",
+                    "kwargs": {"filename": str(tmp_path / "session.db")},
+                },
+            },
+        }
+        server = Server(ASConfiguration(conf=conf, base_path=BASEDIR), cwd=BASEDIR)
+        self.context = server.context
+        self.context.cdb["client_1"] = {
+            "client_secret": "hemligt",
+            "redirect_uris": [("https://example.com/cb", None)],
+            "client_salt": "salted",
+            "endpoint_auth_method": "client_secret_post",
+            "response_types": ["code"],
+            "allowed_scopes": ["email"],
+        }
+        self.session_manager = self.context.session_manager
+        self.token_endpoint = server.get_endpoint("token")
+        self.db_file = str(tmp_path / "session.db")
+
+    def _mint_code(self):
+        session_id = self.session_manager.create_session(
+            create_authn_event("diana"), AUTH_REQ, "diana", client_id="client_1"
+        )
+        grant = self.session_manager[session_id]
+        code = grant.mint_token(
+            session_id=session_id,
+            context=self.context,
+            token_class="authorization_code",
+            token_handler=self.session_manager.token_handler["authorization_code"],
+            usage_rules=grant.usage_rules.get("authorization_code", {}),
+        )
+        self.session_manager[session_id] = grant
+        return code.value
+
+    def test_code_single_use(self):
+        code = self._mint_code()
+        queue = multiprocessing.Queue()
+        _exchange_code(self.token_endpoint, code, queue)
+        _exchange_code(self.token_endpoint, code, queue)
+        _resp = [queue.get(timeout=10) for _ in range(2)]
+        assert _resp == ["access_token", "error"]
+
+    def test_code_single_use_many_processes(self):
+        code = self._mint_code()
+        _mp = multiprocessing.get_context("fork")
+        queue = _mp.Queue()
+        workers = [
+            _mp.Process(target=_exchange_code, args=(self.token_endpoint, code, queue))
+            for _ in range(6)
+        ]
+        for w in workers:
+            w.start()
+        _resp = [queue.get(timeout=60) for _ in workers]
+        for w in workers:
+            w.join()
+
+        assert _resp.count("access_token") == 1
+        assert _resp.count("error") == 5
+
+    def test_revoke_by_client_sees_other_process(self):
+        self.session_manager.create_session(
+            create_authn_event("diana"), AUTH_REQ, "diana", client_id="client_1"
+        )
+        assert self.session_manager.revoke_by_client("client_1") == 1
+
+        # Another process adds a session for the same client
+        _other = Database(
+            crypt_config=CRYPT_CONFIG,
+            session_params={
+                "node_type": ["user", "client", "grant"],
+                "node_info_class": NODE_INFO_CLASS,
+                "storage": {
+                    "class": "idpyoidc.storage.versioned.SQLiteVersionedStore",
+                    "kwargs": {"filename": self.db_file},
+                },
+            },
+        )
+        grant = Grant(authentication_event=create_authn_event(uid="ewa"))
+        _other.set(["ewa", "client_1", grant.id], grant)
+
+        assert self.session_manager.revoke_by_client("client_1") == 1
+        assert _other.get(["ewa", "client_1", grant.id]).revoked is True
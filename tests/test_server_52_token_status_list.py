@@ -0,0 +1,284 @@
+import json
+import os
+
+import pytest
+from cryptojwt.jws.jws import factory
+
+from idpyoidc.message.oidc import AuthorizationRequest
+from idpyoidc.server import Server
+from idpyoidc.server.authn_event import create_authn_event
+from idpyoidc.server.authz import AuthzHandling
+from idpyoidc.server.client_authn import verify_client
+from idpyoidc.server.configure import ASConfiguration
+from idpyoidc.server.exception import ConfigurationError
+from idpyoidc.server.oauth2.authorization import Authorization
+from idpyoidc.server.oauth2.token_revocation import TokenRevocation
+from idpyoidc.server.oauth2.token_status_list import TokenStatusList
+from idpyoidc.server.oidc.token import Token
+from idpyoidc.server.session.manager import SessionManager
+from idpyoidc.server.token.status_list import INVALID
+from idpyoidc.server.token.status_list import VALID
+from idpyoidc.server.token.status_list import StatusList
+from idpyoidc.server.token.status_list import decode
+from idpyoidc.server.token.status_list import status
+from idpyoidc.server.user_authn.authn_context import INTERNETPROTOCOLPASSWORD
+from idpyoidc.server.user_info import UserInfo
+from tests import CRYPT_CONFIG
+from tests import SESSION_PARAMS
+
+KEYDEFS = [
+    {"type": "RSA", "key": "", "use": ["sig"]},
+    {"type": "EC", "crv": "P-256", "use": ["sig"]},
+]
+
+AUTH_REQ = AuthorizationRequest(
+    client_id="client_1",
+    redirect_uri="https://example.com/cb",
+    scope=["openid"],
+    state="STATE",
+    response_type="code",
+)
+
+BASEDIR = os.path.abspath(os.path.dirname(__file__))
+
+
+def test_status_list():
+    status_list = StatusList(chunk_size=2)
+    assert [status_list.allocate() for _ in range(20)] == list(range(20))
+    status_list.revoke(3)
+    status_list.revoke(17)
+    assert status_list.get(3) == INVALID
+    assert status_list.get(4) == VALID
+
+    _bits = decode(status_list.lst)
+    assert [i for i in range(20) if status(_bits, i) == INVALID] == [3, 17]
+
+    with pytest.raises(IndexError):
+        status_list.revoke(20)
+
+
+def test_status_list_etag():
+    status_list = StatusList()
+    status_list.allocate()
+    _etag = status_list.etag
+    # Handing out more indexes does not change what is published
+    status_list.allocate()
+    assert status_list.etag == _etag
+    status_list.revoke(1)
+    assert status_list.etag != _etag
+    _etag = status_list.etag
+    # Nor does revoking an already revoked token
+    status_list.revoke(1)
+    assert status_list.etag == _etag
+
+
+def test_status_list_dump_load():
+    status_list = StatusList(uri="https://example.com/status")
+    for _ in range(10):
+        status_list.allocate()
+    status_list.revoke(7)
+
+    _new = StatusList().load(status_list.dump())
+    assert _new.uri == "https://example.com/status"
+    assert _new.get(7) == INVALID
+    assert _new.allocate() == 10
+
+
+def test_shared_storage(tmp_path):
+    _params = {
+        **SESSION_PARAMS,
+        "storage": {
+            "class": "idpyoidc.storage.versioned.SQLiteVersionedStore",
+            "kwargs": {"filename": str(tmp_path / "session.db")},
+        },
+        "status_list": {"kwargs": {"token_class": ["access_token"]}},
+    }
+    with pytest.raises(ConfigurationError):
+        SessionManager(None, conf={"session_params": _params})
+
+
+class TestEndpoint:
+    @pytest.fixture(autouse=True)
+    def create_endpoint(self):
+        conf = {
+            "issuer": "https://example.com/",
+            "httpc_params": {"verify": False, "timeout": 1},
+            "keys": {"uri_path": "jwks.json", "key_defs": KEYDEFS},
+            "token_handler_args": {
+                "jwks_file": "private/token_jwks.json",
+                "code": {"lifetime": 600, "kwargs": {"crypt_conf": CRYPT_CONFIG}},
+                "token": {
+                    "class": "idpyoidc.server.token.jwt_token.JWTToken",
+                    "kwargs": {"lifetime": 3600, "aud": ["https://example.org/appl"]},
+                },
+                "id_token": {"class": "idpyoidc.server.token.id_token.IDToken"},
+            },
+            "endpoint": {
+                "authorization": {"path": "authorization", "class": Authorization, "kwargs": {}},
+                "token_revocation": {
+                    "path": "revoke",
+                    "class": TokenRevocation,
+                    "kwargs": {"client_authn_method": ["client_secret_post"]},
+                },
+                "token_status_list": {
+                    "path": "status_list",
+                    "class": TokenStatusList,
+                    "kwargs": {"ttl": 60},
+                },
+                "token": {
+                    "path": "token",
+                    "class": Token,
+                    "kwargs": {"client_authn_method": ["client_secret_post"]},
+                },
+            },
+            "authentication": {
+                "anon": {
+                    "acr": INTERNETPROTOCOLPASSWORD,
+                    "class": "idpyoidc.server.user_authn.user.NoAuthn",
+                    "kwargs": {"user": "diana"},
+                }
+            },
+            "userinfo": {"class": UserInfo, "kwargs": {"db": {}}},
+            "client_authn": verify_client,
+            "template_dir": "template",
+            "authz": {
+                "class": AuthzHandling,
+                "kwargs": {
+                    "grant_config": {
+                        "usage_rules": {
+                            "authorization_code": {
+                                "supports_minting": ["access_token", "id_token"],
+                                "max_usage": 1,
+                            },
+                            "access_token": {},
+                        },
+                        "expires_in": 43200,
+                    }
+                },
+            },
+            "session_params": {
+                **SESSION_PARAMS,
+                "status_list": {"kwargs": {"token_class": ["access_token"]}},
+            },
+        }
+        self.server = Server(ASConfiguration(conf=conf, base_path=BASEDIR), cwd=BASEDIR)
+        self.context = self.server.context
+        self.context.cdb["client_1"] = {
+            "client_secret": "hemligt",
+            "redirect_uris": [("https://example.com/cb", None)],
+            "client_salt": "salted",
+            "token_endpoint_auth_method": "client_secret_post",
+            "response_types": ["code"],
+            "allowed_scopes": ["openid"],
+        }
+        self.session_manager = self.context.session_manager
+        self.status_list_endpoint = self.server.get_endpoint("token_status_list")
+        self.revocation_endpoint = self.server.get_endpoint("token_revocation")
+
+    def _mint(self, token_class, grant, session_id, based_on=None):
+        return grant.mint_token(
+            session_id=session_id,
+            context=self.context,
+            token_class=token_class,
+            token_handler=self.session_manager.token_handler[token_class],
+            based_on=based_on,
+        )
+
+    def _get_access_token(self):
+        session_id = self.session_manager.create_session(
+            create_authn_event("diana"), AUTH_REQ, "diana", client_id="client_1"
+        )
+        grant = self.context.authz(session_id, AUTH_REQ)
+        code = self._mint("authorization_code", grant, session_id)
+        return session_id, self._mint("access_token", grant, session_id, code)
+
+    def _fetch(self, etag=""):
+        _http_info = {"headers": {"if-none-match": etag}} if etag else {}
+        _args = self.status_list_endpoint.process_request(http_info=_http_info)
+        return self.status_list_endpoint.do_response(**_args)
+
+    def _is_revoked(self, token):
+        _jwt = factory(token.value)
+        _ref = _jwt.jwt.payload()["status"]["status_list"]
+        assert _ref["uri"] == "https://example.com/status_list"
+
+        _list = json.loads(self._fetch()["response"])
+        assert _list["sub"] == _ref["uri"]
+        return status(decode(_list["status_list"]["lst"]), _ref["idx"]) == INVALID
+
+    def test_index_in_token(self):
+        _, token = self._get_access_token()
+        assert token.status_index == 0
+        _, token = self._get_access_token()
+        assert token.status_index == 1
+        assert self._is_revoked(token) is False
+
+    def test_revoke_token(self):
+        session_id, token = self._get_access_token()
+        _, other = self._get_access_token()
+        self.session_manager.revoke_token(session_id, token.value)
+        assert self._is_revoked(token) is True
+        assert self._is_revoked(other) is False
+
+    def test_revoke_grant(self):
+        session_id, token = self._get_access_token()
+        self.session_manager.revoke_grant(session_id)
+        assert self._is_revoked(token) is True
+
+    def test_revoke_client_session(self):
+        session_id, token = self._get_access_token()
+        self.session_manager.revoke_client_session(session_id)
+        assert self._is_revoked(token) is True
+
+    def test_remove_branch(self):
+        session_id, token = self._get_access_token()
+        self.session_manager.remove_branch(session_id)
+        assert self._is_revoked(token) is True
+
+    def test_revocation_endpoint(self):
+        _, token = self._get_access_token()
+        _req = self.revocation_endpoint.parse_request(
+            {"token": token.value, "client_id": "client_1", "client_secret": "hemligt"}
+        )
+        self.revocation_endpoint.process_request(_req)
+        assert self._is_revoked(token) is True
+
+    def test_conditional_get(self):
+        session_id, token = self._get_access_token()
+        _resp = self._fetch()
+        _headers = dict(_resp["http_headers"])
+        assert _headers["Content-type"] == "application/statuslist+json"
+        assert _headers["Cache-Control"] == "max-age=60"
+        _etag = _headers["ETag"]
+
+        _resp = self._fetch(_etag)
+        assert _resp["response_code"] == 304
+        assert _resp["response"] == ""
+
+        self.session_manager.revoke_token(session_id, token.value)
+        _resp = self._fetch(_etag)
+        assert "response_code" not in _resp
+        assert dict(_resp["http_headers"])["ETag"] != _etag
+
+    def test_signed(self):
+        self.status_list_endpoint.signing_alg = "ES256"
+        self.status_list_endpoint.response_content_type = "application/statuslist+jwt"
+        _resp = self._fetch()
+        _jws = factory(_resp["response"])
+        assert _jws.jwt.headers["typ"] == "statuslist+jwt"
+        _payload = _jws.verify_compact(
+            keys=self.context.keyjar.get_signing_key("ec", issuer_id=self.context.issuer)
+        )
+        assert _payload["sub"] == "https://example.com/status_list"
+        assert _payload["iss"] == "https://example.com/"
+
+    def test_dump_load(self):
+        session_id, token = self._get_access_token()
+        self.session_manager.revoke_token(session_id, token.value)
+        _dump = self.session_manager.dump()
+
+        self.session_manager.flush()
+        self.session_manager.status_list = StatusList()
+        self.session_manager.load(_dump)
+        assert self.session_manager.status_list.get(token.status_index) == INVALID
+        assert self.session_manager.status_list.uri == "https://example.com/status_list"
@@ -0,0 +1,178 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+import requests
+
+from idpyoidc.server.oidc.logout_dispatcher import LogoutDispatcher
+
+
+class RelyingParties(object):
+    """Stand-in for the back-channel logout endpoints of a number of RPs."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        # path -> list of status codes to return, the last one is repeated
+        self.status = {}
+        self.received = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+        _rps = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                with _rps.lock:
+                    _rps.in_flight += 1
+                    _rps.max_in_flight = max(_rps.max_in_flight, _rps.in_flight)
+                _body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+                time.sleep(_rps.delay)
+                with _rps.lock:
+                    _rps.in_flight -= 1
+                    _rps.received.setdefault(self.path, []).append(parse_qs(_body))
+                    _codes = _rps.status.get(self.path, [200])
+                    _code = _codes.pop(0) if len(_codes) > 1 else _codes[0]
+                self.send_response(_code)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def uri(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestLogoutDispatcher(object):
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.rps = RelyingParties()
+        self.dispatcher = LogoutDispatcher(max_workers=4, timeout=2, retries=2, backoff=0.01)
+        yield
+        self.rps.close()
+
+    def _logouts(self, number):
+        return {
+            f"client_{n}": (self.rps.uri(f"/client_{n}"), f"token_{n}") for n in range(number)
+        }
+
+    def test_dispatch(self):
+        _outcome = self.dispatcher.dispatch(self._logouts(3), requests.request)
+        assert set(_outcome.keys()) == {"client_0", "client_1", "client_2"}
+        for _cid, _res in _outcome.items():
+            assert _res["status"] == "ok"
+            assert _res["status_code"] == 200
+            assert _res["attempts"] == 1
+            _token = _cid.replace("client", "token")
+            assert self.rps.received[f"/{_cid}"] == [{"logout_token": [_token]}]
+
+    def test_bounded_concurrency(self):
+        self.rps.delay = 0.1
+        _start = time.time()
+        _outcome = self.dispatcher.dispatch(self._logouts(12), requests.request)
+        _elapsed = time.time() - _start
+        assert all(_res["status"] == "ok" for _res in _outcome.values())
+        assert self.rps.max_in_flight <= 4
+        # In parallel, 12 serial posts would take at least 1.2 seconds
+        assert _elapsed < 1.0
+
+    def test_retry(self):
+        self.rps.status["/client_0"] = [503, 500, 200]
+        _outcome = self.dispatcher.dispatch(self._logouts(2), requests.request)
+        assert _outcome["client_0"]["status"] == "ok"
+        assert _outcome["client_0"]["attempts"] == 3
+        assert _outcome["client_1"]["attempts"] == 1
+
+    def test_give_up(self):
+        self.rps.status["/client_0"] = [503]
+        _outcome = self.dispatcher.dispatch(self._logouts(1), requests.request)
+        assert _outcome["client_0"]["status"] == "failed"
+        assert _outcome["client_0"]["status_code"] == 503
+        assert _outcome["client_0"]["attempts"] == 3
+
+    def test_no_retry_on_client_error(self):
+        self.rps.status["/client_0"] = [400]
+        self.rps.status["/client_1"] = [501]
+        _outcome = self.dispatcher.dispatch(self._logouts(2), requests.request)
+        assert _outcome["client_0"]["status"] == "failed"
+        assert _outcome["client_0"]["attempts"] == 1
+        assert _outcome["client_1"]["status"] == "accepted"
+
+    def test_unreachable(self):
+        _logouts = {"client_0": ("http://127.0.0.1:1/logout", "token")}
+        _outcome = self.dispatcher.dispatch(_logouts, requests.request)
+        assert _outcome["client_0"]["status"] == "failed"
+        assert _outcome["client_0"]["attempts"] == 3
+        assert "error" in _outcome["client_0"]
+
+    def test_max_retry_time(self):
+        self.rps.status["/client_0"] = [503]
+        _dispatcher = LogoutDispatcher(timeout=2, retries=2, backoff=0.01, max_retry_time=1)
+        _outcome = _dispatcher.dispatch(self._logouts(1), requests.request)
+        assert _outcome["client_0"]["status"] == "failed"
+        # A retry could take longer than allowed
+        assert _outcome["client_0"]["attempts"] == 1
+
+    def test_sign(self):
+        _threads = set()
+
+        def _task(n):
+            _threads.add(threading.get_ident())
+            time.sleep(0.05)
+            return (f"https://rp{n}.example.com/logout", f"token_{n}") if n else None
+
+        _res = self.dispatcher.sign({f"client_{n}": lambda n=n: _task(n) for n in range(4)})
+        assert len(_threads) > 1
+        # client_0 has nothing to sign
+        assert set(_res.keys()) == {"client_1", "client_2", "client_3"}
+
+    def test_dispatch_async(self):
+        self.rps.status["/client_1"] = [503, 200]
+        _outcome = asyncio.run(self.dispatcher.dispatch_async(self._logouts(3), requests.request))
+        assert [_res["status"] for _res in _outcome.values()] == ["ok"] * 3
+        assert _outcome["client_1"]["attempts"] == 2
+
+    def test_dispatch_async_client(self):
+        _calls = []
+
+        class Response(object):
+            status = 200
+
+        async def _httpc(method, url, **kwargs):
+            _calls.append((method, url, kwargs["data"]))
+            await asyncio.sleep(0)
+            return Response()
+
+        _outcome = asyncio.run(self.dispatcher.dispatch_async(self._logouts(2), _httpc))
+        assert _outcome["client_0"] == {
+            "uri": self.rps.uri("/client_0"),
+            "attempts": 1,
+            "status_code": 200,
+            "status": "ok",
+        }
+        assert sorted(_calls)[0] == ("POST", self.rps.uri("/client_0"), "logout_token=token_0")
+
+    def test_dispatch_async_timeout(self):
+        async def _httpc(method, url, **kwargs):
+            # Doesn't care about the timeout argument
+            await asyncio.sleep(10)
+
+        _dispatcher = LogoutDispatcher(timeout=0.1, retries=1, backoff=0.01)
+        _start = time.time()
+        _outcome = asyncio.run(_dispatcher.dispatch_async(self._logouts(1), _httpc))
+        assert time.time() - _start < 1
+        assert _outcome["client_0"]["status"] == "failed"
+        assert _outcome["client_0"]["attempts"] == 2
@@ -0,0 +1,81 @@
+import pytest
+
+from idpyoidc.server.browser_state import BrowserState
+from idpyoidc.server.cookie_handler import compute_session_state
+
+REDIRECT_URI = "https://rp.example.com/cb"
+ORIGIN = "https://rp.example.com"
+
+
+class TestBrowserState(object):
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.browser_state = BrowserState(max_browsers=3)
+        self.cookies = 0
+
+    def _make_cookie(self):
+        self.cookies += 1
+        return {"name": "oidc_op_sman", "value": f"opbs_{self.cookies}"}
+
+    def _opbs(self, user_id="diana", authn_time=1000):
+        return self.browser_state.get_cookie(user_id, authn_time, self._make_cookie)["value"]
+
+    def test_same_login_same_opbs(self):
+        assert self._opbs() == self._opbs()
+        assert self.cookies == 1
+
+    def test_rotate_on_login(self):
+        _opbs = self._opbs()
+        assert self._opbs(authn_time=2000) != _opbs
+
+    def test_session_state_cached(self):
+        _opbs = self._opbs()
+        _session_state = self.browser_state.session_state(_opbs, "client_1", REDIRECT_URI)
+        _salt = _session_state.split(".")[1]
+        assert _session_state == compute_session_state(_opbs, _salt, "client_1", REDIRECT_URI)
+        # Same origin
+        assert (
+            self.browser_state.session_state(_opbs, "client_1", "https://rp.example.com/other")
+            == _session_state
+        )
+        assert self.browser_state.session_state(_opbs, "client_2", REDIRECT_URI) != _session_state
+
+    def test_validate(self):
+        _opbs = self._opbs()
+        _session_state = self.browser_state.session_state(_opbs, "client_1", REDIRECT_URI)
+        assert self.browser_state.validate(_opbs, "client_1", ORIGIN, _session_state)
+        assert not self.browser_state.validate(_opbs, "client_2", ORIGIN, _session_state)
+        assert not self.browser_state.validate(_opbs, "client_1", ORIGIN, "foo")
+
+    def test_validate_computed_elsewhere(self):
+        _session_state = compute_session_state("opbs_x", "salt", "client_1", REDIRECT_URI)
+        assert self.browser_state.validate("opbs_x", "client_1", ORIGIN, _session_state)
+
+    def test_logout(self):
+        _opbs = self._opbs()
+        _session_state = self.browser_state.session_state(_opbs, "client_1", REDIRECT_URI)
+        self.browser_state.logout("diana")
+        assert not self.browser_state.validate(_opbs, "client_1", ORIGIN, _session_state)
+        # Same authentication event but logged out, so a new opbs
+        assert self._opbs() != _opbs
+
+    def test_logout_from_client(self):
+        _opbs = self._opbs()
+        _state_1 = self.browser_state.session_state(_opbs, "client_1", REDIRECT_URI)
+        _state_2 = self.browser_state.session_state(_opbs, "client_2", REDIRECT_URI)
+        self.browser_state.logout("diana", "client_1")
+        assert not self.browser_state.validate(_opbs, "client_1", ORIGIN, _state_1)
+        assert self.browser_state.validate(_opbs, "client_2", ORIGIN, _state_2)
+        # Logging in to the client again gives a new session state
+        _new_state = self.browser_state.session_state(_opbs, "client_1", REDIRECT_URI)
+        assert _new_state != _state_1
+        assert self.browser_state.validate(_opbs, "client_1", ORIGIN, _new_state)
+
+    def test_bounded(self):
+        _first = self._opbs("user_0")
+        for n in range(1, 4):
+            self._opbs(f"user_{n}")
+        _state = compute_session_state(_first, "salt", "client_1", REDIRECT_URI)
+        # Dropped, hence no longer valid
+        assert not self.browser_state.validate(_first, "client_1", ORIGIN, _state)
+        assert self._opbs("user_0") != _first
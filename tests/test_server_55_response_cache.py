@@ -0,0 +1,129 @@
+import json
+import os
+
+import pytest
+from cryptojwt.jwk.ec import new_ec_key
+from cryptojwt.key_bundle import KeyBundle
+
+from idpyoidc.server import Server
+from idpyoidc.server.configure import OPConfiguration
+from idpyoidc.server.oauth2.jwks import JWKS
+from idpyoidc.server.oidc.provider_config import ProviderConfiguration
+from idpyoidc.server.response_cache import ResponseCache
+from idpyoidc.server.response_cache import etag_matches
+
+BASEDIR = os.path.abspath(os.path.dirname(__file__))
+
+KEYDEFS = [
+    {"type": "RSA", "key": "", "use": ["sig"]},
+    {"type": "EC", "crv": "P-256", "use": ["sig"]},
+]
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"xyz", "abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"xyz"', '"abc"')
+    assert not etag_matches("", '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+class TestResponseCache(object):
+    def test_build_once(self):
+        cache = ResponseCache(max_age=60, content_type="application/json")
+        _built = []
+
+        def build():
+            _built.append(1)
+            return json.dumps({"a": 1})
+
+        _source = {"a": 1}
+        _resp = cache.get(_source, build)
+        assert cache.get(_source, build)["etag"] == _resp["etag"]
+        assert len(_built) == 1
+        assert ("Cache-Control", "max-age=60") in _resp["http_headers"]
+        assert ("ETag", _resp["etag"]) in _resp["http_headers"]
+
+    def test_rebuild_on_change(self):
+        cache = ResponseCache()
+        _source = {"a": 1}
+        _resp = cache.get(_source, lambda: json.dumps(_source))
+        # Changed in place
+        _source["a"] = 2
+        _resp2 = cache.get(_source, lambda: json.dumps(_source))
+        assert _resp2["etag"] != _resp["etag"]
+        assert json.loads(_resp2["response"]) == {"a": 2}
+
+    def test_headers_not_shared(self):
+        cache = ResponseCache()
+        _resp = cache.get(1, lambda: "{}")
+        _resp["http_headers"].append(("X-Foo", "bar"))
+        assert ("X-Foo", "bar") not in cache.get(1, lambda: "{}")["http_headers"]
+
+
+class TestDiscoveryEndpoints(object):
+    @pytest.fixture(autouse=True)
+    def create_endpoint(self):
+        conf = {
+            "issuer": "https://example.com/",
+            "httpc_params": {"verify": False},
+            "keys": {"uri_path": "static/jwks.json", "key_defs": KEYDEFS},
+            "endpoint": {
+                "provider_config": {
+                    "path": ".well-known/openid-configuration",
+                    "class": ProviderConfiguration,
+                    "kwargs": {"max_age": 600},
+                },
+                "jwks": {"path": "static/jwks.json", "class": JWKS, "kwargs": {}},
+            },
+            "template_dir": "template",
+        }
+        self.server = Server(OPConfiguration(conf=conf, base_path=BASEDIR), cwd=BASEDIR)
+        self.context = self.server.context
+        self.endpoint = self.server.get_endpoint("provider_config")
+        self.jwks_endpoint = self.server.get_endpoint("jwks")
+
+    def test_provider_config_not_modified(self):
+        args = self.endpoint.process_request()
+        msg = self.endpoint.do_response(args["response_args"])
+        assert ("Cache-Control", "max-age=600") in msg["http_headers"]
+        _etag = msg["etag"]
+
+        args = self.endpoint.process_request(http_info={"headers": {"If-None-Match": _etag}})
+        assert args["response_code"] == 304
+        msg = self.endpoint.do_response(**args)
+        assert msg["response_code"] == 304
+        assert msg["response"] == ""
+
+    def test_provider_config_changed(self):
+        args = self.endpoint.process_request()
+        _etag = self.endpoint.do_response(args["response_args"])["etag"]
+
+        self.context.provider_info["service_documentation"] = "https://example.com/doc"
+        args = self.endpoint.process_request(http_info={"headers": {"If-None-Match": _etag}})
+        assert "response_args" in args
+        msg = self.endpoint.do_response(args["response_args"])
+        assert msg["etag"] != _etag
+        assert json.loads(msg["response"])["service_documentation"] == "https://example.com/doc"
+
+    def test_jwks(self):
+        args = self.jwks_endpoint.process_request()
+        msg = self.jwks_endpoint.do_response(**args)
+        _jwks = json.loads(msg["response"])
+        assert len(_jwks["keys"]) == 2
+        assert ("Content-type", "application/jwk-set+json") in msg["http_headers"]
+
+        args = self.jwks_endpoint.process_request(
+            http_info={"headers": {"if-none-match": msg["etag"]}}
+        )
+        assert self.jwks_endpoint.do_response(**args)["response_code"] == 304
+
+    def test_jwks_key_rotation(self):
+        _etag = self.jwks_endpoint.process_request()["etag"]
+        self.server.keyjar.add_kb("", KeyBundle(keys=[new_ec_key("P-256").serialize()]))
+        args = self.jwks_endpoint.process_request(http_info={"headers": {"If-None-Match": _etag}})
+        assert "response_code" not in args
+        assert args["etag"] != _etag
+        assert len(json.loads(args["response"])["keys"]) == 3
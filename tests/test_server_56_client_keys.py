@@ -0,0 +1,192 @@
+import os
+import threading
+import time
+
+import pytest
+import responses
+from cryptojwt.exception import IssuerNotFound
+from cryptojwt.jwe.jwe import factory as jwe_factory
+from cryptojwt.jwt import JWT
+from cryptojwt.key_jar import build_keyjar
+
+from idpyoidc.defaults import JWT_BEARER
+from idpyoidc.message.oidc import RegistrationRequest
+from idpyoidc.server import Server
+from idpyoidc.server.client_authn import PrivateKeyJWT
+from idpyoidc.server.client_keys import ClientKeyJar
+from idpyoidc.server.client_keys import ClientKeys
+from idpyoidc.server.configure import OPConfiguration
+from idpyoidc.server.oidc.registration import Registration
+from tests import SESSION_PARAMS
+
+BASEDIR = os.path.abspath(os.path.dirname(__file__))
+
+KEYDEFS = [
+    {"type": "RSA", "key": "", "use": ["sig"]},
+    {"type": "EC", "crv": "P-256", "use": ["sig"]},
+]
+
+CLIENT_KEYDEFS = [
+    {"type": "RSA", "key": "", "use": ["sig", "enc"]},
+    {"type": "EC", "crv": "P-256", "use": ["sig"]},
+]
+
+JWKS_URI = "https://client.example.org/jwks.json"
+
+
+class TestClientKeys(object):
+    @pytest.fixture(autouse=True)
+    def create_server(self):
+        conf = {
+            "issuer": "https://example.com/",
+            "httpc_params": {"verify": False, "timeout": 1},
+            "keys": {"key_defs": KEYDEFS, "uri_path": "static/jwks.json"},
+            "client_keys": {"class": ClientKeys, "kwargs": {"max_clients": 2}},
+            "endpoint": {
+                "registration": {
+                    "path": "registration",
+                    "class": Registration,
+                    "kwargs": {"client_authn_method": ["none"]},
+                },
+            },
+            "template_dir": "template",
+            "session_params": SESSION_PARAMS,
+        }
+        self.server = Server(OPConfiguration(conf=conf, base_path=BASEDIR), cwd=BASEDIR)
+        self.context = self.server.context
+        self.client_keys = self.context.client_keys
+        self.client_keyjar = {}
+        for _cid in ["client_1", "client_2", "client_3"]:
+            _keyjar = build_keyjar(CLIENT_KEYDEFS)
+            self.client_keyjar[_cid] = _keyjar
+            self.context.cdb[_cid] = {"jwks": _keyjar.export_jwks(), "client_secret": "a_long_and_very_secret_secret"}
+
+    def _assertion(self, client_id):
+        _jwt = JWT(self.client_keyjar[client_id], iss=client_id, sign_alg="RS256")
+        _jwt.with_jti = True
+        return _jwt.pack({"aud": [self.context.issuer]})
+
+    def test_key_jar(self):
+        assert isinstance(self.server.keyjar, ClientKeyJar)
+        assert self.context.keyjar is self.server.keyjar
+        assert self.server.get_attribute("keyjar") is self.server.keyjar
+        # The server's own keys
+        assert len(self.server.keyjar.get_issuer_keys("")) == 2
+
+    def test_lazy(self):
+        assert len(self.client_keys) == 0
+        # 3 from the JWKS and the client secret
+        assert len(self.server.keyjar.get_issuer_keys("client_1")) == 4
+        assert len(self.client_keys) == 1
+        with pytest.raises(IssuerNotFound):
+            self.server.keyjar.get_issuer_keys("unknown")
+
+    def test_client_authn(self):
+        _request = {"client_assertion": self._assertion("client_1"),
+                    "client_assertion_type": JWT_BEARER}
+        authn_info = PrivateKeyJWT(self.server.unit_get).verify(request=_request)
+        assert authn_info["client_id"] == "client_1"
+
+    def test_id_token_encryption(self):
+        _jwt = JWT(
+            self.server.keyjar,
+            iss=self.context.issuer,
+            sign_alg="RS256",
+            encrypt=True,
+            enc_alg="RSA-OAEP",
+            enc_enc="A128CBC-HS256",
+        )
+        _token = _jwt.pack({"sub": "diana"}, recv="client_2")
+        _jwe = jwe_factory(_token)
+        assert _jwe
+        assert _jwe.decrypt(_token, self.client_keyjar["client_2"].get_encrypt_key("RSA"))
+
+    def test_bounded(self):
+        for _cid in ["client_1", "client_2", "client_3"]:
+            assert self.server.keyjar.get_issuer_keys(_cid)
+        assert len(self.client_keys) == 2
+        assert "client_1" not in self.server.keyjar.owners()
+        # Loaded again when needed
+        _request = {"client_assertion": self._assertion("client_1"),
+                    "client_assertion_type": JWT_BEARER}
+        PrivateKeyJWT(self.server.unit_get).verify(request=_request)
+        assert set(self.client_keys._loaded.keys()) == {"client_3", "client_1"}
+
+    def test_forget(self):
+        self.server.keyjar.get_issuer_keys("client_1")
+        _keyjar = build_keyjar(CLIENT_KEYDEFS)
+        self.context.cdb["client_1"] = {"jwks": _keyjar.export_jwks()}
+        self.client_keys.forget("client_1")
+        assert len(self.client_keys) == 0
+        assert {k.kid for k in self.server.keyjar.get_issuer_keys("client_1")} == {
+            k.kid for k in _keyjar.get_issuer_keys("")
+        }
+
+    def test_registration_does_not_fetch(self):
+        _endpoint = self.server.get_endpoint("registration")
+        _req = _endpoint.parse_request(
+            RegistrationRequest(
+                redirect_uris=["https://client.example.org/cb"], jwks_uri=JWKS_URI
+            ).to_json()
+        )
+        with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+            rsps.add("GET", JWKS_URI, body=self.client_keyjar["client_1"].export_jwks_as_json(),
+                     adding_headers={"Content-Type": "application/json"}, status=200)
+            _resp = _endpoint.process_request(request=_req)
+            _client_id = _resp["response_args"]["client_id"]
+            assert len(rsps.calls) == 0
+
+            # First use
+            assert len(self.server.keyjar.get_issuer_keys(_client_id)) == 4
+            assert len(rsps.calls) == 1
+
+    def test_concurrent_first_use(self):
+        self.context.cdb["client_4"] = {"jwks_uri": JWKS_URI}
+        self.context.cdb["client_5"] = {"jwks_uri": JWKS_URI}
+        _jwks = self.client_keyjar["client_1"].export_jwks_as_json()
+
+        def _slow_jwks(request):
+            time.sleep(0.1)
+            return 200, {"Content-Type": "application/json"}, _jwks
+
+        _keys = []
+        with responses.RequestsMock() as rsps:
+            rsps.add_callback("GET", JWKS_URI, callback=_slow_jwks)
+            _threads = [
+                threading.Thread(
+                    target=lambda c: _keys.append(self.server.keyjar.get_issuer_keys(c)),
+                    args=(_cid,),
+                )
+                for _cid in ["client_4", "client_5"] * 3
+            ]
+            for _thread in _threads:
+                _thread.start()
+            for _thread in _threads:
+                _thread.join()
+            assert len(rsps.calls) == 1
+
+        assert [len(k) for k in _keys] == [3] * 6
+        _kb = self.client_keys._bundle[JWKS_URI]
+        for _cid in ["client_4", "client_5"]:
+            assert self.server.keyjar._issuers[_cid]._bundles == [_kb]
+
+    def test_shared_jwks_uri_and_refresh(self):
+        self.context.cdb["client_4"] = {"jwks_uri": JWKS_URI}
+        self.context.cdb["client_5"] = {"jwks_uri": JWKS_URI}
+        with responses.RequestsMock() as rsps:
+            rsps.add("GET", JWKS_URI, body=self.client_keyjar["client_1"].export_jwks_as_json(),
+                     adding_headers={"Content-Type": "application/json"}, status=200)
+            assert len(self.server.keyjar.get_issuer_keys("client_4")) == 3
+            assert len(self.server.keyjar.get_issuer_keys("client_5")) == 3
+            assert len(rsps.calls) == 1
+
+            # Close to when it should be refetched
+            _kb = self.client_keys._bundle[JWKS_URI]
+            _kb.time_out = time.time() + 10
+            self.server.keyjar.get_issuer_keys("client_4")
+            for _ in range(50):
+                if not self.client_keys._refreshing:
+                    break
+                time.sleep(0.02)
+            assert len(rsps.calls) == 2
+            assert _kb.time_out > time.time() + 10
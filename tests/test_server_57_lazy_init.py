@@ -0,0 +1,144 @@
+import os
+
+import pytest
+
+from idpyoidc.encrypter import LazyEncrypter
+from idpyoidc.server import Server
+from idpyoidc.server.configure import OPConfiguration
+from idpyoidc.server.oidc.provider_config import ProviderConfiguration
+from idpyoidc.server.startup_report import StartupReport
+from idpyoidc.server.user_authn.authn_context import INTERNETPROTOCOLPASSWORD
+from tests import CRYPT_CONFIG
+from tests import SESSION_PARAMS
+
+BASEDIR = os.path.abspath(os.path.dirname(__file__))
+
+KEYDEFS = [
+    {"type": "RSA", "key": "", "use": ["sig"]},
+    {"type": "EC", "crv": "P-256", "use": ["sig"]},
+]
+
+CONF = {
+    "issuer": "https://example.com/",
+    "httpc_params": {"verify": False, "timeout": 1},
+    "keys": {"key_defs": KEYDEFS, "uri_path": "static/jwks.json"},
+    "token_handler_args": {
+        "code": {"kwargs": {"lifetime": 600, "crypt_conf": CRYPT_CONFIG}},
+    },
+    "endpoint": {
+        "provider_config": {
+            "path": ".well-known/openid-configuration",
+            "class": ProviderConfiguration,
+            "kwargs": {},
+        },
+    },
+    "authentication": {
+        "anon": {
+            "acr": INTERNETPROTOCOLPASSWORD,
+            "class": "idpyoidc.server.user_authn.user.NoAuthn",
+            "kwargs": {"user": "diana"},
+        }
+    },
+    "userinfo": {
+        "class": "idpyoidc.server.user_info.UserInfo",
+        "kwargs": {"db_file": "users.json"},
+    },
+    "template_dir": "template",
+    "session_params": SESSION_PARAMS,
+}
+
+
+def _server(**kwargs):
+    _conf = CONF.copy()
+    _conf.update(kwargs)
+    return Server(OPConfiguration(conf=_conf, base_path=BASEDIR), cwd=BASEDIR)
+
+
+class TestLazyInit(object):
+    @pytest.fixture(autouse=True)
+    def create_server(self):
+        self.server = _server(lazy_init=True)
+        self.context = self.server.context
+
+    def test_not_set_up(self):
+        assert self.context._pending == {
+            "template_handler",
+            "authentication",
+            "userinfo",
+            "login_hint_lookup",
+            "client_authn_methods",
+        }
+        assert "userinfo" not in self.context.__dict__
+        assert isinstance(self.context.session_manager.crypt, LazyEncrypter)
+        assert self.context.session_manager.crypt._encrypter is None
+        _code_handler = self.context.session_manager.token_handler["authorization_code"]
+        assert isinstance(_code_handler.crypt, LazyEncrypter)
+
+    def test_first_use(self):
+        assert self.context.userinfo.db["diana"]
+        assert "userinfo" not in self.context._pending
+        assert "userinfo" in self.server.startup_report.lazy
+
+        assert len(self.context.authn_broker) == 1
+        assert self.context.template_handler
+        assert "bearer_header" in self.context.client_authn_methods
+
+    def test_assigned_value_kept(self):
+        self.context.client_authn_methods["dummy"] = None
+        assert "dummy" in self.context.client_authn_methods
+
+        self.context.userinfo = "other"
+        assert self.context.userinfo == "other"
+        # Setting it up later does not overwrite it
+        assert "userinfo" in self.context._pending
+        _ = self.context.login_hint_lookup
+        assert self.context.userinfo == "other"
+
+    def test_unknown_attribute(self):
+        with pytest.raises(AttributeError):
+            _ = self.context.no_such_thing
+
+    def test_session(self):
+        _sm = self.context.session_manager
+        _key = _sm.encrypted_branch_id("diana", "client_1")
+        assert _sm.decrypt_branch_id(_key) == ["diana", "client_1"]
+        assert _sm.crypt._encrypter is not None
+
+    def test_report(self):
+        _report = self.server.startup_report
+        assert {"keyjar", "endpoints", "keys", "provider_info", "session_manager"}.issubset(
+            set(_report.timing.keys())
+        )
+        assert _report.total > 0
+        assert "total at startup" in str(_report)
+
+
+def test_not_lazy():
+    # Unless asked for everything is set up at startup
+    server = _server()
+    context = server.context
+    assert "_pending" not in context.__dict__
+    assert context.userinfo.db["diana"]
+    assert not isinstance(context.session_manager.crypt, LazyEncrypter)
+    assert "userinfo" in server.startup_report.timing
+    assert not server.startup_report.lazy
+
+
+def test_configuration_error_at_startup():
+    _userinfo = {
+        "class": "idpyoidc.server.user_info.UserInfo",
+        "kwargs": {"db_file": "no_such_users.json"},
+    }
+    with pytest.raises(FileNotFoundError):
+        _server(userinfo=_userinfo)
+
+
+def test_startup_report():
+    report = StartupReport()
+    with report.measure("a"):
+        pass
+    with report.measure("b", lazy=True):
+        pass
+    assert set(report.timing.keys()) == {"a", "b"}
+    assert report.startup_time() == report.timing["a"]
+    assert "(first use)" in str(report)
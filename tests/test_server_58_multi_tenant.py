@@ -0,0 +1,132 @@
+import os
+
+import pytest
+from cryptojwt.key_jar import build_keyjar
+
+from idpyoidc.server.multi_tenant import MultiTenantServer
+from idpyoidc.server.oidc.provider_config import ProviderConfiguration
+from idpyoidc.server.oidc.registration import Registration
+from idpyoidc.server.user_authn.authn_context import INTERNETPROTOCOLPASSWORD
+from tests import CRYPT_CONFIG
+from tests import SESSION_PARAMS
+
+BASEDIR = os.path.abspath(os.path.dirname(__file__))
+
+KEYDEFS = [{"type": "EC", "crv": "P-256", "use": ["sig"]}]
+
+CONF = {
+    "issuer": "https://example.com/",
+    "httpc_params": {"verify": False, "timeout": 1},
+    "keys": {"key_defs": KEYDEFS, "uri_path": "static/jwks.json"},
+    "token_handler_args": {
+        "code": {"kwargs": {"lifetime": 600, "crypt_conf": CRYPT_CONFIG}},
+    },
+    "endpoint": {
+        "provider_config": {
+            "path": ".well-known/openid-configuration",
+            "class": ProviderConfiguration,
+            "kwargs": {},
+        },
+        "registration": {
+            "path": "registration",
+            "class": Registration,
+            "kwargs": {"client_authn_method": ["none"]},
+        },
+    },
+    "authentication": {
+        "anon": {
+            "acr": INTERNETPROTOCOLPASSWORD,
+            "class": "idpyoidc.server.user_authn.user.NoAuthn",
+            "kwargs": {"user": "diana"},
+        }
+    },
+    "template_dir": "template",
+    "session_params": SESSION_PARAMS,
+}
+
+TENANT_1 = "https://op.example.com/tenant1"
+TENANT_2 = "https://op.example.com/tenant12"
+TENANT_3 = "https://other.example.org"
+
+
+class TestMultiTenant(object):
+    @pytest.fixture(autouse=True)
+    def create_host(self):
+        self.keyjar = build_keyjar(KEYDEFS)
+        self.host = MultiTenantServer(
+            CONF,
+            tenants={
+                TENANT_1: {"keyjar": self.keyjar, "cdb": {"client_1": {"client_secret": "x"}}},
+                TENANT_2: {"keys": {"key_defs": KEYDEFS, "uri_path": "tenant_jwks.json"}},
+                TENANT_3: {"scopes_to_claims": {"openid": ["sub"]}},
+            },
+            cwd=BASEDIR,
+            base_path=BASEDIR,
+        )
+
+    def test_lazy(self):
+        assert self.host.server == {}
+        _server = self.host.get_server(TENANT_1)
+        assert set(self.host.server.keys()) == {TENANT_1}
+        assert self.host.get_server(TENANT_1) is _server
+        assert self.host.get_server("https://unknown.example.com") is None
+
+    def test_tenant(self):
+        _server = self.host.get_server(TENANT_1)
+        assert _server.issuer == TENANT_1
+        assert _server.context.issuer == TENANT_1
+        assert _server.context.provider_info["issuer"] == TENANT_1
+        assert _server.context.provider_info["jwks_uri"] == f"{TENANT_1}/static/jwks.json"
+        assert _server.get_endpoint("registration").full_path == f"{TENANT_1}/registration"
+        assert _server.context.cdb == {"client_1": {"client_secret": "x"}}
+        assert _server.keyjar is self.keyjar
+
+    def test_overlay(self):
+        _server_1 = self.host.get_server(TENANT_1)
+        _server_2 = self.host.get_server(TENANT_2)
+        _server_3 = self.host.get_server(TENANT_3)
+        # Shared
+        assert _server_1.context.template_handler is _server_2.context.template_handler
+        assert _server_1.context.scope2claims is _server_2.context.scope2claims
+        # Tenant specific
+        assert _server_3.context.scope2claims == {"openid": ["sub"]}
+        assert _server_1.context.session_manager is not _server_2.context.session_manager
+        assert _server_1.context.cdb is not _server_2.context.cdb
+        _jwks_2 = _server_2.keyjar.export_jwks()
+        _jwks_3 = _server_3.keyjar.export_jwks()
+        assert _jwks_2["keys"][0]["x"] != _jwks_3["keys"][0]["x"]
+        assert _server_2.context.provider_info["jwks_uri"] == f"{TENANT_2}/tenant_jwks.json"
+        assert _server_3.context.provider_info["jwks_uri"] == f"{TENANT_3}/static/jwks.json"
+        # The common configuration is not changed
+        assert self.host.conf["issuer"] == "https://example.com/"
+        assert self.host.conf.conf["issuer"] == "https://example.com/"
+
+    def test_route(self):
+        assert self.host.route(f"{TENANT_1}/registration") is self.host.get_server(TENANT_1)
+        assert self.host.route(f"{TENANT_2}/registration") is self.host.get_server(TENANT_2)
+        assert self.host.route(TENANT_2) is self.host.get_server(TENANT_2)
+        assert self.host.route(f"{TENANT_3}/.well-known/openid-configuration") is (
+            self.host.get_server(TENANT_3)
+        )
+        assert self.host.route("https://op.example.com/tenant3/registration") is None
+        assert self.host.route("https://unknown.example.com/registration") is None
+
+    def test_add_remove(self):
+        with pytest.raises(ValueError):
+            self.host.add_tenant(TENANT_1)
+        _issuer = "https://op.example.com/tenant1/sub"
+        self.host.add_tenant(_issuer)
+        assert self.host.route(f"{_issuer}/registration").issuer == _issuer
+        self.host.remove_tenant(_issuer)
+        assert self.host.route(f"{_issuer}/registration").issuer == TENANT_1
+        self.host.remove_tenant(TENANT_3)
+        assert self.host.route(TENANT_3) is None
+
+    def test_memory_usage(self):
+        self.host.get_server(TENANT_1)
+        self.host.get_server(TENANT_2)
+        _usage = self.host.memory_usage()
+        assert set(_usage.keys()) == {TENANT_1, TENANT_2}
+        assert _usage[TENANT_1] > 0
+        # The shared parts are not counted
+        assert id(self.host.template_handler) in self.host.shared()
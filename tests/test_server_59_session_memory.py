@@ -0,0 +1,145 @@
+import copy
+
+import pytest
+
+from idpyoidc.message.oidc import AuthorizationRequest
+from idpyoidc.server.authn_event import create_authn_event
+from idpyoidc.server.session.grant import TOKEN_MAP
+from idpyoidc.server.session.grant import Grant
+from idpyoidc.server.session.info import ClientSessionInfo
+from idpyoidc.server.session.info import UserSessionInfo
+from idpyoidc.server.session.token import AccessToken
+from idpyoidc.server.session.token import AuthorizationCode
+from idpyoidc.server.session.token import RefreshToken
+from idpyoidc.server.session.token import SharedUsageRules
+from idpyoidc.server.session.token import intern_usage_rules
+
+AUTH_REQ = AuthorizationRequest(
+    client_id="client_1",
+    redirect_uri="https://example.com/cb",
+    scope=["openid"],
+    state="STATE",
+    response_type="code",
+)
+
+USAGE_RULES = {
+    "authorization_code": {
+        "supports_minting": ["access_token", "refresh_token", "id_token"],
+        "max_usage": 1,
+    },
+    "access_token": {"expires_in": 3600},
+    "refresh_token": {"supports_minting": ["access_token", "refresh_token"]},
+}
+
+
+def make_grant(n):
+    return Grant(
+        scope=["openid"],
+        authorization_request=AUTH_REQ,
+        authentication_event=create_authn_event(f"user_{n}"),
+        usage_rules=copy.deepcopy(USAGE_RULES),
+        sub=f"sub_{n}",
+    )
+
+
+def test_slots():
+    for _item in [
+        AccessToken(token_class="access_token", value="foo"),
+        AuthorizationCode(token_class="authorization_code", value="foo"),
+        RefreshToken(token_class="refresh_token", value="foo"),
+    ]:
+        assert not hasattr(_item, "__dict__")
+
+    _info = ClientSessionInfo("client_1")
+    assert "subordinate" not in _info.__dict__
+
+
+def test_intern():
+    _rules = intern_usage_rules(copy.deepcopy(USAGE_RULES))
+    # Lists are kept as tuples, a copy has lists again
+    assert copy.deepcopy(_rules) == USAGE_RULES
+    assert _rules is intern_usage_rules(copy.deepcopy(USAGE_RULES))
+    assert _rules["access_token"] is intern_usage_rules({"expires_in": 3600})
+    assert intern_usage_rules(None) == {}
+
+
+def test_intern_copies():
+    _supports = ["access_token"]
+    _rules = intern_usage_rules({"supports_minting": _supports, "expires_in": 7200})
+    _supports.append("refresh_token")
+    assert _rules["supports_minting"] == ("access_token",)
+    assert intern_usage_rules({"supports_minting": ["access_token"], "expires_in": 7200}) is _rules
+
+    _copy = copy.deepcopy(_rules)
+    _copy["supports_minting"].append("refresh_token")
+    assert _rules["supports_minting"] == ("access_token",)
+
+
+def test_shared_read_only():
+    _rules = intern_usage_rules({"expires_in": 3600})
+    assert isinstance(_rules, SharedUsageRules)
+    with pytest.raises(TypeError):
+        _rules["expires_in"] = 60
+    with pytest.raises(TypeError):
+        _rules.update({"expires_in": 60})
+
+    _copy = copy.copy(_rules)
+    _copy["expires_in"] = 60
+    assert _rules["expires_in"] == 3600
+
+
+def test_grants_share_usage_rules():
+    _grant_1 = make_grant(1)
+    _grant_2 = make_grant(2)
+    assert _grant_1.shared_usage_rules() is _grant_2.shared_usage_rules()
+    assert _grant_1.token_map is TOKEN_MAP
+
+    _code_1 = AuthorizationCode(
+        token_class="authorization_code",
+        usage_rules=_grant_1.shared_usage_rules()["authorization_code"],
+    )
+    _code_2 = AuthorizationCode(
+        token_class="authorization_code",
+        usage_rules=_grant_2.shared_usage_rules()["authorization_code"],
+    )
+    assert _code_1.shared_usage_rules() is _code_2.shared_usage_rules()
+
+
+def test_modify_usage_rules():
+    _grant_1 = make_grant(1)
+    _grant_2 = make_grant(2)
+    _grant_1.usage_rules["access_token"]["expires_in"] = 60
+    assert _grant_1.usage_rules["access_token"] == {"expires_in": 60}
+    assert _grant_2.usage_rules["access_token"] == {"expires_in": 3600}
+
+    _token_1 = RefreshToken(token_class="refresh_token")
+    _token_2 = RefreshToken(token_class="refresh_token")
+    _token_1.usage_rules["supports_minting"].remove("refresh_token")
+    assert _token_1.supports_minting("refresh_token") is False
+    assert _token_2.supports_minting("refresh_token")
+
+
+def test_dump_load():
+    _grant = make_grant(1)
+    _grant.issued_token.append(
+        AccessToken(
+            token_class="access_token",
+            value="foo",
+            usage_rules=_grant.shared_usage_rules()["access_token"],
+        )
+    )
+    _shared = _grant.shared_usage_rules()
+    _dump = _grant.dump()
+    assert _dump["usage_rules"] == USAGE_RULES
+    # Dumping doesn't make a copy
+    assert _grant.shared_usage_rules() is _shared
+
+    _loaded = Grant().load(_dump)
+    assert _loaded.shared_usage_rules() is _shared
+    assert _loaded.token_map is TOKEN_MAP
+    assert _loaded.issued_token[0].shared_usage_rules() is _shared["access_token"]
+
+    _user = UserSessionInfo("diana")
+    _user.add_subordinate("client_1")
+    _loaded_user = UserSessionInfo().load(_user.dump())
+    assert _loaded_user.subordinate == ["client_1"]
@@ -8,6 +8,7 @@ from cryptojwt.key_jar import init_key_jar
 
 from idpyoidc.message.oauth2 import AccessTokenRequest
 from idpyoidc.message.oauth2 import AuthorizationRequest
+from idpyoidc.message.oauth2 import ResponseMessage
 from idpyoidc.server import Server
 from idpyoidc.server import user_info
 from idpyoidc.server.authn_event import create_authn_event
@@ -15,6 +16,7 @@ from idpyoidc.server.client_authn import verify_client
 from idpyoidc.server.configure import OPConfiguration
 from idpyoidc.server.oauth2.add_on.dpop import DPoPProof
 from idpyoidc.server.oauth2.add_on.dpop import token_post_parse_request
+from idpyoidc.server.oauth2.add_on.dpop import userinfo_post_parse_request
 from idpyoidc.server.oauth2.authorization import Authorization
 from idpyoidc.server.oidc.token import Token
 from idpyoidc.server.user_authn.authn_context import INTERNETPROTOCOLPASSWORD
@@ -236,6 +238,20 @@ class TestEndpoint(object):
         assert auth_req
         assert "dpop_jkt" in auth_req
 
+    def test_post_parse_request_no_proof(self):
+        token_req = token_post_parse_request(
+            AccessTokenRequest(**TOKEN_REQ.to_dict()),
+            TOKEN_REQ["client_id"],
+            self.context,
+            http_info={
+                "headers": {},
+                "url": "https://server.example.com/token",
+                "method": "POST",
+            },
+        )
+        assert token_req
+        assert "dpop_jkt" not in token_req
+
     def test_process_request(self):
         session_id = self._create_session(AUTH_REQ)
         grant = self.session_manager[session_id]
@@ -270,3 +286,54 @@ class TestEndpoint(object):
         )
         _token = self.session_manager.find_token(_session_info["branch_id"], access_token)
         assert _token.token_type == "DPoP"
+
+    def _access_token(self, headers):
+        session_id = self._create_session(AUTH_REQ)
+        grant = self.session_manager[session_id]
+        code = self._mint_code(grant, AUTH_REQ["client_id"])
+
+        _token_request = TOKEN_REQ.to_dict()
+        _token_request["code"] = code.value
+        _req = self.token_endpoint.parse_request(
+            _token_request,
+            http_info={
+                "headers": headers,
+                "url": "https://server.example.com/token",
+                "method": "POST",
+            },
+        )
+        _resp = self.token_endpoint.process_request(request=_req)
+        return _resp["response_args"]["access_token"]
+
+    def test_userinfo_no_proof(self):
+        # A DPoP bound access token used as a bearer token
+        access_token = self._access_token({"dpop": DPOP_HEADER})
+        _req = userinfo_post_parse_request(
+            {"client_id": "client_1", "access_token": access_token},
+            "client_1",
+            self.context,
+            auth_info={"client_id": "client_1", "token": access_token},
+            http_info={
+                "headers": {},
+                "url": "https://server.example.com/userinfo",
+                "method": "GET",
+            },
+        )
+        assert isinstance(_req, ResponseMessage)
+        assert _req["error"] == "invalid_token"
+
+    def test_userinfo_bearer(self):
+        access_token = self._access_token({})
+        request = {"client_id": "client_1", "access_token": access_token}
+        _req = userinfo_post_parse_request(
+            request,
+            "client_1",
+            self.context,
+            auth_info={"client_id": "client_1", "token": access_token},
+            http_info={
+                "headers": {},
+                "url": "https://server.example.com/userinfo",
+                "method": "GET",
+            },
+        )
+        assert _req is request
@@ -0,0 +1,237 @@
+import os
+import threading
+
+import pytest
+from cryptojwt.key_jar import init_key_jar
+
+from idpyoidc.message.oidc import AccessTokenRequest
+from idpyoidc.message.oidc import AuthorizationRequest
+from idpyoidc.server import Server
+from idpyoidc.server.authn_event import create_authn_event
+from idpyoidc.server.configure import OPConfiguration
+from idpyoidc.server.exception import UnAuthorizedClient
+from idpyoidc.server.instrumentation import HistogramCollector
+from idpyoidc.server.instrumentation import Instrumentation
+from idpyoidc.server.oidc.authorization import Authorization
+from idpyoidc.server.oidc.token import Token
+from idpyoidc.server.session.manager import SessionManager
+from idpyoidc.server.user_authn.authn_context import INTERNETPROTOCOLPASSWORD
+from idpyoidc.server.user_info import UserInfo
+from tests import CRYPT_CONFIG
+from tests import SESSION_PARAMS
+
+KEYDEFS = [
+    {"type": "RSA", "key": "", "use": ["sig"]},
+    {"type": "EC", "crv": "P-256", "use": ["sig"]},
+]
+
+ISSUER = "https://example.com/"
+
+KEYJAR = init_key_jar(key_defs=KEYDEFS, issuer_id=ISSUER)
+KEYJAR.import_jwks(KEYJAR.export_jwks(True, ISSUER), "")
+
+BASEDIR = os.path.abspath(os.path.dirname(__file__))
+
+AUTH_REQ = AuthorizationRequest(
+    client_id="client_1",
+    redirect_uri="https://example.com/cb",
+    scope=["openid"],
+    state="STATE",
+    response_type="code",
+)
+
+TOKEN_REQ = AccessTokenRequest(
+    client_id="client_1",
+    redirect_uri="https://example.com/cb",
+    state="STATE",
+    grant_type="authorization_code",
+    client_secret="hemligt",
+)
+
+
+def full_path(local_file):
+    return os.path.join(BASEDIR, local_file)
+
+
+def server_conf(instrumentation=None):
+    conf = {
+        "issuer": ISSUER,
+        "httpc_params": {"verify": False, "timeout": 1},
+        "keys": {"uri_path": "jwks.json", "key_defs": KEYDEFS},
+        "token_handler_args": {
+            "jwks_def": {
+                "private_path": "private/token_jwks.json",
+                "read_only": False,
+                "key_defs": [{"type": "oct", "bytes": "24", "use": ["enc"], "kid": "code"}],
+            },
+            "code": {"lifetime": 600, "kwargs": {"crypt_conf": CRYPT_CONFIG}},
+            "token": {
+                "class": "idpyoidc.server.token.jwt_token.JWTToken",
+                "kwargs": {"lifetime": 3600},
+            },
+            "id_token": {"class": "idpyoidc.server.token.id_token.IDToken", "kwargs": {}},
+        },
+        "endpoint": {
+            "authorization": {"path": "authorization", "class": Authorization, "kwargs": {}},
+            "token": {
+                "path": "token",
+                "class": Token,
+                "kwargs": {"client_authn_method": ["client_secret_post"]},
+            },
+        },
+        "authentication": {
+            "anon": {
+                "acr": INTERNETPROTOCOLPASSWORD,
+                "class": "idpyoidc.server.user_authn.user.NoAuthn",
+                "kwargs": {"user": "diana"},
+            }
+        },
+        "userinfo": {"class": UserInfo, "kwargs": {"db_file": full_path("users.json")}},
+        "template_dir": "template",
+        "session_params": SESSION_PARAMS,
+    }
+    if instrumentation:
+        conf["instrumentation"] = instrumentation
+    return conf
+
+
+class TestInstrumentation(object):
+    @pytest.fixture(autouse=True)
+    def create_server(self):
+        server = Server(
+            OPConfiguration(
+                server_conf(
+                    {
+                        "class": "idpyoidc.server.instrumentation.HistogramCollector",
+                        "kwargs": {"per_client": True},
+                    }
+                ),
+                base_path=BASEDIR,
+            ),
+            keyjar=KEYJAR,
+        )
+        self.context = server.context
+        self.context.cdb["client_1"] = {
+            "client_secret": "hemligt",
+            "redirect_uris": [("https://example.com/cb", None)],
+            "client_salt": "salted",
+            "token_endpoint_auth_method": "client_secret_post",
+            "response_types": ["code"],
+            "allowed_scopes": ["openid"],
+        }
+        self.token_endpoint = server.get_endpoint("token")
+        self.session_manager = self.context.session_manager
+        self.collector = self.context.instrumentation
+
+    def _code(self):
+        session_id = self.session_manager.create_session(
+            authn_event=create_authn_event("diana"),
+            auth_req=AUTH_REQ,
+            user_id="diana",
+            client_id="client_1",
+        )
+        grant = self.session_manager[session_id]
+        return grant.mint_token(
+            session_id=session_id,
+            context=self.context,
+            token_class="authorization_code",
+            token_handler=self.session_manager.token_handler["authorization_code"],
+        )
+
+    def test_instrumented(self):
+        assert isinstance(self.collector, HistogramCollector)
+        assert isinstance(self.session_manager, SessionManager)
+        assert self.session_manager.__class__.__qualname__ == "SessionManager"
+        assert self.session_manager.__class__ is not SessionManager
+        assert isinstance(self.context.userinfo, UserInfo)
+        assert self.context.userinfo._instrumentation is self.collector
+
+    def test_stages(self):
+        _token_request = TOKEN_REQ.to_dict()
+        _token_request["code"] = self._code().value
+        _req = self.token_endpoint.parse_request(_token_request)
+        _resp = self.token_endpoint.process_request(request=_req)
+        assert "access_token" in _resp["response_args"]
+
+        _summary = self.collector.summary()
+        assert _summary[("token", "parse_request")]["count"] == 1
+        assert _summary[("token", "client_authentication")]["count"] == 1
+        assert _summary[("token", "process_request")]["errors"] == 0
+        assert ("session_manager", "create_session") in _summary
+        assert ("token_handler.authorization_code", "call") in _summary
+        assert ("token_handler.access_token", "call") in _summary
+        assert ("token", "client_authentication", "client_1") in self.collector.histogram
+
+        assert self.collector.percentile("token", "parse_request", 50) > 0
+        assert self.collector.percentile("token", "nothing", 50) is None
+
+    def test_errors(self):
+        _token_request = TOKEN_REQ.to_dict()
+        _token_request["code"] = "not a code"
+        _resp = self.token_endpoint.parse_request(_token_request)
+        assert "error" in _resp
+        assert self.collector.summary()[("token", "parse_request")]["errors"] == 1
+
+    def test_unknown_client(self):
+        # Client IDs that aren't registered don't get histograms of their own
+        for _client_id in ["random_1", "random_2"]:
+            _token_request = TOKEN_REQ.to_dict()
+            _token_request["client_id"] = _client_id
+            _token_request["code"] = "not a code"
+            with pytest.raises(UnAuthorizedClient):
+                self.token_endpoint.parse_request(_token_request)
+        _client_ids = {_client_id for _, _, _client_id in self.collector.histogram.keys()}
+        assert _client_ids == {""}
+        assert self.collector.summary()[("token", "parse_request")]["count"] == 2
+
+    def test_prometheus(self):
+        self.collector.reset()
+        self._code()
+        _text = self.collector.prometheus()
+        _labels = 'endpoint="session_manager",stage="create_session",client_id="client_1"'
+        assert "# TYPE idpyoidc_stage_duration_seconds histogram" in _text
+        assert f'idpyoidc_stage_duration_seconds_bucket{{{_labels},le="+Inf"}} 1' in _text
+        assert f"idpyoidc_stage_duration_seconds_count{{{_labels}}} 1" in _text
+        assert f"idpyoidc_stage_errors_total{{{_labels}}} 0" in _text
+
+
+def test_not_instrumented():
+    server = Server(OPConfiguration(server_conf(), base_path=BASEDIR), keyjar=KEYJAR)
+    assert type(server.context.instrumentation) is Instrumentation
+    assert server.context.session_manager.__class__ is SessionManager
+    assert server.get_endpoint("token").__class__ is Token
+
+
+def test_percentile():
+    _collector = HistogramCollector(buckets=[0.1, 0.2, 0.4])
+    for _duration in [0.05, 0.15, 0.15, 0.3]:
+        _span = _collector.start("token", "process_request")
+        _span.start -= _duration
+        _collector.stop(_span)
+    assert _collector.percentile("token", "process_request", 25) == pytest.approx(0.1)
+    assert _collector.percentile("token", "process_request", 50) == pytest.approx(0.15)
+    assert _collector.percentile("token", "process_request", 100) == pytest.approx(0.4)
+
+
+def test_read_while_collecting():
+    _collector = HistogramCollector()
+    _done = threading.Event()
+
+    def collect():
+        n = 0
+        while not _done.is_set():
+            _collector.stop(_collector.start("token", f"stage_{n % 500}"))
+            n += 1
+            if n % 500 == 0:
+                _collector.reset()
+
+    _thread = threading.Thread(target=collect)
+    _thread.start()
+    try:
+        for _ in range(200):
+            _collector.summary()
+            _collector.percentile("token", "stage_0", 50)
+            _collector.prometheus()
+    finally:
+        _done.set()
+        _thread.join()
@@ -0,0 +1,115 @@
+import pytest
+
+from idpyoidc.message.oidc import AuthorizationRequest
+from idpyoidc.server.authn_event import create_authn_event
+from idpyoidc.server.session.database import Database
+from idpyoidc.server.session.grant import Grant
+from idpyoidc.server.session.manager import SessionManager
+from idpyoidc.server.token.handler import TokenHandler
+
+AUTH_REQ = {
+    "client_id": "client_1",
+    "redirect_uri": "https://example.com/cb",
+    "scope": ["openid"],
+    "state": "STATE",
+    "response_type": "code",
+}
+
+
+def make_grant(authn_time=1700000000):
+    return Grant(
+        authorization_request=AuthorizationRequest(**AUTH_REQ),
+        authentication_event=create_authn_event("diana", authn_time=authn_time),
+    )
+
+
+class TestSharedItems(object):
+    @pytest.fixture(autouse=True)
+    def create_db(self):
+        self.db = Database()
+        self.grant_1 = make_grant()
+        self.grant_2 = make_grant(1700000100)
+        self.db.set(["diana", "client_1", self.grant_1.id], self.grant_1)
+        self.db.set(["diana", "client_1", self.grant_2.id], self.grant_2)
+
+    def test_shared(self):
+        assert self.grant_1.authorization_request is self.grant_2.authorization_request
+        assert self.grant_1.authentication_event is not self.grant_2.authentication_event
+        assert len(self.db.shared.item) == 3
+
+        # Storing a grant again doesn't add references
+        self.db.set(["diana", "client_1", self.grant_1.id], self.grant_1)
+        _refs = self.db.shared.refs[self.db.branch_key("diana", "client_1", self.grant_1.id)]
+        assert self.db.shared.item[_refs["authorization_request"]][1] == 2
+
+    def test_garbage_collected(self):
+        _key = self.db.shared.refs[self.db.branch_key("diana", "client_1", self.grant_1.id)]
+        self.db.delete(["diana", "client_1", self.grant_1.id])
+        assert _key["authorization_request"] in self.db.shared.item
+        assert _key["authentication_event"] not in self.db.shared.item
+
+        self.db.delete(["diana", "client_1", self.grant_2.id])
+        assert self.db.shared.item == {}
+        assert self.db.shared.refs == {}
+
+    def test_dump_load(self):
+        _dump = self.db.dump()
+        assert len(_dump["shared"]) == 3
+        _spec = _dump["db"][self.db.branch_key("diana", "client_1", self.grant_1.id)][1]
+        assert _spec["authorization_request"] in _dump["shared"]
+        assert _spec["authentication_event"] in _dump["shared"]
+
+        _db = Database().load(_dump)
+        _grant_1 = _db.get(["diana", "client_1", self.grant_1.id])
+        _grant_2 = _db.get(["diana", "client_1", self.grant_2.id])
+        assert _grant_1.authorization_request == AuthorizationRequest(**AUTH_REQ)
+        assert _grant_1.authorization_request is _grant_2.authorization_request
+        assert _grant_1.authentication_event["authn_time"] == 1700000000
+        assert _db.shared.refs == self.db.shared.refs
+
+    def test_load_without_references(self):
+        _dump = self.db.dump()
+        for _key, _hash in self.db.shared.refs.items():
+            for attr, _hash in _hash.items():
+                _dump["db"][_key][1][attr] = _dump["shared"][_hash]
+        del _dump["shared"]
+
+        _db = Database().load(_dump)
+        _grant_1 = _db.get(["diana", "client_1", self.grant_1.id])
+        _grant_2 = _db.get(["diana", "client_1", self.grant_2.id])
+        assert _grant_1.authorization_request is _grant_2.authorization_request
+        assert len(_db.shared.item) == 3
+
+    def test_flush(self):
+        self.db.flush()
+        assert self.db.shared.item == {}
+
+
+def test_session_manager_copies():
+    session_manager = SessionManager(handler=TokenHandler())
+    _authn_event = create_authn_event("diana", authn_time=1700000000)
+    _sids = [
+        session_manager.create_session(
+            authn_event=_authn_event,
+            auth_req=AuthorizationRequest(**AUTH_REQ),
+            user_id="diana",
+            client_id="client_1",
+        )
+        for _ in range(2)
+    ]
+    _grants = [session_manager[sid] for sid in _sids]
+    assert _grants[0].authorization_request is _grants[1].authorization_request
+
+    _event = session_manager.get_authentication_event(_sids[0])
+    _event["valid_until"] = 0
+    _request = session_manager.get_session_info(_sids[0], authorization_request=True)[
+        "authorization_request"
+    ]
+    _request["state"] = "OTHER"
+    for _event in session_manager.get_authentication_events(session_id=_sids[0]):
+        _event["authn_info"] = "other"
+
+    for _grant in _grants:
+        assert _grant.authentication_event["valid_until"] != 0
+        assert _grant.authentication_event["authn_info"] != "other"
+        assert _grant.authorization_request["state"] == "STATE"
@@ -0,0 +1,192 @@
+import os
+
+import pytest
+
+from idpyoidc import verified_claim_name
+from idpyoidc.message.oidc import AuthorizationRequest
+from idpyoidc.server import Server
+from idpyoidc.server.authn_event import create_authn_event
+from idpyoidc.server.configure import OPConfiguration
+from idpyoidc.server.oidc.backchannel_authentication import BackChannelAuthentication
+from idpyoidc.server.session.manager import PairWiseID
+from idpyoidc.server.session.manager import SessionManager
+from idpyoidc.server.session.manager import ephemeral_id
+from idpyoidc.server.session.manager import pairwise_id
+from idpyoidc.server.session.manager import public_id
+from idpyoidc.server.session.subject import SubjectCache
+from idpyoidc.server.token.handler import TokenHandler
+from idpyoidc.server.user_authn.authn_context import INTERNETPROTOCOLPASSWORD
+from idpyoidc.server.user_info import UserInfo
+from tests import CRYPT_CONFIG
+from tests import SESSION_PARAMS
+
+BASEDIR = os.path.abspath(os.path.dirname(__file__))
+
+KEYDEFS = [
+    {"type": "RSA", "key": "", "use": ["sig"]},
+    {"type": "EC", "crv": "P-256", "use": ["sig"]},
+]
+
+AUTH_REQ = AuthorizationRequest(
+    client_id="client_1",
+    redirect_uri="https://example.com/cb",
+    scope=["openid"],
+    state="STATE",
+    response_type="code",
+    sector_identifier_uri="https://example.com/sector",
+)
+
+
+class Counter(object):
+    def __init__(self, func):
+        self.func = func
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.func(*args, **kwargs)
+
+
+class TestSubjectCache(object):
+    def setup_method(self):
+        self.pairwise = Counter(pairwise_id)
+        self.public = Counter(public_id)
+        self.cache = SubjectCache(
+            {"pairwise": self.pairwise, "public": self.public, "ephemeral": ephemeral_id},
+            size=3,
+        )
+
+    def test_cached(self):
+        _sub = self.cache("pairwise", "diana", "https://example.com", salt="salt")
+        assert _sub == pairwise_id("diana", "https://example.com", "salt")
+        assert self.cache("pairwise", "diana", "https://example.com", salt="salt") == _sub
+        assert self.pairwise.calls == 1
+        assert self.cache("public", "diana", salt="salt") == public_id("diana", "salt")
+        assert self.cache.user_id("pairwise", _sub) == ("diana", "https://example.com")
+
+        # Not the same twice
+        assert self.cache("ephemeral", "diana") != self.cache("ephemeral", "diana")
+
+    def test_bounded(self):
+        for _uid in ["a", "b", "c", "a", "d"]:
+            self.cache("public", _uid, salt="salt")
+        assert len(self.cache) == 3
+        # b was the least recently used
+        assert self.cache.user_id("public", public_id("b", "salt")) is None
+        assert self.cache.user_id("public", public_id("a", "salt")) == ("a", "")
+
+    def test_salt_rotation(self):
+        _sub = self.cache("public", "diana", salt="salt")
+        self.cache("pairwise", "diana", "https://example.com", salt="salt")
+        _new = self.cache("public", "diana", salt="pepper")
+        assert _new != _sub
+        assert self.public.calls == 2
+        assert self.cache.user_id("public", _sub) is None
+        assert len(self.cache) == 2
+
+        # A function with its own salt
+        _func = PairWiseID(salt="salt")
+        self.cache.sub_func["pairwise"] = _func
+        self.cache("pairwise", "diana", "https://example.com")
+        _func.salt = "pepper"
+        _sub = self.cache("pairwise", "diana", "https://example.com")
+        assert _sub == pairwise_id("diana", "https://example.com", "pepper")
+
+    def test_batch(self):
+        res = self.cache.batch(
+            "pairwise", ["diana", "bob"], ["https://a.example.com", "https://b.example.com"]
+        )
+        assert len(res) == 4
+        assert res[("bob", "https://b.example.com")] == pairwise_id(
+            "bob", "https://b.example.com"
+        )
+        assert self.pairwise.calls == 4
+        assert len(self.cache) == 3
+
+        res = self.cache.batch("public", ["diana", "bob"], remember=False)
+        assert res[("diana", "")] == public_id("diana")
+        assert self.cache.user_id("public", res[("diana", "")]) is None
+
+
+class TestSessionManager(object):
+    def setup_method(self):
+        self.session_manager = SessionManager(handler=TokenHandler())
+
+    def test_find_user_id(self):
+        self.session_manager.create_session(
+            authn_event=create_authn_event("diana"),
+            auth_req=AUTH_REQ,
+            user_id="diana",
+            client_id="client_1",
+            sub_type="pairwise",
+        )
+        _sub = pairwise_id("diana", "https://example.com/sector", self.session_manager.get_salt())
+        assert self.session_manager.find_user_id(_sub) == "diana"
+
+        # Not remembered, found in the session database
+        self.session_manager.subject.clear()
+        assert self.session_manager.find_user_id(_sub) == "diana"
+        assert self.session_manager.find_user_id("unknown") is None
+
+    def test_subjects(self):
+        res = self.session_manager.subjects(["diana", "bob"], sub_type="public")
+        assert res[("bob", "")] == public_id("bob", self.session_manager.get_salt())
+        assert self.session_manager.find_user_id(res[("bob", "")]) == "bob"
+
+
+class TestBackChannelAuthentication(object):
+    @pytest.fixture(autouse=True)
+    def create_endpoint(self):
+        conf = {
+            "issuer": "https://example.com/",
+            "httpc_params": {"verify": False, "timeout": 1},
+            "keys": {"uri_path": "jwks.json", "key_defs": KEYDEFS},
+            "token_handler_args": {
+                "code": {"lifetime": 600, "kwargs": {"crypt_conf": CRYPT_CONFIG}},
+            },
+            "endpoint": {
+                "backchannel_authentication": {
+                    "path": "backchannel_authn",
+                    "class": BackChannelAuthentication,
+                    "kwargs": {},
+                },
+            },
+            "authentication": {
+                "anon": {
+                    "acr": INTERNETPROTOCOLPASSWORD,
+                    "class": "idpyoidc.server.user_authn.user.NoAuthn",
+                    "kwargs": {"user": "diana"},
+                }
+            },
+            "userinfo": {"class": UserInfo, "kwargs": {"db": {}}},
+            "session_params": SESSION_PARAMS,
+        }
+        server = Server(OPConfiguration(conf, base_path=BASEDIR), cwd=BASEDIR)
+        self.session_manager = server.context.session_manager
+        self.endpoint = server.get_endpoint("backchannel_authentication")
+        self.session_id = self.session_manager.create_session(
+            authn_event=create_authn_event("diana"),
+            auth_req=AUTH_REQ,
+            user_id="diana",
+            client_id="client_1",
+            sub_type="pairwise",
+        )
+        self.sub = self.session_manager[self.session_id].sub
+
+    def _request(self, id_token):
+        return {"id_token_hint": "x.y.z", verified_claim_name("id_token_hint"): id_token}
+
+    def test_id_token_hint_sub(self):
+        assert self.sub != "diana"
+        _request = self._request({"sub": self.sub})
+        assert self.endpoint.do_request_user(_request) == "diana"
+
+    def test_id_token_hint_sid(self, monkeypatch):
+        # The session ID says who the user is, the subject identifier isn't looked up
+        monkeypatch.setattr(self.session_manager, "find_user_id", None)
+        _request = self._request({"sub": self.sub, "sid": self.session_id})
+        assert self.endpoint.do_request_user(_request) == "diana"
+
+    def test_id_token_hint_unknown(self):
+        with pytest.raises(KeyError):
+            self.endpoint.do_request_user(self._request({"sub": "unknown"}))